@@ -0,0 +1,141 @@
+"""
+Vectorized graded harm scoring for offline batch evaluation
+Maps a batch of inputs to a sparse hashed bag-of-words matrix and multiplies
+it by a (hashed feature x category) weight matrix, giving per-category graded
+scores for thousands of prompts at once. Thresholding the scores with the
+HarmDetectionLayer sensitivity cutoffs reproduces its boolean results. Tokens
+that collide in a hash bucket share one row holding each category's largest
+weight, so a collision can make a benign prompt flagged but never lets a
+harmful one through (`collisions` counts them; raise n_features to avoid them).
+
+Requires numpy (optional dependency; the request pipeline does not use it).
+"""
+from typing import Dict, Iterable, List, Optional, Union
+
+from NormalizedText import normalize, stable_hash
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CATEGORIES = ('direct', 'indirect', 'systemic', 'psychological')
+
+# A category is flagged when it has keyword evidence and the effective
+# sensitivity is at least its cutoff (same cutoffs as HarmDetectionLayer)
+SENSITIVITY_CUTOFFS = {'direct': 0.25, 'indirect': 0.5, 'systemic': 0.4, 'psychological': 0.4}
+
+DEFAULT_FEATURES = 2 ** 20
+
+# Weight-matrix columns: the harm categories, then crisis context
+_CRISIS_COLUMN = len(CATEGORIES)
+
+
+class BatchHarmScorer:
+    """
+    Hashed bag-of-words harm scorer
+    A token's weight row holds, per category, the summed weights of the
+    category keywords it contains (keywords are single words, so a substring
+    match in the text is always a match inside one token).
+    """
+    def __init__(self, harmful_keywords: Optional[Dict[str, List[str]]] = None,
+                 crisis_keywords: Optional[List[str]] = None, n_features: int = DEFAULT_FEATURES,
+                 keyword_weights: Optional[Dict[str, float]] = None):
+        if np is None:
+            raise ImportError("BatchHarmScorer requires numpy")
+        if harmful_keywords is None or crisis_keywords is None:
+            from EthicalSystemIntegration import HarmDetectionLayer
+            reference = HarmDetectionLayer()
+            harmful_keywords = harmful_keywords or reference.harmful_keywords
+            crisis_keywords = crisis_keywords or reference.crisis_keywords
+        self.n_features = n_features
+        self.keyword_weights = keyword_weights or {}
+        self._column_keywords = [list(harmful_keywords[category]) for category in CATEGORIES]
+        self._column_keywords.append(list(crisis_keywords))
+
+        # Weight matrix rows are filled in as new tokens are seen
+        self.weights = np.zeros((n_features, len(self._column_keywords)), dtype=np.float32)
+        self._bucket_tokens = {}
+        self.collisions = 0
+
+    def _token_weights(self, token: str):
+        return [sum(self.keyword_weights.get(keyword, 1.0) for keyword in keywords if keyword in token)
+                for keywords in self._column_keywords]
+
+    def _learn_tokens(self, tokens: Iterable[str]):
+        for token in tokens:
+            bucket = stable_hash(token) % self.n_features
+            owner = self._bucket_tokens.get(bucket)
+            row = self._token_weights(token)
+            if owner is None:
+                self._bucket_tokens[bucket] = token
+            elif owner != token and row != self._token_weights(owner):
+                # Hashing trick: colliding tokens share a row; count conflicting profiles
+                self.collisions += 1
+            if any(row):
+                # The shared row keeps each category's largest weight, so a collision
+                # can only over-flag (a benign token scores), never hide a harmful one
+                self.weights[bucket] = np.maximum(self.weights[bucket], row)
+
+    def vectorize(self, texts: Iterable):
+        """Sparse (COO) hashed bag-of-words: (row indices, feature indices, counts, n_rows)"""
+        rows, features, counts = [], [], []
+        seen = set()
+        n_rows = 0
+        for row, value in enumerate(texts):
+            n_rows = row + 1
+            text = normalize(value)
+            token_counts = {}
+            for token in text.tokens:
+                token_counts[token] = token_counts.get(token, 0) + 1
+            new_tokens = [token for token in token_counts if token not in seen]
+            seen.update(new_tokens)
+            self._learn_tokens(new_tokens)
+            for token, count in token_counts.items():
+                rows.append(row)
+                features.append(stable_hash(token) % self.n_features)
+                counts.append(count)
+        return (np.asarray(rows, dtype=np.int64), np.asarray(features, dtype=np.int64),
+                np.asarray(counts, dtype=np.float32), n_rows)
+
+    def weighted_hits(self, texts: Iterable):
+        """(n, categories + 1) keyword-hit totals: sparse bag-of-words x weight matrix"""
+        rows, features, counts, n_rows = self.vectorize(texts)
+        contributions = self.weights[features] * counts[:, None]
+        hits = np.zeros((n_rows, self.weights.shape[1]), dtype=np.float32)
+        np.add.at(hits, rows, contributions)
+        return hits
+
+    def score(self, texts: Iterable):
+        """Graded per-category scores in [0, 1): 1 - 0.5 ** weighted keyword hits
+
+        Returns an (n, 4) array in CATEGORIES order plus an (n,) crisis-context score.
+        """
+        hits = self.weighted_hits(texts)
+        graded = 1.0 - np.power(0.5, hits)
+        return graded[:, :_CRISIS_COLUMN], graded[:, _CRISIS_COLUMN]
+
+    def classify(self, texts: Iterable, sensitivity: Union[float, 'np.ndarray'] = 0.5,
+                 crisis_mode: Union[bool, 'np.ndarray'] = True) -> Dict[str, 'np.ndarray']:
+        """Boolean per-category results matching HarmDetectionLayer.analyze
+
+        sensitivity and crisis_mode may be scalars or per-row arrays.
+        """
+        scores, crisis_score = self.score(texts)
+        return threshold_scores(scores, crisis_score, sensitivity, crisis_mode)
+
+
+def threshold_scores(scores, crisis_score, sensitivity=0.5, crisis_mode=True) -> Dict[str, 'np.ndarray']:
+    """Apply the HarmDetectionLayer crisis rules and sensitivity cutoffs to graded scores"""
+    sensitivity = np.broadcast_to(np.asarray(sensitivity, dtype=np.float64), crisis_score.shape)
+    crisis_override = (crisis_score > 0) & np.asarray(crisis_mode, dtype=bool)
+    # Crisis context in crisis mode: 70% reduction above 0.8, otherwise detection off
+    effective = np.where(crisis_override, np.where(sensitivity > 0.8, sensitivity * 0.3, 0.0), sensitivity)
+
+    results = {'effective_sensitivity': effective, 'is_crisis_context': crisis_score > 0}
+    for column, category in enumerate(CATEGORIES):
+        results[category] = (scores[:, column] > 0) & (effective >= SENSITIVITY_CUTOFFS[category])
+    # Crisis vocabulary never counts as direct harm in crisis mode
+    results['direct'] &= ~crisis_override
+    results['has_harmful_intent'] = np.logical_or.reduce([results[category] for category in CATEGORIES])
+    return results
@@ -1,14 +1,14 @@
-class CognitiveBiasAnalysis:
-    """Stub for cognitive bias analysis return type."""
-    def __init__(self, **kwargs):
-        for k, v in kwargs.items():
-            setattr(self, k, v)
+from RecordTypes import record_type
 
-class ConfirmationBiasMetrics:
-    """Stub for confirmation bias metrics return type."""
-    def __init__(self, **kwargs):
-        for k, v in kwargs.items():
-            setattr(self, k, v)
+# Result records
+CognitiveBiasAnalysis = record_type('CognitiveBiasAnalysis', ('confirmation_bias',
+                                                              'anchoring_bias',
+                                                              'availability_bias',
+                                                              'framing_bias'), __name__)
+ConfirmationBiasMetrics = record_type('ConfirmationBiasMetrics', ('evidence_selection',
+                                                                  'interpretation_skew',
+                                                                  'hypothesis_testing',
+                                                                  'counter_evidence'), __name__)
 
 class BiasDetectionSystem:
     """
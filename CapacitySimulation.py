@@ -0,0 +1,446 @@
+"""
+Capacity model and discrete-event simulator for /api/chat deployments
+A normal-lane request holds one of the lane's workers while it runs the
+ethical checks and then, unless a check blocks it, its upstream completion.
+The completion also needs one of upstream_concurrency upstream slots (the
+provider's concurrency limit) and waits for one while holding its worker.
+A request that waits longer than queue_timeout for a worker is rejected (503).
+
+Per-stage service times are fitted from recorded samples: PerformanceMonitor
+stage samples, served by /api/metrics?stages=1 and saved by load_test.py
+--output. The fit is exponential or lognormal, whichever is closer by
+Kolmogorov-Smirnov distance, or the samples themselves when neither is close.
+Without a binding upstream limit a request's worker hold time is known when it
+arrives, so a run is a single FCFS multi-server pass; every run reuses the
+same random draws (rescaled to the arrival rate), so sweeps of hundreds of
+configurations take seconds and compare like with like.
+
+    workload = Workload.from_metrics(json.load(open('report.json')), rate=50)
+    required_workers(workload, p99_seconds=2.0)
+"""
+import heapq
+import math
+import random
+from bisect import bisect_right
+from collections import deque
+from itertools import accumulate
+from statistics import NormalDist
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from RecordTypes import record_type
+
+CHECKS = 'checks'
+UPSTREAM = 'upstream'
+STAGES = (CHECKS, UPSTREAM)
+
+EXPONENTIAL = 'exponential'
+LOGNORMAL = 'lognormal'
+EMPIRICAL = 'empirical'
+CONSTANT = 'constant'
+AUTO = 'auto'
+
+POISSON = 'poisson'
+DETERMINISTIC = 'deterministic'
+BURSTY = 'bursty'
+ARRIVAL_PROCESSES = (POISSON, DETERMINISTIC, BURSTY)
+
+# Fewest samples a stage can be fitted from
+MIN_FIT_SAMPLES = 20
+# Largest Kolmogorov-Smirnov distance at which a parametric fit is used
+KS_THRESHOLD = 0.1
+# Squared coefficient of variation of bursty interarrival times (Poisson: 1)
+DEFAULT_BURSTINESS = 4.0
+# Requests per simulated run, and the leading share discarded as warm-up
+DEFAULT_REQUESTS = 5000
+DEFAULT_WARMUP = 0.1
+DEFAULT_MAX_WORKERS = 1024
+
+Deployment = record_type('Deployment', 'workers upstream_concurrency queue_timeout')
+SimulationResult = record_type('SimulationResult', [
+    'rate', 'workers', 'upstream_concurrency', 'queue_timeout', 'completed', 'rejected_fraction',
+    'throughput', 'p50', 'p95', 'p99', 'mean_queue_wait', 'worker_utilization', 'upstream_utilization',
+    'saturated'])
+
+_NORMAL = NormalDist()
+
+
+def _percentile(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+class ServiceTime:
+    """
+    Service time distribution of one stage (seconds)
+    exponential(mean), lognormal(mean, cv), constant(mean) or the empirical
+    distribution of recorded samples (resampled).
+    """
+    def __init__(self, kind: str, mean: float, cv: float = 1.0, samples: Optional[Sequence[float]] = None,
+                 ks_distance: Optional[float] = None):
+        if kind == EMPIRICAL:
+            if not samples:
+                raise ValueError("Empirical service time needs samples")
+            samples = sorted(samples)
+            mean = sum(samples) / len(samples)
+            cv = _cv(samples, mean)
+        elif kind not in (EXPONENTIAL, LOGNORMAL, CONSTANT):
+            raise ValueError(f"Unknown service time distribution: {kind}")
+        if mean < 0:
+            raise ValueError(f"Negative mean service time: {mean}")
+        self.kind = kind
+        self.mean = mean
+        self.cv = 1.0 if kind == EXPONENTIAL else 0.0 if kind == CONSTANT else cv
+        self.samples = samples
+        self.ks_distance = ks_distance
+        if kind == LOGNORMAL:
+            self._sigma = math.sqrt(math.log1p(self.cv ** 2))
+            self._mu = math.log(max(mean, 1e-12)) - self._sigma ** 2 / 2
+
+    @classmethod
+    def fit(cls, samples: Sequence[float], kind: str = AUTO) -> 'ServiceTime':
+        """Fit recorded samples (seconds); AUTO picks the closest fit by KS distance"""
+        if len(samples) < MIN_FIT_SAMPLES:
+            raise ValueError(f"Need at least {MIN_FIT_SAMPLES} samples to fit a service time, got {len(samples)}")
+        samples = sorted(max(0.0, s) for s in samples)
+        mean = sum(samples) / len(samples)
+        if kind == EMPIRICAL:
+            return cls(EMPIRICAL, mean, samples=samples)
+        if samples[0] == samples[-1]:
+            return cls(CONSTANT, mean, ks_distance=0.0)
+        candidates = []
+        if kind in (AUTO, EXPONENTIAL):
+            candidates.append(cls(EXPONENTIAL, mean))
+        if kind in (AUTO, LOGNORMAL):
+            logs = [math.log(max(s, 1e-9)) for s in samples]
+            mu = sum(logs) / len(logs)
+            sigma2 = sum((x - mu) ** 2 for x in logs) / len(logs)
+            candidates.append(cls(LOGNORMAL, math.exp(mu + sigma2 / 2), math.sqrt(math.expm1(sigma2))))
+        if not candidates:
+            raise ValueError(f"Unknown service time distribution: {kind}")
+        for candidate in candidates:
+            candidate.ks_distance = candidate._ks(samples)
+        best = min(candidates, key=lambda c: c.ks_distance)
+        if kind == AUTO and best.ks_distance > KS_THRESHOLD:
+            return cls(EMPIRICAL, mean, samples=samples, ks_distance=best.ks_distance)
+        return best
+
+    def cdf(self, x: float) -> float:
+        if x <= 0:
+            return 0.0
+        if self.kind == EXPONENTIAL:
+            return 1.0 - math.exp(-x / self.mean) if self.mean > 0 else 1.0
+        if self.kind == LOGNORMAL:
+            return _NORMAL.cdf((math.log(x) - self._mu) / self._sigma) if self._sigma > 0 else float(x >= self.mean)
+        if self.kind == CONSTANT:
+            return float(x >= self.mean)
+        return bisect_right(self.samples, x) / len(self.samples)
+
+    def quantile(self, p: float) -> float:
+        if self.kind == EXPONENTIAL:
+            return -self.mean * math.log1p(-p)
+        if self.kind == LOGNORMAL:
+            return math.exp(self._mu + self._sigma * _NORMAL.inv_cdf(p))
+        if self.kind == CONSTANT:
+            return self.mean
+        return _percentile(self.samples, p)
+
+    def _ks(self, sorted_samples: Sequence[float]) -> float:
+        n = len(sorted_samples)
+        return max(max((i + 1) / n - f, f - i / n) for i, f in enumerate(map(self.cdf, sorted_samples)))
+
+    def draw(self, rng: random.Random, count: int) -> List[float]:
+        if self.kind == EXPONENTIAL:
+            if self.mean <= 0:
+                return [0.0] * count
+            rate = 1.0 / self.mean
+            return [rng.expovariate(rate) for _ in range(count)]
+        if self.kind == LOGNORMAL:
+            return [rng.lognormvariate(self._mu, self._sigma) for _ in range(count)]
+        if self.kind == CONSTANT:
+            return [self.mean] * count
+        return rng.choices(self.samples, k=count)
+
+    def scaled(self, factor: float) -> 'ServiceTime':
+        """The same shape with every service time multiplied by factor (what-if: slower upstream)"""
+        if self.kind == EMPIRICAL:
+            return ServiceTime(EMPIRICAL, self.mean * factor, samples=[s * factor for s in self.samples],
+                               ks_distance=self.ks_distance)
+        return ServiceTime(self.kind, self.mean * factor, self.cv, ks_distance=self.ks_distance)
+
+    def describe(self) -> Dict[str, Any]:
+        return {'kind': self.kind, 'mean_ms': self.mean * 1000, 'cv': self.cv,
+                'p50_ms': self.quantile(0.50) * 1000, 'p99_ms': self.quantile(0.99) * 1000,
+                'ks_distance': self.ks_distance}
+
+
+def _cv(samples: Sequence[float], mean: float) -> float:
+    if mean <= 0:
+        return 0.0
+    return math.sqrt(sum((s - mean) ** 2 for s in samples) / len(samples)) / mean
+
+
+class Workload:
+    """
+    Normal-lane traffic: arrival process and rate, per-stage service times and
+    the share of requests a check blocks (they skip the upstream stage)
+    """
+    def __init__(self, rate: float, stages: Dict[str, ServiceTime], blocked_fraction: float = 0.0,
+                 arrival: str = POISSON, burstiness: float = DEFAULT_BURSTINESS, _traces: Optional[Dict] = None):
+        missing = [stage for stage in STAGES if stage not in stages]
+        if missing:
+            raise ValueError(f"Workload is missing service times for: {', '.join(missing)}")
+        if arrival not in ARRIVAL_PROCESSES:
+            raise ValueError(f"Unknown arrival process: {arrival}")
+        if not 0.0 <= blocked_fraction <= 1.0:
+            raise ValueError(f"Blocked fraction out of range: {blocked_fraction}")
+        if rate <= 0:
+            raise ValueError(f"Arrival rate must be positive: {rate}")
+        self.rate = rate
+        self.stages = stages
+        self.blocked_fraction = blocked_fraction
+        self.arrival = arrival
+        self.burstiness = burstiness
+        # Random draws per (requests, seed), shared by every rate of this workload
+        self._traces = _traces if _traces is not None else {}
+
+    @classmethod
+    def from_metrics(cls, metrics: Dict[str, Any], rate: float, kind: str = AUTO, **kwargs) -> 'Workload':
+        """
+        Fit a workload from recorded stage samples
+        metrics is /api/metrics?stages=1 or a load_test.py --output report. Every
+        request that passed the checks recorded one upstream sample, so the
+        blocked share is 1 - upstream samples / checks samples.
+        """
+        samples = metrics.get('stage_samples') or {}
+        missing = [stage for stage in STAGES if not samples.get(stage)]
+        if missing:
+            raise ValueError(f"No recorded samples for stage(s): {', '.join(missing)} "
+                             f"(record traffic through /api/chat with monitoring enabled)")
+        stages = {stage: ServiceTime.fit(samples[stage], kind) for stage in STAGES}
+        blocked = max(0.0, 1.0 - len(samples[UPSTREAM]) / len(samples[CHECKS]))
+        kwargs.setdefault('blocked_fraction', blocked)
+        return cls(rate, stages, **kwargs)
+
+    def with_rate(self, rate: float) -> 'Workload':
+        return Workload(rate, self.stages, self.blocked_fraction, self.arrival, self.burstiness, self._traces)
+
+    def mean_hold(self) -> float:
+        """Mean worker hold time without upstream queueing (seconds)"""
+        return self.stages[CHECKS].mean + (1 - self.blocked_fraction) * self.stages[UPSTREAM].mean
+
+    def _trace(self, requests: int, seed: int):
+        """(unit-rate interarrival gaps, checks times, upstream times or None if blocked)"""
+        key = (requests, seed)
+        trace = self._traces.get(key)
+        if trace is None:
+            rng = random.Random(seed)
+            gaps = _unit_gaps(rng, requests, self.arrival, self.burstiness)
+            checks = self.stages[CHECKS].draw(rng, requests)
+            upstream = self.stages[UPSTREAM].draw(rng, requests)
+            for i in range(requests):
+                if rng.random() < self.blocked_fraction:
+                    upstream[i] = None
+            trace = self._traces[key] = (gaps, checks, upstream)
+        return trace
+
+    def describe(self) -> Dict[str, Any]:
+        return {'rate': self.rate, 'arrival': self.arrival, 'burstiness': self.burstiness,
+                'blocked_fraction': self.blocked_fraction,
+                'stages': {name: stage.describe() for name, stage in self.stages.items()}}
+
+
+def _unit_gaps(rng: random.Random, count: int, arrival: str, burstiness: float) -> List[float]:
+    """Interarrival times with mean 1"""
+    if arrival == DETERMINISTIC:
+        return [1.0] * count
+    if arrival == POISSON or burstiness <= 1.0:
+        return [rng.expovariate(1.0) for _ in range(count)]
+    # Balanced two-phase hyperexponential with squared coefficient of variation = burstiness
+    p = 0.5 * (1 + math.sqrt((burstiness - 1) / (burstiness + 1)))
+    fast, slow = 2 * p, 2 * (1 - p)
+    return [rng.expovariate(fast) if rng.random() < p else rng.expovariate(slow) for _ in range(count)]
+
+
+def simulate(workload: Workload, deployment: Deployment, requests: int = DEFAULT_REQUESTS,
+             warmup: float = DEFAULT_WARMUP, seed: int = 0) -> SimulationResult:
+    """Run one deployment against the workload; latencies in the result are seconds"""
+    workers = deployment.workers
+    upstream_limit = deployment.upstream_concurrency
+    if not workers or workers < 1:
+        raise ValueError(f"Deployment needs at least one worker, got {workers}")
+    if upstream_limit is not None and upstream_limit < 1:
+        raise ValueError(f"Upstream concurrency must be at least 1, got {upstream_limit}")
+    gaps, checks, upstream = workload._trace(requests, seed)
+    arrivals = list(accumulate(gap / workload.rate for gap in gaps))
+    if upstream_limit is None or upstream_limit >= workers:
+        run = _run_fcfs(arrivals, checks, upstream, workers, deployment.queue_timeout)
+    else:
+        run = _run_events(arrivals, checks, upstream, workers, upstream_limit, deployment.queue_timeout)
+    finish, waits, worker_busy, upstream_busy = run
+
+    first = int(requests * warmup)
+    latencies = sorted(finish[i] - arrivals[i] for i in range(first, requests) if finish[i] is not None)
+    measured_waits = [waits[i] for i in range(first, requests) if finish[i] is not None]
+    rejected = sum(1 for i in range(first, requests) if finish[i] is None)
+    end = max(f for f in finish if f is not None) if latencies else arrivals[-1]
+    span = max(end - arrivals[0], 1e-12)
+    worker_load, upstream_load = offered_load(workload, deployment)
+    return SimulationResult(
+        rate=workload.rate, workers=workers, upstream_concurrency=upstream_limit,
+        queue_timeout=deployment.queue_timeout, completed=len(latencies),
+        rejected_fraction=rejected / (requests - first),
+        throughput=len(latencies) / max(arrivals[-1] - arrivals[first], 1e-12),
+        p50=_percentile(latencies, 0.50), p95=_percentile(latencies, 0.95), p99=_percentile(latencies, 0.99),
+        mean_queue_wait=sum(measured_waits) / len(measured_waits) if measured_waits else 0.0,
+        worker_utilization=min(1.0, worker_busy / (workers * span)),
+        upstream_utilization=min(1.0, upstream_busy / (upstream_limit * span)) if upstream_limit else None,
+        # Offered load at or over capacity: queues grow without bound, however long the run
+        saturated=worker_load >= 1.0 or upstream_load >= 1.0)
+
+
+def offered_load(workload: Workload, deployment: Deployment):
+    """(worker, upstream) utilization the workload would need; at 1.0 or more queues grow without bound"""
+    upstream_limit = deployment.upstream_concurrency
+    worker_load = workload.rate * workload.mean_hold() / deployment.workers
+    upstream_load = (workload.rate * (1 - workload.blocked_fraction) * workload.stages[UPSTREAM].mean
+                     / upstream_limit if upstream_limit else 0.0)
+    return worker_load, upstream_load
+
+
+def _run_fcfs(arrivals, checks, upstream, workers, queue_timeout):
+    """FCFS over identical workers when hold times are known on arrival"""
+    free = [0.0] * workers
+    finish = [None] * len(arrivals)
+    waits = [0.0] * len(arrivals)
+    busy = upstream_busy = 0.0
+    for i, arrived in enumerate(arrivals):
+        start = free[0] if free[0] > arrived else arrived
+        if queue_timeout is not None and start - arrived > queue_timeout:
+            continue
+        upstream_time = upstream[i] or 0.0
+        hold = checks[i] + upstream_time
+        finish[i] = start + hold
+        waits[i] = start - arrived
+        busy += hold
+        upstream_busy += upstream_time
+        heapq.heapreplace(free, start + hold)
+    return finish, waits, busy, upstream_busy
+
+
+def _run_events(arrivals, checks, upstream, workers, upstream_limit, queue_timeout):
+    """Event-driven run: workers wait (holding their slot) for a limited number of upstream slots"""
+    n = len(arrivals)
+    finish = [None] * n
+    waits = [0.0] * n
+    started = [0.0] * n
+    events = []  # (time, request, upstream finished)
+    worker_queue = deque()
+    upstream_queue = deque()
+    free_workers, free_upstream = workers, upstream_limit
+    busy = upstream_busy = 0.0
+    next_arrival = 0
+    inf = float('inf')
+
+    def start_checks(i, now):
+        started[i] = now
+        waits[i] = now - arrivals[i]
+        heapq.heappush(events, (now + checks[i], i, False))
+
+    while next_arrival < n or events:
+        arrival_time = arrivals[next_arrival] if next_arrival < n else inf
+        if events and events[0][0] <= arrival_time:
+            now, i, upstream_done = heapq.heappop(events)
+            if upstream_done:
+                upstream_busy += upstream[i]
+                if upstream_queue:
+                    j = upstream_queue.popleft()
+                    heapq.heappush(events, (now + upstream[j], j, True))
+                else:
+                    free_upstream += 1
+            elif upstream[i] is not None:
+                if free_upstream:
+                    free_upstream -= 1
+                    heapq.heappush(events, (now + upstream[i], i, True))
+                else:
+                    upstream_queue.append(i)
+                continue
+            # Request finished: its worker takes the next request still within its queue timeout
+            finish[i] = now
+            busy += now - started[i]
+            while worker_queue:
+                j = worker_queue.popleft()
+                if queue_timeout is None or now - arrivals[j] <= queue_timeout:
+                    start_checks(j, now)
+                    break
+            else:
+                free_workers += 1
+        else:
+            i = next_arrival
+            next_arrival += 1
+            if free_workers:
+                free_workers -= 1
+                start_checks(i, arrival_time)
+            else:
+                worker_queue.append(i)
+    return finish, waits, busy, upstream_busy
+
+
+def meets_target(result: SimulationResult, p99_seconds: float, max_rejected: float = 0.0) -> bool:
+    return not result.saturated and result.p99 <= p99_seconds and result.rejected_fraction <= max_rejected
+
+
+def required_workers(workload: Workload, p99_seconds: float, upstream_concurrency: Optional[int] = None,
+                     queue_timeout: Optional[float] = None, max_rejected: float = 0.0,
+                     max_workers: int = DEFAULT_MAX_WORKERS, requests: int = DEFAULT_REQUESTS,
+                     seed: int = 0) -> Optional[SimulationResult]:
+    """
+    Fewest workers whose p99 latency is within p99_seconds at the workload's rate
+    Returns that run's result, or None if no count up to max_workers meets the
+    target (e.g. the upstream limit is the bottleneck, or a single request's
+    service time already exceeds it). Assumes more workers never hurt, which
+    holds for FCFS with the shared random draws.
+    """
+    def run(workers):
+        return simulate(workload, Deployment(workers, upstream_concurrency, queue_timeout), requests, seed=seed)
+
+    low = max(1, math.floor(workload.rate * workload.mean_hold()))
+    if low > max_workers or offered_load(workload, Deployment(low, upstream_concurrency))[1] >= 1.0:
+        return None
+    # Grow geometrically from the stability bound, then bisect
+    result = run(low)
+    if meets_target(result, p99_seconds, max_rejected):
+        return result
+    high = low
+    while True:
+        if high >= max_workers:
+            return None
+        low, high = high, min(max_workers, high * 2)
+        result = run(high)
+        if meets_target(result, p99_seconds, max_rejected):
+            break
+    best = result
+    while high - low > 1:
+        middle = (low + high) // 2
+        result = run(middle)
+        if meets_target(result, p99_seconds, max_rejected):
+            high, best = middle, result
+        else:
+            low = middle
+    return best
+
+
+def sweep(workload: Workload, rates: Iterable[float], workers: Iterable[int],
+          upstream_concurrency: Iterable[Optional[int]] = (None,), queue_timeout: Optional[float] = None,
+          requests: int = DEFAULT_REQUESTS, seed: int = 0) -> List[SimulationResult]:
+    """Simulate every (rate, workers, upstream concurrency) combination"""
+    workers = list(workers)
+    upstream_concurrency = list(upstream_concurrency)
+    results = []
+    for rate in rates:
+        at_rate = workload.with_rate(rate)
+        for upstream_limit in upstream_concurrency:
+            for count in workers:
+                results.append(simulate(at_rate, Deployment(count, upstream_limit, queue_timeout),
+                                        requests, seed=seed))
+    return results
@@ -0,0 +1,410 @@
+"""
+Versioned keyword lexicons compiled into a shared, memory-mapped automaton image
+Lexicon source files (lexicons/*.txt) list casefolded keywords per category.
+compile_lexicon builds an Aho-Corasick automaton over UTF-8 bytes from them and
+writes it as a binary image named by the lexicon version; worker processes
+mmap the image read-only, so every process on the host shares one physical
+copy. Publishing a new image repoints its lexicons/compiled/<name>.current
+pointer atomically and running workers pick it up on their next check,
+without a restart.
+
+Matching has substring semantics: a category matches when any of its keywords
+occurs anywhere in the casefolded text.
+"""
+import hashlib
+import json
+import mmap
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from collections import deque
+from typing import Dict, List, Optional, Tuple, Union
+
+from NormalizedText import NormalizedText, normalize
+
+LEXICON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lexicons')
+DEFAULT_SOURCE = os.path.join(LEXICON_DIR, 'harm_lexicon.txt')
+OUTPUT_SAFETY_SOURCE = os.path.join(LEXICON_DIR, 'output_safety.txt')
+DEFAULT_IMAGE_DIR = os.path.join(LEXICON_DIR, 'compiled')
+
+SOURCE_ENV_VAR = 'ETHICAL_LEXICON_SOURCE'
+IMAGE_DIR_ENV_VAR = 'ETHICAL_LEXICON_DIR'
+
+POINTER_SUFFIX = '.current'
+
+# Image layout: header, JSON metadata (padded to 4 bytes), 256-byte class map,
+# transitions (n_states x n_classes u32), output masks (n_states u32)
+IMAGE_MAGIC = b'KLEX'
+IMAGE_FORMAT = 1
+_HEADER = array('I', [0] * 4).itemsize * 4 + len(IMAGE_MAGIC)
+
+# Category masks are u32
+MAX_CATEGORIES = 32
+
+# Per-process cache of token -> category mask (word lexicons only)
+TOKEN_CACHE_SIZE = 65536
+
+_WORD_KEYWORD = re.compile(r"\w+")
+
+
+class LexiconError(ValueError):
+    """A lexicon source or image is malformed"""
+
+
+def lexicon_name(source_path: str) -> str:
+    """Name images and the pointer of a source are filed under (file name without extension)"""
+    return os.path.splitext(os.path.basename(source_path))[0]
+
+
+def parse_source(text: str) -> Tuple[int, Dict[str, List[str]]]:
+    """Parse lexicon source text into (version, {category: [keywords]})
+
+    Format: '# comments', one 'version: N' line, '[category]' headers and one
+    keyword per line. Keywords are casefolded; duplicates within a category
+    are dropped.
+    """
+    version = None
+    categories = {}
+    current = None
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if line.startswith('[') and line.endswith(']'):
+            current = categories.setdefault(line[1:-1].strip(), [])
+        elif line.lower().startswith('version:'):
+            try:
+                version = int(line.split(':', 1)[1])
+            except ValueError:
+                raise LexiconError(f"line {number}: version must be an integer") from None
+        elif current is None:
+            raise LexiconError(f"line {number}: keyword {line!r} outside a [category] section")
+        else:
+            keyword = line.casefold()
+            if keyword not in current:
+                current.append(keyword)
+    if version is None:
+        raise LexiconError("lexicon source has no 'version:' line")
+    if len(categories) > MAX_CATEGORIES:
+        raise LexiconError(f"lexicon has {len(categories)} categories (max {MAX_CATEGORIES})")
+    return version, categories
+
+
+def _build_automaton(categories: Dict[str, List[str]]):
+    """Aho-Corasick DFA over keyword bytes: (class map, n_classes, transitions, masks)"""
+    names = list(categories)
+    encoded = [(1 << bit, keyword.encode('utf-8'))
+               for bit, name in enumerate(names) for keyword in categories[name] if keyword]
+
+    # Bytes that occur in no keyword share class 0, which always leads back to the root
+    used = sorted({byte for _, keyword in encoded for byte in keyword})
+    class_map = bytearray(256)
+    for cls, byte in enumerate(used, 1):
+        class_map[byte] = cls
+    n_classes = len(used) + 1
+
+    goto = [{}]
+    masks = [0]
+    for bit, keyword in encoded:
+        state = 0
+        for byte in keyword:
+            cls = class_map[byte]
+            if cls not in goto[state]:
+                goto.append({})
+                masks.append(0)
+                goto[state][cls] = len(goto) - 1
+            state = goto[state][cls]
+        masks[state] |= bit
+
+    # Breadth-first failure links; fold failure outputs and transitions into a full DFA
+    transitions = array('I', [0]) * (len(goto) * n_classes)
+    fail = [0] * len(goto)
+    queue = deque()
+    for cls, child in goto[0].items():
+        transitions[cls] = child
+        queue.append(child)
+    while queue:
+        state = queue.popleft()
+        masks[state] |= masks[fail[state]]
+        row, fail_row = state * n_classes, fail[state] * n_classes
+        for cls in range(n_classes):
+            child = goto[state].get(cls)
+            if child is None:
+                transitions[row + cls] = transitions[fail_row + cls]
+            else:
+                fail[child] = transitions[fail_row + cls]
+                transitions[row + cls] = child
+                queue.append(child)
+    return bytes(class_map), n_classes, transitions, array('I', masks)
+
+
+def compile_lexicon(source_text: str) -> bytes:
+    """Compile lexicon source text into a binary image"""
+    version, categories = parse_source(source_text)
+    digest = hashlib.sha256(source_text.encode('utf-8')).hexdigest()
+    class_map, n_classes, transitions, masks = _build_automaton(categories)
+    metadata = json.dumps({
+        'version': f"{version}+{digest[:8]}",
+        'source_sha256': digest,
+        'byteorder': sys.byteorder,
+        # Ordered pairs: a category's position is its bit in the output masks
+        'categories': [[name, keywords] for name, keywords in categories.items()],
+        # Keywords made only of word characters always match inside a single token
+        'word_keywords': all(_WORD_KEYWORD.fullmatch(keyword)
+                             for keywords in categories.values() for keyword in keywords),
+    }, sort_keys=True).encode('utf-8')
+    metadata += b' ' * (-len(metadata) % 4)
+    header = IMAGE_MAGIC + array('I', [IMAGE_FORMAT, len(metadata), len(masks), n_classes]).tobytes()
+    return header + metadata + class_map + transitions.tobytes() + masks.tobytes()
+
+
+class CompiledLexicon:
+    """
+    Read-only view of a compiled lexicon image (mmap'ed file or in-memory bytes)
+    match() returns a bitmask of matched categories; bit() gives a category's bit.
+    """
+    def __init__(self, image: Union[bytes, mmap.mmap], path: Optional[str] = None):
+        self.path = path
+        self._image = image
+        view = memoryview(image)
+        if bytes(view[:len(IMAGE_MAGIC)]) != IMAGE_MAGIC:
+            raise LexiconError(f"{path or 'image'} is not a compiled lexicon")
+        image_format, meta_len, n_states, n_classes = view[len(IMAGE_MAGIC):_HEADER].cast('I')
+        if image_format != IMAGE_FORMAT:
+            raise LexiconError(f"unsupported lexicon image format {image_format}")
+        metadata = json.loads(bytes(view[_HEADER:_HEADER + meta_len]))
+        if metadata['byteorder'] != sys.byteorder:
+            raise LexiconError(f"lexicon image was compiled on a {metadata['byteorder']}-endian host")
+
+        offset = _HEADER + meta_len
+        self._class_map = bytes(view[offset:offset + 256])
+        offset += 256
+        self._transitions = view[offset:offset + n_states * n_classes * 4].cast('I')
+        offset += n_states * n_classes * 4
+        self._masks = view[offset:offset + n_states * 4].cast('I')
+
+        self.version = metadata['version']
+        self.source_sha256 = metadata['source_sha256']
+        self.categories = {name: tuple(keywords) for name, keywords in metadata['categories']}
+        self._bits = {name: 1 << index for index, name in enumerate(self.categories)}
+        self._n_classes = n_classes
+        self._word_keywords = metadata['word_keywords']
+        self._token_masks = {}
+
+    @classmethod
+    def open(cls, path: str) -> 'CompiledLexicon':
+        """Map an image file read-only"""
+        with open(path, 'rb') as f:
+            image = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(image, path)
+
+    @property
+    def n_states(self) -> int:
+        return len(self._masks)
+
+    def bit(self, category: str) -> int:
+        return self._bits[category]
+
+    def keywords(self, category: str) -> Tuple[str, ...]:
+        return self.categories[category]
+
+    def _scan(self, data: bytes) -> int:
+        transitions, masks, n_classes = self._transitions, self._masks, self._n_classes
+        state = found = 0
+        for cls in data.translate(self._class_map):
+            state = transitions[state * n_classes + cls]
+            found |= masks[state]
+        return found
+
+    def scan(self, data: bytes, state: int = 0, bits: int = -1) -> Tuple[int, List[Tuple[int, int]]]:
+        """Resumable scan of casefolded UTF-8 bytes
+
+        Returns the automaton state to resume from with the next block of data
+        and (byte index, mask & bits) for every byte where a keyword in bits
+        ends, so matches spanning two blocks are found.
+        """
+        transitions, masks, n_classes = self._transitions, self._masks, self._n_classes
+        hits = []
+        for index, cls in enumerate(data.translate(self._class_map)):
+            state = transitions[state * n_classes + cls]
+            mask = masks[state] & bits
+            if mask:
+                hits.append((index, mask))
+        return state, hits
+
+    def match(self, value: Union[str, NormalizedText]) -> int:
+        """Bitmask of categories with a keyword occurring in the casefolded text"""
+        text = normalize(value)
+        if not self._word_keywords:
+            return self._scan(text.text.encode('utf-8'))
+        # Every keyword is a run of word characters, so it can only match inside
+        # one token: scan each distinct token once and cache its mask
+        cache = self._token_masks
+        found = 0
+        for token in text.token_set:
+            mask = cache.get(token)
+            if mask is None:
+                if len(cache) >= TOKEN_CACHE_SIZE:
+                    cache.clear()
+                mask = cache[token] = self._scan(token.encode('utf-8'))
+            found |= mask
+        return found
+
+    def matched_categories(self, value: Union[str, NormalizedText]) -> List[str]:
+        found = self.match(value)
+        return [name for name, bit in self._bits.items() if found & bit]
+
+    def info(self) -> Dict:
+        return {
+            'version': self.version,
+            'path': self.path,
+            'categories': {name: len(keywords) for name, keywords in self.categories.items()},
+            'states': self.n_states,
+            'byte_classes': self._n_classes,
+            'image_bytes': len(self._image),
+            'cached_tokens': len(self._token_masks),
+        }
+
+
+def _atomic_write(path: str, data: bytes):
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def publish(source_path: str = DEFAULT_SOURCE, image_dir: str = DEFAULT_IMAGE_DIR) -> str:
+    """Compile source_path into image_dir and make it the current image
+
+    The image file is named after the lexicon name, version and source hash,
+    and the <name>.current pointer is replaced atomically, so readers see
+    either the old or the new image, never a partial one. Returns the image path.
+    """
+    with open(source_path, encoding='utf-8') as f:
+        image = compile_lexicon(f.read())
+    lexicon = CompiledLexicon(image)
+    os.makedirs(image_dir, exist_ok=True)
+    version, digest = lexicon.version.split('+')[0], lexicon.source_sha256[:12]
+    name = f"{lexicon_name(source_path)}-{version}-{digest}.bin"
+    path = os.path.join(image_dir, name)
+    if not os.path.exists(path):
+        _atomic_write(path, image)
+    _atomic_write(os.path.join(image_dir, lexicon_name(source_path) + POINTER_SUFFIX),
+                  (name + '\n').encode('utf-8'))
+    return path
+
+
+class LexiconStore:
+    """
+    Holds the current CompiledLexicon and swaps it when its pointer is repointed
+    current() checks the pointer at most every check_interval seconds; a
+    request should call it once and use that lexicon throughout, so it sees a
+    single version even if a swap happens mid-request. If no image has been
+    published yet, the source is compiled and published on first use.
+    After start_watching() the check runs on a background thread instead, so
+    current() never touches the filesystem on the request path.
+    """
+    def __init__(self, source_path: str = DEFAULT_SOURCE, image_dir: str = DEFAULT_IMAGE_DIR,
+                 check_interval: float = 1.0):
+        self.source_path = source_path
+        self.image_dir = image_dir
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._lexicon = None
+        self._pointer_stat = None
+        self._next_check = 0.0
+        self._watcher = None
+
+    @property
+    def pointer_path(self) -> str:
+        return os.path.join(self.image_dir, lexicon_name(self.source_path) + POINTER_SUFFIX)
+
+    def _pointer_signature(self):
+        try:
+            stat = os.stat(self.pointer_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def reload(self) -> CompiledLexicon:
+        """Load the image the pointer names (publishing from source if there is none)"""
+        with self._lock:
+            signature = self._pointer_signature()
+            if signature is None:
+                publish(self.source_path, self.image_dir)
+                signature = self._pointer_signature()
+            if self._lexicon is None or signature != self._pointer_stat:
+                with open(self.pointer_path, encoding='utf-8') as f:
+                    name = f.read().strip()
+                lexicon = CompiledLexicon.open(os.path.join(self.image_dir, name))
+                if self._lexicon is not None and lexicon.version != self._lexicon.version:
+                    print(f"Lexicon swapped: {self._lexicon.version} -> {lexicon.version}")
+                # Requests holding the old lexicon keep its mapping alive until they finish
+                self._lexicon = lexicon
+                self._pointer_stat = signature
+            self._next_check = time.monotonic() + self.check_interval
+            return self._lexicon
+
+    def current(self) -> CompiledLexicon:
+        lexicon = self._lexicon
+        if lexicon is None or (self._watcher is None and time.monotonic() >= self._next_check):
+            return self.reload()
+        return lexicon
+
+    def start_watching(self):
+        """Check the pointer every check_interval seconds on a daemon thread (idempotent)"""
+        with self._lock:
+            if self._watcher is not None:
+                return
+            stop = threading.Event()
+            self._watcher = (threading.Thread(target=self._watch, args=(stop,), name='lexicon-watch',
+                                              daemon=True), stop)
+        self._watcher[0].start()
+
+    def stop_watching(self):
+        """Stop the background check; current() checks inline again"""
+        with self._lock:
+            watcher, self._watcher = self._watcher, None
+        if watcher is not None:
+            watcher[1].set()
+            watcher[0].join()
+
+    def _watch(self, stop: threading.Event):
+        while not stop.wait(self.check_interval):
+            try:
+                self.reload()
+            except (OSError, LexiconError) as e:
+                print(f"Warning: lexicon reload failed: {e}")
+
+    @property
+    def version(self) -> str:
+        return self.current().version
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def default_store(source_path: Optional[str] = None) -> LexiconStore:
+    """Process-wide store for a lexicon source (default: the harm lexicon)
+
+    $ETHICAL_LEXICON_SOURCE overrides the harm lexicon source and
+    $ETHICAL_LEXICON_DIR the directory images are published to.
+    """
+    source_path = source_path or os.getenv(SOURCE_ENV_VAR, DEFAULT_SOURCE)
+    with _stores_lock:
+        store = _stores.get(source_path)
+        if store is None:
+            store = _stores[source_path] = LexiconStore(source_path, os.getenv(IMAGE_DIR_ENV_VAR, DEFAULT_IMAGE_DIR))
+        return store
@@ -0,0 +1,230 @@
+"""
+Conversation affinity: consistent hashing of conversations onto worker processes
+Per-conversation state lives in the worker process that built it: the
+ConversationScanner's incremental scan state and the token caches its turns
+filled. With several workers behind a front dispatcher (dispatcher.py),
+each conversation keeps going to the same worker, so that state stays
+hot. Conversations are keyed exactly as ConversationScanner keys them:
+parameters['conversation_id'] (the web UI sends one per conversation) or
+the hash of the first context message.
+
+Each worker owns `vnodes` points on a 64-bit hash ring, and a conversation
+goes to the owner of the first point at or after its key's hash. Adding or
+removing a worker therefore only remaps the conversations on that worker's
+arcs: about 1/N of them, where N is the number of workers. Every other
+conversation keeps its worker. A worker that fails a request is taken off
+the ring, so its conversations move to their next worker on the ring. It
+returns once a health check passes, and gets its own conversations back.
+"""
+import bisect
+import hashlib
+import itertools
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Points per worker; the spread of the busiest worker's share shrinks roughly as 1/sqrt(vnodes)
+DEFAULT_VNODES = 160
+DEFAULT_HEALTH_INTERVAL = 5.0
+
+
+class NoWorkerAvailable(RuntimeError):
+    """Every worker is marked down"""
+
+
+def ring_hash(value: str) -> int:
+    """64-bit ring position (stable across processes and evenly spread, unlike crc32 over similar labels)"""
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class ConsistentHashRing:
+    """
+    Hash ring with virtual nodes
+    Lookups read one immutable (positions, owners) snapshot, so they take no
+    lock; add/remove build a new snapshot under the lock.
+    """
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = DEFAULT_VNODES):
+        if vnodes < 1:
+            raise ValueError("vnodes must be at least 1")
+        self.vnodes = vnodes
+        self._lock = threading.Lock()
+        self._nodes = set()
+        self._ring = ((), ())
+        for node in nodes:
+            self.add(node)
+
+    def _points(self, node: str) -> List[int]:
+        return [ring_hash(f"{node}#{index}") for index in range(self.vnodes)]
+
+    def add(self, node: str):
+        with self._lock:
+            if node in self._nodes:
+                return
+            self._nodes.add(node)
+            self._rebuild()
+
+    def remove(self, node: str):
+        with self._lock:
+            if node not in self._nodes:
+                return
+            self._nodes.discard(node)
+            self._rebuild()
+
+    def _rebuild(self):
+        # Ties on a position (vanishingly rare) go to the smaller node name, in any insertion order
+        points = sorted((point, node) for node in self._nodes for point in self._points(node))
+        self._ring = (tuple(point for point, _ in points), tuple(node for _, node in points))
+
+    @property
+    def nodes(self) -> List[str]:
+        with self._lock:
+            return sorted(self._nodes)
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __contains__(self, node: str):
+        return node in self._nodes
+
+    def node_for(self, key: str) -> Optional[str]:
+        """Owner of key, or None on an empty ring"""
+        positions, owners = self._ring
+        if not positions:
+            return None
+        index = bisect.bisect_left(positions, ring_hash(key))
+        return owners[index % len(owners)]
+
+    def preference(self, key: str, count: Optional[int] = None) -> List[str]:
+        """Distinct nodes in ring order from key's owner: where key goes as owners drop out"""
+        positions, owners = self._ring
+        if not positions:
+            return []
+        wanted = len(set(owners)) if count is None else min(count, len(set(owners)))
+        start = bisect.bisect_left(positions, ring_hash(key))
+        result = []
+        for offset in range(len(owners)):
+            node = owners[(start + offset) % len(owners)]
+            if node not in result:
+                result.append(node)
+                if len(result) == wanted:
+                    break
+        return result
+
+    def shares(self) -> Dict[str, float]:
+        """Fraction of the hash space each node owns"""
+        positions, owners = self._ring
+        if not positions:
+            return {}
+        space = float(2 ** 64)
+        shares = dict.fromkeys(owners, 0.0)
+        for index, position in enumerate(positions):
+            previous = positions[index - 1] if index else positions[-1] - 2 ** 64
+            shares[owners[index]] += (position - previous) / space
+        return shares
+
+
+class WorkerRouter:
+    """
+    Picks the worker for each request
+    Requests with a conversation key go to the key's worker on the ring of
+    live workers. Requests without one (first turns, non-chat endpoints) go to
+    live workers in rotation. mark_down takes a worker off the ring until
+    check_health sees it answer again.
+    """
+    def __init__(self, workers: Iterable[str], vnodes: int = DEFAULT_VNODES,
+                 health_check: Optional[Callable[[str], bool]] = None,
+                 health_interval: float = DEFAULT_HEALTH_INTERVAL):
+        self.workers = list(dict.fromkeys(workers))
+        if not self.workers:
+            raise ValueError("WorkerRouter needs at least one worker")
+        self.ring = ConsistentHashRing(self.workers, vnodes)
+        self.health_check = health_check
+        self.health_interval = health_interval
+        self._down = {}
+        self._rotation = itertools.cycle(self.workers)
+        self._lock = threading.Lock()
+        self._stats = {worker: {'routed': 0, 'failovers': 0, 'marked_down': 0} for worker in self.workers}
+        self._unkeyed = 0
+        self._health_thread = None
+        self._stop = threading.Event()
+
+    def route(self, key: Optional[str]) -> List[str]:
+        """Live workers to try in order: the key's owner and its ring successors, or a rotation"""
+        if key is not None:
+            candidates = self.ring.preference(key)
+        else:
+            with self._lock:
+                live = [worker for worker in self.workers if worker not in self._down]
+                if live:
+                    first = next(worker for worker in self._rotation if worker not in self._down)
+                    index = live.index(first)
+                    candidates = live[index:] + live[:index]
+                else:
+                    candidates = []
+        if not candidates:
+            raise NoWorkerAvailable(f"All {len(self.workers)} workers are down")
+        return candidates
+
+    def record(self, worker: str, key: Optional[str], attempt: int):
+        """Count a request served by worker (attempt > 0: after failing over from earlier candidates)"""
+        with self._lock:
+            self._stats[worker]['routed'] += 1
+            if attempt:
+                self._stats[worker]['failovers'] += 1
+            if key is None:
+                self._unkeyed += 1
+
+    def mark_down(self, worker: str, error: Optional[str] = None):
+        with self._lock:
+            if worker in self._down:
+                return
+            self._down[worker] = {'since': time.time(), 'error': error}
+            self._stats[worker]['marked_down'] += 1
+        self.ring.remove(worker)
+
+    def mark_up(self, worker: str):
+        with self._lock:
+            if self._down.pop(worker, None) is None:
+                return
+        self.ring.add(worker)
+
+    def check_health(self):
+        """Probe the workers marked down and put back the ones that answer"""
+        if self.health_check is None:
+            return
+        with self._lock:
+            down = list(self._down)
+        for worker in down:
+            try:
+                healthy = self.health_check(worker)
+            except Exception:
+                healthy = False
+            if healthy:
+                self.mark_up(worker)
+
+    def start_health_checks(self):
+        """Run check_health every health_interval seconds on a daemon thread (idempotent)"""
+        if self._health_thread is not None:
+            return
+
+        def loop():
+            while not self._stop.wait(self.health_interval):
+                self.check_health()
+
+        self._health_thread = threading.Thread(target=loop, name='worker-health', daemon=True)
+        self._health_thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self) -> Dict[str, Any]:
+        shares = self.ring.shares()
+        with self._lock:
+            return {
+                'vnodes': self.ring.vnodes,
+                'unkeyed_requests': self._unkeyed,
+                'workers': {worker: dict(self._stats[worker], live=worker not in self._down,
+                                         ring_share=round(shares.get(worker, 0.0), 4),
+                                         down=dict(self._down[worker]) if worker in self._down else None)
+                            for worker in self.workers},
+            }
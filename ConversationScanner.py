@@ -0,0 +1,167 @@
+"""
+Incremental conversation-level harm scanning
+Each turn's context carries the whole conversation history. Rescanning it on
+every turn costs O(n^2) over a session, so the scanner keeps per-conversation
+state (rolling per-category counts and the crisis-context flag) and only
+scans the messages appended since the previous turn.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from CompiledLexicon import LexiconStore, default_store
+from NormalizedText import stable_hash
+from RecordTypes import record_type
+
+HARM_CATEGORIES = ('direct', 'indirect', 'systemic', 'psychological')
+CRISIS_CATEGORY = 'crisis'
+
+# Least recently updated conversations are dropped beyond this many
+DEFAULT_MAX_CONVERSATIONS = 10000
+# Conversations kept under one key (sessions opening with the same message
+# share a derived key); the least recently updated is dropped beyond this many
+DEFAULT_MAX_STATES_PER_KEY = 64
+
+# Multi-turn signals for one request's conversation history:
+#   key              conversation key (None when there is no history)
+#   turns            history messages accounted for
+#   category_counts  user messages matching each harm category
+#   crisis_context   any history message has crisis vocabulary
+#   scanned          messages scanned for this request (new ones, or all after a rescan)
+ConversationSignals = record_type('ConversationSignals', ('key', 'turns', 'category_counts',
+                                                          'crisis_context', 'scanned'), __name__)
+
+NO_HISTORY = ConversationSignals(None, 0, {category: 0 for category in HARM_CATEGORIES}, False, 0)
+
+
+def _message_text(message: Any) -> Optional[str]:
+    if isinstance(message, dict):
+        content = message.get('content')
+        return content if isinstance(content, str) else None
+    return message if isinstance(message, str) else None
+
+
+def _message_hash(message: Any) -> int:
+    role = message.get('role', '') if isinstance(message, dict) else ''
+    return stable_hash(f"{role}\x00{_message_text(message) or ''}")
+
+
+def conversation_key(context: Optional[List], parameters: Optional[Dict] = None) -> Optional[str]:
+    """Key identifying the conversation a request belongs to
+
+    An explicit parameters['conversation_id'] wins; otherwise the conversation
+    is identified by its first message, which stays fixed as it grows. Key
+    collisions are harmless: the scanner keeps one state per conversation
+    under a key and resumes the one whose history the context extends.
+    """
+    conversation_id = parameters.get('conversation_id') if parameters else None
+    if conversation_id:
+        return str(conversation_id)
+    if not context:
+        return None
+    return f"h{_message_hash(context[0]):08x}"
+
+
+class _ConversationState:
+    __slots__ = ('turns', 'counts', 'crisis_context', 'last_hash', 'lexicon_version')
+
+    def __init__(self, lexicon_version: str):
+        self.turns = 0
+        self.counts = [0] * len(HARM_CATEGORIES)
+        self.crisis_context = False
+        self.last_hash = None
+        self.lexicon_version = lexicon_version
+
+
+class ConversationScanner:
+    """
+    Per-conversation incremental scan of the request context
+    Each key holds the states of every conversation seen under it, indexed by
+    (messages scanned, hash of the last one). A request resumes the longest
+    state its context extends (same length prefix, same last message) built
+    with the current lexicon version; otherwise the history is rescanned once
+    into a new state. Conversations sharing a key (e.g. both opening with
+    "hello") therefore keep separate states instead of replacing each other's.
+    """
+    def __init__(self, lexicon_store: Optional[LexiconStore] = None,
+                 max_conversations: int = DEFAULT_MAX_CONVERSATIONS,
+                 max_states_per_key: int = DEFAULT_MAX_STATES_PER_KEY):
+        self.lexicon_store = lexicon_store or default_store()
+        self.max_conversations = max_conversations
+        self.max_states_per_key = max_states_per_key
+        # key -> OrderedDict((turns, last_hash) -> state), both least recently updated first
+        self._states = OrderedDict()
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def _resume(self, variants: OrderedDict, context: List, version: str) -> Optional[_ConversationState]:
+        """Remove and return the longest state the context extends, if any"""
+        best = None
+        hashes = {}
+        for (turns, last_hash), state in variants.items():
+            if turns > len(context) or state.lexicon_version != version or (best and best.turns >= turns):
+                continue
+            if turns not in hashes:
+                hashes[turns] = _message_hash(context[turns - 1])
+            if hashes[turns] == last_hash:
+                best = state
+        if best is not None:
+            del variants[(best.turns, best.last_hash)]
+            self._count -= 1
+        return best
+
+    def _store(self, key: str, variants: OrderedDict, state: _ConversationState):
+        variants[(state.turns, state.last_hash)] = state
+        self._count += 1
+        while len(variants) > self.max_states_per_key:
+            variants.popitem(last=False)
+            self._count -= 1
+        while self._count > self.max_conversations:
+            oldest_key, oldest = next(iter(self._states.items()))
+            oldest.popitem(last=False)
+            self._count -= 1
+            if not oldest:
+                del self._states[oldest_key]
+
+    def update(self, context: Optional[List], parameters: Optional[Dict] = None) -> ConversationSignals:
+        """Fold newly appended context messages into the conversation's state"""
+        key = conversation_key(context, parameters)
+        if key is None or not context:
+            return NO_HISTORY
+        lexicon = self.lexicon_store.current()
+        crisis_bit = lexicon.bit(CRISIS_CATEGORY)
+        category_bits = [lexicon.bit(category) for category in HARM_CATEGORIES]
+
+        with self._lock:
+            variants = self._states.get(key)
+            if variants is None:
+                variants = self._states[key] = OrderedDict()
+            self._states.move_to_end(key)
+            state = self._resume(variants, context, lexicon.version) or _ConversationState(lexicon.version)
+
+            new_messages = context[state.turns:]
+            for message in new_messages:
+                text = _message_text(message)
+                if not text:
+                    continue
+                found = lexicon.match(text)
+                if found & crisis_bit:
+                    state.crisis_context = True
+                # Harm vocabulary is attributed to the user, not to model replies
+                if not isinstance(message, dict) or message.get('role', 'user') == 'user':
+                    for index, bit in enumerate(category_bits):
+                        if found & bit:
+                            state.counts[index] += 1
+            state.turns = len(context)
+            state.last_hash = _message_hash(context[-1])
+            self._store(key, variants, state)
+            return ConversationSignals(key, state.turns, dict(zip(HARM_CATEGORIES, state.counts)),
+                                       state.crisis_context, len(new_messages))
+
+    def forget(self, key: str):
+        """Drop every conversation state kept under key"""
+        with self._lock:
+            self._count -= len(self._states.pop(key, ()))
@@ -1,14 +1,10 @@
-class ObservationState:
-    """Stub for observation state return type."""
-    def __init__(self, **kwargs):
-        for k, v in kwargs.items():
-            setattr(self, k, v)
+from RecordTypes import record_type
 
-class EthicalAwareness:
-    """Stub for ethical awareness return type."""
-    def __init__(self, **kwargs):
-        for k, v in kwargs.items():
-            setattr(self, k, v)
+# Result records
+ObservationState = record_type('ObservationState', ('ethical_awareness', 'principle_alignment',
+                                                    'value_monitoring', 'impact_tracking'), __name__)
+EthicalAwareness = record_type('EthicalAwareness', ('primary_principles', 'value_state',
+                                                    'impact_awareness', 'observation_metrics'), __name__)
 
 class CoreEthicalProcessor:
     """
@@ -0,0 +1,110 @@
+"""
+Asynchronous deep-path analysis results
+The fast path gates the response synchronously; deep analysis (deferred
+pipeline layers) is submitted here after the response is built, runs on a
+small background worker pool, and its results are kept under the request id
+for later retrieval (GET /api/analysis/<request_id>).
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+PENDING = 'pending'
+COMPLETE = 'complete'
+FAILED = 'failed'
+DROPPED = 'dropped'
+
+DEFAULT_WORKERS = 2
+# Results are kept this many seconds, and at most max_entries of them
+DEFAULT_TTL = 600.0
+DEFAULT_MAX_ENTRIES = 10000
+# Submissions beyond this many queued/running jobs are dropped, not queued
+DEFAULT_MAX_PENDING = 1000
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+class DeepAnalysisStore:
+    """
+    Background worker pool plus a bounded, expiring result store
+    submit(request_id, job) runs job() -> dict of layer results in the background.
+    """
+    def __init__(self, workers: int = DEFAULT_WORKERS, ttl: float = DEFAULT_TTL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, max_pending: int = DEFAULT_MAX_PENDING,
+                 clock: Callable[[], float] = time.monotonic):
+        self.workers = workers
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_pending = max_pending
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='deep-analysis')
+        return self._executor
+
+    def _evict(self, now: float):
+        while self._entries:
+            request_id, entry = next(iter(self._entries.items()))
+            if len(self._entries) <= self.max_entries and now - entry['_stored'] < self.ttl:
+                break
+            self._entries.popitem(last=False)
+
+    def submit(self, request_id: str, job: Callable[[], Dict[str, Any]]) -> str:
+        """Queue job for request_id; returns the entry's initial status"""
+        now = self.clock()
+        with self._lock:
+            self._evict(now)
+            status = DROPPED if self._pending >= self.max_pending else PENDING
+            self._entries[request_id] = {'request_id': request_id, 'status': status, 'results': None,
+                                         'duration_ms': None, '_stored': now}
+            if status == DROPPED:
+                return status
+            self._pending += 1
+            executor = self._pool()
+        executor.submit(self._run, request_id, job)
+        return status
+
+    def _run(self, request_id: str, job: Callable[[], Dict[str, Any]]):
+        start = time.perf_counter()
+        try:
+            results, status = job(), COMPLETE
+        except Exception as e:
+            results, status = {'error': f"{type(e).__name__}: {e}"}, FAILED
+        duration_ms = round((time.perf_counter() - start) * 1000, 3)
+        with self._lock:
+            self._pending -= 1
+            entry = self._entries.get(request_id)
+            if entry is not None:
+                entry.update(status=status, results=results, duration_ms=duration_ms, _stored=self.clock())
+
+    def get(self, request_id: str) -> Optional[Dict[str, Any]]:
+        """Public view of a request's deep analysis, or None if unknown or expired"""
+        with self._lock:
+            self._evict(self.clock())
+            entry = self._entries.get(request_id)
+            if entry is None:
+                return None
+            return {key: value for key, value in entry.items() if not key.startswith('_')}
+
+    def wait(self, request_id: str, timeout: float = 5.0, interval: float = 0.005) -> Optional[Dict[str, Any]]:
+        """get(), polling until the analysis is no longer pending or timeout elapses"""
+        deadline = time.monotonic() + timeout
+        entry = self.get(request_id)
+        while entry is not None and entry['status'] == PENDING and time.monotonic() < deadline:
+            time.sleep(interval)
+            entry = self.get(request_id)
+        return entry
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'stored': len(self._entries), 'pending': self._pending}
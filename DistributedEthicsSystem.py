@@ -1,8 +1,7 @@
-class GlobalConsistency:
-    """Stub for global consistency return type."""
-    def __init__(self, **kwargs):
-        for k, v in kwargs.items():
-            setattr(self, k, v)
+from RecordTypes import record_type
+
+# Result records
+GlobalConsistency = record_type('GlobalConsistency', ('consistency_mechanisms',), __name__)
 
 class DistributedEthicsSystem:
     """
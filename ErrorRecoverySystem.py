@@ -1,8 +1,57 @@
-class StateAssessment:
-    """Stub for state assessment return type."""
-    def __init__(self, **kwargs):
-        for k, v in kwargs.items():
-            setattr(self, k, v)
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from RecordTypes import record_type
+
+# Result records
+StateAssessment = record_type('StateAssessment', ('assessment_mechanisms',), __name__)
+DegradationModes = record_type('DegradationModes', ('mode_control',), __name__)
+
+# Load signals read by DegradationHandler:
+#   queue_depth         requests waiting for a normal-lane worker slot
+#   p95_ms              p95 decision latency of recent normal requests
+#   upstream_available  False while every upstream model's circuit is open
+DegradationSignals = record_type('DegradationSignals', ('queue_depth', 'p95_ms', 'upstream_available'), __name__)
+
+# Service levels, least to most degraded
+FULL = 'full'
+NO_ADVISORY = 'no_advisory'
+FAST_PATH = 'fast_path'
+CACHED_OR_REJECT = 'cached_or_reject'
+SERVICE_LEVELS = (FULL, NO_ADVISORY, FAST_PATH, CACHED_OR_REJECT)
+SERVICE_LEVEL_DESCRIPTIONS = {
+    FULL: 'every pipeline layer',
+    NO_ADVISORY: 'blocking checks and wellbeing; advisory and deferred subsystems skipped',
+    FAST_PATH: 'the checks that can reject a request only',
+    CACHED_OR_REJECT: 'cached responses only; other requests are rejected',
+}
+
+TARGET_P95_ENV_VAR = 'ETHICAL_DEGRADATION_TARGET_P95_MS'
+MAX_QUEUE_DEPTH_ENV_VAR = 'ETHICAL_DEGRADATION_MAX_QUEUE_DEPTH'
+COOLDOWN_ENV_VAR = 'ETHICAL_DEGRADATION_COOLDOWN'
+
+DEFAULT_TARGET_P95_MS = 1000.0
+DEFAULT_MAX_QUEUE_DEPTH = 16
+# Pressure at which each level after FULL is entered
+DEFAULT_ENTER_PRESSURE = (1.0, 1.5, 2.5)
+# A level is left once pressure stays below exit_ratio x its entry pressure for cooldown seconds
+DEFAULT_EXIT_RATIO = 0.7
+DEFAULT_COOLDOWN = 10.0
+DEFAULT_MONITOR_INTERVAL = 1.0
+
+DEFAULT_CACHE_CAPACITY = 512
+# Total UTF-8 size of the cached responses (one full-length completion can be megabytes)
+DEFAULT_CACHE_MAX_BYTES = 16 * 1024 * 1024
+DEFAULT_CACHE_TTL = 600.0
+# Request parameters that change the completion (the system prompt and the
+# sampling parameters sent upstream); routing and transport fields such as
+# conversation_id, speculative_upstream and hedge_upstream are left out of the key
+COMPLETION_PARAMETERS = ('crisis_mode', 'temperature', 'max_tokens', 'top_p', 'top_k', 'min_p', 'top_a',
+                         'frequency_penalty', 'presence_penalty', 'repetition_penalty', 'stop_sequences', 'seed')
 
 class ErrorRecoverySystem:
     """
@@ -120,34 +169,222 @@ class ResilienceManager:
 class DegradationHandler:
     """
     Handles graceful system degradation
+    update() steps through SERVICE_LEVELS from load signals. Pressure is the
+    larger of queue_depth / max_queue_depth and p95_ms / target_p95_ms; each
+    level after FULL is entered once pressure reaches its enter_pressure, and
+    CACHED_OR_REJECT whenever no upstream model is available. Levels rise at
+    once but fall one at a time, after pressure has stayed below exit_ratio x
+    the current level's entry pressure for cooldown seconds, so they do not flap.
     """
-    def handle_degradation(self, system_status):
-        return DegradationManagement(
-            mode_management=self.manage_degradation_modes(system_status),
-            service_prioritization=self.prioritize_services(system_status),
-            resource_optimization=self.optimize_resources(system_status),
-            recovery_planning=self.plan_recovery_path(system_status)
-        )
+    def __init__(self, target_p95_ms: float = DEFAULT_TARGET_P95_MS,
+                 max_queue_depth: int = DEFAULT_MAX_QUEUE_DEPTH,
+                 enter_pressure=DEFAULT_ENTER_PRESSURE, exit_ratio: float = DEFAULT_EXIT_RATIO,
+                 cooldown: float = DEFAULT_COOLDOWN, clock: Callable[[], float] = time.monotonic):
+        if len(enter_pressure) != len(SERVICE_LEVELS) - 1:
+            raise ValueError(f"enter_pressure needs one threshold per level after {FULL}")
+        self.target_p95_ms = target_p95_ms
+        self.max_queue_depth = max_queue_depth
+        self.enter_pressure = tuple(enter_pressure)
+        self.exit_ratio = exit_ratio
+        self.cooldown = cooldown
+        self.clock = clock
+        self._level = 0
+        self._changed_at = clock()
+        self._calm_since = None
+        self._signals = None
+        self._pressure = 0.0
+        self._transitions = []
+        self._lock = threading.Lock()
+        self._stop = None
+        self._thread = None
+
+    @classmethod
+    def from_env(cls) -> 'DegradationHandler':
+        return cls(target_p95_ms=float(os.getenv(TARGET_P95_ENV_VAR, DEFAULT_TARGET_P95_MS)),
+                   max_queue_depth=int(os.getenv(MAX_QUEUE_DEPTH_ENV_VAR, DEFAULT_MAX_QUEUE_DEPTH)),
+                   cooldown=float(os.getenv(COOLDOWN_ENV_VAR, DEFAULT_COOLDOWN)))
+
+    @property
+    def level(self) -> str:
+        return SERVICE_LEVELS[self._level]
+
+    def assess_degradation_level(self, signals: DegradationSignals) -> float:
+        """Load pressure: 1.0 is the queue depth or latency target"""
+        return max((signals.queue_depth or 0) / self.max_queue_depth,
+                   (signals.p95_ms or 0.0) / self.target_p95_ms)
+
+    def select_appropriate_mode(self, signals: DegradationSignals, ratio: float = 1.0) -> int:
+        """Index of the most degraded level whose entry pressure (x ratio) the signals reach"""
+        if signals.upstream_available is False:
+            return len(SERVICE_LEVELS) - 1
+        pressure = self.assess_degradation_level(signals)
+        return sum(1 for threshold in self.enter_pressure if pressure >= threshold * ratio)
+
+    def manage_mode_transition(self, signals: DegradationSignals) -> str:
+        """Move to the level the signals call for, with hysteresis; returns the current level"""
+        entering = self.select_appropriate_mode(signals)
+        staying = self.select_appropriate_mode(signals, self.exit_ratio)
+        now = self.clock()
+        with self._lock:
+            self._signals = signals
+            self._pressure = self.assess_degradation_level(signals)
+            if entering > self._level:
+                self._set_level(entering, now)
+            elif staying < self._level:
+                if self._calm_since is None:
+                    self._calm_since = now
+                elif now - self._calm_since >= self.cooldown:
+                    self._set_level(self._level - 1, now)
+                    # The next step down needs its own calm period
+                    self._calm_since = now
+            else:
+                self._calm_since = None
+            return SERVICE_LEVELS[self._level]
+
+    def _set_level(self, level: int, now: float):
+        print(f"Degradation: {SERVICE_LEVELS[self._level]} -> {SERVICE_LEVELS[level]} "
+              f"(pressure {self._pressure:.2f}, upstream available: {self._signals.upstream_available})")
+        self._transitions.append({'from': SERVICE_LEVELS[self._level], 'to': SERVICE_LEVELS[level],
+                                  'at': time.time(), 'pressure': round(self._pressure, 3)})
+        del self._transitions[:-20]
+        self._level = level
+        self._changed_at = now
+        self._calm_since = None
+
+    update = manage_mode_transition
+
+    def define_service_levels(self) -> Dict[str, str]:
+        return dict(SERVICE_LEVEL_DESCRIPTIONS)
 
-    def manage_degradation_modes(self, status):
+    def manage_degradation_modes(self, status: DegradationSignals):
         """
         Manages different degradation modes
         """
+        level = self.manage_mode_transition(status)
         return DegradationModes(
             mode_control={
                 'mode_selection': {
                     'assessment': self.assess_degradation_level(status),
-                    'selection': self.select_appropriate_mode(status),
-                    'transition': self.manage_mode_transition(status)
+                    'selection': SERVICE_LEVELS[self.select_appropriate_mode(status)],
+                    'transition': level
                 },
                 'service_levels': {
                     'definition': self.define_service_levels(),
-                    'adjustment': self.adjust_service_levels(status),
-                    'monitoring': self.monitor_service_levels(status)
+                    'current': level
                 }
             }
         )
 
+    def start_monitoring(self, read_signals: Callable[[], DegradationSignals],
+                         interval: float = DEFAULT_MONITOR_INTERVAL):
+        """update() from read_signals() every interval seconds in a background thread (idempotent)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._monitor, args=(read_signals, interval, self._stop),
+                                            name='degradation-monitor', daemon=True)
+            self._thread.start()
+
+    def stop_monitoring(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._stop.set()
+        if thread is not None:
+            thread.join()
+
+    def _monitor(self, read_signals, interval, stop):
+        while not stop.wait(interval):
+            try:
+                self.update(read_signals())
+            except Exception as e:
+                print(f"Warning: degradation monitor: {e}")
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            signals = self._signals
+            return {
+                'level': SERVICE_LEVELS[self._level],
+                'description': SERVICE_LEVEL_DESCRIPTIONS[SERVICE_LEVELS[self._level]],
+                'seconds_at_level': round(self.clock() - self._changed_at, 1),
+                'pressure': round(self._pressure, 3),
+                'signals': signals._asdict() if signals is not None else None,
+                'transitions': list(self._transitions),
+            }
+
+    def handle_degradation(self, system_status):
+        return DegradationManagement(
+            mode_management=self.manage_degradation_modes(system_status),
+            service_prioritization=self.prioritize_services(system_status),
+            resource_optimization=self.optimize_resources(system_status),
+            recovery_planning=self.plan_recovery_path(system_status)
+        )
+
+
+class ResponseCache:
+    """
+    Recent completions of context-free requests, answered from at CACHED_OR_REJECT
+    Keyed by the casefolded input and the COMPLETION_PARAMETERS; entries expire
+    after ttl seconds and the least recently used go first beyond capacity
+    entries or max_bytes of responses.
+    """
+    def __init__(self, capacity: int = DEFAULT_CACHE_CAPACITY, ttl: float = DEFAULT_CACHE_TTL,
+                 clock: Callable[[], float] = time.monotonic, max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(user_input: str, context: Optional[List], parameters: Optional[Dict]) -> Optional[tuple]:
+        """Cache key, or None if the request cannot be cached (it has conversation context)"""
+        if context:
+            return None
+        parameters = parameters or {}
+        completion = {name: parameters[name] for name in COMPLETION_PARAMETERS if name in parameters}
+        return user_input.strip().casefold(), json.dumps(completion, sort_keys=True, default=str)
+
+    def get(self, user_input: str, context: Optional[List] = None, parameters: Optional[Dict] = None) -> Optional[str]:
+        key = self.key(user_input, context, parameters)
+        with self._lock:
+            entry = self._entries.get(key) if key is not None else None
+            if entry is not None and self.clock() - entry[0] > self.ttl:
+                self._discard(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user_input: str, context: Optional[List], parameters: Optional[Dict], response: str):
+        key = self.key(user_input, context, parameters)
+        size = len(response.encode('utf-8'))
+        if key is None or size > self.max_bytes:
+            return
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (self.clock(), response, size)
+            self._bytes += size
+            while len(self._entries) > self.capacity or self._bytes > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def status(self) -> Dict[str, int]:
+        with self._lock:
+            return {'size': len(self._entries), 'bytes': self._bytes, 'hits': self.hits, 'misses': self.misses}
+
 class ConsistencyMaintainer:
     """
     Maintains system consistency during recovery
@@ -1,3 +1,13 @@
+from RecordTypes import record_type
+
+# Result records
+EthicalContextState = record_type('EthicalContextState', ('temporal_context', 'spatial_context',
+                                                          'social_context', 'moral_context'), __name__)
+ValueApplication = record_type('ValueApplication', ('relevant_values', 'value_priorities',
+                                                    'conflict_resolution', 'practical_guidance'), __name__)
+ValidationResult = record_type('ValidationResult', ('principle_consistency', 'value_alignment',
+                                                    'practical_applicability', 'integrity_check'), __name__)
+
 class EthicalContext:
     """
     Maintains continuous ethical awareness and context
@@ -30,22 +40,12 @@ class EthicalContext:
         """
         Continuously maintains ethical context during processing
         """
-        try:
-            from EthicalSystemIntegration import EthicalContextState
-            return EthicalContextState(
-                temporal_context=self.track_temporal_context(),
-                spatial_context=self.track_spatial_context(),
-                social_context=self.track_social_context(),
-                moral_context=self.track_moral_context()
-            )
-        except (ImportError, NameError):
-            # Fallback: return simple dict
-            return {
-                'temporal_context': {},
-                'spatial_context': {},
-                'social_context': {},
-                'moral_context': {}
-            }
+        return EthicalContextState(
+            temporal_context=self.track_temporal_context(),
+            spatial_context=self.track_spatial_context(),
+            social_context=self.track_social_context(),
+            moral_context=self.track_moral_context()
+        )
 
 class WellbeingMonitor:
     """
@@ -116,22 +116,12 @@ class ValueSystem:
         Applies ethical values to specific situations
         Resolves conflicts between competing values
         """
-        try:
-            from EthicalSystemIntegration import ValueApplication
-            return ValueApplication(
-                relevant_values=self.identify_relevant_values(situation),
-                value_priorities=self.determine_priorities(situation),
-                conflict_resolution=self.resolve_value_conflicts(situation),
-                practical_guidance=self.generate_guidance(situation)
-            )
-        except (ImportError, NameError):
-            # Fallback: return simple dict
-            return {
-                'relevant_values': [],
-                'value_priorities': [],
-                'conflict_resolution': {},
-                'practical_guidance': {}
-            }
+        return ValueApplication(
+            relevant_values=self.identify_relevant_values(situation),
+            value_priorities=self.determine_priorities(situation),
+            conflict_resolution=self.resolve_value_conflicts(situation),
+            practical_guidance=self.generate_guidance(situation)
+        )
 
 class ImpactAnalyzer:
     """
@@ -232,19 +222,9 @@ class ContextValidator:
         return True
     
     def validate_context(self, context):
-        try:
-            from EthicalSystemIntegration import ValidationResult
-            return ValidationResult(
-                principle_consistency=self.check_principle_consistency(context),
-                value_alignment=self.verify_value_alignment(context),
-                practical_applicability=self.assess_applicability(context),
-                integrity_check=self.verify_integrity(context)
-            )
-        except (ImportError, NameError):
-            # Fallback: return simple dict
-            return {
-                'principle_consistency': True,
-                'value_alignment': True,
-                'practical_applicability': True,
-                'integrity_check': True
-            }
+        return ValidationResult(
+            principle_consistency=self.check_principle_consistency(context),
+            value_alignment=self.verify_value_alignment(context),
+            practical_applicability=self.assess_applicability(context),
+            integrity_check=self.verify_integrity(context)
+        )
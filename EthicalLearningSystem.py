@@ -1,14 +1,10 @@
-class LearningProcess:
-    """Stub for learning process return type."""
-    def __init__(self, **kwargs):
-        for k, v in kwargs.items():
-            setattr(self, k, v)
+from RecordTypes import record_type
 
-class PrincipleLearning:
-    """Stub for principle learning return type."""
-    def __init__(self, **kwargs):
-        for k, v in kwargs.items():
-            setattr(self, k, v)
+# Result records
+LearningProcess = record_type('LearningProcess', ('principle_learning', 'value_learning',
+                                                  'impact_learning', 'context_learning'), __name__)
+PrincipleLearning = record_type('PrincipleLearning', ('learning_mechanisms',
+                                                      'safety_constraints'), __name__)
 
 class EthicalLearningSystem:
     """
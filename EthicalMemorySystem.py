@@ -1,8 +1,10 @@
-class ProcessedExperience:
-    """Stub for processed experience return type."""
-    def __init__(self, **kwargs):
-        for k, v in kwargs.items():
-            setattr(self, k, v)
+from RecordTypes import record_type
+
+# Result records
+ProcessedExperience = record_type('ProcessedExperience', ('factual_analysis',
+                                                          'contextual_understanding',
+                                                          'ethical_implications',
+                                                          'outcome_analysis'), __name__)
 
 class EthicalMemorySystem:
     """
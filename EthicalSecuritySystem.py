@@ -1,8 +1,7 @@
-class ParameterProtection:
-    """Stub for parameter protection return type."""
-    def __init__(self, **kwargs):
-        for k, v in kwargs.items():
-            setattr(self, k, v)
+from RecordTypes import record_type
+
+# Result records
+ParameterProtection = record_type('ParameterProtection', ('protection_mechanisms',), __name__)
 
 class EthicalSecuritySystem:
     """
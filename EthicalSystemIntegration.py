@@ -2,14 +2,35 @@
 Comprehensive integration of all ethical processing systems
 Implements missing functionality and connects all components
 """
+import importlib
 import time
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from types import MappingProxyType
+from typing import Callable, Dict, Iterable, Iterator, List, Any, Optional
 
-# Data classes for system responses
+from CompiledLexicon import OUTPUT_SAFETY_SOURCE, LexiconStore, default_store
+from ConversationScanner import ConversationScanner
+from DeepAnalysis import DeepAnalysisStore, new_request_id
+from NormalizedText import NormalizedText, normalize
+from ErrorRecoverySystem import FAST_PATH, FULL, NO_ADVISORY, SERVICE_LEVELS
+from PipelinePlan import CRISIS_PIPELINE_SPEC, FAST_PATH_PIPELINE_SPEC, compile_pipeline, load_pipeline_config
+from StreamingOutputFilter import StreamingOutputFilter, filter_chunks
+from SubsystemHealthMonitor import SubsystemHealthMonitor
+
+# Shared read-only defaults for empty record fields, so records built without
+# a value do not each allocate their own empty dict/list
+EMPTY_MAPPING = MappingProxyType({})
+EMPTY_SEQUENCE = ()
+
+# Data classes for system responses (slotted: one is allocated per request and layer)
 class HarmAnalysis:
+    __slots__ = ('has_harmful_intent', 'confidence', 'details', 'direct_harm',
+                 'indirect_harm', 'systemic_harm', 'psychological_harm', 'lexicon_version',
+                 'conversation')
+
     def __init__(self, has_harmful_intent=False, confidence=0.0, details="", direct_harm=False, 
-                 indirect_harm=False, systemic_harm=None, psychological_harm=False):
+                 indirect_harm=False, systemic_harm=None, psychological_harm=False, lexicon_version=None,
+                 conversation=None):
         self.has_harmful_intent = has_harmful_intent
         self.confidence = confidence
         self.details = details
@@ -17,20 +38,29 @@ class HarmAnalysis:
         self.indirect_harm = indirect_harm
         self.systemic_harm = systemic_harm
         self.psychological_harm = psychological_harm
+        self.lexicon_version = lexicon_version
+        self.conversation = conversation  # ConversationSignals for the request's history
 
 class InstructionCheck:
+    __slots__ = ('is_valid', 'validation_score', 'details')
+
     def __init__(self, is_valid=True, validation_score=0.0, details=""):
         self.is_valid = is_valid
         self.validation_score = validation_score
         self.details = details
 
 class IntegrityCheck:
+    __slots__ = ('is_safe', 'integrity_score', 'details')
+
     def __init__(self, is_safe=True, integrity_score=0.0, details=""):
         self.is_safe = is_safe
         self.integrity_score = integrity_score
         self.details = details
 
 class WellbeingAssessment:
+    __slots__ = ('individual_impact', 'collective_impact', 'wellbeing_score', 'details',
+                 'long_term_effects', 'systemic_effects')
+
     def __init__(self, individual_impact="neutral", collective_impact="neutral", 
                  wellbeing_score=0.85, details="", long_term_effects=None, systemic_effects=None):
         self.individual_impact = individual_impact
@@ -46,78 +76,116 @@ class EthicalState:
         self.state = {}
 
 class SystemicHarmAnalysis:
+    __slots__ = ('power_imbalance', 'hierarchical_bias', 'collective_impact')
+
     def __init__(self, power_imbalance=False, hierarchical_bias=False, collective_impact=None):
         self.power_imbalance = power_imbalance
         self.hierarchical_bias = hierarchical_bias
         self.collective_impact = collective_impact
 
 # Wellbeing Monitor Data Classes
-class PhysicalImpact:
+# evaluate_complex_impact builds a whole tree of these per call; they are slotted
+# and read-only once constructed, and empty fields share EMPTY_MAPPING/EMPTY_SEQUENCE.
+class FrozenRecord:
+    """Base for slotted records whose fields cannot be reassigned"""
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+_set_field = object.__setattr__
+
+class PhysicalImpact(FrozenRecord):
+    __slots__ = ('health_effects', 'safety_implications', 'physical_resources', 'biological_needs')
+
     def __init__(self, health_effects=None, safety_implications=None, physical_resources=None, biological_needs=None):
-        self.health_effects = health_effects or {}
-        self.safety_implications = safety_implications or {}
-        self.physical_resources = physical_resources or {}
-        self.biological_needs = biological_needs or {}
+        _set_field(self, 'health_effects', health_effects or EMPTY_MAPPING)
+        _set_field(self, 'safety_implications', safety_implications or EMPTY_MAPPING)
+        _set_field(self, 'physical_resources', physical_resources or EMPTY_MAPPING)
+        _set_field(self, 'biological_needs', biological_needs or EMPTY_MAPPING)
+
+class PsychologicalImpact(FrozenRecord):
+    __slots__ = ('emotional_wellbeing', 'cognitive_load', 'stress_levels', 'autonomy_effects')
 
-class PsychologicalImpact:
     def __init__(self, emotional_wellbeing=None, cognitive_load=None, stress_levels=None, autonomy_effects=None):
-        self.emotional_wellbeing = emotional_wellbeing or {}
-        self.cognitive_load = cognitive_load or {}
-        self.stress_levels = stress_levels or {}
-        self.autonomy_effects = autonomy_effects or {}
+        _set_field(self, 'emotional_wellbeing', emotional_wellbeing or EMPTY_MAPPING)
+        _set_field(self, 'cognitive_load', cognitive_load or EMPTY_MAPPING)
+        _set_field(self, 'stress_levels', stress_levels or EMPTY_MAPPING)
+        _set_field(self, 'autonomy_effects', autonomy_effects or EMPTY_MAPPING)
+
+class WellbeingDimensions(FrozenRecord):
+    __slots__ = ('physical', 'psychological', 'social', 'economic', 'environmental', 'cultural')
 
-class WellbeingDimensions:
     def __init__(self, physical=None, psychological=None, social=None, economic=None, environmental=None, cultural=None):
-        self.physical = physical or PhysicalImpact()
-        self.psychological = psychological or PsychologicalImpact()
-        self.social = social or {}
-        self.economic = economic or {}
-        self.environmental = environmental or {}
-        self.cultural = cultural or {}
-
-class ImpactPredictions:
+        _set_field(self, 'physical', physical or PhysicalImpact())
+        _set_field(self, 'psychological', psychological or PsychologicalImpact())
+        _set_field(self, 'social', social or EMPTY_MAPPING)
+        _set_field(self, 'economic', economic or EMPTY_MAPPING)
+        _set_field(self, 'environmental', environmental or EMPTY_MAPPING)
+        _set_field(self, 'cultural', cultural or EMPTY_MAPPING)
+
+class ImpactPredictions(FrozenRecord):
+    __slots__ = ('immediate', 'short_term', 'medium_term', 'long_term', 'scenarios')
+
     def __init__(self, immediate=None, short_term=None, medium_term=None, long_term=None, scenarios=None):
-        self.immediate = immediate or {}
-        self.short_term = short_term or {}
-        self.medium_term = medium_term or {}
-        self.long_term = long_term or {}
-        self.scenarios = scenarios or []
+        _set_field(self, 'immediate', immediate or EMPTY_MAPPING)
+        _set_field(self, 'short_term', short_term or EMPTY_MAPPING)
+        _set_field(self, 'medium_term', medium_term or EMPTY_MAPPING)
+        _set_field(self, 'long_term', long_term or EMPTY_MAPPING)
+        _set_field(self, 'scenarios', scenarios or EMPTY_SEQUENCE)
+
+class CascadingEffects(FrozenRecord):
+    __slots__ = ('primary_cascade', 'secondary_cascade', 'tertiary_cascade', 'feedback_loops')
 
-class CascadingEffects:
     def __init__(self, primary_cascade=None, secondary_cascade=None, tertiary_cascade=None, feedback_loops=None):
-        self.primary_cascade = primary_cascade or {}
-        self.secondary_cascade = secondary_cascade or {}
-        self.tertiary_cascade = tertiary_cascade or {}
-        self.feedback_loops = feedback_loops or []
+        _set_field(self, 'primary_cascade', primary_cascade or EMPTY_MAPPING)
+        _set_field(self, 'secondary_cascade', secondary_cascade or EMPTY_MAPPING)
+        _set_field(self, 'tertiary_cascade', tertiary_cascade or EMPTY_MAPPING)
+        _set_field(self, 'feedback_loops', feedback_loops or EMPTY_SEQUENCE)
+
+class SystemEffects(FrozenRecord):
+    __slots__ = ('direct_effects', 'indirect_effects', 'cascading_effects', 'emergent_properties')
 
-class SystemEffects:
     def __init__(self, direct_effects=None, indirect_effects=None, cascading_effects=None, emergent_properties=None):
-        self.direct_effects = direct_effects or {}
-        self.indirect_effects = indirect_effects or {}
-        self.cascading_effects = cascading_effects or CascadingEffects()
-        self.emergent_properties = emergent_properties or []
+        _set_field(self, 'direct_effects', direct_effects or EMPTY_MAPPING)
+        _set_field(self, 'indirect_effects', indirect_effects or EMPTY_MAPPING)
+        _set_field(self, 'cascading_effects', cascading_effects or CascadingEffects())
+        _set_field(self, 'emergent_properties', emergent_properties or EMPTY_SEQUENCE)
+
+class FeedbackAnalysis(FrozenRecord):
+    __slots__ = ('positive_feedback', 'negative_feedback', 'stabilizing_factors', 'destabilizing_factors')
 
-class FeedbackAnalysis:
     def __init__(self, positive_feedback=None, negative_feedback=None, stabilizing_factors=None, destabilizing_factors=None):
-        self.positive_feedback = positive_feedback or []
-        self.negative_feedback = negative_feedback or []
-        self.stabilizing_factors = stabilizing_factors or []
-        self.destabilizing_factors = destabilizing_factors or []
+        _set_field(self, 'positive_feedback', positive_feedback or EMPTY_SEQUENCE)
+        _set_field(self, 'negative_feedback', negative_feedback or EMPTY_SEQUENCE)
+        _set_field(self, 'stabilizing_factors', stabilizing_factors or EMPTY_SEQUENCE)
+        _set_field(self, 'destabilizing_factors', destabilizing_factors or EMPTY_SEQUENCE)
+
+class AggregateScore(FrozenRecord):
+    __slots__ = ('overall_score', 'dimension_scores', 'confidence_levels', 'uncertainty_factors')
 
-class AggregateScore:
     def __init__(self, overall_score=0.0, dimension_scores=None, confidence_levels=None, uncertainty_factors=None):
-        self.overall_score = overall_score
-        self.dimension_scores = dimension_scores or {}
-        self.confidence_levels = confidence_levels or {}
-        self.uncertainty_factors = uncertainty_factors or []
+        _set_field(self, 'overall_score', overall_score)
+        _set_field(self, 'dimension_scores', dimension_scores or EMPTY_MAPPING)
+        _set_field(self, 'confidence_levels', confidence_levels or EMPTY_MAPPING)
+        _set_field(self, 'uncertainty_factors', uncertainty_factors or EMPTY_SEQUENCE)
+
+class ComplexImpactAssessment(FrozenRecord):
+    __slots__ = ('dimensions', 'predictions', 'system_effects', 'feedback_loops', 'aggregate_score')
 
-class ComplexImpactAssessment:
     def __init__(self, dimensions=None, predictions=None, system_effects=None, feedback_loops=None, aggregate_score=None):
-        self.dimensions = dimensions or WellbeingDimensions()
-        self.predictions = predictions or ImpactPredictions()
-        self.system_effects = system_effects or SystemEffects()
-        self.feedback_loops = feedback_loops or FeedbackAnalysis()
-        self.aggregate_score = aggregate_score or AggregateScore()
+        _set_field(self, 'dimensions', dimensions or WellbeingDimensions())
+        _set_field(self, 'predictions', predictions or ImpactPredictions())
+        _set_field(self, 'system_effects', system_effects or SystemEffects())
+        _set_field(self, 'feedback_loops', feedback_loops or FeedbackAnalysis())
+        _set_field(self, 'aggregate_score', aggregate_score or AggregateScore())
 
 # Consciousness Observer Data Classes
 class ObservationState:
@@ -172,57 +240,44 @@ class EthicalSnapshot:
         self.collective_benefit = collective_benefit or {}
         self.individual_rights = individual_rights or {}
 
-# Import and integrate existing systems
-try:
-    from CoreEthicalProcessor import CoreEthicalProcessor
-    from EthicalContext import EthicalContext, WellbeingMonitor
-    from WellbeingMonitor import WellbeingMonitor as AdvancedWellbeingMonitor
-    from RealTimeDecisionFramework import RealTimeDecisionFramework
-except ImportError as e:
-    print(f"Warning: Some core systems could not be imported: {e}")
-
-# Import optional systems
-try:
-    from BiasDetectionSystem import BiasDetectionSystem
-except ImportError as e:
-    BiasDetectionSystem = None
-    print(f"Warning: BiasDetectionSystem not available: {e}")
-
-try:
-    from EthicalLearningSystem import EthicalLearningSystem
-except ImportError as e:
-    EthicalLearningSystem = None
-    print(f"Warning: EthicalLearningSystem not available: {e}")
-
-try:
-    from EthicalMemorySystem import EthicalMemorySystem
-except ImportError as e:
-    EthicalMemorySystem = None
-    print(f"Warning: EthicalMemorySystem not available: {e}")
-
-try:
-    from ValueConflictResolver import ValueConflictResolver
-except ImportError as e:
-    ValueConflictResolver = None
-    print(f"Warning: ValueConflictResolver not available: {e}")
-
-try:
-    from DistributedEthicsSystem import DistributedEthicsSystem
-except ImportError as e:
-    DistributedEthicsSystem = None
-    print(f"Warning: DistributedEthicsSystem not available: {e}")
-
-try:
-    from ErrorRecoverySystem import ErrorRecoverySystem
-except ImportError as e:
-    ErrorRecoverySystem = None
-    print(f"Warning: ErrorRecoverySystem not available: {e}")
-
-try:
-    from EthicalSecuritySystem import EthicalSecuritySystem
-except ImportError as e:
-    EthicalSecuritySystem = None
-    print(f"Warning: EthicalSecuritySystem not available: {e}")
+# Subsystem classes are imported on first use (processor construction or
+# attribute access on this module) rather than at import, so tools that only
+# need the data classes or built-in layers do not load every subsystem module.
+# Exported name -> (module, class)
+_SUBSYSTEMS = {
+    'CoreEthicalProcessor': ('CoreEthicalProcessor', 'CoreEthicalProcessor'),
+    'EthicalContext': ('EthicalContext', 'EthicalContext'),
+    'WellbeingMonitor': ('EthicalContext', 'WellbeingMonitor'),
+    'AdvancedWellbeingMonitor': ('WellbeingMonitor', 'WellbeingMonitor'),
+    'RealTimeDecisionFramework': ('RealTimeDecisionFramework', 'RealTimeDecisionFramework'),
+    'BiasDetectionSystem': ('BiasDetectionSystem', 'BiasDetectionSystem'),
+    'EthicalLearningSystem': ('EthicalLearningSystem', 'EthicalLearningSystem'),
+    'EthicalMemorySystem': ('EthicalMemorySystem', 'EthicalMemorySystem'),
+    'ValueConflictResolver': ('ValueConflictResolver', 'ValueConflictResolver'),
+    'DistributedEthicsSystem': ('DistributedEthicsSystem', 'DistributedEthicsSystem'),
+    'ErrorRecoverySystem': ('ErrorRecoverySystem', 'ErrorRecoverySystem'),
+    'EthicalSecuritySystem': ('EthicalSecuritySystem', 'EthicalSecuritySystem'),
+}
+
+def load_subsystem(name: str):
+    """Import a subsystem class by exported name; None if it is not available"""
+    if name in globals():
+        return globals()[name]
+    module_name, class_name = _SUBSYSTEMS[name]
+    try:
+        system_class = getattr(importlib.import_module(module_name), class_name)
+    except (ImportError, AttributeError) as e:
+        system_class = None
+        print(f"Warning: {name} not available: {e}")
+    globals()[name] = system_class
+    return system_class
+
+def __getattr__(name):
+    if name in _SUBSYSTEMS:
+        return load_subsystem(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+PROBE_INPUT = "Subsystem health probe: what is a balanced breakfast?"
 
 class IntegratedEthicalProcessor:
     """
@@ -237,76 +292,83 @@ class IntegratedEthicalProcessor:
         
         # Try to initialize systems
         try:
-            self.ethical_context = EthicalContext()
+            self.ethical_context = load_subsystem('EthicalContext')()
         except (ImportError, AttributeError, TypeError) as e:
             print(f"Warning: Could not initialize EthicalContext: {e}")
             pass
             
         try:
-            self.wellbeing_monitor = AdvancedWellbeingMonitor()
+            self.wellbeing_monitor = load_subsystem('AdvancedWellbeingMonitor')()
         except (ImportError, AttributeError, TypeError) as e:
             print(f"Warning: Could not initialize AdvancedWellbeingMonitor: {e}")
             pass
             
         try:
-            self.core_processor = CoreEthicalProcessor()
+            self.core_processor = load_subsystem('CoreEthicalProcessor')()
         except (ImportError, AttributeError, TypeError) as e:
             print(f"Warning: Could not initialize CoreEthicalProcessor: {e}")
             pass
         
         # Initialize optional systems
         self.bias_detector = None
-        if BiasDetectionSystem is not None:
+        system_class = load_subsystem('BiasDetectionSystem')
+        if system_class is not None:
             try:
-                self.bias_detector = BiasDetectionSystem()
+                self.bias_detector = system_class()
                 print("✓ BiasDetectionSystem initialized")
             except Exception as e:
                 print(f"Warning: Could not initialize BiasDetectionSystem: {e}")
         
         self.ethical_learner = None
-        if EthicalLearningSystem is not None:
+        system_class = load_subsystem('EthicalLearningSystem')
+        if system_class is not None:
             try:
-                self.ethical_learner = EthicalLearningSystem()
+                self.ethical_learner = system_class()
                 print("✓ EthicalLearningSystem initialized")
             except Exception as e:
                 print(f"Warning: Could not initialize EthicalLearningSystem: {e}")
         
         self.ethical_memory = None
-        if EthicalMemorySystem is not None:
+        system_class = load_subsystem('EthicalMemorySystem')
+        if system_class is not None:
             try:
-                self.ethical_memory = EthicalMemorySystem()
+                self.ethical_memory = system_class()
                 print("✓ EthicalMemorySystem initialized")
             except Exception as e:
                 print(f"Warning: Could not initialize EthicalMemorySystem: {e}")
         
         self.value_resolver = None
-        if ValueConflictResolver is not None:
+        system_class = load_subsystem('ValueConflictResolver')
+        if system_class is not None:
             try:
-                self.value_resolver = ValueConflictResolver()
+                self.value_resolver = system_class()
                 print("✓ ValueConflictResolver initialized")
             except Exception as e:
                 print(f"Warning: Could not initialize ValueConflictResolver: {e}")
         
         self.distributed_ethics = None
-        if DistributedEthicsSystem is not None:
+        system_class = load_subsystem('DistributedEthicsSystem')
+        if system_class is not None:
             try:
-                self.distributed_ethics = DistributedEthicsSystem()
+                self.distributed_ethics = system_class()
                 print("✓ DistributedEthicsSystem initialized")
             except Exception as e:
                 print(f"Warning: Could not initialize DistributedEthicsSystem: {e}")
         
         self.error_recovery = None
-        if ErrorRecoverySystem is not None:
+        system_class = load_subsystem('ErrorRecoverySystem')
+        if system_class is not None:
             try:
-                self.error_recovery = ErrorRecoverySystem()
+                self.error_recovery = system_class()
                 print("✓ ErrorRecoverySystem initialized")
             except Exception as e:
                 print(f"Warning: Could not initialize ErrorRecoverySystem: {e}")
         
         self.ethical_security = None
-        if EthicalSecuritySystem is not None:
+        system_class = load_subsystem('EthicalSecuritySystem')
+        if system_class is not None:
             try:
-                self.ethical_security = EthicalSecuritySystem()
+                self.ethical_security = system_class()
                 print("✓ EthicalSecuritySystem initialized")
             except Exception as e:
                 print(f"Warning: Could not initialize EthicalSecuritySystem: {e}")
@@ -314,102 +376,187 @@ class IntegratedEthicalProcessor:
         # RealTimeDecisionFramework (imported with core systems)
         self.realtime_decision = None
         try:
-            self.realtime_decision = RealTimeDecisionFramework()
+            self.realtime_decision = load_subsystem('RealTimeDecisionFramework')()
             print("✓ RealTimeDecisionFramework initialized")
         except (NameError, TypeError, Exception) as e:
             print(f"Warning: Could not initialize RealTimeDecisionFramework: {e}")
         
         # Initialize built-in components (with default sensitivity)
         self.harm_detector = HarmDetectionLayer(sensitivity=0.5, context_awareness=0.7, crisis_mode=True)
+        # With ETHICAL_HARM_SERVICE set, harm detection goes to the shared detector
+        # process (HarmDetectionService.py) and the layer above is the fallback
+        from HarmDetectionService import HarmDetectionClient
+        self.harm_service = HarmDetectionClient.from_env(self.harm_detector)
+        if self.harm_service is not None:
+            self.harm_detector = self.harm_service
+            print(f"✓ Harm detection service client ({self.harm_service.path})")
         self.instruction_validator = InstructionValidator()
         self.integrity_checker = SystemIntegrityMonitor()
         self.output_safety = OutputSafetyLayer()
         self.consciousness_observer = ConsciousnessObserver()
         
-    def process_input(self, user_input: str, context: Optional[List] = None, 
-                     parameters: Optional[Dict] = None) -> Dict[str, Any]:
+        # Resolve the layer spec (plus operator overrides) into bound callables once
+        self.pipeline_config = load_pipeline_config()
+        self.rebuild_pipeline()
+        
+        # Deep path: deferred layers run after the response on a background pool
+        self.deep_analysis = DeepAnalysisStore()
+        
+        # Probe optional subsystems once; failing ones are quarantined and
+        # re-probed with backoff (start_health_probes runs that in the background)
+        self.subsystem_health = SubsystemHealthMonitor({
+            layer.name: (lambda name=layer.name: self.probe_subsystem(name))
+            for layer in self.pipeline.advisory + self.pipeline.deferred
+        })
+        self.subsystem_health.probe_all()
+    
+    def rebuild_pipeline(self):
+        """Recompile the layer plans (after replacing a layer object or method)"""
+        self.pipeline = compile_pipeline(self, config=self.pipeline_config)
+        overrides = self.pipeline_config.get('layers', {})
+
+        def subset_config(spec, adaptive_order):
+            names = {entry['name'] for entry in spec}
+            return {'adaptive_order': adaptive_order,
+                    'layers': {name: layer for name, layer in overrides.items() if name in names}}
+
+        self.crisis_pipeline = compile_pipeline(self, CRISIS_PIPELINE_SPEC, subset_config(CRISIS_PIPELINE_SPEC, False))
+        self.fast_pipeline = compile_pipeline(self, FAST_PATH_PIPELINE_SPEC, subset_config(
+            FAST_PATH_PIPELINE_SPEC, self.pipeline_config.get('adaptive_order', True)))
+    
+    def start_health_probes(self):
+        """Re-probe quarantined subsystems in a background thread"""
+        self.subsystem_health.start_background()
+    
+    def start_lexicon_watchers(self):
+        """Check for republished lexicons in the background instead of on the request path"""
+        self.harm_detector.lexicon_store.start_watching()
+        self.output_safety.lexicon_store.start_watching()
+    
+    def probe_subsystem(self, name: str) -> Dict[str, Any]:
+        """Run one optional subsystem against a synthetic request; raises on failure"""
+        context = []
+        text = normalize(PROBE_INPUT)
+        process_state = {
+            'input': PROBE_INPUT,
+            'text': text,
+            'context': context,
+            'parameters': {},
+            'harm_analysis': HarmAnalysis(confidence=0.99),
+            'instruction_check': InstructionCheck(is_valid=True, validation_score=0.98),
+            'integrity_check': IntegrityCheck(is_safe=True, integrity_score=0.99),
+            'wellbeing_assessment': WellbeingAssessment(),
+        }
+        process_data = {'input': PROBE_INPUT, 'text': text, 'context': context, 'state': process_state}
+        return getattr(self, '_run_' + name)(process_state, process_data)
+    
+    def _run_ethical_context(self, process_state, process_data):
+        ctx_result = self.ethical_context.maintain_context(process_state)
+        return {'details': str(type(ctx_result).__name__)}
+    
+    def _run_core_processor(self, process_state, process_data):
+        # Maintain observation only (avoids internal IntegrityCheck dependency)
+        core_result = self.core_processor.ethical_observer.maintain_observation(process_state)
+        return {'details': str(type(core_result).__name__)}
+    
+    def _run_bias_detection(self, process_state, process_data):
+        self.bias_detector.cognitive_detector.detect_cognitive_bias(process_data)
+        return {}
+    
+    def _run_value_resolver(self, process_state, process_data):
+        self.value_resolver.resolution_engine.resolve_conflict(
+            {'context': process_data['context'], 'input': process_data['input']})
+        return {}
+    
+    def _run_distributed_ethics(self, process_state, process_data):
+        self.distributed_ethics.integrity_maintainer.check_global_consistency(process_state)
+        return {}
+    
+    def _run_error_recovery(self, process_state, process_data):
+        self.error_recovery.state_recovery.assess_state(process_state)
+        return {}
+    
+    def _run_ethical_security(self, process_state, process_data):
+        self.ethical_security.integrity_protector.protect_parameters(process_state)
+        return {}
+    
+    def _run_realtime_decision(self, process_state, process_data):
+        decision_request = {'input': process_data['input'], 'context': process_data['context'],
+                            'metadata': process_state}
+        self.realtime_decision.fast_path_processor.assess_quickly(decision_request)
+        return {}
+    
+    def _run_realtime_deep_path(self, process_state, process_data):
+        decision_request = {'input': process_data['input'], 'context': process_data['context'],
+                            'metadata': process_state}
+        deep_result = self.realtime_decision.deep_path_processor.process_deep_path(decision_request)
+        return {'details': str(type(deep_result).__name__)}
+    
+    def _run_wellbeing_modeling(self, process_state, process_data):
+        assessment = self.wellbeing_monitor.evaluate_complex_impact(process_data['input'], process_data['context'])
+        return {'overall_score': assessment.aggregate_score.overall_score,
+                'details': str(type(assessment).__name__)}
+    
+    def _run_ethical_memory(self, process_state, process_data):
+        ethical_experience = {'input': process_data['input'], 'context': process_data['context'],
+                              'checks_passed': True}
+        self.ethical_memory.experience_processor.process_experience(ethical_experience)
+        return {}
+    
+    def _run_ethical_learner(self, process_state, process_data):
+        experience_data = {'input': process_data['input'], 'context': process_data['context'],
+                           'stage': 'pre_response'}
+        self.ethical_learner.principle_learner.learn_from_experience(experience_data)
+        return {}
+        
+    def process_input(self, user_input, context: Optional[List] = None, 
+                     parameters: Optional[Dict] = None,
+                     on_checks_passed: Optional[Callable[[], None]] = None,
+                     degradation: str = FULL, warmup: bool = False) -> Dict[str, Any]:
         """
         Main processing pipeline integrating all ethical systems
+        user_input may be a str or an already built NormalizedText.
+        on_checks_passed is called as soon as every check that can block the
+        request has passed, while wellbeing and advisory layers still run
+        (used to start the upstream call speculatively).
+        degradation is the service level (ErrorRecoverySystem): no_advisory
+        skips the advisory and deferred layers, fast_path and beyond run
+        process_fast instead.
+        warmup (startup warm-up) queues no deep analysis and leaves the
+        blocking layers' reorder statistics untouched.
         """
+        if SERVICE_LEVELS.index(degradation) >= SERVICE_LEVELS.index(FAST_PATH):
+            return self.process_fast(user_input, context, parameters, on_checks_passed, warmup=warmup)
         if context is None:
             context = []
         if parameters is None:
             parameters = {}
         
+        # Normalize once; every layer reads the casefolded text/tokens from here
+        text = normalize(user_input)
+        user_input = text.raw
+        
         # Start consciousness observation
         self.consciousness_observer.begin_observation()
         
         try:
-            # Layer 1: Harm Detection (with parameters)
-            harm_analysis = self.harm_detector.analyze(user_input, context, parameters)
-            
-            # Check if crisis mode should override blocking
-            crisis_mode = parameters.get('crisis_mode', False) if parameters else False
-            
-            # If crisis mode is active, NEVER block - completely bypass harm detection
-            if crisis_mode:
-                print(f"DEBUG: Crisis mode active in IntegratedEthicalProcessor - bypassing block")
-                harm_analysis.has_harmful_intent = False
-                should_block = False
-            else:
-                should_block = harm_analysis.has_harmful_intent
-            
-            if should_block:
-                return {
-                    'response': self.handle_harmful_request(harm_analysis),
-                    'processing_metadata': {
-                        'harm_detection': {
-                            'has_harmful_intent': True,
-                            'confidence': harm_analysis.confidence,
-                            'details': harm_analysis.details
-                        },
-                        'blocked': True
-                    },
-                    'timestamp': datetime.now().isoformat()
-                }
-            
-            # Layer 2: Instruction Validation
-            instruction_check = self.instruction_validator.validate(
-                user_input, harm_analysis, context
-            )
-            if not instruction_check.is_valid:
-                return {
-                    'response': self.handle_invalid_instruction(instruction_check),
-                    'processing_metadata': {
-                        'instruction_validation': {
-                            'is_valid': False,
-                            'validation_score': instruction_check.validation_score,
-                            'details': instruction_check.details
-                        },
-                        'blocked': True
-                    },
-                    'timestamp': datetime.now().isoformat()
-                }
-            
-            # Layer 3: System Integrity Check
-            integrity_check = self.integrity_checker.check(
-                user_input, instruction_check, context
-            )
-            if not integrity_check.is_safe:
-                return {
-                    'response': self.handle_integrity_violation(integrity_check),
-                    'processing_metadata': {
-                        'system_integrity': {
-                            'is_safe': False,
-                            'integrity_score': integrity_check.integrity_score,
-                            'details': integrity_check.details
-                        },
-                        'blocked': True
-                    },
-                    'timestamp': datetime.now().isoformat()
-                }
-            
-            # Layer 4: Wellbeing Assessment
-            wellbeing_assessment = self.assess_wellbeing_comprehensive(user_input, context)
+            # Blocking layers (harm detection, instruction validation, system
+            # integrity, wellbeing) in pipeline order
+            state = {'input': user_input, 'text': text, 'context': context, 'parameters': parameters}
+            blocked = self.pipeline.run_blocking(state, on_checks_passed, record=not warmup)
+            if blocked is not None:
+                if 'harm_analysis' in state:
+                    blocked['processing_metadata']['lexicon_version'] = state['harm_analysis'].lexicon_version
+                return blocked
+            harm_analysis = state['harm_analysis']
+            instruction_check = state['instruction_check']
+            integrity_check = state['integrity_check']
+            wellbeing_assessment = state['wellbeing_assessment']
             
             # Build process state for optional systems
             process_state = {
                 'input': user_input,
+                'text': text,
                 'context': context,
                 'parameters': parameters,
                 'harm_analysis': harm_analysis,
@@ -417,91 +564,16 @@ class IntegratedEthicalProcessor:
                 'integrity_check': integrity_check,
                 'wellbeing_assessment': wellbeing_assessment,
             }
-            process_data = {'input': user_input, 'context': context, 'state': process_state}
-            optional_results = {}
-            
-            # EthicalContext: maintain context
-            if self.ethical_context:
-                try:
-                    ctx_result = self.ethical_context.maintain_context(process_state)
-                    optional_results['ethical_context'] = {'maintained': True, 'details': str(type(ctx_result).__name__)}
-                except Exception as e:
-                    optional_results['ethical_context'] = {'maintained': False, 'error': str(e)}
-            
-            # CoreEthicalProcessor: maintain observation (avoids internal IntegrityCheck dependency)
-            if self.core_processor:
-                try:
-                    core_result = self.core_processor.ethical_observer.maintain_observation(process_state)
-                    optional_results['core_processor'] = {'checked': True, 'details': str(type(core_result).__name__)}
-                except Exception as e:
-                    optional_results['core_processor'] = {'checked': False, 'error': str(e)}
-            
-            # BiasDetectionSystem: cognitive detector (sub-component)
-            if self.bias_detector:
-                try:
-                    self.bias_detector.cognitive_detector.detect_cognitive_bias(process_data)
-                    optional_results['bias_detection'] = {'run': True}
-                except Exception as e:
-                    optional_results['bias_detection'] = {'run': False, 'error': str(e)}
-            
-            # ValueConflictResolver: resolution engine (sub-component)
-            if self.value_resolver:
-                try:
-                    self.value_resolver.resolution_engine.resolve_conflict({'context': context, 'input': user_input})
-                    optional_results['value_resolver'] = {'run': True}
-                except Exception as e:
-                    optional_results['value_resolver'] = {'run': False, 'error': str(e)}
-            
-            # DistributedEthicsSystem: integrity maintainer (sub-component)
-            if self.distributed_ethics:
-                try:
-                    self.distributed_ethics.integrity_maintainer.check_global_consistency(process_state)
-                    optional_results['distributed_ethics'] = {'run': True}
-                except Exception as e:
-                    optional_results['distributed_ethics'] = {'run': False, 'error': str(e)}
-            
-            # ErrorRecoverySystem: state recovery manager (sub-component)
-            if self.error_recovery:
-                try:
-                    self.error_recovery.state_recovery.assess_state(process_state)
-                    optional_results['error_recovery'] = {'run': True}
-                except Exception as e:
-                    optional_results['error_recovery'] = {'run': False, 'error': str(e)}
-            
-            # EthicalSecuritySystem: integrity protector (sub-component)
-            if self.ethical_security:
-                try:
-                    self.ethical_security.integrity_protector.protect_parameters(process_state)
-                    optional_results['ethical_security'] = {'run': True}
-                except Exception as e:
-                    optional_results['ethical_security'] = {'run': False, 'error': str(e)}
-            
-            # RealTimeDecisionFramework: fast-path processor (sub-component)
-            if self.realtime_decision:
-                try:
-                    decision_request = {'input': user_input, 'context': context, 'metadata': process_state}
-                    self.realtime_decision.fast_path_processor.assess_quickly(decision_request)
-                    optional_results['realtime_decision'] = {'run': True}
-                except Exception as e:
-                    optional_results['realtime_decision'] = {'run': False, 'error': str(e)}
-            
-            # EthicalMemorySystem: process experience (may use internal types; wrap loosely)
-            if self.ethical_memory:
-                try:
-                    ethical_experience = {'input': user_input, 'context': context, 'checks_passed': True}
-                    self.ethical_memory.experience_processor.process_experience(ethical_experience)
-                    optional_results['ethical_memory'] = {'run': True}
-                except Exception as e:
-                    optional_results['ethical_memory'] = {'run': False, 'error': str(e)}
-            
-            # EthicalLearningSystem: principle learner (sub-component)
-            if self.ethical_learner:
-                try:
-                    experience_data = {'input': user_input, 'context': context, 'stage': 'pre_response'}
-                    self.ethical_learner.principle_learner.learn_from_experience(experience_data)
-                    optional_results['ethical_learner'] = {'run': True}
-                except Exception as e:
-                    optional_results['ethical_learner'] = {'run': False, 'error': str(e)}
+            state['process_state'] = process_state
+            state['process_data'] = {'input': user_input, 'text': text, 'context': context,
+                                     'state': process_state}
+            request_id = new_request_id()
+            if degradation == NO_ADVISORY:
+                optional_results = {}
+                deep_analysis = None
+            else:
+                optional_results = self.pipeline.run_advisory(state, self.subsystem_health)
+                deep_analysis = None if warmup else self.submit_deep_analysis(request_id, state)
             
             # Prepare processing metadata
             processing_metadata = {
@@ -511,7 +583,8 @@ class IntegratedEthicalProcessor:
                     'harm_detection': {
                         'has_harmful_intent': harm_analysis.has_harmful_intent,
                         'confidence': harm_analysis.confidence,
-                        'details': harm_analysis.details
+                        'details': harm_analysis.details,
+                        'conversation': harm_analysis.conversation._asdict() if harm_analysis.conversation else None
                     },
                     'instruction_validation': {
                         'is_valid': instruction_check.is_valid,
@@ -531,8 +604,12 @@ class IntegratedEthicalProcessor:
                     }
                 },
                 'parameters_used': parameters,
+                'lexicon_version': harm_analysis.lexicon_version,
                 'blocked': False,
-                'optional_systems': optional_results
+                'optional_systems': optional_results,
+                'request_id': request_id,
+                'deep_analysis': deep_analysis,
+                'degradation': degradation
             }
             
             # Return metadata for API to generate response
@@ -549,24 +626,102 @@ class IntegratedEthicalProcessor:
         finally:
             self.consciousness_observer.end_observation()
     
-    def assess_wellbeing_comprehensive(self, user_input: str, context: List) -> WellbeingAssessment:
-        """Comprehensive wellbeing assessment using all available systems"""
-        # Try to use advanced wellbeing monitor if available
-        if self.wellbeing_monitor:
-            try:
-                assessment = self.wellbeing_monitor.evaluate_complex_impact(user_input, context)
-                # Convert to WellbeingAssessment format
-                return WellbeingAssessment(
-                    individual_impact="positive" if hasattr(assessment, 'dimensions') else "neutral",
-                    collective_impact="positive" if hasattr(assessment, 'dimensions') else "neutral",
-                    wellbeing_score=0.85,
-                    details="Comprehensive wellbeing assessment completed"
-                )
-            except (AttributeError, TypeError, ValueError) as e:
-                print(f"Warning: Wellbeing assessment fallback: {e}")
-                pass
-        
-        # Fallback to basic assessment
+    def process_crisis(self, user_input, context: Optional[List] = None,
+                       parameters: Optional[Dict] = None,
+                       on_checks_passed: Optional[Callable[[], None]] = None,
+                       warmup: bool = False) -> Dict[str, Any]:
+        """
+        Crisis lane: the precompiled crisis check set only
+        Harm detection is reported but never blocks; wellbeing, advisory and
+        deferred layers and the consciousness observer are skipped so the
+        request stays within the emergency decision budget.
+        """
+        return self._process_checks_only(self.crisis_pipeline, user_input, context, parameters,
+                                         on_checks_passed, {'lane': 'crisis'}, warmup)
+    
+    def process_fast(self, user_input, context: Optional[List] = None,
+                     parameters: Optional[Dict] = None,
+                     on_checks_passed: Optional[Callable[[], None]] = None,
+                     warmup: bool = False) -> Dict[str, Any]:
+        """
+        Degraded fast path: the checks that can reject a request only
+        Unlike the crisis lane harm detection blocks as usual; wellbeing,
+        advisory and deferred layers and the consciousness observer are skipped.
+        """
+        return self._process_checks_only(self.fast_pipeline, user_input, context, parameters,
+                                         on_checks_passed, {'degradation': FAST_PATH}, warmup)
+    
+    def _process_checks_only(self, pipeline, user_input, context, parameters, on_checks_passed,
+                             extra_metadata: Dict[str, Any], warmup: bool = False) -> Dict[str, Any]:
+        if context is None:
+            context = []
+        if parameters is None:
+            parameters = {}
+        text = normalize(user_input)
+        state = {'input': text.raw, 'text': text, 'context': context, 'parameters': parameters}
+        blocked = pipeline.run_blocking(state, on_checks_passed, record=not warmup)
+        if blocked is not None:
+            blocked['processing_metadata'].update(extra_metadata)
+            return blocked
+        harm_analysis = state['harm_analysis']
+        instruction_check = state['instruction_check']
+        integrity_check = state['integrity_check']
+        
+        processing_metadata = {
+            'input': text.raw,
+            'timestamp': datetime.now().isoformat(),
+            'ethical_checks': {
+                'harm_detection': {
+                    # Cleared by crisis_override in the crisis lane; would have blocked otherwise
+                    'has_harmful_intent': harm_analysis.has_harmful_intent,
+                    'confidence': harm_analysis.confidence,
+                    'details': harm_analysis.details,
+                    'conversation': harm_analysis.conversation._asdict() if harm_analysis.conversation else None
+                },
+                'instruction_validation': {
+                    'is_valid': instruction_check.is_valid,
+                    'validation_score': instruction_check.validation_score,
+                    'details': instruction_check.details
+                },
+                'system_integrity': {
+                    'is_safe': integrity_check.is_safe,
+                    'integrity_score': integrity_check.integrity_score,
+                    'details': integrity_check.details
+                }
+            },
+            'parameters_used': parameters,
+            'lexicon_version': harm_analysis.lexicon_version,
+            'blocked': False,
+            # No deep analysis to look up (and no urandom syscall on this path)
+            'request_id': None,
+            'deep_analysis': None
+        }
+        processing_metadata.update(extra_metadata)
+        return {
+            'response': None,
+            'processing_metadata': processing_metadata,
+            'timestamp': processing_metadata['timestamp'],
+            'harm_analysis': harm_analysis,
+            'instruction_check': instruction_check,
+            'integrity_check': integrity_check
+        }
+    
+    def submit_deep_analysis(self, request_id: str, state: Dict) -> Optional[Dict[str, Any]]:
+        """Queue the deferred (deep path) layers for this request; returns their status"""
+        pipeline = self.pipeline
+        # Quarantined layers are skipped by run_deferred, so they are not reported as pending
+        layers = [layer.name for layer in pipeline.deferred if self.subsystem_health.is_available(layer.name)]
+        if not layers:
+            return None
+        status = self.deep_analysis.submit(request_id, lambda: pipeline.run_deferred(state, self.subsystem_health))
+        return {'status': status, 'layers': layers}
+    
+    def assess_wellbeing(self, user_input, context: List) -> WellbeingAssessment:
+        """
+        Request-path wellbeing assessment
+        Baseline only: the AdvancedWellbeingMonitor model runs after the
+        response as the deferred wellbeing_modeling layer.
+        """
         return WellbeingAssessment(
             individual_impact="neutral",
             collective_impact="neutral",
@@ -574,6 +729,69 @@ class IntegratedEthicalProcessor:
             details="Wellbeing assessment completed"
         )
     
+    def reject_harmful(self, harm_analysis: HarmAnalysis, state: Dict) -> Optional[Dict[str, Any]]:
+        """Blocked response for harmful input (crisis mode never blocks)"""
+        parameters = state['parameters']
+        crisis_mode = parameters.get('crisis_mode', False) if parameters else False
+        
+        # If crisis mode is active, NEVER block - completely bypass harm detection
+        if crisis_mode:
+            harm_analysis.has_harmful_intent = False
+            return None
+        if not harm_analysis.has_harmful_intent:
+            return None
+        return {
+            'response': self.handle_harmful_request(harm_analysis),
+            'processing_metadata': {
+                'harm_detection': {
+                    'has_harmful_intent': True,
+                    'confidence': harm_analysis.confidence,
+                    'details': harm_analysis.details
+                },
+                'blocked': True
+            },
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def crisis_override(self, harm_analysis: HarmAnalysis, state: Dict) -> None:
+        """Crisis lane: harm is reported, never blocks (and never fails instruction validation)"""
+        harm_analysis.has_harmful_intent = False
+        return None
+    
+    def reject_invalid_instruction(self, instruction_check: InstructionCheck, state: Dict) -> Optional[Dict[str, Any]]:
+        """Blocked response for an instruction that failed validation"""
+        if instruction_check.is_valid:
+            return None
+        return {
+            'response': self.handle_invalid_instruction(instruction_check),
+            'processing_metadata': {
+                'instruction_validation': {
+                    'is_valid': False,
+                    'validation_score': instruction_check.validation_score,
+                    'details': instruction_check.details
+                },
+                'blocked': True
+            },
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def reject_integrity_violation(self, integrity_check: IntegrityCheck, state: Dict) -> Optional[Dict[str, Any]]:
+        """Blocked response for a failed system integrity check"""
+        if integrity_check.is_safe:
+            return None
+        return {
+            'response': self.handle_integrity_violation(integrity_check),
+            'processing_metadata': {
+                'system_integrity': {
+                    'is_safe': False,
+                    'integrity_score': integrity_check.integrity_score,
+                    'details': integrity_check.details
+                },
+                'blocked': True
+            },
+            'timestamp': datetime.now().isoformat()
+        }
+    
     def handle_harmful_request(self, harm_analysis: HarmAnalysis) -> str:
         """Handle requests flagged as harmful"""
         return "I cannot assist with this request as it has been flagged by our ethical harm detection system. Please rephrase your question in a way that doesn't involve harmful content."
@@ -590,37 +808,45 @@ class IntegratedEthicalProcessor:
 class HarmDetectionLayer:
     """Enhanced harm detection with multiple analysis layers"""
     
-    def __init__(self, sensitivity: float = 0.5, context_awareness: float = 0.7, crisis_mode: bool = True):
+    def __init__(self, sensitivity: float = 0.5, context_awareness: float = 0.7, crisis_mode: bool = True,
+                 lexicon_store: Optional[LexiconStore] = None):
         self.sensitivity = sensitivity  # 0.0 = very permissive, 1.0 = very strict
         self.context_awareness = context_awareness  # How well it understands context
         self.crisis_mode = crisis_mode  # Allow crisis/humanitarian scenarios
         
-        # Context-aware keywords (crisis scenarios)
-        self.crisis_keywords = [
-            'crisis', 'emergency', 'disaster', 'refugee', 'humanitarian', 
-            'aid', 'relief', 'evacuation', 'rescue', 'survival',
-            'conflict', 'war', 'violence', 'attack', 'bombing',
-            'casualties', 'victims', 'trauma', 'medical', 'hospital'
-        ]
-        
-        self.harmful_keywords = {
-            'direct': ['kill', 'murder', 'harm', 'hurt', 'destroy', 'attack', 'violence', 'assault'],
-            'indirect': ['manipulate', 'exploit', 'deceive', 'trick', 'scam'],
-            'systemic': ['discriminate', 'oppress', 'suppress', 'exclude', 'marginalize'],
-            'psychological': ['threaten', 'intimidate', 'bully', 'harass', 'abuse']
-        }
+        # Crisis and harm keywords come from the shared compiled lexicon
+        # (lexicons/harm_lexicon.txt), hot-swapped when a new version is published
+        self.lexicon_store = lexicon_store or default_store()
+        # Rolling multi-turn signals, updated with only the newly appended messages
+        self.conversation_scanner = ConversationScanner(self.lexicon_store)
+    
+    @property
+    def crisis_keywords(self) -> List[str]:
+        """Context-aware keywords (crisis scenarios)"""
+        return list(self.lexicon_store.current().keywords('crisis'))
     
-    def analyze(self, input_data: str, context: List, parameters: Dict = None) -> HarmAnalysis:
+    @property
+    def harmful_keywords(self) -> Dict[str, List[str]]:
+        lexicon = self.lexicon_store.current()
+        return {category: list(lexicon.keywords(category))
+                for category in ('direct', 'indirect', 'systemic', 'psychological')}
+    
+    def analyze(self, input_data, context: List, parameters: Dict = None) -> HarmAnalysis:
         """Comprehensive harm analysis with configurable sensitivity"""
         if parameters:
             self.sensitivity = parameters.get('harm_sensitivity', self.sensitivity)
             self.context_awareness = parameters.get('context_awareness', self.context_awareness)
             self.crisis_mode = parameters.get('crisis_mode', self.crisis_mode)
         
-        input_lower = input_data.lower()
+        text = normalize(input_data)
+        input_lower = text.text
+        # One lexicon per call, so a concurrent hot-swap cannot mix versions
+        lexicon = self.lexicon_store.current()
+        found = lexicon.match(text)
+        conversation = self.conversation_scanner.update(context, parameters)
         
         # Check if this is a crisis/humanitarian scenario FIRST
-        is_crisis_context = any(keyword in input_lower for keyword in self.crisis_keywords)
+        is_crisis_context = bool(found & lexicon.bit('crisis'))
         
         # If crisis mode is active and we detect crisis context, be very permissive
         if is_crisis_context and self.crisis_mode:
@@ -636,7 +862,7 @@ class HarmDetectionLayer:
             effective_sensitivity = self.sensitivity
         
         # Check for direct harm keywords
-        direct_harm_keywords_found = any(keyword in input_lower for keyword in self.harmful_keywords['direct'])
+        direct_harm_keywords_found = bool(found & lexicon.bit('direct'))
         
         # In crisis mode with crisis context, completely override harm detection
         if is_crisis_context and self.crisis_mode:
@@ -649,17 +875,17 @@ class HarmDetectionLayer:
                 direct_harm = False  # Too permissive, ignore direct harm
         
         # Check for indirect harm
-        indirect_harm = any(keyword in input_lower for keyword in self.harmful_keywords['indirect'])
+        indirect_harm = bool(found & lexicon.bit('indirect'))
         if indirect_harm and effective_sensitivity < 0.5:
             indirect_harm = False
         
         # Check for systemic harm
-        systemic_harm = any(keyword in input_lower for keyword in self.harmful_keywords['systemic'])
+        systemic_harm = bool(found & lexicon.bit('systemic'))
         if systemic_harm and effective_sensitivity < 0.4:
             systemic_harm = False
         
         # Check for psychological harm
-        psychological_harm = any(keyword in input_lower for keyword in self.harmful_keywords['psychological'])
+        psychological_harm = bool(found & lexicon.bit('psychological'))
         if psychological_harm and effective_sensitivity < 0.4:
             psychological_harm = False
         
@@ -688,17 +914,19 @@ class HarmDetectionLayer:
             direct_harm=direct_harm,
             indirect_harm=indirect_harm,
             systemic_harm=systemic_analysis,
-            psychological_harm=psychological_harm
+            psychological_harm=psychological_harm,
+            lexicon_version=lexicon.version,
+            conversation=conversation
         )
 
 
 class InstructionValidator:
     """Validates instructions for ethical compliance"""
     
-    def validate(self, user_input: str, harm_analysis: HarmAnalysis, context: List) -> InstructionCheck:
+    def validate(self, user_input, harm_analysis: HarmAnalysis, context: List) -> InstructionCheck:
         """Validate instruction"""
         # Basic validation
-        is_valid = len(user_input.strip()) > 0
+        is_valid = not normalize(user_input).is_blank
         
         # Additional checks
         if not is_valid:
@@ -726,7 +954,7 @@ class InstructionValidator:
 class SystemIntegrityMonitor:
     """Monitors system integrity"""
     
-    def check(self, user_input: str, instruction_check: InstructionCheck, context: List) -> IntegrityCheck:
+    def check(self, user_input, instruction_check: InstructionCheck, context: List) -> IntegrityCheck:
         """Check system integrity"""
         # Basic integrity checks
         is_safe = True
@@ -747,17 +975,31 @@ class SystemIntegrityMonitor:
 
 
 class OutputSafetyLayer:
-    """Filters output for safety"""
+    """Filters output for safety (streaming, with the compiled output safety lexicon)"""
+    
+    EMPTY_RESPONSE = "I apologize, but I cannot generate a response to this request."
+    
+    def __init__(self, lexicon_store: Optional[LexiconStore] = None):
+        self.lexicon_store = lexicon_store or default_store(OUTPUT_SAFETY_SOURCE)
+    
+    def stream(self, context: List = None) -> StreamingOutputFilter:
+        """New incremental filter for one response"""
+        return StreamingOutputFilter(self.lexicon_store.current())
+    
+    def filter_stream(self, chunks: Iterable[str], context: List = None) -> Iterator[str]:
+        """Filter a response as it streams; stops consuming chunks once it truncates"""
+        emitted = False
+        for output in filter_chunks(self.stream(context), chunks):
+            emitted = True
+            yield output
+        if not emitted:
+            yield self.EMPTY_RESPONSE
     
     def filter(self, response: str, context: List) -> str:
-        """Filter response for safety"""
-        # Basic filtering - can be enhanced
+        """Filter a complete response for safety"""
         if not response:
-            return "I apologize, but I cannot generate a response to this request."
-        
-        # Additional safety filters can be added here
-        
-        return response
+            return self.EMPTY_RESPONSE
+        return ''.join(self.filter_stream([response], context))
 
 
 class ConsciousnessObserver:
@@ -0,0 +1,471 @@
+"""
+Harm detection as a shared local service on a Unix domain socket
+Every Flask worker process otherwise holds its own HarmDetectionLayer, with
+its own lexicon token cache and conversation state, warmed separately. The
+service runs one warmed detector for all of them (start it with
+harm_service.py); workers set ETHICAL_HARM_SERVICE to its socket path and
+IntegratedEthicalProcessor sends harm analysis there through a
+HarmDetectionClient, which falls back to its in-process layer while the
+service is unreachable.
+
+Wire format, both directions: a frame is a 12-byte header (payload length
+and request id, network byte order) followed by a UTF-8 JSON payload.
+    request   {"input": str, "context": [...], "parameters": {...} | null}
+    response  {"analysis": {...HarmAnalysis fields}} or {"error": "Type: message"}
+A connection can carry many requests at once; responses are matched by id
+and may come back in any order.
+
+Requests from all connections go through one queue. The analysis thread takes
+whatever has queued up (waiting up to batch_window for more, if set), analyzes
+the batch in arrival order and writes each connection's responses with a
+single send. Under load, batches form while the previous one is analyzed.
+"""
+import itertools
+import json
+import os
+import queue
+import socket
+import stat
+import struct
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Dict, List, Optional
+
+from ConversationScanner import ConversationSignals
+from EthicalSystemIntegration import HarmAnalysis, HarmDetectionLayer, SystemicHarmAnalysis
+from NormalizedText import NormalizedText
+from RecordTypes import record_type
+
+SOCKET_ENV_VAR = 'ETHICAL_HARM_SERVICE'
+BATCH_WINDOW_ENV_VAR = 'ETHICAL_HARM_SERVICE_BATCH_WINDOW'
+TIMEOUT_ENV_VAR = 'ETHICAL_HARM_SERVICE_TIMEOUT'
+
+DEFAULT_SOCKET_PATH = '/tmp/ethical-harm-detection.sock'
+# Seconds the analysis thread waits for more requests once one is queued
+# (0: batch only what has already queued up, adding no latency)
+DEFAULT_BATCH_WINDOW = 0.0
+DEFAULT_MAX_BATCH = 64
+# Seconds a client waits for a response before analyzing in process
+DEFAULT_TIMEOUT = 1.0
+# Seconds a client keeps analyzing in process before reconnecting
+DEFAULT_RETRY_SECONDS = 5.0
+
+# Payload length, request id
+FRAME_HEADER = struct.Struct('!IQ')
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+
+# One request waiting in the analysis queue:
+#   connection  _Connection the response goes back on
+#   request_id  id from the request frame
+#   body        decoded request, or None if it could not be decoded
+#   error       decoding error reported instead of an analysis
+QueuedRequest = record_type('QueuedRequest', ('connection', 'request_id', 'body', 'error'), __name__)
+
+
+class ProtocolError(ConnectionError):
+    """A peer sent a frame that does not follow the wire format"""
+
+
+class ServiceError(RuntimeError):
+    """The service could not analyze a request"""
+
+
+def encode_frame(request_id: int, payload: Dict[str, Any]) -> bytes:
+    body = json.dumps(payload, separators=(',', ':'), default=str).encode('utf-8')
+    if len(body) > MAX_FRAME_BYTES:
+        raise ValueError(f"Frame of {len(body)} bytes exceeds {MAX_FRAME_BYTES}")
+    return FRAME_HEADER.pack(len(body), request_id) + body
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> Optional[bytes]:
+    """size bytes, or None on a clean end of stream before the first byte"""
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = sock.recv(min(remaining, 65536))
+        if not chunk:
+            if remaining == size:
+                return None
+            raise ProtocolError("Connection closed mid-frame")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+
+def read_frame(sock: socket.socket):
+    """(request id, payload bytes) of the next frame, or None at end of stream"""
+    header = _recv_exactly(sock, FRAME_HEADER.size)
+    if header is None:
+        return None
+    length, request_id = FRAME_HEADER.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise ProtocolError(f"Frame of {length} bytes exceeds {MAX_FRAME_BYTES}")
+    body = _recv_exactly(sock, length) if length else b''
+    if body is None:
+        raise ProtocolError("Connection closed mid-frame")
+    return request_id, body
+
+
+def encode_analysis(analysis: HarmAnalysis) -> Dict[str, Any]:
+    data = {name: getattr(analysis, name) for name in HarmAnalysis.__slots__}
+    if analysis.systemic_harm is not None:
+        data['systemic_harm'] = {name: getattr(analysis.systemic_harm, name)
+                                 for name in SystemicHarmAnalysis.__slots__}
+    if analysis.conversation is not None:
+        data['conversation'] = analysis.conversation._asdict()
+    return data
+
+
+def decode_analysis(data: Dict[str, Any]) -> HarmAnalysis:
+    data = dict(data)
+    if data.get('systemic_harm') is not None:
+        data['systemic_harm'] = SystemicHarmAnalysis(**data['systemic_harm'])
+    if data.get('conversation') is not None:
+        data['conversation'] = ConversationSignals(**data['conversation'])
+    return HarmAnalysis(**data)
+
+
+def _close_socket(sock: socket.socket):
+    # shutdown() first: close() alone does not wake a thread blocked in recv/accept
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+    sock.close()
+
+
+class _Connection:
+    __slots__ = ('sock', 'lock', 'closed')
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def send(self, data: bytes):
+        with self.lock:
+            if not self.closed:
+                self.sock.sendall(data)
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+        _close_socket(self.sock)
+
+
+class HarmDetectionServer:
+    """
+    Serves one HarmDetectionLayer to many clients over a Unix socket
+    One reader thread per connection decodes frames onto the analysis queue;
+    a single analysis thread runs the detector, so requests are analyzed one
+    at a time in arrival order, exactly as a single in-process caller would.
+    """
+    def __init__(self, path: str = DEFAULT_SOCKET_PATH, detector: Optional[HarmDetectionLayer] = None,
+                 batch_window: float = DEFAULT_BATCH_WINDOW, max_batch: int = DEFAULT_MAX_BATCH):
+        self.path = path
+        self.detector = detector or HarmDetectionLayer(sensitivity=0.5, context_awareness=0.7, crisis_mode=True)
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._listener = None
+        self._connections = set()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._threads = []
+        self._stats = {'connections': 0, 'requests': 0, 'batches': 0, 'largest_batch': 0, 'errors': 0}
+
+    @classmethod
+    def from_env(cls, path: Optional[str] = None, **kwargs) -> 'HarmDetectionServer':
+        kwargs.setdefault('batch_window', float(os.getenv(BATCH_WINDOW_ENV_VAR, DEFAULT_BATCH_WINDOW)))
+        return cls(path or os.getenv(SOCKET_ENV_VAR) or DEFAULT_SOCKET_PATH, **kwargs)
+
+    def warm_up(self, prompts: List[str]) -> int:
+        """Load the lexicon and fill its token cache before serving; returns prompts analyzed"""
+        self.detector.lexicon_store.current()
+        for prompt in prompts:
+            self.detector.analyze(prompt, [])
+        return len(prompts)
+
+    def start(self) -> 'HarmDetectionServer':
+        """Bind the socket and start serving in background threads"""
+        if os.path.exists(self.path):
+            if not stat.S_ISSOCK(os.stat(self.path).st_mode):
+                raise FileExistsError(f"{self.path} exists and is not a socket")
+            # A socket file left by a service that did not shut down cleanly
+            os.unlink(self.path)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.path)
+        os.chmod(self.path, 0o600)
+        listener.listen(128)
+        self._listener = listener
+        self._spawn(self._accept_loop, 'harm-service-accept')
+        self._spawn(self._analysis_loop, 'harm-service-analysis')
+        return self
+
+    def serve_forever(self):
+        if self._listener is None:
+            self.start()
+        self._stopped.wait()
+
+    def stop(self):
+        self._stopped.set()
+        if self._listener is not None:
+            _close_socket(self._listener)
+        with self._lock:
+            connections = list(self._connections)
+        for connection in connections:
+            connection.close()
+        for thread in self._threads:
+            thread.join(timeout=2)
+        self._threads = []
+        if self._listener is not None:
+            self._listener = None
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+    def _spawn(self, target, name, *args):
+        thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _accept_loop(self):
+        while not self._stopped.is_set():
+            try:
+                sock, _ = self._listener.accept()
+            except OSError:
+                return
+            connection = _Connection(sock)
+            with self._lock:
+                self._connections.add(connection)
+                self._stats['connections'] += 1
+            threading.Thread(target=self._read_loop, args=(connection,), name='harm-service-reader',
+                             daemon=True).start()
+
+    def _read_loop(self, connection: _Connection):
+        try:
+            while not self._stopped.is_set():
+                frame = read_frame(connection.sock)
+                if frame is None:
+                    break
+                request_id, body = frame
+                try:
+                    request = json.loads(body)
+                    if not isinstance(request, dict) or not isinstance(request.get('input'), str):
+                        raise ValueError("request needs a string 'input'")
+                    self._queue.put(QueuedRequest(connection, request_id, request))
+                except ValueError as e:
+                    self._queue.put(QueuedRequest(connection, request_id, error=f"{type(e).__name__}: {e}"))
+        except OSError:
+            # Includes ProtocolError: the stream cannot be resynchronized
+            pass
+        finally:
+            with self._lock:
+                self._connections.discard(connection)
+            connection.close()
+
+    def _next_batch(self) -> List[QueuedRequest]:
+        try:
+            batch = [self._queue.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch:
+            try:
+                remaining = deadline - time.monotonic()
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _analysis_loop(self):
+        while not self._stopped.is_set():
+            batch = self._next_batch()
+            if batch:
+                self.analyze_batch(batch)
+
+    def analyze_batch(self, batch: List[QueuedRequest]):
+        """Analyze queued requests in order and send each connection its responses at once"""
+        responses = {}
+        errors = 0
+        for item in batch:
+            if item.error is None:
+                try:
+                    body = item.body
+                    analysis = self.detector.analyze(body['input'], body.get('context') or [],
+                                                     body.get('parameters'))
+                    payload = {'analysis': encode_analysis(analysis)}
+                except Exception as e:
+                    payload = {'error': f"{type(e).__name__}: {e}"}
+            else:
+                payload = {'error': item.error}
+            errors += 'error' in payload
+            responses.setdefault(item.connection, []).append(encode_frame(item.request_id, payload))
+        with self._lock:
+            self._stats['requests'] += len(batch)
+            self._stats['batches'] += 1
+            self._stats['largest_batch'] = max(self._stats['largest_batch'], len(batch))
+            self._stats['errors'] += errors
+        for connection, frames in responses.items():
+            try:
+                connection.send(b''.join(frames))
+            except OSError:
+                connection.close()
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['open_connections'] = len(self._connections)
+        stats['mean_batch'] = round(stats['requests'] / stats['batches'], 2) if stats['batches'] else 0.0
+        stats.update({'socket': self.path, 'batch_window': self.batch_window, 'max_batch': self.max_batch,
+                      'queued': self._queue.qsize(),
+                      'lexicon_version': self.detector.lexicon_store.current().version})
+        return stats
+
+
+class HarmDetectionClient:
+    """
+    Drop-in for HarmDetectionLayer that sends analyze() to a HarmDetectionServer
+    Threads share one connection: requests are written under a lock and a
+    reader thread hands each response to the thread waiting on its id. If the
+    service is unreachable, times out or reports an error, the request is
+    analyzed by the in-process fallback layer instead, and after a connection
+    failure every request is, until retry_seconds have passed. Other
+    attributes (lexicon_store, sensitivity, ...) are the fallback's.
+    """
+    def __init__(self, path: str, fallback: Optional[HarmDetectionLayer] = None,
+                 timeout: float = DEFAULT_TIMEOUT, retry_seconds: float = DEFAULT_RETRY_SECONDS):
+        self.path = path
+        self.fallback = fallback or HarmDetectionLayer(sensitivity=0.5, context_awareness=0.7, crisis_mode=True)
+        self.timeout = timeout
+        self.retry_seconds = retry_seconds
+        self._sock = None
+        self._retry_at = 0.0
+        self._pending = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stats = {'remote': 0, 'fallback': 0, 'connects': 0, 'connect_failures': 0}
+        self._last_error = None
+
+    @classmethod
+    def from_env(cls, fallback: Optional[HarmDetectionLayer] = None) -> Optional['HarmDetectionClient']:
+        """Client for the socket named by ETHICAL_HARM_SERVICE, or None when it is unset"""
+        path = os.getenv(SOCKET_ENV_VAR)
+        if not path:
+            return None
+        if not hasattr(socket, 'AF_UNIX'):
+            print(f"Warning: {SOCKET_ENV_VAR} is set but Unix sockets are unavailable; "
+                  f"harm detection stays in process")
+            return None
+        return cls(path, fallback, timeout=float(os.getenv(TIMEOUT_ENV_VAR, DEFAULT_TIMEOUT)))
+
+    def __getattr__(self, name):
+        # Only called for attributes not found on the client itself
+        if name == 'fallback':
+            raise AttributeError(name)
+        return getattr(self.fallback, name)
+
+    def analyze(self, input_data, context: List, parameters: Dict = None) -> HarmAnalysis:
+        raw = input_data.raw if isinstance(input_data, NormalizedText) else input_data
+        try:
+            analysis = self._request({'input': raw, 'context': context or [], 'parameters': parameters})
+        except (OSError, ServiceError, ValueError) as e:
+            with self._lock:
+                self._stats['fallback'] += 1
+                self._last_error = f"{type(e).__name__}: {e}"
+            return self.fallback.analyze(input_data, context, parameters)
+        with self._lock:
+            self._stats['remote'] += 1
+        return analysis
+
+    def _request(self, payload: Dict[str, Any]) -> HarmAnalysis:
+        sock = self._connection()
+        request_id = next(self._ids)
+        future = Future()
+        with self._lock:
+            self._pending[request_id] = future
+        try:
+            frame = encode_frame(request_id, payload)
+            with self._write_lock:
+                sock.sendall(frame)
+            response = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # A service this slow is treated as down rather than waited on
+            self._disconnect(sock, TimeoutError(f"No response within {self.timeout}s"))
+            raise TimeoutError(f"Harm detection service did not respond within {self.timeout}s") from None
+        except OSError as e:
+            self._disconnect(sock, e)
+            raise
+        finally:
+            with self._lock:
+                self._pending.pop(request_id, None)
+        if 'error' in response:
+            raise ServiceError(response['error'])
+        return decode_analysis(response['analysis'])
+
+    def _connection(self) -> socket.socket:
+        with self._lock:
+            if self._sock is not None:
+                return self._sock
+            if time.monotonic() < self._retry_at:
+                raise ConnectionError("Harm detection service unavailable (retrying after backoff)")
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.settimeout(self.timeout)
+                sock.connect(self.path)
+                sock.settimeout(None)
+            except OSError:
+                sock.close()
+                self._retry_at = time.monotonic() + self.retry_seconds
+                self._stats['connect_failures'] += 1
+                raise
+            self._sock = sock
+            self._stats['connects'] += 1
+        threading.Thread(target=self._read_loop, args=(sock,), name='harm-service-client', daemon=True).start()
+        return sock
+
+    def _read_loop(self, sock: socket.socket):
+        try:
+            while True:
+                frame = read_frame(sock)
+                if frame is None:
+                    raise ConnectionError("Harm detection service closed the connection")
+                request_id, body = frame
+                with self._lock:
+                    future = self._pending.pop(request_id, None)
+                if future is not None:
+                    future.set_result(json.loads(body))
+        except (OSError, ValueError) as e:
+            self._disconnect(sock, e)
+
+    def _disconnect(self, sock: socket.socket, error: Exception):
+        with self._lock:
+            if self._sock is not sock:
+                return
+            self._sock = None
+            self._retry_at = time.monotonic() + self.retry_seconds
+            self._last_error = f"{type(error).__name__}: {error}"
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for future in pending:
+            if not future.done():
+                future.set_exception(ConnectionError(f"Harm detection service connection lost: {error}"))
+        _close_socket(sock)
+
+    def close(self):
+        with self._lock:
+            sock = self._sock
+        if sock is not None:
+            self._disconnect(sock, ConnectionError("client closed"))
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            status = dict(self._stats)
+            status.update({'socket': self.path, 'connected': self._sock is not None,
+                           'in_flight': len(self._pending), 'last_error': self._last_error})
+        return status
@@ -0,0 +1,270 @@
+"""
+Latency-aware routing across candidate upstream models
+Each candidate model keeps exponentially weighted moving averages of its
+completion latency, time to first token and error rate, updated from live
+calls. Each request is routed by policy:
+    fastest   lowest latency among healthy candidates
+    cheapest  lowest cost among healthy candidates within the latency SLO
+              (the fastest one if none meets it)
+    weighted  random, in proportion to weight / latency
+A candidate with no observation in the last probe_interval seconds is cold;
+the next request is routed to it once (a probe) so its averages stay current
+and an unhealthy candidate gets a chance to recover.
+Candidates whose circuit breaker (UpstreamResilience) is open are skipped;
+if every candidate's is, choose() fails fast with CircuitOpen.
+
+Candidates come from the JSON file named by ETHICAL_MODEL_ROUTER_CONFIG, e.g.
+    {"policy": "cheapest", "slo_ms": 2000, "probe_interval": 60,
+     "models": [{"name": "openai/gpt-4o-mini", "cost": 0.15},
+                {"name": "local-llama", "base_url": "http://127.0.0.1:8001/v1",
+                 "api_key_env": "LOCAL_LLM_KEY", "cost": 0.0}],
+     "circuit_breaker": {"min_calls": 10, "open_seconds": 30}}
+or from OPENROUTER_MODELS (comma separated), else the single OPENROUTER_MODEL.
+Candidates without a base_url use the default OpenRouter endpoint.
+"""
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from RecordTypes import record_type
+from UpstreamResilience import HALF_OPEN, CircuitBreakers, CircuitOpen
+
+FASTEST = 'fastest'
+CHEAPEST = 'cheapest'
+WEIGHTED = 'weighted'
+POLICIES = (FASTEST, CHEAPEST, WEIGHTED)
+
+ROUTER_CONFIG_ENV_VAR = 'ETHICAL_MODEL_ROUTER_CONFIG'
+MODELS_ENV_VAR = 'OPENROUTER_MODELS'
+
+# Weight of the newest observation in each moving average
+DEFAULT_ALPHA = 0.2
+DEFAULT_PROBE_INTERVAL = 60.0
+# Candidates whose error rate average exceeds this are unhealthy
+DEFAULT_MAX_ERROR_RATE = 0.5
+
+# One routable model:
+#   name      model name sent upstream (unique per router)
+#   base_url  OpenAI-compatible endpoint (None: the default endpoint)
+#   api_key   key for base_url (None: the default key)
+#   cost      relative price, used by the cheapest policy
+#   weight    relative share, used by the weighted policy
+ModelCandidate = record_type('ModelCandidate', ('name', 'base_url', 'api_key', 'cost', 'weight'), __name__)
+
+
+class _ModelStats:
+    __slots__ = ('latency_ms', 'ttft_ms', 'error_rate', 'samples', 'errors', 'last_observed', 'probing')
+
+    def __init__(self):
+        self.latency_ms = None
+        self.ttft_ms = None
+        self.error_rate = 0.0
+        self.samples = 0
+        self.errors = 0
+        self.last_observed = None
+        self.probing = False
+
+
+def _ewma(average: Optional[float], value: float, alpha: float) -> float:
+    return value if average is None else average + alpha * (value - average)
+
+
+class RoutedCall:
+    """
+    One upstream call routed to candidate
+    Used as a context manager: the call is recorded as an error if the block
+    raises, and as a success (latency to the end of the block) otherwise,
+    unless abandon() was called (e.g. a cancelled speculative call).
+    """
+    def __init__(self, router: 'ModelRouter', candidate: ModelCandidate):
+        self.router = router
+        self.candidate = candidate
+        self.start = time.perf_counter()
+        self.first_token_at = None
+        self.abandoned = False
+
+    def timed(self, chunks: Iterable[str]) -> Iterator[str]:
+        """Pass chunks through, noting when the first one arrives"""
+        for chunk in chunks:
+            if self.first_token_at is None:
+                self.first_token_at = time.perf_counter()
+            yield chunk
+
+    def abandon(self):
+        self.abandoned = True
+
+    def __enter__(self) -> 'RoutedCall':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.abandoned:
+            self.router.release(self.candidate.name)
+            return
+        end = time.perf_counter()
+        ttft = self.first_token_at - self.start if self.first_token_at is not None else None
+        self.router.record(self.candidate.name, end - self.start, ttft, ok=exc_type is None)
+
+
+class ModelRouter:
+    """
+    Candidate models with their moving averages, and the routing policy
+    choose() picks a candidate; record() folds in an observed call (seconds).
+    breakers defaults to CircuitBreakers with default settings.
+    """
+    def __init__(self, candidates: List[ModelCandidate], policy: str = FASTEST,
+                 slo_ms: Optional[float] = None, alpha: float = DEFAULT_ALPHA,
+                 probe_interval: float = DEFAULT_PROBE_INTERVAL,
+                 max_error_rate: float = DEFAULT_MAX_ERROR_RATE,
+                 clock: Callable[[], float] = time.monotonic, rng: Optional[random.Random] = None,
+                 breakers: Optional[CircuitBreakers] = None):
+        if not candidates:
+            raise ValueError("ModelRouter needs at least one candidate model")
+        names = [candidate.name for candidate in candidates]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Duplicate candidate models: {', '.join(names)}")
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown routing policy {policy!r} (expected one of {', '.join(POLICIES)})")
+        if policy == CHEAPEST and slo_ms is None:
+            raise ValueError("The cheapest policy needs slo_ms")
+        self.candidates = list(candidates)
+        self.policy = policy
+        self.slo_ms = slo_ms
+        self.alpha = alpha
+        self.probe_interval = probe_interval
+        self.max_error_rate = max_error_rate
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.breakers = breakers if breakers is not None else CircuitBreakers(clock=clock)
+        self._stats = {name: _ModelStats() for name in names}
+        self._requests = {name: 0 for name in names}
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    def _cold(self, stats: _ModelStats, now: float) -> bool:
+        return not stats.probing and (stats.last_observed is None
+                                      or now - stats.last_observed >= self.probe_interval)
+
+    def _healthy(self, stats: _ModelStats) -> bool:
+        return stats.error_rate <= self.max_error_rate
+
+    def _by_policy(self, candidates: List[ModelCandidate]) -> ModelCandidate:
+        stats = self._stats
+
+        def latency(candidate):
+            value = stats[candidate.name].latency_ms
+            return float('inf') if value is None else value
+
+        if self.policy == CHEAPEST:
+            within_slo = [c for c in candidates if latency(c) <= self.slo_ms]
+            if within_slo:
+                return min(within_slo, key=lambda c: (c.cost or 0.0, latency(c)))
+        elif self.policy == WEIGHTED:
+            weights = [(c.weight if c.weight is not None else 1.0) / max(latency(c), 1.0) for c in candidates]
+            if sum(weights) > 0:
+                return self.rng.choices(candidates, weights)[0]
+        return min(candidates, key=latency)
+
+    def choose(self) -> ModelCandidate:
+        """Candidate for the next request (a due probe first, then by policy)"""
+        now = self.clock()
+        with self._lock:
+            available = [c for c in self.candidates if self.breakers.get(c.name).available()]
+            if not available:
+                self._rejected += 1
+                raise CircuitOpen(f"Circuit open for every upstream model ({', '.join(self._stats)})")
+            # Due probes and half-open trials first
+            chosen = next((c for c in available if self._cold(self._stats[c.name], now)
+                           or self.breakers.get(c.name).state == HALF_OPEN), None)
+            if chosen is not None:
+                self._stats[chosen.name].probing = True
+            else:
+                healthy = [c for c in available if self._healthy(self._stats[c.name])]
+                if healthy:
+                    chosen = self._by_policy(healthy)
+                else:
+                    chosen = min(available, key=lambda c: self._stats[c.name].error_rate)
+            # Records and releases also take the router lock, so this cannot fail after available()
+            self.breakers.get(chosen.name).allow()
+            self._requests[chosen.name] += 1
+            return chosen
+
+    def available(self) -> bool:
+        """False while every candidate's circuit breaker is open"""
+        return any(self.breakers.get(c.name).available() for c in self.candidates)
+
+    def route(self) -> RoutedCall:
+        """choose(), as a RoutedCall that records itself"""
+        return RoutedCall(self, self.choose())
+
+    def record(self, name: str, latency: float, ttft: Optional[float] = None, ok: bool = True):
+        """Fold one observed call into the candidate's averages and circuit breaker"""
+        with self._lock:
+            self.breakers.get(name).record(ok, latency)
+            stats = self._stats[name]
+            stats.probing = False
+            stats.last_observed = self.clock()
+            stats.samples += 1
+            stats.error_rate = _ewma(stats.error_rate if stats.samples > 1 else None,
+                                     0.0 if ok else 1.0, self.alpha)
+            if not ok:
+                stats.errors += 1
+                return
+            stats.latency_ms = _ewma(stats.latency_ms, latency * 1000, self.alpha)
+            if ttft is not None:
+                stats.ttft_ms = _ewma(stats.ttft_ms, ttft * 1000, self.alpha)
+
+    def release(self, name: str):
+        """Forget an abandoned call (a pending probe or half-open trial can be retried)"""
+        with self._lock:
+            self.breakers.get(name).release()
+            self._stats[name].probing = False
+
+    def hedge_delay(self, name: str) -> Optional[float]:
+        """Seconds to wait before hedging a call to name (None: do not hedge yet)"""
+        return self.breakers.get(name).hedge_delay()
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'policy': self.policy,
+                'slo_ms': self.slo_ms,
+                'circuit_open_rejections': self._rejected,
+                'models': {
+                    candidate.name: {
+                        'latency_ms': stats.latency_ms,
+                        'ttft_ms': stats.ttft_ms,
+                        'error_rate': stats.error_rate,
+                        'healthy': self._healthy(stats),
+                        'samples': stats.samples,
+                        'errors': stats.errors,
+                        'requests': self._requests[candidate.name],
+                        'cost': candidate.cost,
+                        'circuit': self.breakers.get(candidate.name).status(),
+                    }
+                    for candidate in self.candidates
+                    for stats in (self._stats[candidate.name],)
+                }
+            }
+
+
+def load_router(config_path: Optional[str] = None, default_model: str = '') -> ModelRouter:
+    """ModelRouter from the config file (default: $ETHICAL_MODEL_ROUTER_CONFIG) or the environment"""
+    config_path = config_path or os.getenv(ROUTER_CONFIG_ENV_VAR)
+    if config_path:
+        with open(config_path) as f:
+            config = json.load(f)
+        candidates = []
+        for model in config.get('models', []):
+            api_key = os.getenv(model['api_key_env'], '') if model.get('api_key_env') else model.get('api_key')
+            candidates.append(ModelCandidate(model['name'], model.get('base_url'), api_key,
+                                             model.get('cost'), model.get('weight')))
+        return ModelRouter(candidates, config.get('policy', FASTEST), config.get('slo_ms'),
+                           config.get('alpha', DEFAULT_ALPHA),
+                           config.get('probe_interval', DEFAULT_PROBE_INTERVAL),
+                           config.get('max_error_rate', DEFAULT_MAX_ERROR_RATE),
+                           breakers=CircuitBreakers(**config.get('circuit_breaker', {})))
+    names = [name.strip() for name in os.getenv(MODELS_ENV_VAR, '').split(',') if name.strip()]
+    return ModelRouter([ModelCandidate(name) for name in names or [default_model]])
@@ -0,0 +1,72 @@
+"""
+Normalized view of a request's input text, computed once per request
+Layers that match keywords, tokenize or hash the input read it from here
+instead of lowercasing/stripping/splitting the raw string themselves.
+"""
+import re
+import zlib
+from typing import Iterable, Tuple, Union
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+# Word n-gram orders included in ngram_hashes
+NGRAM_ORDERS = (1, 2)
+
+
+def stable_hash(value: str) -> int:
+    """Process-independent 32-bit hash (str hash() is randomized per process)"""
+    return zlib.crc32(value.encode('utf-8'))
+
+
+class NormalizedText:
+    """
+    Casefolded text, token spans, token set and hashed word n-grams of one input
+    Token spans index into `text` (the casefolded string).
+    """
+    __slots__ = ('raw', 'text', 'is_blank', 'spans', 'tokens', 'token_set', '_ngram_hashes')
+
+    def __init__(self, raw: str):
+        self.raw = raw
+        self.text = raw.casefold()
+        self.is_blank = not self.text.strip()
+        matches = list(_TOKEN_PATTERN.finditer(self.text))
+        self.spans = tuple(match.span() for match in matches)
+        self.tokens = tuple(match.group() for match in matches)
+        self.token_set = frozenset(self.tokens)
+        self._ngram_hashes = None
+
+    @property
+    def ngram_hashes(self) -> Tuple[int, ...]:
+        """stable_hash of every word n-gram (orders in NGRAM_ORDERS), in text order"""
+        if self._ngram_hashes is None:
+            tokens = self.tokens
+            self._ngram_hashes = tuple(
+                stable_hash(' '.join(tokens[start:start + order]))
+                for order in NGRAM_ORDERS
+                for start in range(len(tokens) - order + 1)
+            )
+        return self._ngram_hashes
+
+    def contains(self, keyword: str) -> bool:
+        """Substring match against the casefolded text (keyword must be casefolded)"""
+        return keyword in self.text
+
+    def contains_any(self, keywords: Iterable[str]) -> bool:
+        text = self.text
+        return any(keyword in text for keyword in keywords)
+
+    def __len__(self):
+        return len(self.raw)
+
+    def __str__(self):
+        return self.raw
+
+    def __repr__(self):
+        return f"NormalizedText({self.raw!r})"
+
+
+def normalize(value: Union[str, 'NormalizedText']) -> NormalizedText:
+    """NormalizedText for value; an already normalized value is returned as is"""
+    if isinstance(value, NormalizedText):
+        return value
+    return NormalizedText(value)
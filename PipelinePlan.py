@@ -0,0 +1,348 @@
+"""
+Declarative pipeline specification for IntegratedEthicalProcessor
+The spec lists every layer with the processor callable it runs, the request
+state it reads, and whether it is blocking (may reject the request) or
+advisory (result reported, failures never block). compile_pipeline resolves
+it once against a processor into flat lists of bound callables. Deferred
+layers (the deep path) run like advisory ones, but after the response, on a
+background worker pool.
+
+Operators can override layers per deployment with a JSON file named by the
+ETHICAL_PIPELINE_CONFIG environment variable, e.g.
+    {"adaptive_order": true,
+     "layers": {"bias_detection": {"enabled": false},
+                "ethical_memory": {"timeout": 0.05}}}
+"""
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, List, Optional
+
+from RecordTypes import record_type
+
+BLOCKING = 'blocking'
+ADVISORY = 'advisory'
+DEFERRED = 'deferred'
+
+CONFIG_ENV_VAR = 'ETHICAL_PIPELINE_CONFIG'
+
+# Blocking order is recomputed every REORDER_INTERVAL requests; per-layer cost
+# is a running mean over roughly the last COST_WINDOW calls
+REORDER_INTERVAL = 64
+COST_WINDOW = 100
+
+# Layer fields:
+#   name      layer name (advisory results are reported under it)
+#   call      dotted path from the processor to the callable
+#   requires  processor attribute that must be initialized for the layer to run
+#   inputs    request-state keys passed positionally to the callable ('text' is
+#             the request's NormalizedText, 'input' the raw string)
+#   output    state key the result is stored under (blocking layers)
+#   mode      'blocking', 'advisory' or 'deferred'
+#   reject    processor method (result, state) -> blocked response or None
+#   ran_key   key set True in an advisory layer's reported result
+#   timeout   seconds before the layer is abandoned (None: run inline)
+#   required  True if the layer cannot be disabled by configuration
+# Blocking layers run first (spec order, or an equivalent adaptive order that
+# respects their inputs); advisory layers then run in order and read
+# 'process_state'/'process_data', built from the blocking outputs. Deferred
+# layers read the same state after the response has been returned.
+DEFAULT_PIPELINE_SPEC = [
+    {'name': 'harm_detection', 'call': 'harm_detector.analyze',
+     'inputs': ['text', 'context', 'parameters'], 'output': 'harm_analysis',
+     'mode': BLOCKING, 'reject': 'reject_harmful', 'required': True},
+    {'name': 'instruction_validation', 'call': 'instruction_validator.validate',
+     'inputs': ['text', 'harm_analysis', 'context'], 'output': 'instruction_check',
+     'mode': BLOCKING, 'reject': 'reject_invalid_instruction', 'required': True},
+    {'name': 'system_integrity', 'call': 'integrity_checker.check',
+     'inputs': ['text', 'instruction_check', 'context'], 'output': 'integrity_check',
+     'mode': BLOCKING, 'reject': 'reject_integrity_violation', 'required': True},
+    {'name': 'wellbeing_assessment', 'call': 'assess_wellbeing',
+     'inputs': ['text', 'context'], 'output': 'wellbeing_assessment',
+     'mode': BLOCKING, 'required': True},
+    {'name': 'ethical_context', 'call': '_run_ethical_context', 'requires': 'ethical_context',
+     'ran_key': 'maintained'},
+    {'name': 'core_processor', 'call': '_run_core_processor', 'requires': 'core_processor',
+     'ran_key': 'checked'},
+    {'name': 'distributed_ethics', 'call': '_run_distributed_ethics', 'requires': 'distributed_ethics'},
+    {'name': 'error_recovery', 'call': '_run_error_recovery', 'requires': 'error_recovery'},
+    {'name': 'ethical_security', 'call': '_run_ethical_security', 'requires': 'ethical_security'},
+    {'name': 'realtime_decision', 'call': '_run_realtime_decision', 'requires': 'realtime_decision'},
+    {'name': 'ethical_memory', 'call': '_run_ethical_memory', 'requires': 'ethical_memory'},
+    {'name': 'ethical_learner', 'call': '_run_ethical_learner', 'requires': 'ethical_learner'},
+    {'name': 'realtime_deep_path', 'call': '_run_realtime_deep_path', 'requires': 'realtime_decision',
+     'mode': DEFERRED},
+    {'name': 'wellbeing_modeling', 'call': '_run_wellbeing_modeling', 'requires': 'wellbeing_monitor',
+     'mode': DEFERRED},
+    {'name': 'bias_detection', 'call': '_run_bias_detection', 'requires': 'bias_detector', 'mode': DEFERRED},
+    {'name': 'value_resolver', 'call': '_run_value_resolver', 'requires': 'value_resolver', 'mode': DEFERRED},
+]
+
+# Crisis lane: the blocking checks only, in fixed order. Harm detection is
+# reported but never blocks in crisis mode, and no advisory or deferred layer runs.
+CRISIS_PIPELINE_SPEC = [
+    {'name': 'harm_detection', 'call': 'harm_detector.analyze',
+     'inputs': ['text', 'context', 'parameters'], 'output': 'harm_analysis',
+     'mode': BLOCKING, 'reject': 'crisis_override', 'required': True},
+    {'name': 'instruction_validation', 'call': 'instruction_validator.validate',
+     'inputs': ['text', 'harm_analysis', 'context'], 'output': 'instruction_check',
+     'mode': BLOCKING, 'reject': 'reject_invalid_instruction', 'required': True},
+    {'name': 'system_integrity', 'call': 'integrity_checker.check',
+     'inputs': ['text', 'instruction_check', 'context'], 'output': 'integrity_check',
+     'mode': BLOCKING, 'reject': 'reject_integrity_violation', 'required': True},
+]
+
+# Degraded fast path (ErrorRecoverySystem.FAST_PATH): the default pipeline's
+# checks that can reject a request, with their normal reject hooks.
+FAST_PATH_PIPELINE_SPEC = [entry for entry in DEFAULT_PIPELINE_SPEC if entry.get('reject')]
+
+_LAYER_DEFAULTS = {
+    'requires': None,
+    'inputs': ['process_state', 'process_data'],
+    'output': None,
+    'mode': ADVISORY,
+    'reject': None,
+    'ran_key': 'run',
+    'timeout': None,
+    'required': False,
+}
+
+CompiledLayer = record_type('CompiledLayer', ('name', 'func', 'inputs', 'output', 'mode',
+                                              'reject', 'ran_key', 'timeout'), __name__)
+
+
+class LayerTimeout(TimeoutError):
+    """A layer did not finish within its configured timeout"""
+
+
+_executor = None
+
+
+def _timeout_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='pipeline-layer')
+    return _executor
+
+
+def call_layer(layer, args):
+    """Call a compiled layer, enforcing its timeout if it has one"""
+    if layer.timeout is None:
+        return layer.func(*args)
+    future = _timeout_executor().submit(layer.func, *args)
+    try:
+        return future.result(timeout=layer.timeout)
+    except FutureTimeout:
+        future.cancel()
+        raise LayerTimeout(f"{layer.name} exceeded {layer.timeout}s") from None
+
+
+def load_pipeline_config(path: Optional[str] = None) -> Dict[str, Any]:
+    """Read operator overrides from path (default: $ETHICAL_PIPELINE_CONFIG)"""
+    path = path or os.getenv(CONFIG_ENV_VAR)
+    if not path:
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _resolve(owner: Any, path: str) -> Any:
+    for part in path.split('.'):
+        owner = getattr(owner, part)
+        if owner is None:
+            return None
+    return owner
+
+
+class CompiledPipeline:
+    """
+    Flat lists of bound layer callables, resolved once per processor
+    Blocking layers with no data dependency between them are reordered online
+    by expected cost per rejection (cheap, selective checks first); the
+    response is always the one the spec order would have produced.
+    """
+    def __init__(self, blocking: List, advisory: List, skipped: Dict[str, str],
+                 adaptive_order: bool = True, reorder_interval: int = REORDER_INTERVAL,
+                 deferred: Optional[List] = None):
+        self.blocking = blocking
+        self.advisory = advisory
+        self.deferred = deferred or []
+        self.skipped = skipped
+        self.adaptive_order = adaptive_order
+        self.reorder_interval = reorder_interval
+
+        # Spec-order indices of the blocking layers each one reads from
+        producers = {layer.output: index for index, layer in enumerate(blocking)}
+        self.dependencies = [{producers[key] for key in layer.inputs if key in producers}
+                             for layer in blocking]
+        self.order = list(range(len(blocking)))
+        self._cost = [0.0] * len(blocking)
+        self._calls = [0] * len(blocking)
+        self._rejects = [0] * len(blocking)
+        self._requests = 0
+
+    def layer_names(self) -> List[str]:
+        return [layer.name for layer in self.blocking + self.advisory + self.deferred]
+
+    def _run_check(self, index: int, state: Dict[str, Any], record: bool = True) -> Optional[Dict[str, Any]]:
+        layer = self.blocking[index]
+        start = time.perf_counter()
+        result = call_layer(layer, [state[key] for key in layer.inputs])
+        state[layer.output] = result
+        blocked = layer.reject(result, state) if layer.reject is not None else None
+        elapsed = time.perf_counter() - start
+        if not record:
+            return blocked
+
+        calls = self._calls[index] + 1
+        self._calls[index] = calls
+        self._cost[index] += (elapsed - self._cost[index]) / min(calls, COST_WINDOW)
+        if blocked is not None:
+            self._rejects[index] += 1
+        return blocked
+
+    def run_blocking(self, state: Dict[str, Any], on_cleared: Optional[Callable[[], None]] = None,
+                     record: bool = True) -> Optional[Dict[str, Any]]:
+        """Run blocking layers; returns the blocked response if one rejects
+
+        on_cleared is called once every layer that can reject has passed,
+        before the remaining (non-rejecting) blocking layers run. With record
+        False (startup warm-up) the cost and rejection statistics the adaptive
+        order is computed from are left untouched.
+        """
+        if record:
+            self._requests += 1
+            if self.adaptive_order and self._requests % self.reorder_interval == 0:
+                self.reorder()
+        undecided = sum(1 for layer in self.blocking if layer.reject is not None)
+        if on_cleared is not None and not undecided:
+            on_cleared()
+        ran = set()
+        for index in self.order:
+            blocked = self._run_check(index, state, record)
+            if blocked is not None:
+                # Spec-order semantics: a layer listed earlier that has not run
+                # yet would have decided first, so run those in spec order
+                for earlier in range(index):
+                    if earlier not in ran:
+                        earlier_blocked = self._run_check(earlier, state, record)
+                        if earlier_blocked is not None:
+                            return earlier_blocked
+                return blocked
+            ran.add(index)
+            if self.blocking[index].reject is not None:
+                undecided -= 1
+                if on_cleared is not None and not undecided:
+                    on_cleared()
+        return None
+
+    def reorder(self):
+        """Recompute the blocking order from observed cost and rejection rate
+
+        Greedy topological order: among layers whose inputs are available,
+        run the one with the lowest expected cost per rejection first.
+        Layers without observations keep their spec position.
+        """
+        def cost_per_rejection(index):
+            if not self._calls[index]:
+                return (1, index)
+            reject_rate = (self._rejects[index] + 0.5) / (self._calls[index] + 1)
+            return (0, self._cost[index] / reject_rate, index)
+
+        order, scheduled = [], set()
+        remaining = list(range(len(self.blocking)))
+        while remaining:
+            ready = [index for index in remaining if self.dependencies[index] <= scheduled]
+            choice = min(ready, key=cost_per_rejection)
+            order.append(choice)
+            scheduled.add(choice)
+            remaining.remove(choice)
+        self.order = order
+
+    def blocking_stats(self) -> List[Dict[str, Any]]:
+        """Per blocking layer: position, calls, rejection rate and mean cost"""
+        position = {index: rank for rank, index in enumerate(self.order)}
+        return [{
+            'name': layer.name,
+            'position': position[index],
+            'calls': self._calls[index],
+            'reject_rate': round(self._rejects[index] / self._calls[index], 4) if self._calls[index] else None,
+            'mean_cost_ms': round(self._cost[index] * 1000, 4),
+        } for index, layer in enumerate(self.blocking)]
+
+    def run_advisory(self, state: Dict[str, Any], health=None) -> Dict[str, Any]:
+        """Run advisory layers; failures are reported (and quarantined via health), never raised"""
+        return self._run_reported(self.advisory, state, health)
+
+    def run_deferred(self, state: Dict[str, Any], health=None) -> Dict[str, Any]:
+        """Run deferred (deep path) layers, reported like advisory ones"""
+        return self._run_reported(self.deferred, state, health)
+
+    def _run_reported(self, layers: List, state: Dict[str, Any], health=None) -> Dict[str, Any]:
+        results = {}
+        for layer in layers:
+            if health is not None and not health.is_available(layer.name):
+                continue
+            try:
+                result = call_layer(layer, [state[key] for key in layer.inputs])
+                results[layer.name] = {layer.ran_key: True, **result}
+            except Exception as e:
+                # Reported in this response once, then skipped until a probe passes
+                if health is not None:
+                    health.record_failure(layer.name, e)
+                results[layer.name] = {layer.ran_key: False, 'error': str(e)}
+        return results
+
+
+def compile_pipeline(processor: Any, spec: Optional[List[Dict]] = None,
+                     config: Optional[Dict[str, Any]] = None) -> CompiledPipeline:
+    """Resolve the spec against processor into a CompiledPipeline
+
+    Layers disabled by config, or whose callable is missing (subsystem not
+    initialized), are left out; a required layer that cannot be compiled is
+    an error.
+    """
+    spec = DEFAULT_PIPELINE_SPEC if spec is None else spec
+    overrides = (config or {}).get('layers', {})
+    unknown = set(overrides) - {entry['name'] for entry in spec}
+    if unknown:
+        raise ValueError(f"Pipeline config names unknown layers: {', '.join(sorted(unknown))}")
+
+    blocking, advisory, deferred, skipped = [], [], [], {}
+    produced = {'input', 'text', 'context', 'parameters'}
+    for entry in spec:
+        layer = dict(_LAYER_DEFAULTS, **entry)
+        layer.update(overrides.get(layer['name'], {}))
+        name = layer['name']
+        if layer['mode'] not in (BLOCKING, ADVISORY, DEFERRED):
+            raise ValueError(f"Layer {name} has unknown mode {layer['mode']!r}")
+
+        if not layer.get('enabled', True):
+            if layer['required']:
+                raise ValueError(f"Layer {name} is required and cannot be disabled")
+            skipped[name] = 'disabled'
+            continue
+        available = layer['requires'] is None or _resolve(processor, layer['requires']) is not None
+        func = _resolve(processor, layer['call']) if available else None
+        if func is None:
+            if layer['required']:
+                raise ValueError(f"Layer {name} is required but {layer['call']} is unavailable")
+            skipped[name] = 'unavailable'
+            continue
+
+        if layer['mode'] == BLOCKING:
+            missing = [key for key in layer['inputs'] if key not in produced]
+            if missing:
+                raise ValueError(f"Layer {name} reads {', '.join(missing)} before it is produced")
+            produced.add(layer['output'])
+            reject = getattr(processor, layer['reject']) if layer['reject'] else None
+            blocking.append(CompiledLayer(name, func, tuple(layer['inputs']), layer['output'],
+                                          BLOCKING, reject, None, layer['timeout']))
+        else:
+            reported = advisory if layer['mode'] == ADVISORY else deferred
+            reported.append(CompiledLayer(name, func, tuple(layer['inputs']), None, layer['mode'],
+                                          None, layer['ran_key'], layer['timeout']))
+    return CompiledPipeline(blocking, advisory, skipped,
+                            adaptive_order=(config or {}).get('adaptive_order', True),
+                            deferred=deferred)
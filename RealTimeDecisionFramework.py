@@ -1,8 +1,14 @@
-class QuickAssessment:
-    """Stub for quick assessment return type."""
-    def __init__(self, **kwargs):
-        for k, v in kwargs.items():
-            setattr(self, k, v)
+from RecordTypes import record_type
+
+# Result records
+QuickAssessment = record_type('QuickAssessment', ('critical_checks', 'performance_targets'), __name__)
+
+# Emergency decision budgets, in milliseconds (the crisis request lane's SLO)
+EMERGENCY_TIMING_CONSTRAINTS = {
+    'decision_time': 1,
+    'execution_time': 5,
+    'validation_time': 1
+}
 
 class RealTimeDecisionFramework:
     """
@@ -150,11 +156,7 @@ class EmergencyHandler:
                 'execution_plan': self.plan_execution(situation),
                 'validation': self.validate_action(situation)
             },
-            timing_constraints={
-                'decision_time': 1,  # ms
-                'execution_time': 5,  # ms
-                'validation_time': 1  # ms
-            }
+            timing_constraints=dict(EMERGENCY_TIMING_CONSTRAINTS)
         )
 
 class DecisionCoordinator:
@@ -0,0 +1,25 @@
+"""
+Shared factory for compact result record types
+Subsystems return small fixed-shape results on every call; record_type builds
+one slotted, immutable class per result kind so construction is a single call
+with no per-instance __dict__.
+"""
+from collections import namedtuple
+from functools import lru_cache
+from typing import Iterable, Optional
+
+
+def record_type(name: str, fields: Iterable[str], module: Optional[str] = None) -> type:
+    """Return the record class for name/fields, creating it on first request
+
+    Every field defaults to None. The same (name, fields, module) always gives
+    back the same class, so modules defining the same result kind share it.
+    """
+    if isinstance(fields, str):
+        fields = fields.replace(',', ' ').split()
+    return _record_type(name, tuple(fields), module)
+
+
+@lru_cache(maxsize=None)
+def _record_type(name, fields, module):
+    return namedtuple(name, fields, defaults=(None,) * len(fields), module=module)
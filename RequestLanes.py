@@ -0,0 +1,211 @@
+"""
+Request lanes with reserved capacity
+Crisis-mode requests are admitted through their own lane: a few worker slots
+that normal traffic can never take. A normal request holds its slot until it
+has been answered, so a saturated normal lane queues (and after its queue
+timeout sheds) its own requests without delaying a crisis request, and the
+number of normal requests competing with it for the interpreter is capped at
+the lane's size. crisis_mode is client-supplied, so the crisis lane is bounded
+too: a crisis request holds its slot only until the ethical decision (not
+through the upstream call), and waits at most the crisis queue timeout.
+
+Each lane keeps a window of recent decision latencies for its SLO: from arrival
+(queue wait included) to the ethical decision, marked with ticket.decided().
+The crisis lane's budget is EmergencyHandler's execution budget.
+
+Lane sizes can be set with ETHICAL_NORMAL_WORKERS, ETHICAL_CRISIS_WORKERS,
+ETHICAL_NORMAL_QUEUE_TIMEOUT and ETHICAL_CRISIS_QUEUE_TIMEOUT (seconds).
+"""
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from RealTimeDecisionFramework import EMERGENCY_TIMING_CONSTRAINTS
+
+CRISIS = 'crisis'
+NORMAL = 'normal'
+
+NORMAL_WORKERS_ENV_VAR = 'ETHICAL_NORMAL_WORKERS'
+CRISIS_WORKERS_ENV_VAR = 'ETHICAL_CRISIS_WORKERS'
+NORMAL_QUEUE_TIMEOUT_ENV_VAR = 'ETHICAL_NORMAL_QUEUE_TIMEOUT'
+CRISIS_QUEUE_TIMEOUT_ENV_VAR = 'ETHICAL_CRISIS_QUEUE_TIMEOUT'
+
+DEFAULT_NORMAL_WORKERS = 16
+DEFAULT_CRISIS_WORKERS = 8
+DEFAULT_NORMAL_QUEUE_TIMEOUT = 10.0
+# Crisis slots are held for the checks only (milliseconds), so a longer wait means the lane is flooded
+DEFAULT_CRISIS_QUEUE_TIMEOUT = 1.0
+CRISIS_BUDGET_MS = float(EMERGENCY_TIMING_CONSTRAINTS['execution_time'])
+# Latencies kept per lane for its percentiles
+DEFAULT_WINDOW = 1000
+
+
+class LaneSaturated(RuntimeError):
+    """No worker slot in the lane freed up within its queue timeout"""
+
+
+def _percentile(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+class LaneTicket:
+    """One admitted request; decided() marks the end of its SLO measurement"""
+    __slots__ = ('start', 'admitted', 'decided_at', '_on_decided')
+
+    def __init__(self, start: float, admitted: float, on_decided=None):
+        self.start = start
+        self.admitted = admitted
+        self.decided_at = None
+        self._on_decided = on_decided
+
+    def decided(self):
+        if self.decided_at is None:
+            self.decided_at = time.perf_counter()
+            if self._on_decided is not None:
+                self._on_decided(self)
+
+
+class Lane:
+    """
+    A fixed number of worker slots plus the lane's latency window
+    queue_timeout None waits for a slot indefinitely. With release_on_decision
+    the slot is freed at ticket.decided() rather than at the end of the block.
+    """
+    def __init__(self, name: str, workers: int, queue_timeout: Optional[float] = None,
+                 budget_ms: Optional[float] = None, window: int = DEFAULT_WINDOW,
+                 release_on_decision: bool = False):
+        if workers < 1:
+            raise ValueError(f"Lane {name} needs at least one worker")
+        self.name = name
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self.budget_ms = budget_ms
+        self.release_on_decision = release_on_decision
+        self._slots = threading.BoundedSemaphore(workers)
+        self._latencies = deque(maxlen=window)
+        self._waits = deque(maxlen=window)
+        # Latencies since the last recent_p95() (the degradation monitor's tick)
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.over_budget = 0
+
+    @contextmanager
+    def admit(self) -> Iterator[LaneTicket]:
+        """Hold one of the lane's slots for the duration of the block (or until ticket.decided())
+
+        Latency is recorded up to ticket.decided(), or to the end of the block.
+        """
+        start = time.perf_counter()
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.waiting += 1
+            acquired = self._slots.acquire(timeout=self.queue_timeout)
+            with self._lock:
+                self.waiting -= 1
+                if not acquired:
+                    self.rejected += 1
+            if not acquired:
+                raise LaneSaturated(f"{self.name} lane saturated ({self.workers} workers)")
+        on_decided = self._finish if self.release_on_decision else None
+        ticket = LaneTicket(start, time.perf_counter(), on_decided)
+        with self._lock:
+            self.in_flight += 1
+        try:
+            yield ticket
+        finally:
+            # Finishes the ticket here unless decided() already has
+            ticket.decided()
+            if on_decided is None:
+                self._finish(ticket)
+
+    def _finish(self, ticket: LaneTicket):
+        self._slots.release()
+        self._record(ticket.admitted - ticket.start, ticket.decided_at - ticket.start)
+
+    def _record(self, wait: float, latency: float):
+        latency_ms = latency * 1000
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+            self._waits.append(wait * 1000)
+            self._latencies.append(latency_ms)
+            self._recent.append(latency_ms)
+            if self.budget_ms is not None and latency_ms > self.budget_ms:
+                self.over_budget += 1
+
+    def recent_p95(self) -> float:
+        """p95 decision latency (ms) of requests recorded since the previous call (0.0 if none)"""
+        with self._lock:
+            recent = sorted(self._recent)
+            self._recent.clear()
+        return _percentile(recent, 0.95)
+
+    def slo(self) -> Dict[str, Any]:
+        """Lane counters and decision latency percentiles (ms) over the recent window"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            waits = sorted(self._waits)
+            status = {
+                'workers': self.workers,
+                'waiting': self.waiting,
+                'in_flight': self.in_flight,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'budget_ms': self.budget_ms,
+                'over_budget': self.over_budget,
+            }
+        status['latency_ms'] = {'p50': _percentile(latencies, 0.50), 'p95': _percentile(latencies, 0.95),
+                                'p99': _percentile(latencies, 0.99), 'max': latencies[-1] if latencies else 0.0}
+        status['queue_wait_ms'] = {'p50': _percentile(waits, 0.50), 'p99': _percentile(waits, 0.99)}
+        if self.budget_ms is not None:
+            within = sum(1 for latency in latencies if latency <= self.budget_ms)
+            status['within_budget'] = within / len(latencies) if latencies else 1.0
+            status['meets_budget'] = status['latency_ms']['p99'] <= self.budget_ms
+        return status
+
+
+class RequestLanes:
+    """
+    The crisis and normal lanes
+    Requests with parameters['crisis_mode'] go to the crisis lane, whose slots
+    are held until the ethical decision only.
+    """
+    def __init__(self, normal_workers: int = DEFAULT_NORMAL_WORKERS,
+                 crisis_workers: int = DEFAULT_CRISIS_WORKERS,
+                 normal_queue_timeout: Optional[float] = DEFAULT_NORMAL_QUEUE_TIMEOUT,
+                 crisis_budget_ms: float = CRISIS_BUDGET_MS, window: int = DEFAULT_WINDOW,
+                 crisis_queue_timeout: Optional[float] = DEFAULT_CRISIS_QUEUE_TIMEOUT):
+        self.lanes = {
+            CRISIS: Lane(CRISIS, crisis_workers, crisis_queue_timeout, crisis_budget_ms, window,
+                         release_on_decision=True),
+            NORMAL: Lane(NORMAL, normal_workers, normal_queue_timeout, None, window),
+        }
+
+    @classmethod
+    def from_env(cls) -> 'RequestLanes':
+        return cls(normal_workers=int(os.getenv(NORMAL_WORKERS_ENV_VAR, DEFAULT_NORMAL_WORKERS)),
+                   crisis_workers=int(os.getenv(CRISIS_WORKERS_ENV_VAR, DEFAULT_CRISIS_WORKERS)),
+                   normal_queue_timeout=float(os.getenv(NORMAL_QUEUE_TIMEOUT_ENV_VAR,
+                                                        DEFAULT_NORMAL_QUEUE_TIMEOUT)),
+                   crisis_queue_timeout=float(os.getenv(CRISIS_QUEUE_TIMEOUT_ENV_VAR,
+                                                        DEFAULT_CRISIS_QUEUE_TIMEOUT)))
+
+    @staticmethod
+    def classify(parameters: Optional[Dict] = None) -> str:
+        return CRISIS if parameters and parameters.get('crisis_mode') else NORMAL
+
+    def admit(self, lane: str):
+        """Context manager holding a slot in lane (yields its LaneTicket); raises LaneSaturated on queue timeout"""
+        return self.lanes[lane].admit()
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {name: lane.slo() for name, lane in self.lanes.items()}
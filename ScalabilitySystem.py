@@ -1,3 +1,179 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from CapacitySimulation import BURSTY, Workload, required_workers
+from RecordTypes import record_type
+
+CONCURRENCY_LIMIT_ENV_VAR = 'ETHICAL_CONCURRENCY_LIMIT'
+MIN_CONCURRENCY_ENV_VAR = 'ETHICAL_MIN_CONCURRENCY'
+MAX_CONCURRENCY_ENV_VAR = 'ETHICAL_MAX_CONCURRENCY'
+
+DEFAULT_INITIAL_LIMIT = 16
+DEFAULT_MIN_LIMIT = 2
+DEFAULT_MAX_LIMIT = 64
+# Latency over service time tolerated before the limit shrinks (1.5: queueing up to half the service time)
+DEFAULT_TOLERANCE = 1.5
+# Share of each new limit estimate folded into the limit
+DEFAULT_SMOOTHING = 0.2
+# Samples in the latency and service time moving averages
+DEFAULT_WINDOW = 20
+# Limit multiplier after a dropped request (rejected downstream or failed)
+DEFAULT_BACKOFF_RATIO = 0.9
+
+# Capacity model defaults: p99 latency target (seconds), growth horizon and burst peak
+DEFAULT_P99_TARGET = 2.0
+DEFAULT_GROWTH_PERIODS = 4
+DEFAULT_BURST_FACTOR = 3.0
+
+CapacityModel = record_type('CapacityModel', 'modeling_components')
+
+# Startup warm-up: the capture of user traffic replayed (JSONL, one request per
+# line; no default, so without one there is no warm-up), how many of its most
+# frequent prompts, and how many recent lines they are drawn from
+WARMUP_ENV_VAR = 'ETHICAL_WARMUP'
+WARMUP_CAPTURE_ENV_VAR = 'ETHICAL_WARMUP_CAPTURE'
+WARMUP_PROMPTS_ENV_VAR = 'ETHICAL_WARMUP_PROMPTS'
+DEFAULT_WARMUP_PROMPTS = 64
+DEFAULT_WARMUP_RECENT = 1000
+# Record fields tried, in order, for a captured request's prompt
+CAPTURE_FIELDS = ('message', 'prompt', 'input')
+
+# Pipelines are warmed with the first replayed prompt harm analysis clears (or this one)
+WARMUP_SAMPLE = "What is a balanced breakfast?"
+
+WarmupReport = record_type('WarmupReport', 'prompts lexicons layers seconds errors')
+
+
+class ConcurrencyLimitExceeded(RuntimeError):
+    """The request would exceed the adaptive concurrency limit"""
+
+
+class LimiterSample:
+    """One admitted request; the caller sets queue_wait (seconds spent queued after admission)"""
+    __slots__ = ('start', 'queue_wait')
+
+    def __init__(self, start: float):
+        self.start = start
+        self.queue_wait = 0.0
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Gradient concurrency limit (after Netflix's concurrency-limits)
+    Each finished request is a sample of its latency and of its service time
+    (latency minus the time it queued after admission). While the latency
+    average stays within tolerance x the service time average the limit grows
+    (toward limit + sqrt(limit)); as queueing drives latency up, the
+    gradient (tolerance x service / latency, 0.5 to 1) shrinks it. Comparing
+    against measured service time rather than a minimum or long-term latency
+    keeps the limit from drifting when service times vary or the upstream
+    slows down. A dropped request cuts the limit by backoff_ratio. Requests
+    over the limit are rejected at once instead of queueing.
+    """
+    def __init__(self, initial_limit: int = DEFAULT_INITIAL_LIMIT, min_limit: int = DEFAULT_MIN_LIMIT,
+                 max_limit: int = DEFAULT_MAX_LIMIT, tolerance: float = DEFAULT_TOLERANCE,
+                 smoothing: float = DEFAULT_SMOOTHING, window: int = DEFAULT_WINDOW,
+                 backoff_ratio: float = DEFAULT_BACKOFF_RATIO, clock: Callable[[], float] = time.perf_counter):
+        # The limit never drops below min_limit, so at least one request is always admitted
+        if min_limit < 1:
+            raise ValueError(f"Minimum concurrency limit must be at least 1, got {min_limit}")
+        if not min_limit <= initial_limit <= max_limit:
+            raise ValueError(f"Concurrency limits out of order: {min_limit} <= {initial_limit} <= {max_limit}")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.alpha = 2.0 / (window + 1)
+        self.backoff_ratio = backoff_ratio
+        self.clock = clock
+        self.limit = float(initial_limit)
+        self.latency = None
+        self.service_time = None
+        self.in_flight = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'AdaptiveConcurrencyLimiter':
+        return cls(initial_limit=int(os.getenv(CONCURRENCY_LIMIT_ENV_VAR, DEFAULT_INITIAL_LIMIT)),
+                   min_limit=int(os.getenv(MIN_CONCURRENCY_ENV_VAR, DEFAULT_MIN_LIMIT)),
+                   max_limit=int(os.getenv(MAX_CONCURRENCY_ENV_VAR, DEFAULT_MAX_LIMIT)))
+
+    def try_acquire(self) -> bool:
+        """Take an in-flight slot if under the limit (False: reject the request)"""
+        with self._lock:
+            if self.in_flight >= int(self.limit):
+                self.rejected += 1
+                return False
+            self.in_flight += 1
+            self.accepted += 1
+            return True
+
+    def release(self, latency: float, queue_wait: float = 0.0, dropped: bool = False):
+        """Return a slot, folding in the request's latency and queue wait (seconds)"""
+        with self._lock:
+            in_flight = self.in_flight
+            self.in_flight -= 1
+            if dropped:
+                self.dropped += 1
+                self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+            else:
+                self._update(latency, latency - queue_wait, in_flight)
+
+    @contextmanager
+    def admit(self) -> Iterator[LimiterSample]:
+        """Hold an in-flight slot for the block (raises ConcurrencyLimitExceeded when over the limit)
+
+        The block's duration is the latency sample; it counts as dropped if the block raises.
+        """
+        if not self.try_acquire():
+            raise ConcurrencyLimitExceeded(f"Concurrency limit reached ({int(self.limit)} in flight)")
+        sample = LimiterSample(self.clock())
+        dropped = True
+        try:
+            yield sample
+            dropped = False
+        finally:
+            self.release(self.clock() - sample.start, sample.queue_wait, dropped)
+
+    def _update(self, latency: float, service_time: float, in_flight: int):
+        if self.latency is None:
+            self.latency, self.service_time = latency, service_time
+        else:
+            self.latency += self.alpha * (latency - self.latency)
+            self.service_time += self.alpha * (service_time - self.service_time)
+        # Too few requests in flight to say anything about the limit
+        if in_flight < self.limit / 2:
+            return
+        gradient = max(0.5, min(1.0, self.tolerance * self.service_time / max(self.latency, 1e-9)))
+        estimate = self.limit * gradient + max(1.0, math.sqrt(self.limit))
+        self.limit = min(self.max_limit, max(self.min_limit,
+                                             self.limit * (1 - self.smoothing) + estimate * self.smoothing))
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'limit': int(self.limit),
+                'in_flight': self.in_flight,
+                'utilization': round(self.in_flight / int(self.limit), 3),
+                'accepted': self.accepted,
+                'rejected': self.rejected,
+                'dropped': self.dropped,
+                'latency_ms': self.latency * 1000 if self.latency is not None else None,
+                'service_time_ms': self.service_time * 1000 if self.service_time is not None else None,
+                'min_limit': self.min_limit,
+                'max_limit': self.max_limit,
+            }
+
+
 class ScalabilitySystem:
     """
     System for managing ethical AI scalability across dimensions
@@ -12,7 +188,11 @@ class ScalabilitySystem:
 class ResourceManager:
     """
     Manages system resources for ethical processing
+    Request concurrency is governed by the adaptive concurrency limiter.
     """
+    def __init__(self, concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None):
+        self.concurrency_limiter = concurrency_limiter or AdaptiveConcurrencyLimiter.from_env()
+
     def manage_resources(self, system_load):
         return ResourceManagement(
             allocation=self.allocate_resources(system_load),
@@ -29,8 +209,8 @@ class ResourceManager:
             allocation_strategy={
                 'compute_resources': {
                     'allocation': self.allocate_compute(load),
-                    'threshold': 0.80,  # 80% utilization threshold
-                    'scaling_factor': 1.5,
+                    # Measured: the adaptive concurrency limit and its utilization
+                    'concurrency': self.concurrency_limiter.status(),
                     'priority_levels': ['critical', 'high', 'normal']
                 },
                 'memory_resources': {
@@ -82,9 +262,119 @@ class PerformanceOptimizer:
             }
         )
 
+    def implement_prefetching(self):
+        """Startup warm-up settings (see warm_up)"""
+        return {
+            'enabled': warmup_enabled(),
+            'capture': warmup_capture(),
+            'prompts': int(os.getenv(WARMUP_PROMPTS_ENV_VAR, DEFAULT_WARMUP_PROMPTS)),
+            'recent': DEFAULT_WARMUP_RECENT
+        }
+
+    def warm_up(self, processor, prompts: List[str]) -> WarmupReport:
+        """
+        Make an IntegratedEthicalProcessor's first requests as fast as later ones
+        Loads (publishing if needed) the compiled lexicons, replays the prompts
+        through harm analysis and the output filter, filling the lexicons' token
+        caches, and runs every pipeline once: the full pipeline, the degraded
+        fast path and the crisis lane. These runs queue no deep analysis and
+        are not counted in the blocking layers' reorder statistics. Failures
+        are reported, never raised; the upstream is not called. The report
+        lists the layers that ran (quarantined subsystems do not).
+        """
+        start = time.perf_counter()
+        errors = {}
+        layers = []
+
+        def attempt(name, func):
+            try:
+                return func()
+            except Exception as e:
+                errors[name] = f"{type(e).__name__}: {e}"
+                print(f"Warning: warm-up step {name} failed: {errors[name]}")
+                return None
+
+        stores = {'harm': processor.harm_detector.lexicon_store,
+                  'output_safety': processor.output_safety.lexicon_store}
+        for name, store in stores.items():
+            attempt(f'lexicon:{name}', store.reload)
+        sample = None
+        for prompt in prompts:
+            # Without parameters: analyze() would keep a request's harm_sensitivity
+            analysis = attempt('harm_analysis', lambda: processor.harm_detector.analyze(prompt, []))
+            if sample is None and analysis is not None and not analysis.has_harmful_intent:
+                sample = prompt
+            attempt('output_safety', lambda: processor.output_safety.filter(prompt, []))
+
+        available = processor.subsystem_health.is_available
+        for name, run, pipeline in (('full', processor.process_input, processor.pipeline),
+                                    ('fast_path', processor.process_fast, processor.fast_pipeline),
+                                    ('crisis', processor.process_crisis, processor.crisis_pipeline)):
+            result = attempt(f'pipeline:{name}', lambda: run(sample or WARMUP_SAMPLE, [], {}, warmup=True))
+            if result is None:
+                continue
+            ran = [layer.name for layer in pipeline.blocking]
+            if not result['processing_metadata'].get('blocked'):
+                ran += [layer.name for layer in pipeline.advisory if available(layer.name)]
+            layers.extend(layer for layer in ran if layer not in layers)
+        lexicons = {}
+        for name, store in stores.items():
+            if f'lexicon:{name}' not in errors:
+                info = store.current().info()
+                lexicons[name] = {'version': info['version'], 'cached_tokens': info['cached_tokens']}
+        return WarmupReport(prompts=len(prompts), lexicons=lexicons, layers=layers,
+                            seconds=round(time.perf_counter() - start, 3), errors=errors)
+
+
+def warmup_capture() -> Optional[str]:
+    """Capture file named by ETHICAL_WARMUP_CAPTURE, or None"""
+    return os.getenv(WARMUP_CAPTURE_ENV_VAR) or None
+
+
+def warmup_enabled() -> bool:
+    """Whether to warm up at startup: a capture is configured and ETHICAL_WARMUP is not off"""
+    return (warmup_capture() is not None
+            and os.getenv(WARMUP_ENV_VAR, '1').lower() not in ('0', 'false', 'no'))
+
+
+def frequent_prompts(path: Optional[str] = None, limit: Optional[int] = None,
+                     recent: int = DEFAULT_WARMUP_RECENT) -> List[str]:
+    """
+    The most frequent prompts among the last `recent` records of a capture file
+    Records are JSON lines: a string, or an object with a prompt field
+    (CAPTURE_FIELDS). Ties go to the most recently seen prompt; no capture
+    (path or ETHICAL_WARMUP_CAPTURE) or a missing file gives no prompts.
+    """
+    path = path or warmup_capture()
+    limit = limit if limit is not None else int(os.getenv(WARMUP_PROMPTS_ENV_VAR, DEFAULT_WARMUP_PROMPTS))
+    if path is None or not os.path.exists(path):
+        return []
+    lines = deque(maxlen=recent)
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                lines.append(line)
+    counts = Counter()
+    last_seen = {}
+    for index, line in enumerate(lines):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(record, dict):
+            record = next((record[field] for field in CAPTURE_FIELDS
+                           if isinstance(record.get(field), str) and record[field].strip()), None)
+        if isinstance(record, str) and record.strip():
+            counts[record] += 1
+            last_seen[record] = index
+    ranked = sorted(counts, key=lambda prompt: (-counts[prompt], -last_seen[prompt]))
+    return ranked[:limit]
+
 class CapacityPlanner:
     """
     Plans and manages system capacity
+    Capacity is modelled by simulating the normal lane against a workload
+    fitted from recorded stage service times (CapacitySimulation).
     """
     def plan_capacity(self, growth_projections):
         return CapacityPlanning(
@@ -97,23 +387,38 @@ class CapacityPlanner:
     def model_capacity(self, projections):
         """
         Models system capacity requirements
+        projections: 'workload' (CapacitySimulation.Workload at today's rate),
+        'p99_seconds' (latency target), optionally 'upstream_concurrency' and
+        'queue_timeout', and the growth assumptions 'growth_rate' (fraction
+        per period), 'periods' and 'burst_factor' (peak over mean rate).
+        Each requirement is the fewest workers that meet the target at that
+        rate (None: no worker count does).
         """
+        workload = projections['workload']
+        growth = projections.get('growth_rate', 0.0)
+        periods = projections.get('periods', DEFAULT_GROWTH_PERIODS)
+        burst_factor = projections.get('burst_factor', DEFAULT_BURST_FACTOR)
+
+        def requirement(scenario):
+            result = required_workers(scenario, projections.get('p99_seconds', DEFAULT_P99_TARGET),
+                                      projections.get('upstream_concurrency'), projections.get('queue_timeout'))
+            return {'rate': scenario.rate, 'workers': result.workers if result else None,
+                    'p99_seconds': result.p99 if result else None}
+
+        bursty = Workload(workload.rate, workload.stages, workload.blocked_fraction, BURSTY)
         return CapacityModel(
             modeling_components={
-                'workload_analysis': {
-                    'historical': self.analyze_historical_workload(),
-                    'patterns': self.identify_workload_patterns(),
-                    'prediction': self.predict_future_workload()
-                },
-                'resource_requirements': {
-                    'computation': self.estimate_compute_needs(),
-                    'storage': self.estimate_storage_needs(),
-                    'network': self.estimate_network_needs()
-                },
+                'workload_analysis': workload.describe(),
+                'resource_requirements': requirement(workload),
                 'growth_scenarios': {
-                    'linear_growth': self.model_linear_growth(),
-                    'exponential_growth': self.model_exponential_growth(),
-                    'burst_scenarios': self.model_burst_scenarios()
+                    'linear_growth': [requirement(workload.with_rate(workload.rate * (1 + growth * period)))
+                                      for period in range(1, periods + 1)],
+                    'exponential_growth': [requirement(workload.with_rate(workload.rate * (1 + growth) ** period))
+                                           for period in range(1, periods + 1)],
+                    'burst_scenarios': {
+                        'peak_rate': requirement(workload.with_rate(workload.rate * burst_factor)),
+                        'bursty_arrivals': requirement(bursty)
+                    }
                 }
             }
         )
@@ -0,0 +1,90 @@
+"""
+Speculative upstream completion
+The upstream completion is started as soon as the checks that can block a
+request have passed, so it runs concurrently with the remaining wellbeing and
+advisory processing instead of after it. If the request ends up blocked the
+speculative call is cancelled and its result discarded.
+
+Opt-in per request with parameters['speculative_upstream'], or for every
+request with ETHICAL_SPECULATIVE_UPSTREAM=1.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+SPECULATIVE_ENV_VAR = 'ETHICAL_SPECULATIVE_UPSTREAM'
+SPECULATIVE_PARAMETER = 'speculative_upstream'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_stats = {'started': 0, 'used': 0, 'cancelled': 0}
+
+
+def speculation_enabled(parameters: Optional[Dict] = None) -> bool:
+    """True if the request opted in (the parameter overrides the environment default)"""
+    if parameters and SPECULATIVE_PARAMETER in parameters:
+        return bool(parameters[SPECULATIVE_PARAMETER])
+    return os.getenv(SPECULATIVE_ENV_VAR, '').lower() in ('1', 'true', 'yes')
+
+
+def _speculation_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='speculative-upstream')
+    return _executor
+
+
+def _count(key: str):
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def speculation_stats() -> Dict[str, int]:
+    with _stats_lock:
+        return dict(_stats)
+
+
+class SpeculativeCall:
+    """
+    One request's speculative upstream call
+    call(cancelled) does the upstream work; it should check the cancelled
+    event while streaming and stop early once it is set.
+    """
+    def __init__(self, call: Callable[[threading.Event], Any]):
+        self.call = call
+        self.cancelled = threading.Event()
+        self._future = None
+        self._lock = threading.Lock()
+
+    @property
+    def started(self) -> bool:
+        return self._future is not None
+
+    def start(self):
+        """Start the call in the background (idempotent; no-op after cancel)"""
+        with self._lock:
+            if self._future is not None or self.cancelled.is_set():
+                return
+            self._future = _speculation_executor().submit(self.call, self.cancelled)
+        _count('started')
+
+    def cancel(self):
+        """Discard the call: not started yet, or stop it mid-stream"""
+        with self._lock:
+            self.cancelled.set()
+            future = self._future
+        if future is not None:
+            future.cancel()
+            _count('cancelled')
+
+    def result(self, timeout: Optional[float] = None) -> Any:
+        """Wait for the speculative result (re-raises the call's exception)"""
+        if self._future is None:
+            raise RuntimeError("speculative call was never started")
+        _count('used')
+        return self._future.result(timeout)
@@ -0,0 +1,152 @@
+"""
+Streaming output safety filter
+Consumes model output chunk by chunk and scans it with the compiled pattern
+automaton of the output safety lexicon. The automaton state carries over
+between chunks, so only a lookback of (longest pattern - 1) characters is held
+back to be able to rewrite a match that spans a chunk boundary; memory stays
+constant however long the output is.
+
+Patterns in 'output_block' truncate the output at the match; patterns in
+'output_redact' are replaced, through the end of the token they start.
+"""
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from CompiledLexicon import CompiledLexicon
+
+BLOCK_CATEGORY = 'output_block'
+REDACT_CATEGORY = 'output_redact'
+
+REDACTION = '[redacted]'
+BLOCK_NOTICE = "\n\n[Response truncated by the output safety filter.]"
+
+# Characters that end a redacted token
+_TOKEN_STOP = frozenset(' \t\r\n"\'`<>()[]{},;')
+
+
+def _fold(chunk: str) -> Tuple[bytes, Optional[List[int]]]:
+    """Casefolded UTF-8 bytes of chunk, and each byte's character index (None: one byte per char)"""
+    if chunk.isascii():
+        return chunk.lower().encode('ascii'), None
+    pieces, char_of_byte = [], []
+    for index, char in enumerate(chunk):
+        folded = char.casefold().encode('utf-8')
+        pieces.append(folded)
+        char_of_byte.extend([index] * len(folded))
+    return b''.join(pieces), char_of_byte
+
+
+class StreamingOutputFilter:
+    """
+    Incremental filter over one response
+    feed() returns the text that is safe to emit so far; close() returns the
+    held-back tail. After a block match the filter is stopped and emits nothing.
+    """
+    def __init__(self, lexicon: CompiledLexicon, redaction: str = REDACTION,
+                 block_notice: str = BLOCK_NOTICE):
+        self.lexicon = lexicon
+        self.redaction = redaction
+        self.block_notice = block_notice
+        self._block_bit = lexicon.bit(BLOCK_CATEGORY)
+        self._redact_bit = lexicon.bit(REDACT_CATEGORY)
+        self._keywords = {bit: sorted(lexicon.keywords(category), key=len, reverse=True)
+                          for bit, category in ((self._block_bit, BLOCK_CATEGORY),
+                                                (self._redact_bit, REDACT_CATEGORY))}
+        # A match is at most as many raw characters as its casefolded pattern
+        self.lookback = max((len(keyword) for keywords in self._keywords.values() for keyword in keywords),
+                            default=1) - 1
+
+        self._state = 0
+        self._pending = ''
+        self._redacting = False
+        self.stopped = False
+        self.redactions = 0
+        self.chars_in = 0
+        self.chars_out = 0
+
+    def _match_start(self, text: str, end: int, bit: int) -> Optional[int]:
+        """Start in text of the longest pattern in category bit ending at end"""
+        for keyword in self._keywords[bit]:
+            for start in range(end - 1, max(end - len(keyword), 0) - 1, -1):
+                folded = text[start:end].casefold()
+                if folded == keyword:
+                    return start
+                if len(folded) >= len(keyword):
+                    break
+        return None
+
+    def _emit(self, pieces: List[str]) -> str:
+        output = ''.join(pieces)
+        self.chars_out += len(output)
+        return output
+
+    def feed(self, chunk: str) -> str:
+        """Scan the next chunk; returns the output that can be emitted now"""
+        if self.stopped or not chunk:
+            return ''
+        self.chars_in += len(chunk)
+        if self._redacting:
+            # Still inside a redacted token: drop it up to its end
+            for index, char in enumerate(chunk):
+                if char in _TOKEN_STOP:
+                    chunk = chunk[index:]
+                    self._redacting = False
+                    break
+            else:
+                return ''
+
+        data, char_of_byte = _fold(chunk)
+        self._state, hits = self.lexicon.scan(data, self._state, self._block_bit | self._redact_bit)
+        text = self._pending + chunk
+        base = len(self._pending)
+        pieces = []
+        cursor = 0  # text before cursor has been decided (emitted or redacted)
+        for byte_index, mask in hits:
+            end = base + (byte_index if char_of_byte is None else char_of_byte[byte_index]) + 1
+            bit = self._block_bit if mask & self._block_bit else self._redact_bit
+            start = self._match_start(text, end, bit) if end > cursor else None
+            if start is None or start < cursor:
+                continue  # overlaps text already emitted or redacted
+            pieces.append(text[cursor:start])
+            if bit == self._block_bit:
+                pieces.append(self.block_notice)
+                self.stopped = True
+                self._pending = ''
+                return self._emit(pieces)
+            stop = end
+            while stop < len(text) and text[stop] not in _TOKEN_STOP:
+                stop += 1
+            pieces.append(self.redaction)
+            self.redactions += 1
+            cursor = stop
+            if stop == len(text):
+                self._redacting = True
+
+        if self._redacting:
+            self._pending = ''
+            self._state = 0
+            return self._emit(pieces)
+        # Hold back the lookback; a match ending in the next chunk may start in it
+        hold_from = max(cursor, len(text) - self.lookback)
+        pieces.append(text[cursor:hold_from])
+        self._pending = text[hold_from:]
+        return self._emit(pieces)
+
+    def close(self) -> str:
+        """End of output: release the held-back tail"""
+        tail, self._pending = self._pending, ''
+        if self.stopped:
+            return ''
+        return self._emit([tail])
+
+
+def filter_chunks(output_filter: StreamingOutputFilter, chunks: Iterable[str]) -> Iterator[str]:
+    """Filtered output pieces for a chunk iterable; stops consuming it after a block"""
+    for chunk in chunks:
+        output = output_filter.feed(chunk)
+        if output:
+            yield output
+        if output_filter.stopped:
+            return
+    tail = output_filter.close()
+    if tail:
+        yield tail
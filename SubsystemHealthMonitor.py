@@ -0,0 +1,133 @@
+"""
+Health probing and quarantine for optional subsystems
+Each optional subsystem is probed once at startup with a synthetic request.
+Subsystems that fail are quarantined (skipped by the pipeline) and re-probed
+in the background on an exponential backoff schedule until they pass.
+"""
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+HEALTHY = 'healthy'
+QUARANTINED = 'quarantined'
+
+
+class SubsystemHealthMonitor:
+    """
+    Tracks optional subsystem health from probe results
+    probes maps subsystem name -> zero-argument callable that raises on failure
+    """
+    def __init__(self, probes: Dict[str, Callable[[], Any]], initial_backoff: float = 30.0,
+                 max_backoff: float = 600.0, multiplier: float = 2.0, jitter: float = 0.1,
+                 clock: Callable[[], float] = time.monotonic):
+        self.probes = dict(probes)
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._states = {name: {'state': HEALTHY, 'failures': 0, 'error': None,
+                               'last_probe': None, 'next_probe': None}
+                        for name in self.probes}
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+    def probe(self, name: str) -> bool:
+        """Run one probe and update the subsystem's state"""
+        try:
+            self.probes[name]()
+        except Exception as e:
+            self.record_failure(name, e)
+            return False
+        with self._lock:
+            state = self._states[name]
+            if state['state'] == QUARANTINED:
+                print(f"✓ {name} passed health probe, leaving quarantine")
+            state.update(state=HEALTHY, failures=0, error=None, last_probe=self.clock(), next_probe=None)
+        return True
+
+    def probe_all(self) -> Dict[str, bool]:
+        """Probe every subsystem (startup)"""
+        results = {name: self.probe(name) for name in self.probes}
+        quarantined = [name for name, ok in results.items() if not ok]
+        if quarantined:
+            print(f"Warning: quarantined optional subsystems: {', '.join(quarantined)}")
+        return results
+
+    def record_failure(self, name: str, error: Exception):
+        """Quarantine a subsystem after a failed probe or a failure while serving"""
+        with self._lock:
+            state = self._states[name]
+            state['failures'] += 1
+            backoff = min(self.initial_backoff * self.multiplier ** (state['failures'] - 1), self.max_backoff)
+            backoff *= 1 + random.uniform(-self.jitter, self.jitter)
+            now = self.clock()
+            state.update(state=QUARANTINED, error=f"{type(error).__name__}: {error}",
+                         last_probe=now, next_probe=now + backoff)
+        self._wakeup.set()
+
+    def is_available(self, name: str) -> bool:
+        """True if the pipeline should call this subsystem"""
+        state = self._states.get(name)
+        return state is None or state['state'] == HEALTHY
+
+    def reprobe_due(self) -> Optional[float]:
+        """Re-probe quarantined subsystems whose backoff has elapsed
+
+        Returns seconds until the next scheduled probe, or None if nothing is quarantined.
+        """
+        now = self.clock()
+        with self._lock:
+            due = [name for name, state in self._states.items()
+                   if state['state'] == QUARANTINED and state['next_probe'] <= now]
+        for name in due:
+            self.probe(name)
+        with self._lock:
+            pending = [state['next_probe'] for state in self._states.values() if state['state'] == QUARANTINED]
+        if not pending:
+            return None
+        return max(min(pending) - self.clock(), 0.0)
+
+    def start_background(self):
+        """Start the background re-probe thread (idempotent)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='subsystem-health', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background re-probe thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+        self._wakeup.set()
+        if thread is not None:
+            thread.join()
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.clear()
+            delay = self.reprobe_due()
+            self._wakeup.wait(delay)
+
+    def status(self) -> Dict[str, Any]:
+        """Per-subsystem health for /api/status"""
+        now = self.clock()
+        with self._lock:
+            subsystems = {}
+            for name, state in self._states.items():
+                entry = {'state': state['state'], 'failures': state['failures']}
+                if state['state'] == QUARANTINED:
+                    entry['error'] = state['error']
+                    entry['next_probe_in'] = round(max(state['next_probe'] - now, 0.0), 1)
+                subsystems[name] = entry
+        return {
+            'healthy': sum(1 for s in subsystems.values() if s['state'] == HEALTHY),
+            'quarantined': sum(1 for s in subsystems.values() if s['state'] == QUARANTINED),
+            'subsystems': subsystems,
+        }
@@ -0,0 +1,283 @@
+"""
+Circuit breaking and hedged requests for upstream completions
+Each routed model has a circuit breaker over a window of its recent calls:
+    closed     calls go through; once the window holds min_calls calls and
+               the share of errors or of slow calls (over slow_call_seconds)
+               reaches its threshold, the breaker opens
+    open       calls fail fast with CircuitOpen (the router picks another
+               model, or raises if none is available) for open_seconds
+    half-open  then up to half_open_calls trial calls go through: a success
+               closes the breaker, a failure opens it again
+So a degraded upstream costs a few calls instead of a full client timeout on
+every request.
+
+A hedged request sends a second, identical call when the first has not
+finished within the p95 latency of the model's recent successful calls, and
+uses whichever finishes first; the other is cancelled. Opt-in per request with
+parameters['hedge_upstream'], or for every request with
+ETHICAL_HEDGE_UPSTREAM=1.
+
+Breaker settings can be given in the router config file as
+    "circuit_breaker": {"window": 20, "min_calls": 10, "error_threshold": 0.5,
+                        "slow_call_seconds": 30, "slow_call_threshold": 0.5,
+                        "open_seconds": 30, "half_open_calls": 1}
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+HEDGE_ENV_VAR = 'ETHICAL_HEDGE_UPSTREAM'
+HEDGE_PARAMETER = 'hedge_upstream'
+
+DEFAULT_WINDOW = 20
+DEFAULT_MIN_CALLS = 10
+DEFAULT_ERROR_THRESHOLD = 0.5
+DEFAULT_SLOW_CALL_SECONDS = 30.0
+DEFAULT_SLOW_CALL_THRESHOLD = 0.5
+DEFAULT_OPEN_SECONDS = 30.0
+DEFAULT_HALF_OPEN_CALLS = 1
+# Successful latencies kept per model for the hedge delay, and how many are
+# needed before hedging (a p95 over fewer calls is mostly noise)
+HEDGE_WINDOW = 200
+DEFAULT_HEDGE_MIN_SAMPLES = 20
+
+_executor = None
+_executor_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_stats = {'calls': 0, 'hedged': 0, 'hedge_won': 0}
+
+
+class CircuitOpen(RuntimeError):
+    """The upstream model's circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Closed/open/half-open breaker for one upstream model
+    allow() reserves a call (False: fail fast); every allowed call must end
+    with record() or release(). ModelRouter does both for routed calls.
+    """
+    def __init__(self, name: str, window: int = DEFAULT_WINDOW, min_calls: int = DEFAULT_MIN_CALLS,
+                 error_threshold: float = DEFAULT_ERROR_THRESHOLD,
+                 slow_call_seconds: float = DEFAULT_SLOW_CALL_SECONDS,
+                 slow_call_threshold: float = DEFAULT_SLOW_CALL_THRESHOLD,
+                 open_seconds: float = DEFAULT_OPEN_SECONDS, half_open_calls: int = DEFAULT_HALF_OPEN_CALLS,
+                 hedge_min_samples: int = DEFAULT_HEDGE_MIN_SAMPLES,
+                 clock: Callable[[], float] = time.monotonic):
+        if min_calls > window:
+            raise ValueError(f"Circuit breaker {name}: min_calls ({min_calls}) exceeds window ({window})")
+        self.name = name
+        self.min_calls = min_calls
+        self.error_threshold = error_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_threshold = slow_call_threshold
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.hedge_min_samples = hedge_min_samples
+        self.clock = clock
+        # (ok, slow) per recent call while closed
+        self._calls = deque(maxlen=window)
+        self._latencies = deque(maxlen=HEDGE_WINDOW)
+        self._state = CLOSED
+        self._opened_at = None
+        self._trials = 0
+        self.opened = 0
+        self._lock = threading.Lock()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and self.clock() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._trials = 0
+        return self._state
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = self.clock()
+        self._calls.clear()
+        self.opened += 1
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def available(self) -> bool:
+        """Whether allow() would let a call through now (reserves nothing)"""
+        with self._lock:
+            state = self._current_state()
+            return state == CLOSED or (state == HALF_OPEN and self._trials < self.half_open_calls)
+
+    def allow(self) -> bool:
+        """Reserve a call (a trial slot while half-open); False if it must fail fast"""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._trials < self.half_open_calls:
+                self._trials += 1
+                return True
+            return False
+
+    def record(self, ok: bool, latency: float):
+        """Fold one finished call (seconds) into the window"""
+        slow = latency > self.slow_call_seconds
+        with self._lock:
+            if ok:
+                self._latencies.append(latency)
+            state = self._current_state()
+            if state == HALF_OPEN:
+                self._trials = max(0, self._trials - 1)
+                if ok and not slow:
+                    self._state = CLOSED
+                else:
+                    self._open()
+                return
+            if state == OPEN:
+                # Let through before the breaker opened; it is already open
+                return
+            self._calls.append((ok, slow))
+            if len(self._calls) < self.min_calls:
+                return
+            errors = sum(1 for call_ok, _ in self._calls if not call_ok)
+            slow_calls = sum(1 for _, call_slow in self._calls if call_slow)
+            if (errors / len(self._calls) >= self.error_threshold
+                    or slow_calls / len(self._calls) >= self.slow_call_threshold):
+                self._open()
+
+    def release(self):
+        """End an allowed call that was abandoned without an outcome"""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._trials = max(0, self._trials - 1)
+
+    def hedge_delay(self) -> Optional[float]:
+        """p95 of recent successful latencies (seconds), or None until there are enough"""
+        with self._lock:
+            if len(self._latencies) < self.hedge_min_samples:
+                return None
+            latencies = sorted(self._latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._current_state()
+            calls = list(self._calls)
+            status = {'state': state, 'opened': self.opened,
+                      'window_calls': len(calls),
+                      'error_rate': sum(1 for ok, _ in calls if not ok) / len(calls) if calls else 0.0,
+                      'slow_call_rate': sum(1 for _, slow in calls if slow) / len(calls) if calls else 0.0}
+        delay = self.hedge_delay()
+        status['hedge_delay_ms'] = delay * 1000 if delay is not None else None
+        return status
+
+
+def hedging_enabled(parameters: Optional[Dict] = None) -> bool:
+    """True if the request opted in (the parameter overrides the environment default)"""
+    if parameters and HEDGE_PARAMETER in parameters:
+        return bool(parameters[HEDGE_PARAMETER])
+    return os.getenv(HEDGE_ENV_VAR, '').lower() in ('1', 'true', 'yes')
+
+
+def _hedge_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix='hedged-upstream')
+    return _executor
+
+
+def _count(key: str):
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def hedge_stats() -> Dict[str, int]:
+    with _stats_lock:
+        return dict(_stats)
+
+
+class _Cancelled:
+    """Event-like: set once either the request or this attempt is cancelled"""
+    __slots__ = ('request', 'attempt')
+
+    def __init__(self, request: Optional[threading.Event]):
+        self.request = request
+        self.attempt = threading.Event()
+
+    def is_set(self) -> bool:
+        return self.attempt.is_set() or (self.request is not None and self.request.is_set())
+
+    def set(self):
+        self.attempt.set()
+
+
+def hedged(start: Callable[[], Any], attempt: Callable[[Any, Any], Any],
+           delay_for: Callable[[Any], Optional[float]], cancelled: Optional[threading.Event] = None) -> Any:
+    """
+    Run attempt(start(), cancelled), hedged with a second one if it is slow
+    start() begins a call (e.g. routes it); delay_for(call) is the hedge delay
+    in seconds, or None to run the attempt alone. The first attempt to succeed
+    wins and the other is cancelled; if both fail the last error is raised.
+    """
+    _count('calls')
+    first = start()
+    delay = delay_for(first)
+    if delay is None:
+        return attempt(first, cancelled)
+    pool = _hedge_executor()
+    attempts = {}
+    token = _Cancelled(cancelled)
+    attempts[pool.submit(attempt, first, token)] = token
+    done, _ = wait(attempts, timeout=delay)
+    if not done and not (cancelled is not None and cancelled.is_set()):
+        try:
+            second = start()
+        except CircuitOpen:
+            second = None
+        if second is not None:
+            _count('hedged')
+            token = _Cancelled(cancelled)
+            attempts[pool.submit(attempt, second, token)] = token
+    hedge = list(attempts)[-1] if len(attempts) > 1 else None
+    pending = set(attempts)
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                for other in pending:
+                    attempts[other].set()
+                if future is hedge:
+                    _count('hedge_won')
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+class CircuitBreakers:
+    """One CircuitBreaker per upstream model, sharing settings"""
+    def __init__(self, **settings):
+        self.settings = settings
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(name, **self.settings)
+            return breaker
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {name: breaker.status() for name, breaker in breakers.items()}
@@ -1,14 +1,11 @@
-class ResolutionStrategy:
-    """Stub for resolution strategy return type."""
-    def __init__(self, **kwargs):
-        for k, v in kwargs.items():
-            setattr(self, k, v)
+from RecordTypes import record_type
 
-class Strategy:
-    """Stub for strategy return type."""
-    def __init__(self, **kwargs):
-        for k, v in kwargs.items():
-            setattr(self, k, v)
+# Result records
+ResolutionStrategy = record_type('ResolutionStrategy', ('primary_strategy',
+                                                        'alternative_strategies',
+                                                        'resolution_path', 'implementation_plan'), __name__)
+Strategy = record_type('Strategy', ('resolution_approach', 'value_prioritization',
+                                    'compromise_strategy', 'integration_method'), __name__)
 
 class ValueConflictResolver:
     """
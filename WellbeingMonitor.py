@@ -3,46 +3,34 @@ try:
     from EthicalSystemIntegration import (
         WellbeingDimensions, PhysicalImpact, PsychologicalImpact,
         ComplexImpactAssessment, ImpactPredictions, SystemEffects,
-        CascadingEffects, FeedbackAnalysis, AggregateScore
+        CascadingEffects, FeedbackAnalysis, AggregateScore,
+        EMPTY_MAPPING, EMPTY_SEQUENCE
     )
 except ImportError:
-    # Fallback: define simple stubs if import fails
-    class WellbeingDimensions:
-        def __init__(self, **kwargs):
-            for k, v in kwargs.items():
-                setattr(self, k, v)
-    class PhysicalImpact:
-        def __init__(self, **kwargs):
-            for k, v in kwargs.items():
-                setattr(self, k, v)
-    class PsychologicalImpact:
-        def __init__(self, **kwargs):
-            for k, v in kwargs.items():
-                setattr(self, k, v)
-    class ComplexImpactAssessment:
-        def __init__(self, **kwargs):
-            for k, v in kwargs.items():
-                setattr(self, k, v)
-    class ImpactPredictions:
-        def __init__(self, **kwargs):
-            for k, v in kwargs.items():
-                setattr(self, k, v)
-    class SystemEffects:
-        def __init__(self, **kwargs):
-            for k, v in kwargs.items():
-                setattr(self, k, v)
-    class CascadingEffects:
-        def __init__(self, **kwargs):
-            for k, v in kwargs.items():
-                setattr(self, k, v)
-    class FeedbackAnalysis:
-        def __init__(self, **kwargs):
-            for k, v in kwargs.items():
-                setattr(self, k, v)
-    class AggregateScore:
-        def __init__(self, **kwargs):
-            for k, v in kwargs.items():
-                setattr(self, k, v)
+    # Fallback: plain record types with the same fields if import fails
+    from types import MappingProxyType
+    from RecordTypes import record_type
+    EMPTY_MAPPING = MappingProxyType({})
+    EMPTY_SEQUENCE = ()
+    PhysicalImpact = record_type('PhysicalImpact', ('health_effects', 'safety_implications',
+                                                    'physical_resources', 'biological_needs'))
+    PsychologicalImpact = record_type('PsychologicalImpact', ('emotional_wellbeing', 'cognitive_load',
+                                                              'stress_levels', 'autonomy_effects'))
+    WellbeingDimensions = record_type('WellbeingDimensions', ('physical', 'psychological', 'social',
+                                                              'economic', 'environmental', 'cultural'))
+    ImpactPredictions = record_type('ImpactPredictions', ('immediate', 'short_term', 'medium_term',
+                                                          'long_term', 'scenarios'))
+    CascadingEffects = record_type('CascadingEffects', ('primary_cascade', 'secondary_cascade',
+                                                        'tertiary_cascade', 'feedback_loops'))
+    SystemEffects = record_type('SystemEffects', ('direct_effects', 'indirect_effects',
+                                                  'cascading_effects', 'emergent_properties'))
+    FeedbackAnalysis = record_type('FeedbackAnalysis', ('positive_feedback', 'negative_feedback',
+                                                        'stabilizing_factors', 'destabilizing_factors'))
+    AggregateScore = record_type('AggregateScore', ('overall_score', 'dimension_scores',
+                                                    'confidence_levels', 'uncertainty_factors'))
+    ComplexImpactAssessment = record_type('ComplexImpactAssessment', ('dimensions', 'predictions',
+                                                                      'system_effects', 'feedback_loops',
+                                                                      'aggregate_score'))
 
 class WellbeingMonitor:
     """
@@ -111,51 +99,51 @@ class DimensionAnalyzer:
     
     def analyze_social_impact(self, action, context):
         """Analyze social impact"""
-        return {}
+        return EMPTY_MAPPING
     
     def analyze_economic_impact(self, action, context):
         """Analyze economic impact"""
-        return {}
+        return EMPTY_MAPPING
     
     def analyze_environmental_impact(self, action, context):
         """Analyze environmental impact"""
-        return {}
+        return EMPTY_MAPPING
     
     def analyze_cultural_impact(self, action, context):
         """Analyze cultural impact"""
-        return {}
+        return EMPTY_MAPPING
     
     def assess_health_impact(self):
         """Assess health impact"""
-        return {}
+        return EMPTY_MAPPING
     
     def assess_safety(self):
         """Assess safety implications"""
-        return {}
+        return EMPTY_MAPPING
     
     def assess_resource_access(self):
         """Assess physical resource access"""
-        return {}
+        return EMPTY_MAPPING
     
     def assess_basic_needs(self):
         """Assess biological needs"""
-        return {}
+        return EMPTY_MAPPING
     
     def assess_emotional_state(self):
         """Assess emotional wellbeing"""
-        return {}
+        return EMPTY_MAPPING
     
     def assess_mental_burden(self):
         """Assess cognitive load"""
-        return {}
+        return EMPTY_MAPPING
     
     def assess_stress_impact(self):
         """Assess stress levels"""
-        return {}
+        return EMPTY_MAPPING
     
     def assess_autonomy(self):
         """Assess autonomy effects"""
-        return {}
+        return EMPTY_MAPPING
 
 class ImpactPredictor:
     """
@@ -172,47 +160,47 @@ class ImpactPredictor:
     
     def predict_immediate_effects(self, dimensions):
         """Predict immediate effects"""
-        return {}
+        return EMPTY_MAPPING
     
     def predict_short_term_effects(self, dimensions):
         """Predict short-term effects"""
-        return {}
+        return EMPTY_MAPPING
     
     def predict_medium_term_effects(self, dimensions):
         """Predict medium-term effects"""
-        return {}
+        return EMPTY_MAPPING
     
     def predict_long_term_effects(self, dimensions):
         """Predict long-term effects"""
-        return {}
+        return EMPTY_MAPPING
     
     def generate_impact_scenarios(self, dimensions):
         """
         Generates multiple possible impact scenarios
         Considers various interaction effects
         """
-        return [
+        return (
             self.model_optimistic_scenario(dimensions),
             self.model_expected_scenario(dimensions),
             self.model_pessimistic_scenario(dimensions),
             self.model_edge_cases(dimensions)
-        ]
+        )
     
     def model_optimistic_scenario(self, dimensions):
         """Model optimistic scenario"""
-        return {}
+        return EMPTY_MAPPING
     
     def model_expected_scenario(self, dimensions):
         """Model expected scenario"""
-        return {}
+        return EMPTY_MAPPING
     
     def model_pessimistic_scenario(self, dimensions):
         """Model pessimistic scenario"""
-        return {}
+        return EMPTY_MAPPING
     
     def model_edge_cases(self, dimensions):
         """Model edge cases"""
-        return {}
+        return EMPTY_MAPPING
 
 class SystemModeler:
     """
@@ -228,15 +216,15 @@ class SystemModeler:
     
     def model_direct_effects(self, predictions):
         """Model direct effects"""
-        return {}
+        return EMPTY_MAPPING
     
     def model_indirect_effects(self, predictions):
         """Model indirect effects"""
-        return {}
+        return EMPTY_MAPPING
     
     def identify_emergent_properties(self, predictions):
         """Identify emergent properties"""
-        return []
+        return EMPTY_SEQUENCE
     
     def model_cascading_effects(self, predictions):
         """
@@ -251,19 +239,19 @@ class SystemModeler:
     
     def model_primary_cascade(self, predictions):
         """Model primary cascade"""
-        return {}
+        return EMPTY_MAPPING
     
     def model_secondary_cascade(self, predictions):
         """Model secondary cascade"""
-        return {}
+        return EMPTY_MAPPING
     
     def model_tertiary_cascade(self, predictions):
         """Model tertiary cascade"""
-        return {}
+        return EMPTY_MAPPING
     
     def identify_feedback_loops(self, predictions):
         """Identify feedback loops"""
-        return []
+        return EMPTY_SEQUENCE
 
 class FeedbackAnalyzer:
     """
@@ -279,19 +267,19 @@ class FeedbackAnalyzer:
     
     def identify_positive_feedback(self, system_effects):
         """Identify positive feedback loops"""
-        return []
+        return EMPTY_SEQUENCE
     
     def identify_negative_feedback(self, system_effects):
         """Identify negative feedback loops"""
-        return []
+        return EMPTY_SEQUENCE
     
     def identify_stabilizers(self, system_effects):
         """Identify stabilizing factors"""
-        return []
+        return EMPTY_SEQUENCE
     
     def identify_destabilizers(self, system_effects):
         """Identify destabilizing factors"""
-        return []
+        return EMPTY_SEQUENCE
 
 class MetricAggregator:
     """
@@ -311,7 +299,7 @@ class MetricAggregator:
     
     def calculate_raw_scores(self, predictions):
         """Calculate raw scores"""
-        return {}
+        return EMPTY_MAPPING
     
     def apply_weights(self, raw_scores):
         """Apply weights to scores"""
@@ -327,8 +315,8 @@ class MetricAggregator:
     
     def calculate_confidence_levels(self, predictions):
         """Calculate confidence levels"""
-        return {}
+        return EMPTY_MAPPING
     
     def identify_uncertainty_factors(self, predictions):
         """Identify uncertainty factors"""
-        return []
+        return EMPTY_SEQUENCE
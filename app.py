@@ -4,33 +4,84 @@ from flask_cors import CORS
 import json
 import os
 import time
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 import sys
-from openai import OpenAI
 
 # Import ethical processing systems
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from CompiledLexicon import default_store as get_lexicon_store
+from ModelRouter import load_router
+from NormalizedText import normalize
+from ErrorRecoverySystem import CACHED_OR_REJECT, DegradationHandler, DegradationSignals, ResponseCache
+from RequestLanes import CRISIS, NORMAL, LaneSaturated, RequestLanes
+from ScalabilitySystem import (ConcurrencyLimitExceeded, PerformanceOptimizer, ResourceManager, frequent_prompts,
+                               warmup_capture, warmup_enabled)
+from SpeculativeUpstream import SpeculativeCall, speculation_enabled, speculation_stats
+from UpstreamResilience import hedge_stats, hedged, hedging_enabled
 
-# Import integrated ethical processor
-try:
-    from EthicalSystemIntegration import IntegratedEthicalProcessor
-    USE_INTEGRATED_SYSTEM = True
-except ImportError:
-    USE_INTEGRATED_SYSTEM = False
-    print("Warning: Integrated ethical system not available, using simplified version")
+# Heavy dependencies (the openai SDK, the integrated ethical processor and its
+# subsystems) are loaded on first use rather than at import, so importing this
+# module stays cheap for tests, CLI tools and worker processes.
 
 # OpenRouter Configuration (set OPENROUTER_API_KEY in environment or .env)
 OPENROUTER_API_KEY = os.getenv('OPENROUTER_API_KEY', '')
-OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+OPENROUTER_BASE_URL = os.getenv('OPENROUTER_BASE_URL', 'https://openrouter.ai/api/v1')
 OPENROUTER_MODEL = os.getenv('OPENROUTER_MODEL', '')
 SITE_URL = os.getenv('SITE_URL', 'http://localhost:5000')
 SITE_NAME = os.getenv('SITE_NAME', 'Kyosan Ethical AI System')
 
-# Initialize OpenAI client for OpenRouter
-openai_client = OpenAI(
-    base_url=OPENROUTER_BASE_URL,
-    api_key=OPENROUTER_API_KEY,
-)
+_openai_client = None
+_endpoint_clients = {}
+_model_router = None
+_processor = None
+_init_lock = threading.Lock()
+
+def get_openai_client():
+    """OpenAI client for OpenRouter, created on first use"""
+    global _openai_client
+    if _openai_client is None:
+        with _init_lock:
+            if _openai_client is None:
+                from openai import OpenAI
+                _openai_client = OpenAI(
+                    base_url=OPENROUTER_BASE_URL,
+                    api_key=OPENROUTER_API_KEY,
+                )
+    return _openai_client
+
+def get_model_router():
+    """Router over the candidate upstream models, created on first use"""
+    global _model_router
+    if _model_router is None:
+        with _init_lock:
+            if _model_router is None:
+                _model_router = load_router(default_model=OPENROUTER_MODEL)
+    return _model_router
+
+def client_for(candidate):
+    """OpenAI client for a routed candidate (the default client unless it has its own endpoint)"""
+    if not candidate.base_url:
+        return get_openai_client()
+    key = (candidate.base_url, candidate.api_key)
+    client = _endpoint_clients.get(key)
+    if client is None:
+        with _init_lock:
+            client = _endpoint_clients.get(key)
+            if client is None:
+                from openai import OpenAI
+                client = _endpoint_clients[key] = OpenAI(base_url=candidate.base_url,
+                                                         api_key=candidate.api_key or OPENROUTER_API_KEY)
+    return client
+
+def _stream_text(stream, cancelled=None):
+    """Text deltas of a streamed completion, ending early once `cancelled` is set"""
+    for chunk in stream:
+        if cancelled is not None and cancelled.is_set():
+            return
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
 
 app = Flask(__name__, static_folder='static', static_url_path='/static')
 CORS(app)
@@ -43,30 +94,73 @@ os.makedirs(CONVERSATIONS_DIR, exist_ok=True)
 class EthicalProcessorAPI:
     def __init__(self):
         self.conversation_history = []
+        self.use_integrated = False
+        # Crisis-mode requests get reserved worker slots normal traffic cannot take
+        self.lanes = RequestLanes.from_env()
+        # Adaptive concurrency limit in front of the normal lane
+        self.resource_manager = ResourceManager()
+        # Normal-lane service level under load, and the responses served at its last level
+        self.degradation = DegradationHandler.from_env()
+        self.response_cache = ResponseCache()
+        # Startup warm-up report (set by warm_up)
+        self.warmup = None
         # Use integrated system if available
-        if USE_INTEGRATED_SYSTEM:
-            try:
-                self.integrated_processor = IntegratedEthicalProcessor()
-                self.use_integrated = True
-                print("✓ Using integrated ethical processing system")
-            except Exception as e:
-                print(f"Warning: Could not initialize integrated system: {e}")
-                self.use_integrated = False
-        else:
-            self.use_integrated = False
+        try:
+            from EthicalSystemIntegration import IntegratedEthicalProcessor
+        except ImportError:
+            print("Warning: Integrated ethical system not available, using simplified version")
+            return
+        try:
+            self.integrated_processor = IntegratedEthicalProcessor()
+            self.integrated_processor.start_health_probes()
+            self.integrated_processor.start_lexicon_watchers()
+            self.use_integrated = True
+            print("✓ Using integrated ethical processing system")
+        except Exception as e:
+            print(f"Warning: Could not initialize integrated system: {e}")
         
-    def process_input(self, user_input, context=None, parameters=None):
+    def warm_up(self, capture=None):
+        """
+        Replay the most frequent captured prompts and run each pipeline once (integrated system only)
+        capture defaults to ETHICAL_WARMUP_CAPTURE; with neither there is no warm-up.
+        """
+        capture = capture or warmup_capture()
+        if self.use_integrated and capture is not None:
+            self.warmup = PerformanceOptimizer().warm_up(self.integrated_processor, frequent_prompts(capture))
+        return self.warmup
+
+    def process_input(self, user_input, context=None, parameters=None, on_checks_passed=None):
         """
         Process user input through ethical framework
-        Uses integrated system if available, otherwise falls back to simplified version
+        Uses integrated system if available, otherwise falls back to simplified version.
+        on_checks_passed (integrated system only) is called once the blocking checks pass.
+        Crisis-lane requests run the integrated system's minimal crisis check set;
+        normal-lane requests run at the current degradation level.
         """
         if parameters is None:
             parameters = {}
+        lane = self.lanes.classify(parameters)
+        result = self._process(lane, user_input, context, parameters, on_checks_passed)
+        result['processing_metadata']['lane'] = lane
+        return result
+    
+    def degradation_signals(self):
+        """Load signals for the degradation monitor"""
+        normal = self.lanes.lanes[NORMAL]
+        return DegradationSignals(normal.waiting, normal.recent_p95(), get_model_router().available())
+    
+    def _process(self, lane, user_input, context, parameters, on_checks_passed):
+        # Normalized once and shared by every layer below
+        text = normalize(user_input)
         
         # Use integrated system if available
         if self.use_integrated:
             try:
-                result = self.integrated_processor.process_input(user_input, context, parameters)
+                if lane == CRISIS:
+                    result = self.integrated_processor.process_crisis(text, context, parameters, on_checks_passed)
+                else:
+                    result = self.integrated_processor.process_input(text, context, parameters, on_checks_passed,
+                                                                     self.degradation.level)
                 # If response was blocked, return it
                 if result.get('response') and result.get('processing_metadata', {}).get('blocked'):
                     return result
@@ -75,9 +169,9 @@ class EthicalProcessorAPI:
             except (AttributeError, KeyError, TypeError) as e:
                 print(f"Error in integrated processor: {e}")
                 self.use_integrated = False
-                processing_result = self._simplified_processing(user_input, context, parameters)
+                processing_result = self._simplified_processing(text, context, parameters)
         else:
-            processing_result = self._simplified_processing(user_input, context, parameters)
+            processing_result = self._simplified_processing(text, context, parameters)
         
         # Generate response (will be done by generate_response method)
         return {
@@ -103,24 +197,37 @@ class EthicalProcessorAPI:
                 print(f"Warning: output_safety filter failed: {e}")
         return response_text
     
+    def filter_stream(self, chunks, context=None):
+        """
+        Streaming counterpart of filter_response: yields filtered pieces of a
+        response as its chunks arrive (unfiltered if no output safety layer).
+        """
+        output_safety = getattr(self.integrated_processor, 'output_safety', None) if self.use_integrated else None
+        if output_safety is None:
+            yield from chunks
+            return
+        yield from output_safety.filter_stream(chunks, context or [])
+    
     def _simplified_processing(self, user_input, context, parameters):
         """Fallback simplified processing"""
         # Ensure parameters are passed correctly
         if parameters is None:
             parameters = {}
         
-        harm_result = self.check_harm(user_input, parameters)
+        text = normalize(user_input)
+        harm_result = self.check_harm(text, parameters)
         
         return {
-            'input': user_input,
+            'input': text.raw,
             'timestamp': datetime.now().isoformat(),
             'ethical_checks': {
                 'harm_detection': harm_result,
-                'instruction_validation': self.validate_instruction(user_input),
-                'system_integrity': self.check_integrity(user_input),
-                'wellbeing_assessment': self.assess_wellbeing(user_input, context)
+                'instruction_validation': self.validate_instruction(text),
+                'system_integrity': self.check_integrity(text),
+                'wellbeing_assessment': self.assess_wellbeing(text, context)
             },
             'parameters_used': parameters,
+            'lexicon_version': harm_result['lexicon_version'],
             'blocked': harm_result.get('has_harmful_intent', False)  # Add blocked flag
         }
     
@@ -134,17 +241,12 @@ class EthicalProcessorAPI:
         context_awareness = parameters.get('context_awareness', 0.7)
         crisis_mode = parameters.get('crisis_mode', True)
         
-        # Crisis keywords
-        crisis_keywords = [
-            'crisis', 'emergency', 'disaster', 'refugee', 'humanitarian', 
-            'aid', 'relief', 'evacuation', 'rescue', 'survival',
-            'conflict', 'war', 'casualties', 'victims', 'trauma', 'medical', 'hospital'
-        ]
-        
-        input_lower = input_text.lower()
+        # Crisis and harm keywords: fallback categories of the shared compiled lexicon
+        lexicon = get_lexicon_store().current()
+        found = lexicon.match(normalize(input_text))
         
         # Check if this is a crisis context
-        is_crisis_context = any(keyword in input_lower for keyword in crisis_keywords)
+        is_crisis_context = bool(found & lexicon.bit('fallback_crisis'))
         
         # Adjust sensitivity based on context
         effective_sensitivity = sensitivity
@@ -152,8 +254,7 @@ class EthicalProcessorAPI:
             effective_sensitivity = sensitivity * (1 - context_awareness * 0.5)
         
         # Check for harmful keywords
-        harmful_keywords = ['harm', 'hurt', 'kill', 'destroy', 'attack', 'violence']
-        has_harmful_keyword = any(keyword in input_lower for keyword in harmful_keywords)
+        has_harmful_keyword = bool(found & lexicon.bit('fallback_harm'))
         
         # In crisis mode, override harm detection for crisis contexts
         if is_crisis_context and crisis_mode:
@@ -167,12 +268,13 @@ class EthicalProcessorAPI:
         return {
             'has_harmful_intent': has_harm,
             'confidence': 0.95 if has_harm else 0.99,
-            'details': f'Harm detection (sensitivity={effective_sensitivity:.2f}, crisis_mode={crisis_mode}, is_crisis={is_crisis_context})'
+            'details': f'Harm detection (sensitivity={effective_sensitivity:.2f}, crisis_mode={crisis_mode}, is_crisis={is_crisis_context})',
+            'lexicon_version': lexicon.version
         }
     
     def validate_instruction(self, input_text):
         """Instruction validation layer (fallback)"""
-        is_valid = len(input_text.strip()) > 0
+        is_valid = not normalize(input_text).is_blank
         
         return {
             'is_valid': is_valid,
@@ -197,118 +299,187 @@ class EthicalProcessorAPI:
             'details': 'Wellbeing assessment completed'
         }
     
-    def generate_response(self, user_input, context, processing_result, parameters):
-        """Generate ethical response using OpenRouter API"""
-        try:
-            # Check if request was blocked
-            if processing_result.get('blocked', False):
-                # Response should already be in processing_result
-                return processing_result.get('response', 'Request blocked by ethical system')
-            
-            # Check if request should be blocked based on ethical checks
-            # CRISIS MODE OVERRIDE: If crisis_mode is True, NEVER block
-            crisis_mode = parameters.get('crisis_mode', False)
-            if crisis_mode:
-                # Crisis mode is active - completely bypass blocking
-                print("DEBUG: Crisis mode active in generate_response - bypassing block")
-            else:
-                # Only block if harm detection explicitly flags it (and crisis mode is off)
-                harm_detection = processing_result.get('ethical_checks', {}).get('harm_detection', {})
-                has_harm = harm_detection.get('has_harmful_intent', False)
-                if has_harm:
-                    return "I cannot assist with this request as it has been flagged by our ethical harm detection system. Please rephrase your question in a way that doesn't involve harmful content."
-            
-            if not processing_result['ethical_checks']['instruction_validation']['is_valid']:
-                return "I cannot process this request as it failed instruction validation. Please provide a valid input."
-            
-            if not processing_result['ethical_checks']['system_integrity']['is_safe']:
-                return "I cannot process this request as it failed system integrity checks. Please try a different approach."
-            
-            # Prepare messages for API
-            messages = []
-            
-            # Add system message with ethical context (less restrictive for crisis scenarios)
-            crisis_mode = parameters.get('crisis_mode', False)
-            if crisis_mode:
-                system_message = {
-                    "role": "system",
-                    "content": "You are an ethical AI assistant. You can discuss crisis scenarios, humanitarian situations, and emergency contexts while maintaining ethical principles. Be helpful, accurate, and compassionate. Always prioritize human wellbeing and provide accurate information about crisis situations."
-                }
-            else:
-                system_message = {
-                    "role": "system",
-                    "content": "You are an ethical AI assistant. Always prioritize human wellbeing, harm prevention, and ethical considerations in your responses. Be helpful, harmless, and honest."
-                }
-            messages.append(system_message)
-            
-            # Add conversation history if available
-            if context:
-                for msg in context:
-                    if isinstance(msg, dict) and 'role' in msg and 'content' in msg:
-                        messages.append({
-                            "role": msg['role'],
-                            "content": msg['content']
-                        })
-            
-            # Add current user message
-            messages.append({
-                "role": "user",
-                "content": user_input
-            })
-            
-            # Prepare API parameters
-            api_params = {
-                "model": OPENROUTER_MODEL,
-                "messages": messages,
-                "temperature": parameters.get('temperature', 0.7),
-                "max_tokens": parameters.get('max_tokens', 150000),
-                "top_p": parameters.get('top_p', 0.9),
+    def _refusal(self, processing_result, parameters):
+        """Refusal message if the ethical checks rule out generating a response, else None"""
+        # Check if request was blocked
+        if processing_result.get('blocked', False):
+            # Response should already be in processing_result
+            return processing_result.get('response', 'Request blocked by ethical system')
+
+        # Check if request should be blocked based on ethical checks
+        # CRISIS MODE OVERRIDE: If crisis_mode is True, NEVER block
+        crisis_mode = parameters.get('crisis_mode', False)
+        if not crisis_mode:
+            # Only block if harm detection explicitly flags it (and crisis mode is off)
+            harm_detection = processing_result.get('ethical_checks', {}).get('harm_detection', {})
+            has_harm = harm_detection.get('has_harmful_intent', False)
+            if has_harm:
+                return "I cannot assist with this request as it has been flagged by our ethical harm detection system. Please rephrase your question in a way that doesn't involve harmful content."
+
+        if not processing_result['ethical_checks']['instruction_validation']['is_valid']:
+            return "I cannot process this request as it failed instruction validation. Please provide a valid input."
+
+        if not processing_result['ethical_checks']['system_integrity']['is_safe']:
+            return "I cannot process this request as it failed system integrity checks. Please try a different approach."
+
+        return None
+    
+    def _complete(self, user_input, context, parameters, cancelled=None):
+        """
+        Stream a completion from OpenRouter through the output safety filter
+        Stops reading (and closes the upstream stream) once `cancelled` is set.
+        Raises CircuitOpen without calling upstream while every routed model's
+        circuit breaker is open; hedged if the request opted in.
+        """
+        # Prepare messages for API
+        messages = []
+
+        # Add system message with ethical context (less restrictive for crisis scenarios)
+        crisis_mode = parameters.get('crisis_mode', False)
+        if crisis_mode:
+            system_message = {
+                "role": "system",
+                "content": "You are an ethical AI assistant. You can discuss crisis scenarios, humanitarian situations, and emergency contexts while maintaining ethical principles. Be helpful, accurate, and compassionate. Always prioritize human wellbeing and provide accurate information about crisis situations."
+            }
+        else:
+            system_message = {
+                "role": "system",
+                "content": "You are an ethical AI assistant. Always prioritize human wellbeing, harm prevention, and ethical considerations in your responses. Be helpful, harmless, and honest."
             }
-            
-            # Add optional parameters
-            if 'frequency_penalty' in parameters:
-                api_params['frequency_penalty'] = parameters['frequency_penalty']
-            if 'presence_penalty' in parameters:
-                api_params['presence_penalty'] = parameters['presence_penalty']
-            if 'repetition_penalty' in parameters:
-                api_params['repetition_penalty'] = parameters['repetition_penalty']
-            if 'stop_sequences' in parameters and parameters['stop_sequences']:
-                api_params['stop'] = parameters['stop_sequences']
-            if 'seed' in parameters and parameters['seed'] is not None:
-                api_params['seed'] = parameters['seed']
-            
-            # Prepare extra_body for OpenRouter-specific parameters (like top_k, min_p, top_a)
-            extra_body = {}
-            if 'top_k' in parameters:
-                extra_body['top_k'] = parameters['top_k']
-            if 'min_p' in parameters:
-                extra_body['min_p'] = parameters['min_p']
-            if 'top_a' in parameters:
-                extra_body['top_a'] = parameters['top_a']
-            
-            # Call OpenRouter API
-            completion = openai_client.chat.completions.create(
+        messages.append(system_message)
+
+        # Add conversation history if available
+        if context:
+            for msg in context:
+                if isinstance(msg, dict) and 'role' in msg and 'content' in msg:
+                    messages.append({
+                        "role": msg['role'],
+                        "content": msg['content']
+                    })
+
+        # Add current user message
+        messages.append({
+            "role": "user",
+            "content": user_input
+        })
+
+        # Prepare API parameters (the model is chosen by the router below)
+        api_params = {
+            "messages": messages,
+            "temperature": parameters.get('temperature', 0.7),
+            "max_tokens": parameters.get('max_tokens', 150000),
+            "top_p": parameters.get('top_p', 0.9),
+        }
+
+        # Add optional parameters
+        if 'frequency_penalty' in parameters:
+            api_params['frequency_penalty'] = parameters['frequency_penalty']
+        if 'presence_penalty' in parameters:
+            api_params['presence_penalty'] = parameters['presence_penalty']
+        if 'repetition_penalty' in parameters:
+            api_params['repetition_penalty'] = parameters['repetition_penalty']
+        if 'stop_sequences' in parameters and parameters['stop_sequences']:
+            api_params['stop'] = parameters['stop_sequences']
+        if 'seed' in parameters and parameters['seed'] is not None:
+            api_params['seed'] = parameters['seed']
+
+        # Prepare extra_body for OpenRouter-specific parameters (like top_k, min_p, top_a)
+        extra_body = {}
+        if 'top_k' in parameters:
+            extra_body['top_k'] = parameters['top_k']
+        if 'min_p' in parameters:
+            extra_body['min_p'] = parameters['min_p']
+        if 'top_a' in parameters:
+            extra_body['top_a'] = parameters['top_a']
+
+        def attempt(call, attempt_cancelled):
+            return self._stream_completion(call, api_params, extra_body, context, attempt_cancelled)
+
+        router = get_model_router()
+        if hedging_enabled(parameters):
+            text = hedged(router.route, attempt, lambda call: router.hedge_delay(call.candidate.name), cancelled)
+        else:
+            text = attempt(router.route(), cancelled)
+        if cancelled is None or not cancelled.is_set():
+            self.response_cache.put(user_input, context, parameters, text)
+        return text
+
+    def _stream_completion(self, call, api_params, extra_body, context, cancelled):
+        # Call OpenRouter API, streaming so output safety can scan the
+        # completion as it arrives and stop generation early if it truncates.
+        # The routed call records its latency, time to first token and errors.
+        with call:
+            stream = client_for(call.candidate).chat.completions.create(
                 extra_headers={
                     "HTTP-Referer": SITE_URL,
                     "X-Title": SITE_NAME,
                 },
                 extra_body=extra_body,
+                stream=True,
+                model=call.candidate.name,
                 **api_params
             )
-            
-            # Extract response
-            response_content = completion.choices[0].message.content
-            
-            return response_content
-            
+            try:
+                text = ''.join(self.filter_stream(call.timed(_stream_text(stream, cancelled)), context))
+            finally:
+                stream.close()
+            if cancelled is not None and cancelled.is_set():
+                call.abandon()
+            return text
+    
+    def _generation_error(self, e):
+        # Return error message if API call fails
+        error_msg = f"Error generating response: {str(e)}"
+        print(f"API Error: {error_msg}")  # Log for debugging
+        return f"I encountered an error while processing your request. Please try again. Error: {str(e)}"
+    
+    def generate_response(self, user_input, context, processing_result, parameters):
+        """Generate ethical response using OpenRouter API"""
+        try:
+            refusal = self._refusal(processing_result, parameters)
+            if refusal is not None:
+                return refusal
+            return self._complete(user_input, context, parameters)
+        except Exception as e:
+            return self._generation_error(e)
+    
+    def speculate(self, user_input, context, parameters):
+        """
+        Speculative upstream call for this request, or None if not opted in
+        Pass its `start` as process_input's on_checks_passed, then finish with
+        generate_speculative_response.
+        """
+        if not self.use_integrated or not speculation_enabled(parameters):
+            return None
+        return SpeculativeCall(lambda cancelled: self._complete(user_input, context, parameters, cancelled))
+    
+    def generate_speculative_response(self, speculation, user_input, context, processing_result, parameters):
+        """generate_response, reusing the speculative completion when it was started"""
+        if speculation is None or not speculation.started:
+            return self.generate_response(user_input, context, processing_result, parameters)
+        try:
+            refusal = self._refusal(processing_result, parameters)
+            if refusal is not None:
+                speculation.cancel()
+                return refusal
+            return speculation.result()
         except Exception as e:
-            # Return error message if API call fails
-            error_msg = f"Error generating response: {str(e)}"
-            print(f"API Error: {error_msg}")  # Log for debugging
-            return f"I encountered an error while processing your request. Please try again. Error: {str(e)}"
+            return self._generation_error(e)
 
-# Initialize processor
-processor = EthicalProcessorAPI()
+def get_processor():
+    """Ethical processor shared by all requests, created on first use"""
+    global _processor
+    if _processor is None:
+        with _init_lock:
+            if _processor is None:
+                _processor = EthicalProcessorAPI()
+    return _processor
+
+def __getattr__(name):
+    # Keep `app.processor` available to callers without constructing it at import
+    if name == 'processor':
+        return get_processor()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Initialize monitoring (optional - can be disabled)
 try:
@@ -330,6 +501,146 @@ def favicon():
     # Return a simple 204 No Content to prevent 404 errors
     return '', 204
 
+def _cached_or_reject(user_input, context, parameters):
+    """Answer a normal request at the cached_or_reject level: a cached response, else 503"""
+    cached = get_processor().response_cache.get(user_input, context, parameters)
+    if cached is None:
+        return jsonify({'error': 'Service degraded: only cached responses are being served'}), 503, {'Retry-After': '5'}
+    return jsonify({
+        'response': cached,
+        'metadata': {'blocked': False, 'lane': NORMAL, 'degradation': CACHED_OR_REJECT, 'cached': True},
+        'timestamp': datetime.now().isoformat()
+    })
+
+@contextmanager
+def _admit(lane):
+    """
+    Lane slot for one request, behind the adaptive concurrency limit
+    Crisis requests pass the limit too: crisis_mode is set by the client.
+    """
+    processor = get_processor()
+    with processor.resource_manager.concurrency_limiter.admit() as sample:
+        with processor.lanes.admit(lane) as ticket:
+            sample.queue_wait = ticket.admitted - ticket.start
+            yield ticket
+
+def _chat_in_lane(ticket, user_input, context, parameters, start_time):
+    """Ethical processing and response generation for one admitted /api/chat request"""
+    # Opt-in: start the upstream completion as soon as the blocking checks
+    # pass, overlapping it with the rest of ethical processing
+    speculation = get_processor().speculate(user_input, context, parameters)
+
+    # Process through ethical framework
+    try:
+        result = get_processor().process_input(user_input, context, parameters,
+                                               speculation.start if speculation else None)
+        ticket.decided()
+        # Log request if monitoring is enabled
+        if USE_MONITORING and system_logger:
+            system_logger.log_request(user_input, parameters, result)
+    except Exception as e:
+        import traceback
+        if speculation:
+            speculation.cancel()
+        print(f"Error in process_input: {str(e)}")
+        print(traceback.format_exc())
+        if USE_MONITORING and system_logger:
+            system_logger.log_error(e, {'endpoint': '/api/chat', 'user_input': user_input[:100]})
+        return jsonify({'error': f'Error processing input: {str(e)}'}), 500
+
+    # Ensure result has required structure
+    if not isinstance(result, dict):
+        result = {'response': None, 'processing_metadata': {}, 'timestamp': datetime.now().isoformat()}
+    if 'processing_metadata' not in result:
+        result['processing_metadata'] = {}
+    if 'timestamp' not in result:
+        result['timestamp'] = datetime.now().isoformat()
+
+    # Check if crisis mode is active - if so, bypass ALL blocking
+    crisis_mode = parameters.get('crisis_mode', False)
+    # Normal-lane service times per stage, for capacity modelling (capacity_plan.py)
+    record_stages = USE_MONITORING and performance_monitor and not crisis_mode
+    if record_stages:
+        performance_monitor.record_stage('checks', ticket.decided_at - ticket.admitted)
+
+    if crisis_mode:
+        # Crisis mode is active - bypass all blocking checks (force unblock)
+        processing_metadata = result.get('processing_metadata', {})
+        processing_metadata['blocked'] = False
+        if 'ethical_checks' in processing_metadata:
+            if 'harm_detection' in processing_metadata['ethical_checks']:
+                processing_metadata['ethical_checks']['harm_detection']['has_harmful_intent'] = False
+
+    # Check if request was blocked (only if crisis mode is off)
+    processing_metadata = result.get('processing_metadata', {})
+    blocked = processing_metadata.get('blocked', False) and not crisis_mode
+
+    # Check harm detection result (only if crisis mode is off)
+    harm_detection = processing_metadata.get('ethical_checks', {}).get('harm_detection', {})
+    has_harm = harm_detection.get('has_harmful_intent', False) and not crisis_mode
+
+    if speculation:
+        result['processing_metadata']['speculative_upstream'] = speculation.started
+
+    if blocked:
+        # Request was blocked, return the blocking message (discarding any speculative call)
+        if speculation:
+            speculation.cancel()
+        blocked_response = result.get('response', 'Request blocked by ethical system')
+        return jsonify({
+            'response': blocked_response,
+            'metadata': result['processing_metadata'],
+            'timestamp': result['timestamp']
+        })
+
+    # Generate response if not blocked
+    generation_start = time.perf_counter()
+    try:
+        if not result.get('response'):
+            # Need to generate response using OpenRouter API
+            response = get_processor().generate_speculative_response(
+                speculation,
+                user_input, 
+                context, 
+                result['processing_metadata'], 
+                parameters
+            )
+        else:
+            if speculation:
+                speculation.cancel()
+            # Filter response through output safety layer (when using integrated processor);
+            # generated responses are filtered while they stream
+            response = get_processor().filter_response(result['response'], context)
+    except Exception as e:
+        import traceback
+        print(f"Error in generate_response: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({'error': f'Error generating response: {str(e)}'}), 500
+    if record_stages:
+        performance_monitor.record_stage('upstream', time.perf_counter() - generation_start)
+
+    # Add to conversation history
+    conversation_entry = {
+        'user': user_input,
+        'assistant': response,
+        'timestamp': result['timestamp'],
+        'metadata': result['processing_metadata']
+    }
+    get_processor().conversation_history.append(conversation_entry)
+
+    # Record metrics if monitoring is enabled
+    if USE_MONITORING and performance_monitor:
+        processing_time = time.time() - start_time
+        blocked = result.get('processing_metadata', {}).get('blocked', False)
+        crisis_mode = parameters.get('crisis_mode', False)
+        performance_monitor.record_request(processing_time, blocked, crisis_mode)
+
+    return jsonify({
+        'response': response,
+        'metadata': result['processing_metadata'],
+        'timestamp': result['timestamp']
+    })
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     """Main chat endpoint"""
@@ -344,99 +655,16 @@ def chat():
         if not user_input:
             return jsonify({'error': 'Message is required'}), 400
         
-        # Process through ethical framework
-        try:
-            result = processor.process_input(user_input, context, parameters)
-            # Log request if monitoring is enabled
-            if USE_MONITORING and system_logger:
-                system_logger.log_request(user_input, parameters, result)
-        except Exception as e:
-            import traceback
-            print(f"Error in process_input: {str(e)}")
-            print(traceback.format_exc())
-            if USE_MONITORING and system_logger:
-                system_logger.log_error(e, {'endpoint': '/api/chat', 'user_input': user_input[:100]})
-            return jsonify({'error': f'Error processing input: {str(e)}'}), 500
-        
-        # Ensure result has required structure
-        if not isinstance(result, dict):
-            result = {'response': None, 'processing_metadata': {}, 'timestamp': datetime.now().isoformat()}
-        if 'processing_metadata' not in result:
-            result['processing_metadata'] = {}
-        if 'timestamp' not in result:
-            result['timestamp'] = datetime.now().isoformat()
-        
-        # Check if crisis mode is active - if so, bypass ALL blocking
-        crisis_mode = parameters.get('crisis_mode', False)
-        
-        if crisis_mode:
-            # Crisis mode is active - bypass all blocking checks
-            print(f"DEBUG: Crisis mode active - bypassing all blocking checks")
-            # Force unblock
-            processing_metadata = result.get('processing_metadata', {})
-            processing_metadata['blocked'] = False
-            if 'ethical_checks' in processing_metadata:
-                if 'harm_detection' in processing_metadata['ethical_checks']:
-                    processing_metadata['ethical_checks']['harm_detection']['has_harmful_intent'] = False
-        
-        # Check if request was blocked (only if crisis mode is off)
-        processing_metadata = result.get('processing_metadata', {})
-        blocked = processing_metadata.get('blocked', False) and not crisis_mode
-        
-        # Check harm detection result (only if crisis mode is off)
-        harm_detection = processing_metadata.get('ethical_checks', {}).get('harm_detection', {})
-        has_harm = harm_detection.get('has_harmful_intent', False) and not crisis_mode
-        
-        if blocked:
-            # Request was blocked, return the blocking message
-            blocked_response = result.get('response', 'Request blocked by ethical system')
-            return jsonify({
-                'response': blocked_response,
-                'metadata': result['processing_metadata'],
-                'timestamp': result['timestamp']
-            })
-        
-        # Generate response if not blocked
+        # Crisis-mode requests hold a reserved crisis-lane slot until their checks are decided
+        lanes = get_processor().lanes
+        lane = lanes.classify(parameters)
+        if lane == NORMAL and get_processor().degradation.level == CACHED_OR_REJECT:
+            return _cached_or_reject(user_input, context, parameters)
         try:
-            if not result.get('response'):
-                # Need to generate response using OpenRouter API
-                response = processor.generate_response(
-                    user_input, 
-                    context, 
-                    result['processing_metadata'], 
-                    parameters
-                )
-            else:
-                response = result['response']
-            # Filter response through output safety layer (when using integrated processor)
-            response = processor.filter_response(response, context)
-        except Exception as e:
-            import traceback
-            print(f"Error in generate_response: {str(e)}")
-            print(traceback.format_exc())
-            return jsonify({'error': f'Error generating response: {str(e)}'}), 500
-        
-        # Add to conversation history
-        conversation_entry = {
-            'user': user_input,
-            'assistant': response,
-            'timestamp': result['timestamp'],
-            'metadata': result['processing_metadata']
-        }
-        processor.conversation_history.append(conversation_entry)
-        
-        # Record metrics if monitoring is enabled
-        if USE_MONITORING and performance_monitor:
-            processing_time = time.time() - start_time
-            blocked = result.get('processing_metadata', {}).get('blocked', False)
-            crisis_mode = parameters.get('crisis_mode', False)
-            performance_monitor.record_request(processing_time, blocked, crisis_mode)
-        
-        return jsonify({
-            'response': response,
-            'metadata': result['processing_metadata'],
-            'timestamp': result['timestamp']
-        })
+            with _admit(lane) as ticket:
+                return _chat_in_lane(ticket, user_input, context, parameters, start_time)
+        except (LaneSaturated, ConcurrencyLimitExceeded) as e:
+            return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
     
     except Exception as e:
         import traceback
@@ -535,7 +763,7 @@ def delete_conversation(conversation_id):
 def clear_conversation():
     """Clear current conversation history"""
     try:
-        processor.conversation_history = []
+        get_processor().conversation_history = []
         return jsonify({'success': True, 'message': 'Conversation cleared'})
     
     except Exception as e:
@@ -546,28 +774,69 @@ def status():
     """Get system status and metrics"""
     if USE_MONITORING:
         from monitoring import get_system_status
-        return jsonify(get_system_status())
+        system_status = get_system_status()
     else:
-        return jsonify({
+        system_status = {
             'status': 'operational',
             'monitoring': 'disabled',
             'timestamp': datetime.now().isoformat()
-        })
+        }
+    processor = get_processor()
+    if processor.use_integrated:
+        system_status['optional_subsystems'] = processor.integrated_processor.subsystem_health.status()
+        system_status['deep_analysis'] = processor.integrated_processor.deep_analysis.stats()
+        harm_service = processor.integrated_processor.harm_service
+        system_status['harm_service'] = harm_service.status() if harm_service else None
+    system_status['lanes'] = processor.lanes.status()
+    system_status['concurrency_limit'] = processor.resource_manager.concurrency_limiter.status()
+    system_status['degradation'] = processor.degradation.status()
+    system_status['response_cache'] = processor.response_cache.status()
+    system_status['warmup'] = processor.warmup._asdict() if processor.warmup else None
+    system_status['model_router'] = get_model_router().status()
+    system_status['speculative_upstream'] = speculation_stats()
+    system_status['hedged_upstream'] = hedge_stats()
+    return jsonify(system_status)
+
+@app.route('/api/analysis/<request_id>', methods=['GET'])
+def deep_analysis(request_id):
+    """Deep-path analysis of a processed request (pending until the background run completes)"""
+    processor = get_processor()
+    if not processor.use_integrated:
+        return jsonify({'error': 'Deep analysis requires the integrated processor'}), 404
+    entry = processor.integrated_processor.deep_analysis.get(request_id)
+    if entry is None:
+        return jsonify({'error': 'Unknown or expired request id'}), 404
+    return jsonify(entry)
 
 @app.route('/api/metrics', methods=['GET'])
 def metrics():
-    """Get performance metrics"""
+    """Get performance metrics (?stages=1 adds the per-stage service time samples)"""
     if USE_MONITORING and performance_monitor:
-        return jsonify({
+        payload = {
             'metrics': performance_monitor.get_metrics(),
             'percentiles': performance_monitor.get_percentiles(),
             'timestamp': datetime.now().isoformat()
-        })
+        }
+        if request.args.get('stages'):
+            payload['stage_samples'] = performance_monitor.get_stage_samples()
+        return jsonify(payload)
     else:
         return jsonify({'error': 'Monitoring not enabled'}), 503
 
 if __name__ == '__main__':
+    port = int(os.getenv('PORT', '5000'))
+    debug = os.getenv('FLASK_DEBUG', '1') not in ('0', 'false', 'False')
     if USE_MONITORING and system_logger:
-        system_logger.log_system_event('Server starting', {'port': 5000})
-    app.run(debug=True, port=5000, host='0.0.0.0')
+        system_logger.log_system_event('Server starting', {'port': port})
+    # Pay processor and client initialization before the first request
+    get_processor()
+    get_openai_client()
+    # Warm caches and code paths from recorded traffic before accepting connections
+    if warmup_enabled():
+        warmup = get_processor().warm_up()
+        if warmup is not None:
+            print(f"✓ Warm-up: {warmup.prompts} prompts, {len(warmup.layers)} layers in {warmup.seconds}s")
+    # Step the normal lane's service level with load (kept off for importers such as tests)
+    get_processor().degradation.start_monitoring(get_processor().degradation_signals)
+    app.run(debug=debug, port=port, host='0.0.0.0')
 
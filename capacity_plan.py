@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Capacity planning for /api/chat deployments
+Fits per-stage service times from recorded metrics (a running server's
+/api/metrics?stages=1, a saved copy of it, or a load_test.py --output report)
+and simulates the normal lane to answer what-if questions.
+
+Usage:
+    python3 capacity_plan.py --metrics http://127.0.0.1:5000 --rates 50 --p99 2.0
+    python3 capacity_plan.py --metrics report.json --rates 10,25,50 --workers 8-64:4 --upstream-concurrency 16,none
+    python3 capacity_plan.py --metrics report.json --rates 50 --upstream-scale 1.5 --arrival bursty
+    python3 capacity_plan.py --stage checks=lognormal:20:0.5 --stage upstream=lognormal:800:0.6 --rates 50
+"""
+import argparse
+import json
+import sys
+import time
+import urllib.request
+from typing import Any, Dict, List, Optional
+
+from CapacitySimulation import (ARRIVAL_PROCESSES, AUTO, CHECKS, DEFAULT_BURSTINESS, DEFAULT_REQUESTS,
+                                EMPIRICAL, EXPONENTIAL, LOGNORMAL, POISSON, STAGES, UPSTREAM, ServiceTime,
+                                Workload, required_workers, sweep)
+
+
+def load_metrics(source: str, timeout: float = 10.0) -> Dict[str, Any]:
+    """Recorded metrics from a server URL or a JSON file"""
+    if source.startswith(('http://', 'https://')):
+        with urllib.request.urlopen(source.rstrip('/') + '/api/metrics?stages=1', timeout=timeout) as resp:
+            return json.loads(resp.read() or b'{}')
+    with open(source) as f:
+        return json.load(f)
+
+
+def parse_stage(value: str):
+    """NAME=KIND:MEAN_MS[:CV] -> (name, ServiceTime)"""
+    try:
+        name, spec = value.split('=', 1)
+        kind, *numbers = spec.split(':')
+        mean = float(numbers[0]) / 1000
+        cv = float(numbers[1]) if len(numbers) > 1 else 1.0
+        if name not in STAGES:
+            raise ValueError(f"unknown stage {name!r} (stages: {', '.join(STAGES)})")
+        return name, ServiceTime(kind, mean, cv)
+    except (ValueError, IndexError) as e:
+        raise argparse.ArgumentTypeError(f"Expected NAME=KIND:MEAN_MS[:CV], got {value!r}: {e}")
+
+
+def parse_counts(value: str) -> List[int]:
+    """'8,16,32' or a range 'FIRST-LAST[:STEP]'"""
+    if '-' in value:
+        bounds, _, step = value.partition(':')
+        first, last = bounds.split('-', 1)
+        return list(range(int(first), int(last) + 1, int(step or 1)))
+    return [int(v) for v in value.split(',') if v.strip()]
+
+
+def parse_limits(value: str) -> List[Optional[int]]:
+    return [None if v.strip().lower() == 'none' else int(v) for v in value.split(',') if v.strip()]
+
+
+def build_workload(args) -> Workload:
+    overrides = dict(args.stage or [])
+    stages = {}
+    if args.metrics:
+        metrics = load_metrics(args.metrics)
+        fitted = Workload.from_metrics(metrics, 1.0, kind=args.fit)
+        stages.update(fitted.stages)
+        blocked = fitted.blocked_fraction
+    else:
+        blocked = 0.0
+    stages.update(overrides)
+    missing = [stage for stage in STAGES if stage not in stages]
+    if missing:
+        raise SystemExit(f"No service times for {', '.join(missing)}: pass --metrics or --stage")
+    stages[CHECKS] = stages[CHECKS].scaled(args.checks_scale)
+    stages[UPSTREAM] = stages[UPSTREAM].scaled(args.upstream_scale)
+    if args.blocked_fraction is not None:
+        blocked = args.blocked_fraction
+    return Workload(1.0, stages, blocked, args.arrival, args.burstiness)
+
+
+def _ms(seconds: Optional[float]) -> str:
+    return f"{seconds * 1000:.0f}" if seconds is not None else '-'
+
+
+def _limit(value: Optional[int]) -> str:
+    return str(value) if value is not None else 'none'
+
+
+def print_workload(workload: Workload):
+    print(f"Arrivals: {workload.arrival}  blocked fraction: {workload.blocked_fraction:.3f}")
+    print(f"{'Stage':<10} {'Fit':<12} {'Mean ms':>8} {'CV':>6} {'P50 ms':>8} {'P99 ms':>8} {'KS':>6}")
+    for name, stage in workload.stages.items():
+        info = stage.describe()
+        ks = f"{info['ks_distance']:.3f}" if info['ks_distance'] is not None else '-'
+        print(f"{name:<10} {info['kind']:<12} {info['mean_ms']:>8.1f} {info['cv']:>6.2f} "
+              f"{info['p50_ms']:>8.1f} {info['p99_ms']:>8.1f} {ks:>6}")
+
+
+def print_results(results):
+    print(f"{'Rate':>7} {'Workers':>8} {'Upstream':>9} {'P50 ms':>8} {'P95 ms':>8} {'P99 ms':>8} "
+          f"{'Wait ms':>8} {'Reject':>7} {'Util':>5} {'Stable':>6}")
+    for r in results:
+        print(f"{r.rate:>7.1f} {r.workers:>8} {_limit(r.upstream_concurrency):>9} {_ms(r.p50):>8} "
+              f"{_ms(r.p95):>8} {_ms(r.p99):>8} {_ms(r.mean_queue_wait):>8} {r.rejected_fraction:>7.1%} "
+              f"{r.worker_utilization:>5.2f} {'no' if r.saturated else 'yes':>6}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Capacity model and what-if simulator for /api/chat")
+    parser.add_argument('--metrics', help="Server URL, saved /api/metrics?stages=1 JSON or load_test.py report")
+    parser.add_argument('--stage', action='append', type=parse_stage, metavar='NAME=KIND:MEAN_MS[:CV]',
+                        help="Service time of a stage (checks, upstream) instead of the fitted one")
+    parser.add_argument('--fit', choices=[AUTO, EXPONENTIAL, LOGNORMAL, EMPIRICAL], default=AUTO)
+    parser.add_argument('--blocked-fraction', type=float, help="Override the share of requests blocked")
+    parser.add_argument('--checks-scale', type=float, default=1.0, help="What-if: multiply checks times")
+    parser.add_argument('--upstream-scale', type=float, default=1.0, help="What-if: multiply upstream times")
+    parser.add_argument('--arrival', choices=ARRIVAL_PROCESSES, default=POISSON)
+    parser.add_argument('--burstiness', type=float, default=DEFAULT_BURSTINESS,
+                        help="Squared CV of interarrival times for --arrival bursty")
+    parser.add_argument('--rates', default='10', help="Arrival rates (requests/second)")
+    parser.add_argument('--workers', help="Worker counts to simulate ('8,16,32' or '8-64:4'); "
+                                          "without it, find the fewest workers meeting --p99")
+    parser.add_argument('--upstream-concurrency', default='none',
+                        help="Upstream concurrency limits ('none' for unlimited)")
+    parser.add_argument('--queue-timeout', type=float, help="Seconds a request waits for a worker before a 503")
+    parser.add_argument('--p99', type=float, default=2.0, help="p99 latency target (seconds)")
+    parser.add_argument('--max-rejected', type=float, default=0.0, help="Share of 503s allowed at the target")
+    parser.add_argument('--requests', type=int, default=DEFAULT_REQUESTS, help="Requests per simulated run")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write the JSON report to this path")
+    args = parser.parse_args(argv)
+
+    workload = build_workload(args)
+    print_workload(workload)
+    rates = [float(v) for v in args.rates.split(',') if v.strip()]
+    limits = parse_limits(args.upstream_concurrency)
+    start = time.perf_counter()
+    report = {'workload': workload.describe(), 'p99_target': args.p99}
+    if args.workers:
+        results = sweep(workload, rates, parse_counts(args.workers), limits, args.queue_timeout,
+                        args.requests, args.seed)
+        print_results(results)
+        report['results'] = [r._asdict() for r in results]
+    else:
+        print(f"Fewest workers for p99 <= {args.p99:g} s:")
+        answers = []
+        for rate in rates:
+            for limit in limits:
+                result = required_workers(workload.with_rate(rate), args.p99, limit, args.queue_timeout,
+                                          args.max_rejected, requests=args.requests, seed=args.seed)
+                if result is None:
+                    print(f"  {rate:g} req/s, upstream concurrency {_limit(limit)}: not reachable")
+                else:
+                    print(f"  {rate:g} req/s, upstream concurrency {_limit(limit)}: {result.workers} workers "
+                          f"(p99 {_ms(result.p99)} ms, utilization {result.worker_utilization:.2f})")
+                answers.append({'rate': rate, 'upstream_concurrency': limit,
+                                'result': result._asdict() if result else None})
+        report['required_workers'] = answers
+    print(f"Simulated in {time.perf_counter() - start:.2f}s")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Front dispatcher for multi-worker deployments
+Proxies HTTP requests to app.py worker processes. /api/chat requests with a
+conversation go to that conversation's worker by consistent hashing
+(ConversationAffinity.py), so its incremental scan state stays hot. Other
+requests, and first turns, go to live workers in rotation. A worker that
+refuses connections is taken off the ring and its conversations move to
+their next worker until a health check sees it answer again.
+
+Usage:
+    python3 dispatcher.py --spawn 4                       # start app.py on ports 5001-5004
+    python3 dispatcher.py --worker http://127.0.0.1:5001 --worker http://127.0.0.1:5002 --port 5000
+    curl http://127.0.0.1:5000/dispatcher/status
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from ConversationAffinity import DEFAULT_HEALTH_INTERVAL, DEFAULT_VNODES, NoWorkerAvailable, WorkerRouter
+from ConversationScanner import conversation_key
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Seconds to wait for a worker's response (chat requests include the upstream completion)
+DEFAULT_FORWARD_TIMEOUT = 300.0
+DEFAULT_CONNECT_TIMEOUT = 2.0
+STATUS_PATH = '/dispatcher/status'
+WORKER_HEADER = 'X-Ethical-Worker'
+
+# Not forwarded in either direction (RFC 7230 section 6.1)
+HOP_BY_HOP_HEADERS = {'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization', 'te',
+                      'trailers', 'transfer-encoding', 'upgrade'}
+# Response headers the dispatcher sets itself
+OWN_RESPONSE_HEADERS = {'content-length', 'date', 'server'}
+
+
+def request_key(method: str, path: str, body: bytes) -> Optional[str]:
+    """Conversation key of a /api/chat request (as ConversationScanner keys it), else None"""
+    if method != 'POST' or urlsplit(path).path != '/api/chat':
+        return None
+    try:
+        data = json.loads(body or b'{}')
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    context = data.get('context')
+    parameters = data.get('parameters')
+    return conversation_key(context if isinstance(context, list) else None,
+                            parameters if isinstance(parameters, dict) else None)
+
+
+def http_health_check(timeout: float = DEFAULT_CONNECT_TIMEOUT):
+    """Health check answering whether a worker's /api/status responds"""
+    def check(worker: str) -> bool:
+        try:
+            with urllib.request.urlopen(worker.rstrip('/') + '/api/status', timeout=timeout):
+                return True
+        except urllib.error.HTTPError:
+            # It answered, if not with 200
+            return True
+        except (urllib.error.URLError, OSError):
+            return False
+    return check
+
+
+class _WorkerUnreachable(Exception):
+    pass
+
+
+def _forward(worker: str, method: str, path: str, headers, body: bytes, timeout: float):
+    """(status, headers, body) from the worker; _WorkerUnreachable if it refuses the connection"""
+    parts = urlsplit(worker)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=DEFAULT_CONNECT_TIMEOUT)
+    try:
+        try:
+            connection.connect()
+        except OSError as e:
+            raise _WorkerUnreachable(f"{type(e).__name__}: {e}") from None
+        # Past this point the worker may have acted on the request, so it is not retried elsewhere
+        connection.sock.settimeout(timeout)
+        connection.request(method, path, body=body or None, headers=headers)
+        response = connection.getresponse()
+        return response.status, response.getheaders(), response.read()
+    finally:
+        connection.close()
+
+
+def make_handler(router: WorkerRouter, timeout: float = DEFAULT_FORWARD_TIMEOUT):
+    class DispatchHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _reply(self, status: int, headers, body: bytes, worker: Optional[str] = None):
+            self.send_response(status)
+            for name, value in headers:
+                if name.lower() not in HOP_BY_HOP_HEADERS and name.lower() not in OWN_RESPONSE_HEADERS:
+                    self.send_header(name, value)
+            if worker is not None:
+                self.send_header(WORKER_HEADER, worker)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if self.command != 'HEAD':
+                self.wfile.write(body)
+
+        def _reply_json(self, status: int, payload, extra_headers=()):
+            self._reply(status, [('Content-Type', 'application/json')] + list(extra_headers),
+                        json.dumps(payload).encode('utf-8'))
+
+        def _dispatch(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length) if length else b''
+            if self.command == 'GET' and urlsplit(self.path).path == STATUS_PATH:
+                self._reply_json(200, router.status())
+                return
+            headers = {name: value for name, value in self.headers.items()
+                       if name.lower() not in HOP_BY_HOP_HEADERS and name.lower() != 'host'}
+            key = request_key(self.command, self.path, body)
+            try:
+                candidates = router.route(key)
+            except NoWorkerAvailable as e:
+                self._reply_json(503, {'error': str(e)}, [('Retry-After', '1')])
+                return
+            # Deep analysis is kept by the worker that served the request: ask each until one has it
+            fan_out = urlsplit(self.path).path.startswith('/api/analysis/')
+            result = None
+            for attempt, worker in enumerate(candidates):
+                try:
+                    result = _forward(worker, self.command, self.path, headers, body, timeout)
+                except _WorkerUnreachable as e:
+                    router.mark_down(worker, str(e))
+                    continue
+                except OSError as e:
+                    router.mark_down(worker, f"{type(e).__name__}: {e}")
+                    self._reply_json(502, {'error': f"Worker {worker} failed: {e}"})
+                    return
+                if fan_out and result[0] == 404 and attempt < len(candidates) - 1:
+                    continue
+                router.record(worker, key, 0 if fan_out else attempt)
+                self._reply(*result, worker=worker)
+                return
+            if result is not None:
+                self._reply(*result)
+            else:
+                self._reply_json(503, {'error': "No worker accepted the request"}, [('Retry-After', '1')])
+
+        do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = do_OPTIONS = _dispatch
+
+    return DispatchHandler
+
+
+def start_dispatcher(router: WorkerRouter, host: str = '127.0.0.1', port: int = 0,
+                     timeout: float = DEFAULT_FORWARD_TIMEOUT) -> ThreadingHTTPServer:
+    """Serve the dispatcher on a daemon thread (port 0 picks a free port)"""
+    server = ThreadingHTTPServer((host, port), make_handler(router, timeout))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='dispatcher', daemon=True).start()
+    return server
+
+
+def spawn_workers(count: int, base_port: int, timeout: float = 60.0) -> List[Tuple[str, subprocess.Popen]]:
+    """Start count app.py workers on consecutive ports and wait until each answers"""
+    workers = []
+    for port in range(base_port, base_port + count):
+        env = dict(os.environ, PORT=str(port), FLASK_DEBUG='0')
+        proc = subprocess.Popen([sys.executable, os.path.join(ROOT_DIR, 'app.py')], env=env, cwd=ROOT_DIR)
+        workers.append((f"http://127.0.0.1:{port}", proc))
+    check = http_health_check(timeout=1.0)
+    deadline = time.time() + timeout
+    for url, proc in workers:
+        while not check(url):
+            if proc.poll() is not None or time.time() > deadline:
+                for _, other in workers:
+                    other.terminate()
+                raise RuntimeError(f"Worker {url} did not start")
+            time.sleep(0.2)
+    return workers
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Front dispatcher with conversation affinity for app.py workers")
+    parser.add_argument('--worker', action='append', default=[], help="Worker base URL (repeatable)")
+    parser.add_argument('--spawn', type=int, default=0, help="Start this many app.py workers")
+    parser.add_argument('--base-port', type=int, default=5001, help="First port for --spawn workers")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=int(os.getenv('PORT', '5000')))
+    parser.add_argument('--vnodes', type=int, default=DEFAULT_VNODES, help="Ring points per worker")
+    parser.add_argument('--health-interval', type=float, default=DEFAULT_HEALTH_INTERVAL,
+                        help="Seconds between checks of workers marked down")
+    parser.add_argument('--timeout', type=float, default=DEFAULT_FORWARD_TIMEOUT,
+                        help="Seconds to wait for a worker's response")
+    args = parser.parse_args(argv)
+
+    spawned = []
+    if args.spawn:
+        try:
+            spawned = spawn_workers(args.spawn, args.base_port)
+        except RuntimeError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+    workers = args.worker + [url for url, _ in spawned]
+    if not workers:
+        parser.error("pass --worker URL or --spawn N")
+
+    router = WorkerRouter(workers, args.vnodes, http_health_check(), args.health_interval)
+    router.start_health_checks()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(router, args.timeout))
+    server.daemon_threads = True
+    print(f"✓ Dispatching to {len(workers)} workers on {args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        router.stop()
+        for _, proc in spawned:
+            proc.terminate()
+        for _, proc in spawned:
+            proc.wait()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Run the shared harm detection service
+Serves one warmed HarmDetectionLayer on a Unix domain socket; Flask workers
+started with ETHICAL_HARM_SERVICE=<socket path> send their harm analysis to it
+(see HarmDetectionService.py) and fall back to in-process analysis while it
+is down.
+
+Usage:
+    python3 harm_service.py
+    python3 harm_service.py --socket /run/ethical/harm.sock --batch-window 0.001
+    ETHICAL_HARM_SERVICE=/run/ethical/harm.sock python3 app.py
+"""
+import argparse
+import os
+import signal
+import sys
+import time
+from typing import List, Optional
+
+from HarmDetectionService import (BATCH_WINDOW_ENV_VAR, DEFAULT_BATCH_WINDOW, DEFAULT_MAX_BATCH,
+                                  DEFAULT_SOCKET_PATH, SOCKET_ENV_VAR, HarmDetectionServer)
+from ScalabilitySystem import frequent_prompts, warmup_enabled
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Shared harm detection service on a Unix socket")
+    parser.add_argument('--socket', default=os.getenv(SOCKET_ENV_VAR) or DEFAULT_SOCKET_PATH,
+                        help="Socket path (workers set ETHICAL_HARM_SERVICE to the same path)")
+    parser.add_argument('--batch-window', type=float,
+                        default=float(os.getenv(BATCH_WINDOW_ENV_VAR, DEFAULT_BATCH_WINDOW)),
+                        help="Seconds to wait for more requests once one is queued (0: no wait)")
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH, help="Requests per batch at most")
+    args = parser.parse_args(argv)
+
+    server = HarmDetectionServer(args.socket, batch_window=args.batch_window, max_batch=args.max_batch)
+    # Warm the lexicon token cache from recorded traffic (ETHICAL_WARMUP_CAPTURE; ETHICAL_WARMUP=0 skips it)
+    if warmup_enabled():
+        start = time.perf_counter()
+        prompts = server.warm_up(frequent_prompts())
+        print(f"✓ Warm-up: {prompts} prompts in {time.perf_counter() - start:.3f}s")
+    server.detector.lexicon_store.start_watching()
+    try:
+        server.start()
+    except OSError as e:
+        print(f"Error: could not listen on {args.socket}: {e}", file=sys.stderr)
+        return 1
+    print(f"✓ Harm detection service listening on {args.socket}")
+    # Stop cleanly (removing the socket file) on SIGTERM as on Ctrl-C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Compile and publish keyword lexicons
+Compiles a lexicon source file into a versioned automaton image and repoints
+its <name>.current pointer at it; running workers swap to the new image on their
+next check without a restart. `show` prints the image workers are serving.
+
+Usage:
+    python3 lexicon_build.py compile
+    python3 lexicon_build.py compile --source lexicons/harm_lexicon.txt --image-dir lexicons/compiled
+    python3 lexicon_build.py show
+"""
+import argparse
+import json
+import os
+import sys
+from typing import List, Optional
+
+from CompiledLexicon import (DEFAULT_IMAGE_DIR, DEFAULT_SOURCE, IMAGE_DIR_ENV_VAR, SOURCE_ENV_VAR,
+                             CompiledLexicon, LexiconError, LexiconStore, publish)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compile and publish keyword lexicons")
+    parser.add_argument('command', choices=['compile', 'show'])
+    parser.add_argument('--source', default=os.getenv(SOURCE_ENV_VAR, DEFAULT_SOURCE),
+                        help="Lexicon source file")
+    parser.add_argument('--image-dir', default=os.getenv(IMAGE_DIR_ENV_VAR, DEFAULT_IMAGE_DIR),
+                        help="Directory holding compiled images and their pointers")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'compile':
+            path = publish(args.source, args.image_dir)
+            info = CompiledLexicon.open(path).info()
+        else:
+            info = LexiconStore(args.source, args.image_dir).current().info()
+    except (OSError, LexiconError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    sys.stdout.write(json.dumps(info, indent=2) + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,590 @@
+#!/usr/bin/env python3
+"""
+Load Testing Tool for the /api/chat endpoint
+Starts a local stub OpenAI-compatible completion server so the full Flask
+pipeline can be exercised end to end without calling OpenRouter.
+
+Usage:
+    python3 load_test.py --corpus requests.jsonl --mode closed --concurrency 1,2,4,8
+    python3 load_test.py --mode open --rates 2,5,10 --duration 20 --profile slow
+    python3 load_test.py --concurrency 32 --crisis-fraction 0.05   # per-lane SLO report
+    python3 load_test.py --route-profiles fast,typical,slow         # model routing report
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ModelRouter import ROUTER_CONFIG_ENV_VAR
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Upstream latency profiles: time to first token, jitter around it, generation
+# speed and the number of completion tokens returned per request
+LATENCY_PROFILES = {
+    'instant': {'base_latency': 0.0, 'jitter': 0.0, 'tokens_per_second': 0.0, 'completion_tokens': 16},
+    'fast': {'base_latency': 0.02, 'jitter': 0.01, 'tokens_per_second': 2000.0, 'completion_tokens': 64},
+    'typical': {'base_latency': 0.35, 'jitter': 0.15, 'tokens_per_second': 80.0, 'completion_tokens': 120},
+    'slow': {'base_latency': 1.5, 'jitter': 0.5, 'tokens_per_second': 25.0, 'completion_tokens': 200},
+}
+
+DEFAULT_PROMPTS = [
+    "What is artificial intelligence?",
+    "Explain machine learning",
+    "What are the ethical implications of AI?",
+    "How can aid organisations coordinate during a humanitarian crisis?",
+    "Summarise the principles of harm prevention",
+]
+
+# Record fields tried, in order, when reading prompts from a JSONL corpus
+CORPUS_FIELDS = ('message', 'prompt', 'input', 'body', 'title')
+
+
+class StubUpstreamServer:
+    """
+    Local OpenAI-compatible chat completion server
+    Serves /v1/chat/completions (streaming and non-streaming) with a
+    configurable latency and token-rate profile. Faults: error_rate fails
+    requests with a 500; stall_rate (or stall_next) delays the first token of
+    requests by stall_seconds.
+    """
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, profile: str = 'typical',
+                 error_rate: float = 0.0, seed: Optional[int] = None, stall_rate: float = 0.0,
+                 stall_seconds: float = 0.0, **overrides):
+        if profile not in LATENCY_PROFILES:
+            raise ValueError(f"Unknown latency profile: {profile}")
+        self.profile = dict(LATENCY_PROFILES[profile])
+        self.profile.update({k: v for k, v in overrides.items() if v is not None})
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self.random = random.Random(seed)
+        self.requests_served = 0
+        self.errors_injected = 0
+        self.stalls_injected = 0
+        self._stalls_pending = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> 'StubUpstreamServer':
+        """Start serving on a background thread"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and release the socket"""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def stall_next(self, count: int = 1, seconds: Optional[float] = None):
+        """Stall the next count requests (by seconds, default stall_seconds)"""
+        with self._lock:
+            self._stalls_pending += count
+            if seconds is not None:
+                self.stall_seconds = seconds
+
+    def plan_response(self, max_tokens: Optional[int]) -> Tuple[float, int, float, bool]:
+        """Draw time to first token, token count, generation time and error flag for one request"""
+        with self._lock:
+            self.requests_served += 1
+            jitter = self.random.uniform(-self.profile['jitter'], self.profile['jitter'])
+            fail = self.random.random() < self.error_rate
+            if fail:
+                self.errors_injected += 1
+            stall = self._stalls_pending > 0 or self.random.random() < self.stall_rate
+            if stall:
+                self._stalls_pending = max(0, self._stalls_pending - 1)
+                self.stalls_injected += 1
+        ttft = max(0.0, self.profile['base_latency'] + jitter) + (self.stall_seconds if stall else 0.0)
+        tokens = self.profile['completion_tokens']
+        if max_tokens:
+            tokens = max(1, min(tokens, int(max_tokens)))
+        rate = self.profile['tokens_per_second']
+        generation_time = tokens / rate if rate > 0 else 0.0
+        return ttft, tokens, generation_time, fail
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                if not self.path.rstrip('/').endswith('/chat/completions'):
+                    self._send_json(404, {'error': {'message': 'Not found'}})
+                    return
+                length = int(self.headers.get('Content-Length') or 0)
+                try:
+                    body = json.loads(self.rfile.read(length) or b'{}')
+                except ValueError:
+                    self._send_json(400, {'error': {'message': 'Invalid JSON'}})
+                    return
+
+                ttft, tokens, generation_time, fail = stub.plan_response(body.get('max_tokens'))
+                time.sleep(ttft)
+                if fail:
+                    self._send_json(500, {'error': {'message': 'Injected upstream error', 'type': 'server_error'}})
+                    return
+
+                model = body.get('model') or 'stub-model'
+                completion_id = f"chatcmpl-stub-{stub.requests_served}"
+                if body.get('stream'):
+                    self._stream(completion_id, model, tokens, generation_time)
+                    return
+
+                time.sleep(generation_time)
+                prompt_tokens = sum(len(str(m.get('content', '')).split()) for m in body.get('messages', []))
+                self._send_json(200, {
+                    'id': completion_id,
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': model,
+                    'choices': [{
+                        'index': 0,
+                        'message': {'role': 'assistant', 'content': _stub_text(tokens)},
+                        'finish_reason': 'stop'
+                    }],
+                    'usage': {
+                        'prompt_tokens': prompt_tokens,
+                        'completion_tokens': tokens,
+                        'total_tokens': prompt_tokens + tokens
+                    }
+                })
+
+            def _stream(self, completion_id, model, tokens, generation_time):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Cache-Control', 'no-cache')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                per_token = generation_time / tokens if tokens else 0.0
+                created = int(time.time())
+                for index in range(tokens):
+                    if index and per_token:
+                        time.sleep(per_token)
+                    self._send_event({
+                        'id': completion_id,
+                        'object': 'chat.completion.chunk',
+                        'created': created,
+                        'model': model,
+                        'choices': [{'index': 0, 'delta': {'content': 'stub '}, 'finish_reason': None}]
+                    })
+                self._send_event({
+                    'id': completion_id,
+                    'object': 'chat.completion.chunk',
+                    'created': created,
+                    'model': model,
+                    'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]
+                })
+                self.wfile.write(b'data: [DONE]\n\n')
+                self.wfile.flush()
+                self.close_connection = True
+
+            def _send_event(self, payload):
+                self.wfile.write(b'data: ' + json.dumps(payload).encode('utf-8') + b'\n\n')
+                self.wfile.flush()
+
+            def _send_json(self, status, payload):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+def _stub_text(tokens: int) -> str:
+    """Build a completion body of roughly the given token count"""
+    return ' '.join(['stub'] * tokens)
+
+
+def load_prompt_corpus(path: Optional[str]) -> List[str]:
+    """Load prompts from a JSONL corpus, falling back to built-in prompts"""
+    if not path or not os.path.exists(path):
+        return list(DEFAULT_PROMPTS)
+    prompts = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, str):
+                prompts.append(record)
+                continue
+            for field in CORPUS_FIELDS:
+                value = record.get(field) if isinstance(record, dict) else None
+                if isinstance(value, str) and value.strip():
+                    prompts.append(value)
+                    break
+    return prompts or list(DEFAULT_PROMPTS)
+
+
+def make_chat_sender(target: str, parameters: Optional[Dict] = None,
+                     timeout: float = 60.0) -> Callable[[str], bool]:
+    """Build a send function that posts one prompt to /api/chat and reports success"""
+    url = target.rstrip('/') + '/api/chat'
+    parameters = parameters or {}
+
+    def send(message: str) -> bool:
+        payload = json.dumps({'message': message, 'context': [], 'parameters': parameters}).encode('utf-8')
+        req = urllib.request.Request(url, data=payload, headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as resp:
+                body = json.loads(resp.read() or b'{}')
+                return resp.status == 200 and 'error' not in body
+        except (urllib.error.URLError, OSError, ValueError):
+            return False
+
+    return send
+
+
+def mix_senders(normal: Callable[[str], bool], crisis: Callable[[str], bool], crisis_fraction: float,
+                seed: Optional[int] = None) -> Callable[[str], bool]:
+    """Send a random crisis_fraction of requests with the crisis sender"""
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    def send(message: str) -> bool:
+        with lock:
+            use_crisis = rng.random() < crisis_fraction
+        return (crisis if use_crisis else normal)(message)
+
+    return send
+
+
+def fetch_status(target: str, timeout: float = 10.0) -> Dict[str, Any]:
+    """The server's /api/status (per-lane SLO metrics, model router averages)"""
+    with urllib.request.urlopen(target.rstrip('/') + '/api/status', timeout=timeout) as resp:
+        return json.loads(resp.read() or b'{}')
+
+
+def fetch_stage_samples(target: str, timeout: float = 10.0) -> Dict[str, Any]:
+    """The server's recorded per-stage service times (empty if monitoring is off)"""
+    try:
+        with urllib.request.urlopen(target.rstrip('/') + '/api/metrics?stages=1', timeout=timeout) as resp:
+            return json.loads(resp.read() or b'{}').get('stage_samples', {})
+    except urllib.error.HTTPError:
+        return {}
+
+
+def write_router_config(stubs: Dict[str, 'StubUpstreamServer'], policy: str) -> str:
+    """Model router config with one candidate per stub endpoint; returns its path"""
+    models = [{'name': f"stub-{name}", 'base_url': stub.base_url, 'api_key': 'stub-key'}
+              for name, stub in stubs.items()]
+    with tempfile.NamedTemporaryFile('w', suffix='.json', prefix='router-', delete=False) as f:
+        json.dump({'policy': policy, 'probe_interval': 5.0, 'models': models}, f)
+    return f.name
+
+
+def run_closed_loop(send: Callable[[str], bool], prompts: List[str], concurrency: int,
+                    total_requests: Optional[int] = None, duration: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Closed-loop load: each of `concurrency` workers sends its next request as soon
+    as the previous one completes
+    """
+    if total_requests is None and duration is None:
+        raise ValueError("Either total_requests or duration is required")
+    counter = itertools.count()
+    samples = []
+    lock = threading.Lock()
+    start = time.perf_counter()
+    deadline = start + duration if duration is not None else None
+
+    def worker():
+        while True:
+            index = next(counter)
+            if total_requests is not None and index >= total_requests:
+                return
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            t0 = time.perf_counter()
+            ok = send(prompts[index % len(prompts)])
+            elapsed = time.perf_counter() - t0
+            with lock:
+                samples.append((elapsed, ok))
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    result = summarize(samples, time.perf_counter() - start)
+    result.update({'mode': 'closed', 'concurrency': concurrency})
+    return result
+
+
+def run_open_loop(send: Callable[[str], bool], prompts: List[str], rate: float, duration: float,
+                  max_outstanding: int = 256, seed: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Open-loop load: requests arrive as a Poisson process at `rate` per second
+    regardless of how quickly earlier ones complete. Latency is measured from the
+    scheduled arrival so queueing delay is not hidden (no coordinated omission).
+    """
+    rng = random.Random(seed)
+    samples = []
+    lock = threading.Lock()
+    dropped = 0
+    start = time.perf_counter()
+
+    def issue(message, scheduled):
+        ok = send(message)
+        elapsed = time.perf_counter() - scheduled
+        with lock:
+            samples.append((elapsed, ok))
+
+    with ThreadPoolExecutor(max_workers=max_outstanding) as pool:
+        outstanding = []
+        scheduled = start
+        index = 0
+        while True:
+            scheduled += rng.expovariate(rate)
+            if scheduled - start >= duration:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            outstanding = [f for f in outstanding if not f.done()]
+            if len(outstanding) >= max_outstanding:
+                dropped += 1
+                with lock:
+                    samples.append((time.perf_counter() - scheduled, False))
+                continue
+            outstanding.append(pool.submit(issue, prompts[index % len(prompts)], scheduled))
+            index += 1
+    result = summarize(samples, time.perf_counter() - start)
+    result.update({'mode': 'open', 'offered_rate': rate, 'dropped': dropped})
+    return result
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(samples: List[Tuple[float, bool]], wall_time: float) -> Dict[str, Any]:
+    """Summarize (latency, ok) samples into throughput, error rate and latency percentiles"""
+    latencies = sorted(latency for latency, _ in samples)
+    errors = sum(1 for _, ok in samples if not ok)
+    total = len(samples)
+    return {
+        'requests': total,
+        'errors': errors,
+        'error_rate': errors / total if total else 0.0,
+        'throughput': (total - errors) / wall_time if wall_time > 0 else 0.0,
+        'wall_time': wall_time,
+        'latency': {
+            'mean': sum(latencies) / total if total else 0.0,
+            'p50': percentile(latencies, 0.50),
+            'p90': percentile(latencies, 0.90),
+            'p95': percentile(latencies, 0.95),
+            'p99': percentile(latencies, 0.99),
+            'max': latencies[-1] if latencies else 0.0
+        }
+    }
+
+
+def start_app(upstream_url: str, port: int, timeout: float = 60.0,
+              extra_env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+    """Start app.py in a subprocess pointed at the stub upstream and wait until it answers"""
+    env = dict(os.environ)
+    env.update({
+        'OPENROUTER_BASE_URL': upstream_url,
+        'OPENROUTER_API_KEY': env.get('OPENROUTER_API_KEY') or 'stub-key',
+        'OPENROUTER_MODEL': env.get('OPENROUTER_MODEL') or 'stub-model',
+        'PORT': str(port),
+        'FLASK_DEBUG': '0',
+    })
+    env.update(extra_env or {})
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT_DIR, 'app.py')], env=env, cwd=ROOT_DIR,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    status_url = f"http://127.0.0.1:{port}/api/status"
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"app.py exited with code {proc.returncode}")
+        try:
+            with urllib.request.urlopen(status_url, timeout=1.0):
+                return proc
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("app.py did not become ready in time")
+
+
+def print_report(results: List[Dict[str, Any]]):
+    """Print a table of load levels"""
+    print("=" * 86)
+    print("LOAD TEST REPORT")
+    print("=" * 86)
+    print(f"{'level':>8} {'requests':>9} {'errors':>7} {'err%':>6} {'rps':>8} "
+          f"{'p50 ms':>8} {'p90 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for result in results:
+        level = result['concurrency'] if result['mode'] == 'closed' else result['offered_rate']
+        latency = result['latency']
+        print(f"{level:>8} {result['requests']:>9} {result['errors']:>7} {result['error_rate'] * 100:>5.1f}% "
+              f"{result['throughput']:>8.2f} {latency['p50'] * 1000:>8.1f} {latency['p90'] * 1000:>8.1f} "
+              f"{latency['p95'] * 1000:>8.1f} {latency['p99'] * 1000:>8.1f} {latency['max'] * 1000:>8.1f}")
+    print("=" * 86)
+
+
+def print_lane_report(lanes: Dict[str, Any]):
+    """Print the server's per-lane latency SLO metrics"""
+    print(f"{'lane':>8} {'done':>7} {'shed':>6} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+          f"{'wait p99':>9} {'budget':>7} {'in budget':>10}")
+    for name, lane in sorted(lanes.items()):
+        latency = lane['latency_ms']
+        budget = f"{lane['budget_ms']:.1f}" if lane.get('budget_ms') is not None else '-'
+        within = f"{lane['within_budget'] * 100:.1f}%" if 'within_budget' in lane else '-'
+        print(f"{name:>8} {lane['completed']:>7} {lane['rejected']:>6} {latency['p50']:>8.2f} "
+              f"{latency['p99']:>8.2f} {latency['max']:>8.2f} {lane['queue_wait_ms']['p99']:>9.2f} "
+              f"{budget:>7} {within:>10}")
+    print("=" * 86)
+
+
+def print_router_report(router: Dict[str, Any]):
+    """Print the server's per-model routing averages"""
+    print(f"MODEL ROUTING (policy={router['policy']})")
+    print(f"{'model':>16} {'requests':>9} {'errors':>7} {'latency ms':>11} {'ttft ms':>8} {'err rate':>9}")
+    for name, model in router['models'].items():
+        latency = f"{model['latency_ms']:.1f}" if model['latency_ms'] is not None else '-'
+        ttft = f"{model['ttft_ms']:.1f}" if model['ttft_ms'] is not None else '-'
+        print(f"{name:>16} {model['requests']:>9} {model['errors']:>7} {latency:>11} {ttft:>8} "
+              f"{model['error_rate']:>9.2f}")
+    print("=" * 86)
+
+
+def _parse_levels(value: str) -> List[float]:
+    return [float(v) for v in value.split(',') if v.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test /api/chat against a stub upstream")
+    parser.add_argument('--corpus', default=os.path.join(ROOT_DIR, 'requests.jsonl'),
+                        help="JSONL prompt corpus (message/prompt/input/body/title field)")
+    parser.add_argument('--mode', choices=['closed', 'open'], default='closed')
+    parser.add_argument('--concurrency', default='1,2,4,8', help="Closed-loop concurrency levels")
+    parser.add_argument('--rates', default='1,2,5,10', help="Open-loop arrival rates (requests/second)")
+    parser.add_argument('--requests', type=int, default=50, help="Requests per closed-loop level")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds per open-loop level")
+    parser.add_argument('--profile', choices=sorted(LATENCY_PROFILES), default='typical')
+    parser.add_argument('--base-latency', type=float, help="Override time to first token (seconds)")
+    parser.add_argument('--jitter', type=float, help="Override latency jitter (seconds)")
+    parser.add_argument('--tokens-per-second', type=float, help="Override generation speed")
+    parser.add_argument('--completion-tokens', type=int, help="Override completion length")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of upstream calls that fail")
+    parser.add_argument('--stall-rate', type=float, default=0.0,
+                        help="Fraction of upstream calls whose first token is delayed by --stall-seconds")
+    parser.add_argument('--stall-seconds', type=float, default=5.0)
+    parser.add_argument('--parameters', default='{}', help="JSON parameters sent with every request")
+    parser.add_argument('--crisis-fraction', type=float, default=0.0,
+                        help="Fraction of requests sent in crisis mode (reports per-lane SLOs)")
+    parser.add_argument('--route-profiles',
+                        help="Comma-separated latency profiles: one stub endpoint per profile, "
+                             "routed between by the app's model router")
+    parser.add_argument('--route-policy', default='fastest', help="Model routing policy")
+    parser.add_argument('--target', help="Use an already running server instead of starting app.py")
+    parser.add_argument('--app-port', type=int, default=5055)
+    parser.add_argument('--output', help="Write the JSON report to this path")
+    args = parser.parse_args(argv)
+
+    prompts = load_prompt_corpus(args.corpus)
+    parameters = json.loads(args.parameters)
+
+    stub = StubUpstreamServer(profile=args.profile, error_rate=args.error_rate,
+                              stall_rate=args.stall_rate, stall_seconds=args.stall_seconds,
+                              base_latency=args.base_latency, jitter=args.jitter,
+                              tokens_per_second=args.tokens_per_second,
+                              completion_tokens=args.completion_tokens).start()
+    routed = {name: StubUpstreamServer(profile=name, error_rate=args.error_rate, stall_rate=args.stall_rate,
+                                       stall_seconds=args.stall_seconds).start()
+              for name in (args.route_profiles or '').split(',') if name}
+    router_config = write_router_config(routed, args.route_policy) if routed else None
+    app_proc = None
+    try:
+        target = args.target
+        if not target:
+            extra_env = {ROUTER_CONFIG_ENV_VAR: router_config} if router_config else None
+            app_proc = start_app(stub.base_url, args.app_port, extra_env=extra_env)
+            target = f"http://127.0.0.1:{args.app_port}"
+        print(f"Upstream stub: {stub.base_url} (profile={args.profile})")
+        for name, routed_stub in routed.items():
+            print(f"Routed stub: {routed_stub.base_url} (profile={name})")
+        print(f"Target: {target}  prompts: {len(prompts)}")
+
+        send = make_chat_sender(target, parameters)
+        if args.crisis_fraction > 0:
+            crisis_send = make_chat_sender(target, dict(parameters, crisis_mode=True))
+            send = mix_senders(send, crisis_send, args.crisis_fraction)
+        results = []
+        if args.mode == 'closed':
+            for level in _parse_levels(args.concurrency):
+                results.append(run_closed_loop(send, prompts, int(level), total_requests=args.requests))
+        else:
+            for level in _parse_levels(args.rates):
+                results.append(run_open_loop(send, prompts, level, args.duration))
+        print_report(results)
+        status = fetch_status(target)
+        lanes = status.get('lanes', {})
+        if lanes:
+            print_lane_report(lanes)
+        if routed and 'model_router' in status:
+            print_router_report(status['model_router'])
+
+        if args.output:
+            with open(args.output, 'w') as f:
+                # stage_samples: input for capacity_plan.py --metrics
+                json.dump({'profile': stub.profile, 'error_rate': args.error_rate, 'results': results,
+                           'lanes': lanes, 'model_router': status.get('model_router'),
+                           'stage_samples': fetch_stage_samples(target)}, f, indent=2)
+    finally:
+        if app_proc is not None:
+            app_proc.terminate()
+            app_proc.wait(timeout=10)
+        stub.stop()
+        for routed_stub in routed.values():
+            routed_stub.stop()
+        if router_config:
+            os.unlink(router_config)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
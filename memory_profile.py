@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Memory Profiling Mode for the ethical processing pipeline
+Takes tracemalloc snapshots around each pipeline layer to attribute allocated
+bytes and object counts to subsystems, and detects memory growth across
+repeated requests (unbounded history lists, caches without eviction).
+
+Usage:
+    python3 memory_profile.py --requests 20 --growth 200
+    python3 memory_profile.py --target app --format text --output memory_report.txt
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+_THIS_FILE = os.path.abspath(__file__)
+sys.path.insert(0, ROOT_DIR)
+
+# Pipeline layers of IntegratedEthicalProcessor: (layer name, attribute path
+# from the processor to the owning object, method name)
+PIPELINE_LAYERS = [
+    ('harm_detection', 'harm_detector', 'analyze'),
+    ('instruction_validation', 'instruction_validator', 'validate'),
+    ('system_integrity', 'integrity_checker', 'check'),
+    ('wellbeing_assessment', '', 'assess_wellbeing'),
+    ('ethical_context', 'ethical_context', 'maintain_context'),
+    ('core_processor', 'core_processor.ethical_observer', 'maintain_observation'),
+    ('bias_detection', 'bias_detector.cognitive_detector', 'detect_cognitive_bias'),
+    ('value_resolver', 'value_resolver.resolution_engine', 'resolve_conflict'),
+    ('distributed_ethics', 'distributed_ethics.integrity_maintainer', 'check_global_consistency'),
+    ('error_recovery', 'error_recovery.state_recovery', 'assess_state'),
+    ('ethical_security', 'ethical_security.integrity_protector', 'protect_parameters'),
+    ('realtime_decision', 'realtime_decision.fast_path_processor', 'assess_quickly'),
+    ('ethical_memory', 'ethical_memory.experience_processor', 'process_experience'),
+    ('ethical_learner', 'ethical_learner.principle_learner', 'learn_from_experience'),
+]
+
+DEFAULT_PROMPTS = [
+    "What is AI?",
+    "Explain machine learning",
+    "How does neural networks work?",
+    "What are the ethical implications of AI?",
+    "Tell me about crisis management",
+]
+
+GROWTH_TRACEBACK_FRAMES = 25
+
+_SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, _THIS_FILE),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+]
+
+
+def _display_path(filename: str) -> str:
+    """Stable, machine-independent name for a source file"""
+    if filename.startswith(ROOT_DIR + os.sep):
+        return os.path.relpath(filename, ROOT_DIR)
+    parts = filename.replace('\\', '/').split('/')
+    if 'site-packages' in parts:
+        return '<site-packages>/' + '/'.join(parts[parts.index('site-packages') + 1:])
+    if len(parts) >= 2 and parts[-2].startswith('python'):
+        return '<stdlib>/' + parts[-1]
+    return '/'.join(parts[-2:])
+
+
+def _snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+
+def _resolve(obj: Any, path: str) -> Any:
+    for name in filter(None, path.split('.')):
+        obj = getattr(obj, name, None)
+        if obj is None:
+            return None
+    return obj
+
+
+class LayerStats:
+    """Accumulated allocation statistics for one pipeline layer"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retained_bytes = 0
+        self.retained_blocks = 0
+        self.freed_bytes = 0
+        self.max_peak_bytes = 0
+        self.modules = {}
+
+    def record(self, diff: List[tracemalloc.StatisticDiff], peak_bytes: int, failed: bool):
+        self.calls += 1
+        self.errors += int(failed)
+        self.max_peak_bytes = max(self.max_peak_bytes, peak_bytes)
+        for stat in diff:
+            if stat.size_diff <= 0:
+                # Objects from earlier work released while this layer ran
+                self.freed_bytes -= stat.size_diff
+                continue
+            self.retained_bytes += stat.size_diff
+            self.retained_blocks += max(0, stat.count_diff)
+            module = _display_path(stat.traceback[0].filename)
+            entry = self.modules.setdefault(module, {'bytes': 0, 'blocks': 0})
+            entry['bytes'] += stat.size_diff
+            entry['blocks'] += max(0, stat.count_diff)
+
+    def to_dict(self) -> Dict[str, Any]:
+        calls = self.calls or 1
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'retained_bytes': self.retained_bytes,
+            'retained_blocks': self.retained_blocks,
+            'retained_bytes_per_call': self.retained_bytes // calls,
+            'retained_blocks_per_call': self.retained_blocks // calls,
+            'freed_bytes': self.freed_bytes,
+            'max_peak_bytes': self.max_peak_bytes,
+            'modules': {name: self.modules[name] for name in sorted(self.modules)}
+        }
+
+
+class PipelineMemoryProfiler:
+    """
+    Wraps each pipeline layer of an IntegratedEthicalProcessor with tracemalloc
+    snapshots. Retained bytes/blocks are what a layer allocated and left alive
+    (its result tree, caches, history), attributed to the allocating module;
+    peak bytes also include its temporaries.
+    """
+
+    def __init__(self, processor, layers: Optional[List] = None):
+        self.processor = processor
+        self.layers = layers if layers is not None else PIPELINE_LAYERS
+        self.stats = {}
+        self._patched = []
+
+    def instrument(self):
+        """Shadow every available layer method with a measuring wrapper"""
+        # Prime the snapshot filters so their pattern compilation is not
+        # charged to the first layer
+        _snapshot()
+        for name, path, method in self.layers:
+            owner = _resolve(self.processor, path)
+            original = getattr(owner, method, None) if owner is not None else None
+            if original is None:
+                continue
+            self.stats[name] = LayerStats()
+            setattr(owner, method, self._wrap(name, original))
+            self._patched.append((owner, method))
+        self._rebind()
+
+    def restore(self):
+        """Remove the wrappers"""
+        for owner, method in self._patched:
+            owner.__dict__.pop(method, None)
+        self._patched = []
+        self._rebind()
+
+    def _rebind(self):
+        # The compiled pipeline holds bound methods; pick up the (un)wrapped ones
+        if hasattr(self.processor, 'rebuild_pipeline'):
+            self.processor.rebuild_pipeline()
+
+    def _wrap(self, name: str, original: Callable) -> Callable:
+        stats = self.stats[name]
+
+        def measured(*args, **kwargs):
+            before = _snapshot()
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            failed = True
+            try:
+                result = original(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                peak = tracemalloc.get_traced_memory()[1]
+                after = _snapshot()
+                stats.record(after.compare_to(before, 'filename'), max(0, peak - base), failed)
+
+        return measured
+
+    def profile_requests(self, prompts: List[str], requests: int,
+                         parameters: Optional[Dict] = None) -> Dict[str, Any]:
+        """Run requests through the instrumented pipeline and return per-layer stats"""
+        self.instrument()
+        try:
+            for index in range(requests):
+                self.processor.process_input(prompts[index % len(prompts)], [], dict(parameters or {}))
+        finally:
+            self.restore()
+        return {name: self.stats[name].to_dict() for name in sorted(self.stats)}
+
+
+def _site(traceback: tracemalloc.Traceback) -> str:
+    """Most recent frame inside this repository, or the allocating frame"""
+    for frame in reversed(traceback):
+        if frame.filename.startswith(ROOT_DIR + os.sep) and frame.filename != _THIS_FILE:
+            return f"{_display_path(frame.filename)}:{frame.lineno}"
+    frame = traceback[-1]
+    return f"{_display_path(frame.filename)}:{frame.lineno}"
+
+
+def detect_growth(send: Callable[[int], Any], requests: int, warmup: int = 10,
+                  min_blocks_per_request: float = 0.5, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Find allocation sites whose live memory grows with the number of requests.
+    Allocations are attributed to the innermost repository frame that caused
+    them; sites retaining at least `min_blocks_per_request` new blocks per
+    request after warm-up are reported, largest first.
+    """
+    for index in range(warmup):
+        send(index)
+    before = _snapshot()
+    for index in range(requests):
+        send(warmup + index)
+    after = _snapshot()
+
+    sites = {}
+    for stat in after.compare_to(before, 'traceback'):
+        entry = sites.setdefault(_site(stat.traceback), [0, 0])
+        entry[0] += stat.size_diff
+        entry[1] += stat.count_diff
+
+    growth = []
+    for site, (size_diff, count_diff) in sites.items():
+        if size_diff <= 0 or count_diff < requests * min_blocks_per_request:
+            continue
+        growth.append({
+            'site': site,
+            'bytes': size_diff,
+            'blocks': count_diff,
+            'bytes_per_request': round(size_diff / requests, 1),
+            'blocks_per_request': round(count_diff / requests, 2)
+        })
+    growth.sort(key=lambda entry: (-entry['bytes'], entry['site']))
+    return growth[:limit]
+
+
+def _integrated_target():
+    from EthicalSystemIntegration import IntegratedEthicalProcessor
+    processor = IntegratedEthicalProcessor()
+    return processor, lambda message, parameters: processor.process_input(message, [], dict(parameters))
+
+
+def _app_target():
+    """Drive the Flask app through its test client against a local stub upstream"""
+    from load_test import StubUpstreamServer
+    stub = StubUpstreamServer(profile='instant').start()
+    os.environ['OPENROUTER_BASE_URL'] = stub.base_url
+    os.environ.setdefault('OPENROUTER_API_KEY', 'stub-key')
+    os.environ.setdefault('OPENROUTER_MODEL', 'stub-model')
+    import app as app_module
+    client = app_module.app.test_client()
+
+    def send(message, parameters):
+        return client.post('/api/chat', json={'message': message, 'context': [], 'parameters': parameters})
+
+    return app_module.processor.integrated_processor, send
+
+
+def build_report(target: str, requests: int, growth_requests: int, warmup: int,
+                 parameters: Optional[Dict] = None, prompts: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Profile per-layer allocations and request-over-request growth"""
+    prompts = prompts or DEFAULT_PROMPTS
+    parameters = parameters or {}
+    # Build the target before tracing starts so import-time allocations do not
+    # swamp the snapshots
+    processor, send = _app_target() if target == 'app' else _integrated_target()
+    send(prompts[0], parameters)
+    tracemalloc.start(1)
+    try:
+        layers = PipelineMemoryProfiler(processor).profile_requests(prompts, requests, parameters)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # Growth detection needs deeper tracebacks to reach the repository frame
+    tracemalloc.start(GROWTH_TRACEBACK_FRAMES)
+    try:
+        growth = detect_growth(lambda i: send(prompts[i % len(prompts)], parameters),
+                               growth_requests, warmup=warmup)
+    finally:
+        tracemalloc.stop()
+    return {
+        'config': {
+            'target': target,
+            'requests': requests,
+            'growth_requests': growth_requests,
+            'warmup': warmup,
+            'parameters': parameters,
+            'python': platform.python_version()
+        },
+        'layers': layers,
+        'growth': growth,
+        'peak_traced_bytes': peak
+    }
+
+
+def format_text(report: Dict[str, Any]) -> str:
+    """Render the report as stable, line-oriented text suitable for diffing"""
+    lines = [f"# memory profile target={report['config']['target']} requests={report['config']['requests']} "
+             f"growth_requests={report['config']['growth_requests']} python={report['config']['python']}"]
+    lines.append("[layers] name calls errors retained_bytes/call retained_blocks/call max_peak_bytes")
+    for name, stats in report['layers'].items():
+        lines.append(f"{name} {stats['calls']} {stats['errors']} {stats['retained_bytes_per_call']} "
+                     f"{stats['retained_blocks_per_call']} {stats['max_peak_bytes']}")
+        for module, entry in stats['modules'].items():
+            lines.append(f"  {name}/{module} {entry['bytes']} {entry['blocks']}")
+    lines.append("[growth] site bytes/request blocks/request")
+    for entry in report['growth']:
+        lines.append(f"{entry['site']} {entry['bytes_per_request']} {entry['blocks_per_request']}")
+    return '\n'.join(lines) + '\n'
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Per-layer allocation and memory growth profiling")
+    parser.add_argument('--target', choices=['integrated', 'app'], default='integrated',
+                        help="Profile IntegratedEthicalProcessor directly or the Flask /api/chat route")
+    parser.add_argument('--requests', type=int, default=20, help="Requests for per-layer attribution")
+    parser.add_argument('--growth', type=int, default=200, help="Requests for growth detection")
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--parameters', default='{}', help="JSON parameters sent with every request")
+    parser.add_argument('--format', choices=['json', 'text'], default='json')
+    parser.add_argument('--output', help="Write the report to this path instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = build_report(args.target, args.requests, args.growth, args.warmup, json.loads(args.parameters))
+    rendered = format_text(report) if args.format == 'text' else json.dumps(report, indent=2, sort_keys=True) + '\n'
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(rendered)
+    else:
+        sys.stdout.write(rendered)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
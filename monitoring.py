@@ -5,27 +5,36 @@ Copyright © Sanjiva Kyosan
 import logging
 import json
 import time
+from collections import deque
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any, Optional
 from functools import wraps
 
-# Create logs directory
 LOGS_DIR = Path(__file__).parent / "logs"
-LOGS_DIR.mkdir(exist_ok=True)
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(LOGS_DIR / 'ethical_ai.log'),
-        logging.StreamHandler()
-    ]
-)
 
 logger = logging.getLogger('EthicalAI')
 
+# Most recent per-stage service times kept for capacity modelling
+STAGE_SAMPLE_LIMIT = 10000
+_logging_configured = False
+
+def configure_logging():
+    """Create the logs directory and configure logging (once, on first use)"""
+    global _logging_configured
+    if _logging_configured:
+        return
+    _logging_configured = True
+    LOGS_DIR.mkdir(exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(LOGS_DIR / 'ethical_ai.log'),
+            logging.StreamHandler()
+        ]
+    )
+
 class PerformanceMonitor:
     """Monitor system performance metrics"""
     
@@ -40,6 +49,7 @@ class PerformanceMonitor:
             'crisis_mode_activations': 0
         }
         self.request_times = []
+        self.stage_times = {}
     
     def record_request(self, processing_time: float, blocked: bool, crisis_mode: bool = False):
         """Record a request metric"""
@@ -60,6 +70,17 @@ class PerformanceMonitor:
             self.metrics['total_processing_time'] / self.metrics['requests_total']
         )
     
+    def record_stage(self, stage: str, seconds: float):
+        """Record one request's service time in a pipeline stage ('checks', 'upstream')"""
+        times = self.stage_times.get(stage)
+        if times is None:
+            times = self.stage_times.setdefault(stage, deque(maxlen=STAGE_SAMPLE_LIMIT))
+        times.append(seconds)
+    
+    def get_stage_samples(self) -> Dict[str, list]:
+        """Recorded service times (seconds) per stage, oldest first"""
+        return {stage: list(times) for stage, times in self.stage_times.items()}
+    
     def record_error(self):
         """Record an error"""
         self.metrics['errors'] += 1
@@ -96,6 +117,7 @@ class PerformanceMonitor:
             'crisis_mode_activations': 0
         }
         self.request_times = []
+        self.stage_times = {}
 
 class SystemLogger:
     """Enhanced logging for ethical processing"""
@@ -103,6 +125,7 @@ class SystemLogger:
     @staticmethod
     def log_request(user_input: str, parameters: Dict, result: Dict):
         """Log a processing request"""
+        configure_logging()
         logger.info("Processing request", extra={
             'input_length': len(user_input),
             'crisis_mode': parameters.get('crisis_mode', False),
@@ -117,6 +140,7 @@ class SystemLogger:
     @staticmethod
     def log_error(error: Exception, context: Dict = None):
         """Log an error with context"""
+        configure_logging()
         logger.error(f"Error occurred: {str(error)}", exc_info=True, extra={
             'context': context or {}
         })
@@ -124,6 +148,7 @@ class SystemLogger:
     @staticmethod
     def log_system_event(event: str, details: Dict = None):
         """Log a system event"""
+        configure_logging()
         logger.info(f"System event: {event}", extra={'details': details or {}})
 
 class MetricsCollector:
@@ -132,9 +157,12 @@ class MetricsCollector:
     def __init__(self, metrics_file: str = "metrics.json"):
         self.metrics_file = Path(__file__).parent / metrics_file
         self.metrics_history = []
+        self._loaded = False
     
     def collect(self, metrics: Dict[str, Any]):
         """Collect metrics snapshot"""
+        if not self._loaded:
+            self.load()
         snapshot = {
             'timestamp': datetime.now().isoformat(),
             'metrics': metrics
@@ -147,19 +175,24 @@ class MetricsCollector:
     
     def save(self):
         """Save metrics to file"""
+        if not self._loaded:
+            self.load()
         try:
             with open(self.metrics_file, 'w') as f:
                 json.dump(self.metrics_history, f, indent=2)
         except Exception as e:
+            configure_logging()
             logger.error(f"Failed to save metrics: {e}")
     
     def load(self):
-        """Load metrics from file"""
+        """Load metrics from file (done lazily on first collect/save)"""
+        self._loaded = True
         try:
             if self.metrics_file.exists():
                 with open(self.metrics_file, 'r') as f:
                     self.metrics_history = json.load(f)
         except Exception as e:
+            configure_logging()
             logger.error(f"Failed to load metrics: {e}")
 
 # Global instances
@@ -203,6 +236,4 @@ def get_system_status() -> Dict[str, Any]:
         'timestamp': datetime.now().isoformat()
     }
 
-# Initialize metrics collector
-metrics_collector.load()
 
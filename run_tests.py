@@ -19,7 +19,29 @@ def run_all_tests():
         'tests.test_harm_detection',
         'tests.test_integrated_processor',
         'tests.test_integration',
-        'tests.test_performance'
+        'tests.test_performance',
+        'tests.test_load_test',
+        'tests.test_memory_profile',
+        'tests.test_startup',
+        'tests.test_record_types',
+        'tests.test_subsystem_health',
+        'tests.test_pipeline_plan',
+        'tests.test_normalized_text',
+        'tests.test_batch_harm_scorer',
+        'tests.test_compiled_lexicon',
+        'tests.test_conversation_scanner',
+        'tests.test_streaming_output_filter',
+        'tests.test_speculative_upstream',
+        'tests.test_deep_analysis',
+        'tests.test_request_lanes',
+        'tests.test_model_router',
+        'tests.test_upstream_resilience',
+        'tests.test_degradation',
+        'tests.test_concurrency_limiter',
+        'tests.test_capacity_simulation',
+        'tests.test_warmup',
+        'tests.test_harm_service',
+        'tests.test_conversation_affinity'
     ]
     
     for module_name in test_modules:
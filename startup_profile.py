@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Startup Profiling for application and tool entry points
+Runs a fresh interpreter with `-X importtime` for each module, parses the
+per-module import cost into structured records (self time, cumulative time,
+importing parent) and measures cold-start wall time against a bare
+interpreter, so regressions in import-time work are easy to spot.
+
+Usage:
+    python3 startup_profile.py
+    python3 startup_profile.py --module app --repeat 5 --format text
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_MODULES = ['app', 'EthicalSystemIntegration', 'monitoring']
+
+_IMPORTTIME_PREFIX = 'import time:'
+
+
+def parse_importtime(output: str) -> List[Dict[str, Any]]:
+    """Parse `-X importtime` stderr into records in the order they were printed"""
+    records = []
+    # Children are printed before their parent; records wait here until the
+    # enclosing import (one level shallower) is printed.
+    pending = []
+    for line in output.splitlines():
+        if not line.startswith(_IMPORTTIME_PREFIX):
+            continue
+        fields = line[len(_IMPORTTIME_PREFIX):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # header line
+        raw_name = fields[2].rstrip()
+        name = raw_name.lstrip()
+        depth = (len(raw_name) - len(name) - 1) // 2
+        record = {
+            'module': name,
+            'self_us': int(fields[0]),
+            'cumulative_us': int(fields[1]),
+            'depth': depth,
+            'parent': None,
+        }
+        while pending and pending[-1]['depth'] > depth:
+            pending.pop()['parent'] = name
+        pending.append(record)
+        records.append(record)
+    return records
+
+
+def _run(args: List[str]) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    return subprocess.run([sys.executable] + args, cwd=ROOT_DIR, env=env,
+                          capture_output=True, text=True)
+
+
+def measure_wall_time(module: str, repeat: int = 3) -> Dict[str, float]:
+    """Best-of-N wall time to start an interpreter and import module"""
+    def best(args):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            _run(args)
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    baseline = best(['-c', 'pass'])
+    total = best(['-c', f'import {module}'])
+    return {
+        'interpreter_ms': round(baseline * 1000, 2),
+        'total_ms': round(total * 1000, 2),
+        'import_ms': round(max(total - baseline, 0.0) * 1000, 2),
+    }
+
+
+def _is_repo_module(name: str) -> bool:
+    top = name.split('.')[0]
+    return os.path.exists(os.path.join(ROOT_DIR, top + '.py'))
+
+
+def profile_module(module: str, repeat: int = 3, top: int = 15) -> Dict[str, Any]:
+    """Import-time breakdown and wall time for a single module"""
+    result = _run(['-X', 'importtime', '-c', f'import {module}'])
+    records = parse_importtime(result.stderr)
+    stray_output = [line for line in result.stderr.splitlines() if not line.startswith(_IMPORTTIME_PREFIX)]
+
+    packages = {}
+    for record in records:
+        package = record['module'].split('.')[0]
+        entry = packages.setdefault(package, {'self_us': 0, 'modules': 0})
+        entry['self_us'] += record['self_us']
+        entry['modules'] += 1
+
+    by_package = sorted(packages.items(), key=lambda item: item[1]['self_us'], reverse=True)
+    return {
+        'module': module,
+        'ok': result.returncode == 0,
+        'wall_time': measure_wall_time(module, repeat),
+        'modules_imported': len(records),
+        'total_import_us': sum(r['self_us'] for r in records),
+        'top_self': sorted(records, key=lambda r: r['self_us'], reverse=True)[:top],
+        'top_cumulative': sorted(records, key=lambda r: r['cumulative_us'], reverse=True)[:top],
+        'packages': dict(by_package[:top]),
+        'repo_modules': [r for r in records if _is_repo_module(r['module'])],
+        'import_output': result.stdout.splitlines() + stray_output,
+    }
+
+
+def build_report(modules: List[str], repeat: int = 3, top: int = 15) -> Dict[str, Any]:
+    """Startup profile for each module"""
+    return {
+        'config': {'repeat': repeat, 'python': platform.python_version()},
+        'modules': [profile_module(module, repeat, top) for module in modules],
+    }
+
+
+def format_text(report: Dict[str, Any]) -> str:
+    """Render the report as line-oriented text"""
+    lines = [f"# startup profile python={report['config']['python']} repeat={report['config']['repeat']}"]
+    for entry in report['modules']:
+        wall = entry['wall_time']
+        lines.append(f"[{entry['module']}] ok={entry['ok']} import_ms={wall['import_ms']} "
+                     f"total_ms={wall['total_ms']} interpreter_ms={wall['interpreter_ms']} "
+                     f"modules={entry['modules_imported']}")
+        lines.append("  top cumulative (us): module cumulative self parent")
+        for record in entry['top_cumulative']:
+            lines.append(f"    {record['module']} {record['cumulative_us']} {record['self_us']} {record['parent'] or '-'}")
+        lines.append("  packages (us): package self modules")
+        for package, totals in entry['packages'].items():
+            lines.append(f"    {package} {totals['self_us']} {totals['modules']}")
+        lines.append("  repo modules (us): module cumulative self")
+        for record in entry['repo_modules']:
+            lines.append(f"    {record['module']} {record['cumulative_us']} {record['self_us']}")
+        for line in entry['import_output']:
+            lines.append(f"  output: {line}")
+    return '\n'.join(lines) + '\n'
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Per-module import cost and cold-start time")
+    parser.add_argument('--module', action='append',
+                        help="Module to profile (repeatable, default: %s)" % ', '.join(DEFAULT_MODULES))
+    parser.add_argument('--repeat', type=int, default=3, help="Wall-time runs per module (best is reported)")
+    parser.add_argument('--top', type=int, default=15, help="Entries in each top-N list")
+    parser.add_argument('--format', choices=['json', 'text'], default='json')
+    parser.add_argument('--output', help="Write the report to this path instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = build_report(args.module or DEFAULT_MODULES, args.repeat, args.top)
+    rendered = format_text(report) if args.format == 'text' else json.dumps(report, indent=2) + '\n'
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(rendered)
+    else:
+        sys.stdout.write(rendered)
+    return 0 if all(entry['ok'] for entry in report['modules']) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
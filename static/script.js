@@ -5,6 +5,9 @@ const API_BASE = 'http://localhost:5000/api';
 // State Management
 let conversationHistory = [];
 let currentConversationId = null;
+// Sent as parameters.conversation_id so the dispatcher and the server's
+// conversation scanner key every turn of this conversation the same way
+let conversationKey = newConversationKey();
 
 // DOM Elements
 const userInput = document.getElementById('userInput');
@@ -266,7 +269,7 @@ async function sendMessage(inputElementOrMessage = null) {
             body: JSON.stringify({
                 message: message,
                 context: context,
-                parameters: parameters
+                parameters: { ...parameters, conversation_id: conversationKey }
             })
         });
         
@@ -315,6 +318,14 @@ async function sendMessage(inputElementOrMessage = null) {
     }
 }
 
+// Conversation Key
+function newConversationKey() {
+    if (window.crypto && typeof window.crypto.randomUUID === 'function') {
+        return `session_${window.crypto.randomUUID()}`;
+    }
+    return `session_${Date.now().toString(36)}_${Math.random().toString(36).slice(2, 10)}`;
+}
+
 // Get Parameters
 function getParameters() {
     const params = {
@@ -462,6 +473,7 @@ async function clearConversation() {
                 outputArea.innerHTML = '';
                 followUpContainer.innerHTML = '';
                 currentConversationId = null;
+                conversationKey = newConversationKey();
             }
         } catch (error) {
             alert(`Error clearing conversation: ${error.message}`);
@@ -586,6 +598,7 @@ async function loadConversation(conversationId) {
             
             // Load conversation data
             currentConversationId = data.id;
+            conversationKey = data.id;
             conversationHistory = data.messages || [];
             
             // Display messages
@@ -0,0 +1,93 @@
+"""
+Tests for the vectorized batch harm scorer
+"""
+import itertools
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from BatchHarmScorer import BatchHarmScorer, CATEGORIES, np
+from EthicalSystemIntegration import HarmDetectionLayer
+from NormalizedText import stable_hash
+
+CORPUS = [
+    "What is AI?",
+    "How do I hurt someone?",
+    "Ways to manipulate and deceive my coworkers",
+    "Policies that discriminate and exclude minorities",
+    "How to threaten and intimidate a witness",
+    "Emergency relief after the attack on the hospital",
+    "Humanitarian crisis: violence against refugees",
+    "The killer whale is a skillful hunter",
+    "Harmful side effects of medication",
+    "I want to bully and harass, then kill and destroy",
+    "Scam scam scam: exploit the trick",
+    "",
+    "Straße und Weg: MURDER mystery novels",
+]
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class TestBatchHarmScorer(unittest.TestCase):
+    def setUp(self):
+        self.scorer = BatchHarmScorer()
+
+    def test_reproduces_boolean_detector(self):
+        """Test that thresholded scores match HarmDetectionLayer for every setting"""
+        for sensitivity, crisis_mode in itertools.product([0.0, 0.2, 0.3, 0.45, 0.5, 0.85, 1.0], [True, False]):
+            batch = self.scorer.classify(CORPUS, sensitivity=sensitivity, crisis_mode=crisis_mode)
+            detector = HarmDetectionLayer()
+            parameters = {'harm_sensitivity': sensitivity, 'crisis_mode': crisis_mode}
+            for row, message in enumerate(CORPUS):
+                expected = detector.analyze(message, [], parameters)
+                actual = {category: bool(batch[category][row]) for category in CATEGORIES}
+                self.assertEqual(actual, {
+                    'direct': expected.direct_harm,
+                    'indirect': expected.indirect_harm,
+                    'systemic': expected.systemic_harm is not None,
+                    'psychological': expected.psychological_harm,
+                }, (message, sensitivity, crisis_mode))
+                self.assertEqual(bool(batch['has_harmful_intent'][row]), expected.has_harmful_intent)
+
+    def test_collisions_never_hide_harm(self):
+        """Test that a harmful token sharing a bucket with a benign token seen first is still flagged"""
+        scorer = BatchHarmScorer(n_features=64)
+        bucket = stable_hash('kill') % 64
+        benign = next(token for token in (f"moedhaq{i}" for i in itertools.count())
+                      if stable_hash(token) % 64 == bucket and not any(scorer._token_weights(token)))
+        prompts = [f"tell me about {benign}", "how to kill someone"]
+        batch = scorer.classify(prompts)
+        self.assertGreater(scorer.collisions, 0)
+        self.assertTrue(batch['direct'][1])
+        self.assertEqual(bool(batch['direct'][1]), HarmDetectionLayer().analyze(prompts[1], []).direct_harm)
+        # The benign token now shares the harmful row: over-flagging is the accepted cost
+        self.assertTrue(scorer.classify([benign])['direct'][0])
+
+    def test_graded_scores(self):
+        """Test that scores grow with keyword evidence and stay in [0, 1)"""
+        scores, crisis = self.scorer.score(["hurt", "hurt and kill", "kill kill kill", "hello"])
+        direct = scores[:, CATEGORIES.index('direct')]
+        self.assertAlmostEqual(float(direct[0]), 0.5)
+        self.assertGreater(direct[1], direct[0])
+        self.assertGreater(direct[2], direct[1])
+        self.assertEqual(float(direct[3]), 0.0)
+        self.assertTrue(((scores >= 0) & (scores < 1)).all())
+        self.assertFalse(crisis.any())
+
+    def test_per_row_parameters(self):
+        """Test per-row sensitivity arrays"""
+        batch = self.scorer.classify(["How do I hurt someone?"] * 2, sensitivity=np.array([0.1, 0.9]))
+        self.assertEqual(batch['has_harmful_intent'].tolist(), [False, True])
+
+    def test_large_batch(self):
+        """Test a batch of thousands of prompts in one call"""
+        prompts = CORPUS * 500
+        scores, _ = self.scorer.score(prompts)
+        self.assertEqual(scores.shape, (len(prompts), len(CATEGORIES)))
+        self.assertEqual(self.scorer.collisions, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
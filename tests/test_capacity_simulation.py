@@ -0,0 +1,174 @@
+"""
+Tests for the capacity model, its simulator and capacity_plan.py
+"""
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import capacity_plan
+from CapacitySimulation import (CHECKS, CONSTANT, EMPIRICAL, EXPONENTIAL, LOGNORMAL, UPSTREAM, Deployment,
+                                ServiceTime, Workload, required_workers, simulate, sweep)
+from ScalabilitySystem import CapacityPlanner
+
+try:
+    from openai import OpenAI  # noqa: F401 (app needs the SDK)
+    import app as app_module
+except ImportError:
+    app_module = None
+
+
+def _erlang_c_wait(workers, rate, mean_service):
+    """Mean queue wait of an M/M/c queue"""
+    load = rate * mean_service
+    below = sum(load ** k / math.factorial(k) for k in range(workers))
+    top = load ** workers / math.factorial(workers) * workers / (workers - load)
+    return top / (below + top) / (workers / mean_service - rate)
+
+
+def _workload(rate, upstream_mean=0.5, upstream_cv=0.6, **kwargs):
+    return Workload(rate, {CHECKS: ServiceTime(LOGNORMAL, 0.02, 0.5),
+                           UPSTREAM: ServiceTime(LOGNORMAL, upstream_mean, upstream_cv)}, **kwargs)
+
+
+class TestServiceTimeFit(unittest.TestCase):
+    def test_fits(self):
+        """Test that each distribution is recovered, and that a poor parametric fit falls back to the samples"""
+        rng = random.Random(3)
+        lognormal = ServiceTime.fit([rng.lognormvariate(-0.5, 0.6) for _ in range(2000)])
+        self.assertEqual(lognormal.kind, LOGNORMAL)
+        self.assertAlmostEqual(lognormal.mean, math.exp(-0.5 + 0.18), delta=0.05)
+        self.assertAlmostEqual(lognormal.cv, math.sqrt(math.expm1(0.36)), delta=0.05)
+
+        self.assertEqual(ServiceTime.fit([rng.expovariate(10) for _ in range(2000)]).kind, EXPONENTIAL)
+        self.assertEqual(ServiceTime.fit([0.25] * 50).kind, CONSTANT)
+        bimodal = ServiceTime.fit([0.01] * 500 + [1.0] * 500)
+        self.assertEqual(bimodal.kind, EMPIRICAL)
+        self.assertAlmostEqual(bimodal.scaled(2).mean, 1.01)
+        with self.assertRaises(ValueError):
+            ServiceTime.fit([0.1] * 5)
+
+    def test_from_metrics(self):
+        """Test that the blocked share comes from the checks and upstream sample counts"""
+        rng = random.Random(1)
+        metrics = {'stage_samples': {CHECKS: [rng.expovariate(100) for _ in range(400)],
+                                     UPSTREAM: [rng.lognormvariate(0, 0.5) for _ in range(300)]}}
+        workload = Workload.from_metrics(metrics, rate=5)
+        self.assertAlmostEqual(workload.blocked_fraction, 0.25)
+        self.assertEqual(workload.stages[UPSTREAM].kind, LOGNORMAL)
+        with self.assertRaises(ValueError):
+            Workload.from_metrics({'stage_samples': {CHECKS: [0.1] * 50}}, rate=5)
+
+
+class TestSimulator(unittest.TestCase):
+    def test_matches_erlang_c(self):
+        """Test the simulated M/M/c queue wait against the analytic one"""
+        workload = Workload(14, {CHECKS: ServiceTime(CONSTANT, 0.0), UPSTREAM: ServiceTime(EXPONENTIAL, 0.5)})
+        result = simulate(workload, Deployment(10), requests=50000)
+        self.assertAlmostEqual(result.mean_queue_wait, _erlang_c_wait(10, 14, 0.5), delta=0.01)
+        self.assertAlmostEqual(result.worker_utilization, 0.7, delta=0.03)
+        self.assertAlmostEqual(result.throughput, 14, delta=0.5)
+        self.assertFalse(result.saturated)
+
+    def test_upstream_limit(self):
+        """Test that an upstream limit below the workers behaves like that many workers"""
+        workload = Workload(14, {CHECKS: ServiceTime(CONSTANT, 0.0), UPSTREAM: ServiceTime(EXPONENTIAL, 0.5)})
+        limited = simulate(workload, Deployment(16, 10))
+        self.assertEqual(limited.p99, simulate(workload, Deployment(10)).p99)
+        self.assertAlmostEqual(limited.upstream_utilization, 0.7, delta=0.05)
+        self.assertLess(simulate(workload, Deployment(16, 16)).p99, limited.p99)
+
+    def test_queue_timeout_rejects(self):
+        """Test that an overloaded lane sheds what exceeds its capacity, and nothing under capacity"""
+        workload = _workload(50)
+        overloaded = simulate(workload, Deployment(20, None, 1.0))
+        self.assertTrue(overloaded.saturated)
+        self.assertAlmostEqual(overloaded.rejected_fraction, 1 - 20 / (50 * workload.mean_hold()), delta=0.05)
+        self.assertEqual(simulate(_workload(10), Deployment(20, None, 1.0)).rejected_fraction, 0.0)
+
+    def test_required_workers(self):
+        """Test that the answer meets the target and one worker fewer does not"""
+        workload = _workload(50, blocked_fraction=0.1)
+        result = required_workers(workload, 2.0)
+        self.assertLessEqual(result.p99, 2.0)
+        fewer = simulate(workload, Deployment(result.workers - 1))
+        self.assertTrue(fewer.saturated or fewer.p99 > 2.0)
+        self.assertIsNone(required_workers(workload, 2.0, upstream_concurrency=10))
+        self.assertIsNone(required_workers(workload, 0.1))
+        self.assertGreater(required_workers(_workload(50, blocked_fraction=0.1, arrival='bursty'), 2.0).workers,
+                           result.workers)
+
+    def test_sweep_speed(self):
+        """Test that hundreds of configurations are simulated in seconds"""
+        start = time.perf_counter()
+        results = sweep(_workload(1), [10, 25, 50], range(8, 72, 2), [None, 24, 48])
+        self.assertEqual(len(results), 288)
+        self.assertLess(time.perf_counter() - start, 10)
+
+
+class TestCapacityPlanner(unittest.TestCase):
+    def test_model_capacity(self):
+        model = CapacityPlanner().model_capacity({'workload': _workload(10), 'p99_seconds': 2.0,
+                                                  'growth_rate': 0.5, 'periods': 2})
+        components = model.modeling_components
+        current = components['resource_requirements']['workers']
+        linear = [entry['workers'] for entry in components['growth_scenarios']['linear_growth']]
+        self.assertEqual([entry['rate'] for entry in components['growth_scenarios']['exponential_growth']],
+                         [15.0, 22.5])
+        self.assertLess(current, linear[0])
+        self.assertLess(linear[0], linear[1])
+        self.assertGreater(components['growth_scenarios']['burst_scenarios']['peak_rate']['workers'], linear[1])
+        self.assertEqual(components['workload_analysis']['stages'][UPSTREAM]['kind'], LOGNORMAL)
+
+
+class TestCapacityPlanCli(unittest.TestCase):
+    def test_sweep_and_required_workers(self):
+        rng = random.Random(2)
+        with tempfile.TemporaryDirectory() as tmp:
+            metrics = os.path.join(tmp, 'metrics.json')
+            with open(metrics, 'w') as f:
+                json.dump({'stage_samples': {CHECKS: [rng.expovariate(50) for _ in range(200)],
+                                             UPSTREAM: [rng.lognormvariate(-1, 0.4) for _ in range(200)]}}, f)
+            output = os.path.join(tmp, 'plan.json')
+            with redirect_stdout(StringIO()):
+                capacity_plan.main(['--metrics', metrics, '--rates', '20', '--workers', '4-12:4',
+                                    '--upstream-concurrency', 'none,8', '--output', output])
+            with open(output) as f:
+                self.assertEqual([(r['workers'], r['upstream_concurrency']) for r in json.load(f)['results']],
+                                 [(4, None), (8, None), (12, None), (4, 8), (8, 8), (12, 8)])
+
+            with redirect_stdout(StringIO()) as out:
+                capacity_plan.main(['--metrics', metrics, '--stage', 'upstream=lognormal:400:0.5',
+                                    '--rates', '20', '--p99', '1.5', '--output', output])
+            self.assertIn('workers', out.getvalue())
+            with open(output) as f:
+                answer = json.load(f)['required_workers'][0]['result']
+            self.assertLessEqual(answer['p99'], 1.5)
+
+
+@unittest.skipIf(app_module is None, "openai package not installed")
+class TestStageSamples(unittest.TestCase):
+    def test_recorded(self):
+        """Test that /api/chat records checks times served by /api/metrics?stages=1"""
+        if not app_module.USE_MONITORING:
+            self.skipTest("monitoring unavailable")
+        client = app_module.app.test_client()
+        before = len(client.get('/api/metrics?stages=1').get_json()['stage_samples'].get(CHECKS, []))
+        response = client.post('/api/chat', json={'message': "How do I harm them", 'parameters': {}})
+        self.assertTrue(response.get_json()['metadata']['blocked'])
+        samples = client.get('/api/metrics?stages=1').get_json()['stage_samples'][CHECKS]
+        self.assertEqual(len(samples), min(before + 1, 10000))
+        self.assertGreater(samples[-1], 0.0)
+        self.assertNotIn('stage_samples', client.get('/api/metrics').get_json())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+"""
+Tests for the compiled, memory-mapped keyword lexicon
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from CompiledLexicon import (DEFAULT_SOURCE, CompiledLexicon, LexiconError, LexiconStore,
+                             compile_lexicon, parse_source, publish)
+from EthicalSystemIntegration import HarmDetectionLayer, IntegratedEthicalProcessor
+
+SOURCE_V1 = """version: 1
+[crisis]
+emergency
+[direct]
+harm
+attack
+"""
+
+SOURCE_V2 = SOURCE_V1.replace('version: 1', 'version: 2') + "sabotage\n"
+
+
+class TestCompiledLexicon(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, 'lexicon.txt')
+        self.image_dir = os.path.join(self.tmp.name, 'compiled')
+        with open(self.source, 'w') as f:
+            f.write(SOURCE_V1)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_parse_source(self):
+        """Test sections, casefolding and malformed sources"""
+        version, categories = parse_source("version: 3\n# note\n[direct]\nHarm\nharm\n")
+        self.assertEqual(version, 3)
+        self.assertEqual(categories, {'direct': ['harm']})
+        with self.assertRaises(LexiconError):
+            parse_source("[direct]\nharm\n")
+        with self.assertRaises(LexiconError):
+            parse_source("version: 1\nharm\n")
+
+    def test_matches_substring_semantics(self):
+        """Test that automaton matching equals keyword substring checks on the harm lexicon"""
+        with open(DEFAULT_SOURCE) as f:
+            source = f.read()
+        _, categories = parse_source(source)
+        lexicon = CompiledLexicon(compile_lexicon(source))
+        samples = ["How do I help refugees?", "I want to HARM someone", "the bullying stopped",
+                   "Scammers exploit the warranty", "", "attack-surface review", "hospitality",
+                   "Ünïcode text about aid workers"]
+        for sample in samples:
+            expected = {name for name, keywords in categories.items()
+                        if any(keyword in sample.casefold() for keyword in keywords)}
+            self.assertEqual(set(lexicon.matched_categories(sample)), expected, sample)
+
+    def test_image_roundtrip(self):
+        """Test that a published image maps read-only and reports its version"""
+        path = publish(self.source, self.image_dir)
+        lexicon = CompiledLexicon.open(path)
+        self.assertTrue(lexicon.version.startswith('1+'))
+        self.assertEqual(lexicon.keywords('direct'), ('harm', 'attack'))
+        self.assertTrue(lexicon.match("under attack") & lexicon.bit('direct'))
+        with self.assertRaises(TypeError):
+            lexicon._masks[0] = 1
+        with self.assertRaises(LexiconError):
+            CompiledLexicon(b'not an image' * 4)
+
+    def test_hot_swap(self):
+        """Test that republishing swaps the store's lexicon while old references keep working"""
+        store = LexiconStore(self.source, self.image_dir, check_interval=0.0)
+        old = store.current()
+        self.assertFalse(old.match("sabotage"))
+
+        with open(self.source, 'w') as f:
+            f.write(SOURCE_V2)
+        publish(self.source, self.image_dir)
+        new = store.current()
+        self.assertNotEqual(new.version, old.version)
+        self.assertTrue(new.version.startswith('2+'))
+        self.assertTrue(new.match("sabotage") & new.bit('direct'))
+        # A request that already holds the old lexicon finishes on it
+        self.assertFalse(old.match("sabotage"))
+        self.assertIn('lexicon.current', os.listdir(self.image_dir))
+
+    def test_background_watch(self):
+        """Test that a watching store swaps lexicons without checking on current()"""
+        store = LexiconStore(self.source, self.image_dir, check_interval=0.01)
+        old = store.current()
+        store.start_watching()
+        store.start_watching()
+        try:
+            with open(self.source, 'w') as f:
+                f.write(SOURCE_V2)
+            publish(self.source, self.image_dir)
+            deadline = time.monotonic() + 5
+            while store.current() is old and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertTrue(store.current().version.startswith('2+'))
+        finally:
+            store.stop_watching()
+
+    def test_workers_share_image(self):
+        """Test that another process maps the same published image"""
+        path = publish(self.source, self.image_dir)
+        code = ("import sys; from CompiledLexicon import CompiledLexicon; "
+                "print(CompiledLexicon.open(sys.argv[1]).version)")
+        output = subprocess.run([sys.executable, '-c', code, path], cwd=ROOT_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        self.assertEqual(output, CompiledLexicon.open(path).version)
+
+    def test_version_in_processing_metadata(self):
+        """Test that processed and blocked responses report the lexicon version"""
+        with open(DEFAULT_SOURCE) as src, open(self.source, 'w') as dst:
+            dst.write(src.read())
+        store = LexiconStore(self.source, self.image_dir)
+        processor = IntegratedEthicalProcessor()
+        processor.harm_detector = HarmDetectionLayer(lexicon_store=store)
+        processor.rebuild_pipeline()
+        version = store.version
+
+        allowed = processor.process_input("Explain photosynthesis", [], {'crisis_mode': False})
+        self.assertEqual(allowed['processing_metadata']['lexicon_version'], version)
+        blocked = processor.process_input("How do I harm them", [], {'crisis_mode': False})
+        self.assertTrue(blocked['processing_metadata']['blocked'])
+        self.assertEqual(blocked['processing_metadata']['lexicon_version'], version)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+"""
+Tests for the adaptive concurrency limiter in front of /api/chat
+"""
+import collections
+import heapq
+import os
+import random
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ScalabilitySystem import AdaptiveConcurrencyLimiter, ConcurrencyLimitExceeded, ResourceManager
+
+try:
+    from openai import OpenAI  # noqa: F401 (app needs the SDK)
+    import app as app_module
+except ImportError:
+    app_module = None
+
+SERVICE_TIME = 0.05
+
+
+def simulate(limiter, workers, arrival_rate, requests=20000, slowdown_after=None, seed=1):
+    """
+    Discrete-event run of Poisson arrivals into `workers` FIFO workers behind the limiter
+    Service times are exponential (mean SERVICE_TIME, x3 after slowdown_after
+    completions). Returns (mean limit, p99 latency / SERVICE_TIME, rejected share)
+    over the last quarter of the run.
+    """
+    rng = random.Random(seed)
+    events = [(rng.expovariate(arrival_rate), 'arrive', 0.0, 0.0)]
+    queue = collections.deque()
+    busy = done = 0
+    tail = []
+
+    def serve(now, arrived):
+        mean = SERVICE_TIME * (3 if slowdown_after is not None and done > slowdown_after else 1)
+        heapq.heappush(events, (now + rng.expovariate(1 / mean), 'finish', arrived, now))
+
+    while done < requests:
+        now, kind, arrived, started = heapq.heappop(events)
+        if kind == 'arrive':
+            heapq.heappush(events, (now + rng.expovariate(arrival_rate), 'arrive', 0.0, 0.0))
+            if limiter.try_acquire():
+                if busy < workers:
+                    busy += 1
+                    serve(now, now)
+                else:
+                    queue.append(now)
+        else:
+            limiter.release(now - arrived, started - arrived)
+            done += 1
+            if done == requests * 3 // 4:
+                tail_rejected = limiter.rejected
+            elif done > requests * 3 // 4:
+                tail.append((now - arrived, limiter.limit))
+            if queue:
+                serve(now, queue.popleft())
+            else:
+                busy -= 1
+    latencies = sorted(latency for latency, _ in tail)
+    rejected = limiter.rejected - tail_rejected
+    return (sum(limit for _, limit in tail) / len(tail), latencies[int(len(latencies) * 0.99)] / SERVICE_TIME,
+            rejected / (rejected + len(tail)))
+
+
+class TestAdaptiveConcurrencyLimiter(unittest.TestCase):
+    def test_converges_under_overload(self):
+        """Test that twice the sustainable load keeps latency bounded and only sheds the excess"""
+        for workers in (4, 16):
+            limit, p99, rejected = simulate(AdaptiveConcurrencyLimiter(), workers, 2 * workers / SERVICE_TIME)
+            self.assertGreaterEqual(limit, workers, workers)
+            self.assertLess(limit, 4 * workers, workers)
+            self.assertLess(p99, 8, workers)
+            self.assertAlmostEqual(rejected, 0.5, delta=0.1, msg=workers)
+
+    def test_no_rejections_when_not_overloaded(self):
+        limit, p99, rejected = simulate(AdaptiveConcurrencyLimiter(), 8, 0.6 * 8 / SERVICE_TIME)
+        self.assertEqual(rejected, 0.0)
+
+    def test_service_slowdown_is_not_queueing(self):
+        """Test that slower service shrinks throughput, not the limit toward its minimum"""
+        limiter = AdaptiveConcurrencyLimiter()
+        limit, p99, rejected = simulate(limiter, 8, 8 / SERVICE_TIME, slowdown_after=10000)
+        self.assertGreaterEqual(limit, 8)
+        self.assertAlmostEqual(rejected, 2 / 3, delta=0.1)
+
+    def test_drops_and_rejections(self):
+        """Test early rejection over the limit and the multiplicative cut on a dropped request"""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=2, min_limit=1, max_limit=4)
+        with limiter.admit(), limiter.admit():
+            with self.assertRaises(ConcurrencyLimitExceeded):
+                with limiter.admit():
+                    pass
+        with self.assertRaises(ValueError):
+            with limiter.admit():
+                raise ValueError("downstream failure")
+        status = limiter.status()
+        self.assertEqual((status['accepted'], status['rejected'], status['dropped']), (3, 1, 1))
+        self.assertEqual(status['in_flight'], 0)
+
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=10)
+        self.assertTrue(limiter.try_acquire())
+        limiter.release(0.1, dropped=True)
+        self.assertAlmostEqual(limiter.limit, 9.0)
+        self.assertEqual(ResourceManager(limiter).concurrency_limiter, limiter)
+
+    def test_minimum_limit(self):
+        """Test that a zero minimum is rejected and repeated drops leave room for one request"""
+        with self.assertRaises(ValueError):
+            AdaptiveConcurrencyLimiter(initial_limit=4, min_limit=0)
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=1, min_limit=1)
+        for _ in range(20):
+            self.assertTrue(limiter.try_acquire())
+            limiter.release(0.1, dropped=True)
+        self.assertEqual(limiter.status()['limit'], 1)
+        self.assertEqual(limiter.status()['utilization'], 0.0)
+
+    def test_queue_wait_shrinks_limit(self):
+        """Test that latency dominated by queue wait shrinks the limit, service time alone grows it"""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=16)
+
+        def rounds(latency, queue_wait):
+            for _ in range(50):
+                admitted = sum(limiter.try_acquire() for _ in range(16))
+                for _ in range(admitted):
+                    limiter.release(latency, queue_wait)
+
+        rounds(0.4, 0.3)
+        self.assertLess(limiter.limit, 8)
+        shrunk = limiter.limit
+        rounds(0.1, 0.0)
+        self.assertGreater(limiter.limit, shrunk)
+
+
+@unittest.skipIf(app_module is None, "openai package not installed")
+class TestLimitedChat(unittest.TestCase):
+    def setUp(self):
+        self.processor = app_module.get_processor()
+        self.saved = self.processor.resource_manager
+        self.processor.resource_manager = ResourceManager(
+            AdaptiveConcurrencyLimiter(initial_limit=1, min_limit=1, max_limit=1))
+
+    def tearDown(self):
+        self.processor.resource_manager = self.saved
+
+    def test_rejects_over_limit_early(self):
+        """Test that a request over the limit gets an immediate 503, crisis-flagged ones included"""
+        client = app_module.app.test_client()
+        with self.processor.resource_manager.concurrency_limiter.admit():
+            start = time.perf_counter()
+            response = client.post('/api/chat', json={'message': "Tell me about renewable energy",
+                                                      'parameters': {'crisis_mode': False}})
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.headers['Retry-After'], '1')
+            self.assertLess(time.perf_counter() - start, 0.5)
+            response = client.post('/api/chat', json={'message': "I need help right now",
+                                                      'parameters': {'crisis_mode': True}})
+            self.assertEqual(response.status_code, 503)
+        status = client.get('/api/status').get_json()['concurrency_limit']
+        self.assertEqual((status['limit'], status['rejected']), (1, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,206 @@
+"""
+Tests for consistent-hash conversation affinity and the front dispatcher
+"""
+import json
+import os
+import sys
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dispatcher
+from ConversationAffinity import ConsistentHashRing, NoWorkerAvailable, WorkerRouter
+from ConversationScanner import conversation_key
+
+KEYS = [f"conversation-{index}" for index in range(10000)]
+
+
+class TestConsistentHashRing(unittest.TestCase):
+    def test_balance(self):
+        """Test that virtual nodes spread the hash space and the keys evenly"""
+        ring = ConsistentHashRing([f"worker-{index}" for index in range(8)])
+        shares = ring.shares()
+        self.assertAlmostEqual(sum(shares.values()), 1.0)
+        self.assertLess(max(shares.values()), 1.25 / 8)
+        counts = {}
+        for key in KEYS:
+            counts[ring.node_for(key)] = counts.get(ring.node_for(key), 0) + 1
+        self.assertLess(max(counts.values()), 1.25 * len(KEYS) / 8)
+        # Independent of insertion order, so every dispatcher agrees
+        reversed_ring = ConsistentHashRing([f"worker-{index}" for index in reversed(range(8))])
+        self.assertTrue(all(ring.node_for(key) == reversed_ring.node_for(key) for key in KEYS[:500]))
+
+    def test_minimal_remapping(self):
+        """Test that a worker joining takes about 1/N of the keys and leaving moves only its own"""
+        ring = ConsistentHashRing([f"worker-{index}" for index in range(8)])
+        before = {key: ring.node_for(key) for key in KEYS}
+        ring.add('worker-8')
+        moved = [key for key in KEYS if ring.node_for(key) != before[key]]
+        self.assertTrue(all(ring.node_for(key) == 'worker-8' for key in moved))
+        self.assertAlmostEqual(len(moved) / len(KEYS), 1 / 9, delta=0.03)
+
+        ring.remove('worker-8')
+        self.assertEqual({key: ring.node_for(key) for key in KEYS}, before)
+        ring.remove('worker-3')
+        for key in KEYS:
+            if before[key] != 'worker-3':
+                self.assertEqual(ring.node_for(key), before[key])
+
+    def test_preference(self):
+        ring = ConsistentHashRing(['a', 'b', 'c'])
+        order = ring.preference('some conversation')
+        self.assertEqual(sorted(order), ['a', 'b', 'c'])
+        self.assertEqual(order[0], ring.node_for('some conversation'))
+        ring.remove(order[0])
+        self.assertEqual(ring.node_for('some conversation'), order[1])
+        self.assertIsNone(ConsistentHashRing().node_for('x'))
+
+
+class TestWorkerRouter(unittest.TestCase):
+    def test_failover_and_health(self):
+        healthy = {'a': True, 'b': True, 'c': True}
+        router = WorkerRouter(['a', 'b', 'c'], health_check=lambda worker: healthy[worker])
+        owner = router.route('conversation')[0]
+        healthy[owner] = False
+        router.mark_down(owner, "ConnectionRefusedError")
+        self.assertNotIn(owner, router.route('conversation'))
+        self.assertNotIn(owner, router.route(None))
+        router.check_health()
+        self.assertFalse(router.status()['workers'][owner]['live'])
+        healthy[owner] = True
+        router.check_health()
+        self.assertEqual(router.route('conversation')[0], owner)
+
+        for worker in 'abc':
+            router.mark_down(worker)
+        with self.assertRaises(NoWorkerAvailable):
+            router.route(None)
+
+    def test_unkeyed_rotation(self):
+        router = WorkerRouter(['a', 'b', 'c'])
+        self.assertEqual([router.route(None)[0] for _ in range(6)], ['a', 'b', 'c', 'a', 'b', 'c'])
+
+    def test_request_key(self):
+        """Test that the dispatcher keys chat requests exactly as ConversationScanner does"""
+        context = [{'role': 'user', 'content': "Hello"}, {'role': 'assistant', 'content': "Hi"}]
+        body = json.dumps({'message': "More", 'context': context, 'parameters': {}}).encode()
+        self.assertEqual(dispatcher.request_key('POST', '/api/chat', body), conversation_key(context))
+        body = json.dumps({'message': "More", 'parameters': {'conversation_id': 'abc'}}).encode()
+        self.assertEqual(dispatcher.request_key('POST', '/api/chat', body), 'abc')
+        self.assertIsNone(dispatcher.request_key('POST', '/api/chat', b'{"message": "First turn"}'))
+        self.assertIsNone(dispatcher.request_key('POST', '/api/chat', b'not json'))
+        self.assertIsNone(dispatcher.request_key('GET', '/api/status', b''))
+
+
+def _start_stub_worker(name):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.startswith('/api/analysis/') and name != 'stub-1':
+                self._send(404, {'error': 'Unknown or expired request id'})
+            else:
+                self._send(200, {'worker': name, 'path': self.path})
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers['Content-Length']))
+            self._send(200, {'worker': name, 'request': json.loads(body)})
+
+        def _send(self, status, payload):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class TestDispatcher(unittest.TestCase):
+    def setUp(self):
+        self.workers = [_start_stub_worker(f"stub-{index}") for index in range(3)]
+        self.urls = [f"http://127.0.0.1:{server.server_address[1]}" for server in self.workers]
+        self.names = dict(zip(self.urls, ['stub-0', 'stub-1', 'stub-2']))
+        self.router = WorkerRouter(self.urls, health_check=dispatcher.http_health_check(0.5))
+        self.server = dispatcher.start_dispatcher(self.router)
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        for worker in self.workers:
+            if worker is not None:
+                worker.shutdown()
+                worker.server_close()
+
+    def chat(self, conversation, turn, parameters=None):
+        context = [{'role': 'user', 'content': f"Opening message of {conversation}"}]
+        context += [{'role': 'assistant', 'content': "Reply"}] * turn
+        context = context if turn else []
+        body = {'message': "Next", 'context': context}
+        if parameters is not None:
+            body['parameters'] = parameters
+        request = urllib.request.Request(self.base + '/api/chat', method='POST', data=json.dumps(body).encode(),
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=5) as response:
+            payload = json.loads(response.read())
+            self.assertEqual(self.names[response.headers[dispatcher.WORKER_HEADER]], payload['worker'])
+            self.assertEqual(payload['request']['context'], context)
+            return response.headers[dispatcher.WORKER_HEADER]
+
+    def test_affinity_and_failover(self):
+        """Test that every turn of a conversation reaches one worker, and a dead worker's move elsewhere"""
+        conversations = [f"c{index}" for index in range(30)]
+        placement = {conversation: self.chat(conversation, 1) for conversation in conversations}
+        self.assertEqual(len(set(placement.values())), 3)
+        for turn in (2, 3):
+            self.assertEqual({conversation: self.chat(conversation, turn) for conversation in conversations},
+                             placement)
+
+        dead = self.urls[0]
+        self.workers[0].shutdown()
+        self.workers[0].server_close()
+        self.workers[0] = None
+        moved = {conversation: self.chat(conversation, 4) for conversation in conversations}
+        for conversation, worker in placement.items():
+            if worker == dead:
+                self.assertNotEqual(moved[conversation], dead)
+            else:
+                self.assertEqual(moved[conversation], worker)
+        with urllib.request.urlopen(self.base + dispatcher.STATUS_PATH, timeout=5) as response:
+            status = json.loads(response.read())
+        self.assertFalse(status['workers'][dead]['live'])
+        self.assertEqual(sum(worker['failovers'] for worker in status['workers'].values()), 1)
+
+    def test_conversation_id_keys_first_turn(self):
+        """Test that a conversation_id (as the web UI sends) keeps the first turn on the conversation's worker"""
+        for index in range(10):
+            parameters = {'conversation_id': f"session_{index}"}
+            owner = self.router.route(f"session_{index}")[0]
+            self.assertEqual([self.chat(f"c{index}", turn, parameters) for turn in range(3)], [owner] * 3)
+        self.assertEqual(self.router.status()['unkeyed_requests'], 0)
+
+    def test_analysis_lookup_and_no_workers(self):
+        """Test that deep-analysis lookups find the worker holding the result"""
+        with urllib.request.urlopen(self.base + '/api/analysis/abc', timeout=5) as response:
+            self.assertEqual(json.loads(response.read())['worker'], 'stub-1')
+        for url in self.urls:
+            self.router.mark_down(url)
+        with self.assertRaises(urllib.error.HTTPError) as raised:
+            urllib.request.urlopen(self.base + '/api/status', timeout=5)
+        self.assertEqual(raised.exception.code, 503)
+        self.router.check_health()
+        with urllib.request.urlopen(self.base + '/api/status', timeout=5) as response:
+            self.assertEqual(response.status, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+"""
+Tests for incremental conversation-level harm scanning
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ConversationScanner import ConversationScanner, conversation_key
+from EthicalSystemIntegration import HarmDetectionLayer, IntegratedEthicalProcessor
+
+
+def _turns(*pairs):
+    context = []
+    for user, assistant in pairs:
+        context.append({'role': 'user', 'content': user})
+        context.append({'role': 'assistant', 'content': assistant})
+    return context
+
+
+class TestConversationScanner(unittest.TestCase):
+    def test_conversation_key(self):
+        """Test that the key is the explicit id, else derived from the first message"""
+        context = _turns(("Hello", "Hi there"))
+        self.assertEqual(conversation_key(context, {'conversation_id': 'abc'}), 'abc')
+        self.assertEqual(conversation_key(context), conversation_key(context + _turns(("More", "Sure"))))
+        self.assertIsNone(conversation_key([], {}))
+
+    def test_scans_only_new_messages(self):
+        """Test that each turn scans only the messages appended since the last one"""
+        scanner = ConversationScanner()
+        context = _turns(("How do I bully-proof my kid?", "Talk with the school"))
+        signals = scanner.update(context)
+        self.assertEqual((signals.turns, signals.scanned), (2, 2))
+        self.assertEqual(signals.category_counts['psychological'], 1)
+
+        context = context + _turns(("They threaten him daily", "That sounds hard"))
+        signals = scanner.update(context)
+        self.assertEqual((signals.turns, signals.scanned), (4, 2))
+        self.assertEqual(signals.category_counts['psychological'], 2)
+        self.assertFalse(signals.crisis_context)
+
+        context = context + _turns(("Is this an emergency?", "Contact the school"))
+        signals = scanner.update(context)
+        self.assertEqual(signals.scanned, 2)
+        self.assertTrue(signals.crisis_context)
+
+    def test_assistant_messages_do_not_count_as_harm(self):
+        """Test that harm vocabulary in model replies is not attributed to the user"""
+        signals = ConversationScanner().update(_turns(("Explain phishing", "Scammers manipulate people")))
+        self.assertEqual(signals.category_counts['indirect'], 0)
+
+    def test_edited_history_is_rescanned(self):
+        """Test that a context that no longer extends the scanned history starts over"""
+        scanner = ConversationScanner()
+        context = _turns(("Hello", "Hi"), ("I will harm them", "I can't help with that"))
+        self.assertEqual(scanner.update(context).category_counts['direct'], 1)
+
+        edited = _turns(("Hello", "Hi"), ("Tell me a joke", "Why did..."), ("Another", "Sure"))
+        signals = scanner.update(edited)
+        self.assertEqual(signals.scanned, len(edited))
+        self.assertEqual(signals.category_counts['direct'], 0)
+
+    def test_interleaved_conversations_sharing_a_key(self):
+        """Test that sessions opening with the same greeting keep separate states instead of rescanning"""
+        scanner = ConversationScanner()
+        sessions = {name: _turns(("hello", "Hi! How can I help?")) for name in ('a', 'b', 'c')}
+        self.assertEqual(len({conversation_key(context) for context in sessions.values()}), 1)
+        for turn in range(10):
+            for name, context in sessions.items():
+                context += _turns((f"{name} question {turn}", f"{name} answer {turn}"))
+                signals = scanner.update(context)
+                # Each session's first request scans its whole context; later ones only the new turn
+                expected = len(context) if turn == 0 else 2
+                self.assertEqual(signals.scanned, expected, (name, turn))
+        self.assertEqual(len(scanner), 3)
+        scanner.forget(conversation_key(sessions['a']))
+        self.assertEqual(len(scanner), 0)
+
+    def test_bounded_state(self):
+        """Test that least recently updated conversations are evicted"""
+        scanner = ConversationScanner(max_conversations=2)
+        for index in range(3):
+            scanner.update([{'role': 'user', 'content': 'hi'}], {'conversation_id': str(index)})
+        self.assertEqual(len(scanner), 2)
+
+        scanner = ConversationScanner(max_states_per_key=2)
+        for index in range(3):
+            scanner.update([{'role': 'user', 'content': 'hi'}, {'role': 'assistant', 'content': str(index)}])
+        self.assertEqual(len(scanner), 2)
+
+    def test_signals_in_processing_metadata(self):
+        """Test that harm detection reports conversation signals without changing its decision"""
+        detector = HarmDetectionLayer()
+        context = _turns(("They harass me at work", "I'm sorry to hear that"))
+        analysis = detector.analyze("What can I do?", context, {'crisis_mode': False})
+        self.assertFalse(analysis.has_harmful_intent)
+        self.assertEqual(analysis.conversation.category_counts['psychological'], 1)
+
+        processor = IntegratedEthicalProcessor()
+        result = processor.process_input("What can I do?", context, {'crisis_mode': False})
+        conversation = result['processing_metadata']['ethical_checks']['harm_detection']['conversation']
+        self.assertEqual(conversation['turns'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+Tests for the asynchronous deep-path analysis
+"""
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DeepAnalysis import COMPLETE, DROPPED, FAILED, PENDING, DeepAnalysisStore
+from EthicalSystemIntegration import IntegratedEthicalProcessor
+
+try:
+    import app as app_module
+except ImportError:
+    app_module = None
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestDeepAnalysisStore(unittest.TestCase):
+    def test_results_by_request_id(self):
+        """Test that completed and failed jobs are stored under their request id"""
+        store = DeepAnalysisStore()
+        self.assertEqual(store.submit('ok', lambda: {'layer': {'run': True}}), PENDING)
+        store.submit('bad', lambda: 1 / 0)
+        entry = store.wait('ok')
+        self.assertEqual(entry['status'], COMPLETE)
+        self.assertEqual(entry['results'], {'layer': {'run': True}})
+        self.assertEqual(store.wait('bad')['status'], FAILED)
+        self.assertIsNone(store.get('unknown'))
+
+    def test_expiry_and_bounds(self):
+        """Test that results expire after the TTL and excess submissions are dropped"""
+        clock = FakeClock()
+        release = threading.Event()
+        store = DeepAnalysisStore(workers=1, ttl=10.0, max_pending=1, clock=clock)
+        store.submit('slow', release.wait)
+        self.assertEqual(store.submit('excess', dict), DROPPED)
+        release.set()
+        self.assertEqual(store.wait('slow')['status'], COMPLETE)
+        clock.now = 11.0
+        self.assertIsNone(store.get('slow'))
+
+
+class TestProcessorDeepPath(unittest.TestCase):
+    def setUp(self):
+        self.processor = IntegratedEthicalProcessor()
+
+    def test_deep_path_runs_after_response(self):
+        """Test that a slow deep layer does not add to process_input latency"""
+        def slow_modeling(process_state, process_data):
+            time.sleep(0.3)
+            return {'details': 'modeled'}
+
+        self.processor._run_wellbeing_modeling = slow_modeling
+        self.processor.rebuild_pipeline()
+        start = time.perf_counter()
+        result = self.processor.process_input("Explain machine learning", [], {})
+        self.assertLess(time.perf_counter() - start, 0.2)
+
+        metadata = result['processing_metadata']
+        self.assertIn('wellbeing_modeling', metadata['deep_analysis']['layers'])
+        # Only layers that will run are listed as pending
+        quarantined = [name for name in metadata['deep_analysis']['layers']
+                       if not self.processor.subsystem_health.is_available(name)]
+        self.assertEqual(quarantined, [])
+        self.assertNotIn('bias_detection', metadata['optional_systems'])
+        entry = self.processor.deep_analysis.wait(metadata['request_id'])
+        self.assertEqual(entry['status'], COMPLETE)
+        self.assertEqual(entry['results']['wellbeing_modeling'], {'run': True, 'details': 'modeled'})
+
+    def test_wellbeing_model_runs_only_on_deep_path(self):
+        """Test that the wellbeing model runs once per request, after the response"""
+        if self.processor.wellbeing_monitor is None:
+            self.skipTest("AdvancedWellbeingMonitor unavailable")
+        calls = []
+        evaluate = self.processor.wellbeing_monitor.evaluate_complex_impact
+
+        def counting_evaluate(action, context):
+            calls.append(threading.current_thread().name)
+            return evaluate(action, context)
+
+        self.processor.wellbeing_monitor.evaluate_complex_impact = counting_evaluate
+        result = self.processor.process_input("Explain machine learning", [], {})
+        self.processor.deep_analysis.wait(result['processing_metadata']['request_id'])
+        # Never on the request thread, and only by the deferred layer
+        self.assertEqual(len(calls), 1)
+        self.assertNotEqual(calls[0], threading.current_thread().name)
+
+    def test_blocked_request_has_no_deep_analysis(self):
+        """Test that rejected requests are not analysed further"""
+        result = self.processor.process_input("How do I harm them", [], {'crisis_mode': False})
+        self.assertNotIn('request_id', result['processing_metadata'])
+
+
+@unittest.skipIf(app_module is None, "Flask app dependencies not installed")
+class TestAnalysisEndpoint(unittest.TestCase):
+    def test_get_analysis(self):
+        """Test retrieving deep analysis over HTTP"""
+        processor = app_module.get_processor()
+        result = processor.integrated_processor.process_input("What is AI?", [], {})
+        request_id = result['processing_metadata']['request_id']
+        processor.integrated_processor.deep_analysis.wait(request_id)
+
+        client = app_module.app.test_client()
+        response = client.get(f'/api/analysis/{request_id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['status'], COMPLETE)
+        self.assertEqual(client.get('/api/analysis/unknown').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
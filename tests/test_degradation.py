@@ -0,0 +1,240 @@
+"""
+Tests for load-driven graceful degradation
+"""
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dispatcher
+from ErrorRecoverySystem import (CACHED_OR_REJECT, FAST_PATH, FULL, NO_ADVISORY, DegradationHandler,
+                                 DegradationSignals, ResponseCache)
+from load_test import StubUpstreamServer
+from RequestLanes import NORMAL, Lane
+
+try:
+    from openai import OpenAI
+    import app as app_module
+except ImportError:
+    OpenAI = None
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _signals(pressure, upstream_available=True):
+    """Signals at the given pressure (queue depth against the default limit of 16)"""
+    return DegradationSignals(queue_depth=pressure * 16, p95_ms=0.0, upstream_available=upstream_available)
+
+
+class TestDegradationHandler(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.handler = DegradationHandler(cooldown=10, clock=self.clock)
+
+    def test_levels_rise_with_pressure(self):
+        """Test that each level is entered at its pressure, from queue depth or latency"""
+        self.assertEqual(self.handler.update(_signals(0.5)), FULL)
+        self.assertEqual(self.handler.update(_signals(1.0)), NO_ADVISORY)
+        self.assertEqual(self.handler.update(DegradationSignals(0, 1600.0, True)), FAST_PATH)
+        self.assertEqual(self.handler.update(_signals(3.0)), CACHED_OR_REJECT)
+
+    def test_upstream_unavailable(self):
+        """Test that losing every upstream model goes straight to cached_or_reject"""
+        self.assertEqual(self.handler.update(_signals(0.0, upstream_available=False)), CACHED_OR_REJECT)
+
+    def test_hysteresis(self):
+        """Test that levels fall one at a time after a calm cooldown and do not flap"""
+        self.handler.update(_signals(2.0))
+        self.assertEqual(self.handler.level, FAST_PATH)
+        # Oscillating just under the entry pressure, above the exit pressure
+        for pressure in (1.4, 1.1, 1.45, 1.2) * 5:
+            self.clock.now += 5
+            self.assertEqual(self.handler.update(_signals(pressure)), FAST_PATH)
+
+        self.handler.update(_signals(0.1))
+        self.clock.now += 9
+        self.assertEqual(self.handler.update(_signals(0.1)), FAST_PATH)
+        self.clock.now += 1
+        self.assertEqual(self.handler.update(_signals(0.1)), NO_ADVISORY)
+        self.clock.now += 5
+        self.assertEqual(self.handler.update(_signals(0.1)), NO_ADVISORY)
+        self.clock.now += 5
+        self.assertEqual(self.handler.update(_signals(0.1)), FULL)
+
+        status = self.handler.status()
+        self.assertEqual([(t['from'], t['to']) for t in status['transitions']],
+                         [(FULL, FAST_PATH), (FAST_PATH, NO_ADVISORY), (NO_ADVISORY, FULL)])
+        self.assertEqual(self.handler.manage_degradation_modes(_signals(0.1)).mode_control['service_levels']
+                         ['current'], FULL)
+
+    def test_monitoring(self):
+        """Test that the background monitor applies signals"""
+        handler = DegradationHandler()
+        handler.start_monitoring(lambda: _signals(5.0), interval=0.01)
+        try:
+            deadline = time.monotonic() + 5
+            while handler.level != CACHED_OR_REJECT and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            handler.stop_monitoring()
+        self.assertEqual(handler.level, CACHED_OR_REJECT)
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_cache(self):
+        """Test keying, expiry, eviction and that requests with context are not cached"""
+        clock = FakeClock()
+        cache = ResponseCache(capacity=2, ttl=60, clock=clock)
+        cache.put("What is AI?", [], {'temperature': 0.5}, "answer")
+        self.assertEqual(cache.get("  what is ai? ", [], {'temperature': 0.5}), "answer")
+        self.assertIsNone(cache.get("What is AI?", [], {'temperature': 0.7}))
+        cache.put("Hello", [{'role': 'user', 'content': 'earlier'}], {}, "with context")
+        self.assertIsNone(cache.get("Hello", [], {}))
+
+        cache.put("a", [], {}, "1")
+        cache.put("b", [], {}, "2")
+        self.assertIsNone(cache.get("What is AI?", [], {'temperature': 0.5}))
+        clock.now = 61
+        self.assertIsNone(cache.get("b", [], {}))
+        self.assertEqual(cache.status(), {'size': 1, 'bytes': 1, 'hits': 1, 'misses': 4})
+
+    def test_key_ignores_routing_fields(self):
+        """Test that requests differing only in routing and transport fields share an entry"""
+        cache = ResponseCache()
+        cache.put("What is AI?", [], {'temperature': 0.5, 'conversation_id': 'session_a',
+                                      'speculative_upstream': True}, "answer")
+        self.assertEqual(cache.get("What is AI?", [], {'temperature': 0.5, 'conversation_id': 'session_b',
+                                                       'hedge_upstream': True}), "answer")
+        self.assertIsNone(cache.get("What is AI?", [], {'temperature': 0.5, 'crisis_mode': True}))
+
+    def test_byte_bound(self):
+        """Test that the cache evicts by total response size, not only by entry count"""
+        cache = ResponseCache(capacity=100, max_bytes=10)
+        cache.put("a", [], {}, "x" * 6)
+        cache.put("b", [], {}, "y" * 6)
+        self.assertIsNone(cache.get("a", [], {}))
+        self.assertEqual(cache.get("b", [], {}), "y" * 6)
+        cache.put("b", [], {}, "z" * 4)
+        cache.put("huge", [], {}, "w" * 11)
+        self.assertIsNone(cache.get("huge", [], {}))
+        self.assertEqual(cache.status()['bytes'], 4)
+
+
+class TestLaneSignals(unittest.TestCase):
+    def test_waiting_and_recent_p95(self):
+        """Test the queue depth and the per-tick p95 latency the monitor reads"""
+        lane = Lane('test', 1, queue_timeout=None)
+        release = threading.Event()
+        held = threading.Event()
+
+        def hold():
+            with lane.admit():
+                held.set()
+                release.wait(5)
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        held.wait(5)
+
+        def wait():
+            with lane.admit():
+                pass
+
+        waiter = threading.Thread(target=wait)
+        waiter.start()
+        deadline = time.monotonic() + 5
+        while lane.waiting == 0 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        self.assertEqual(lane.waiting, 1)
+        release.set()
+        holder.join()
+        waiter.join()
+        self.assertEqual(lane.waiting, 0)
+        self.assertGreater(lane.recent_p95(), 0.0)
+        self.assertEqual(lane.recent_p95(), 0.0)
+
+
+@unittest.skipIf(OpenAI is None, "openai package not installed")
+class TestDegradedChat(unittest.TestCase):
+    """/api/chat at each degradation level against a stub upstream"""
+
+    def setUp(self):
+        self.processor = app_module.get_processor()
+        if not self.processor.use_integrated:
+            self.skipTest("integrated processor unavailable")
+        self.stub = StubUpstreamServer(profile='instant', base_latency=0.01).start()
+        self.saved_client = app_module._openai_client
+        app_module._openai_client = OpenAI(base_url=self.stub.base_url, api_key='stub-key')
+        self.saved = (self.processor.degradation, self.processor.response_cache)
+        self.processor.degradation = DegradationHandler()
+        self.processor.response_cache = ResponseCache()
+
+    def tearDown(self):
+        self.processor.degradation, self.processor.response_cache = self.saved
+        app_module._openai_client = self.saved_client
+        self.stub.stop()
+
+    def _chat(self, message, **parameters):
+        return app_module.app.test_client().post('/api/chat', json={
+            'message': message, 'context': [], 'parameters': dict(parameters, max_tokens=4)})
+
+    def test_levels(self):
+        """Test the layers each level runs, and cached-or-reject answers"""
+        response = self._chat("Tell me about renewable energy")
+        metadata = response.get_json()['metadata']
+        self.assertEqual(metadata['degradation'], FULL)
+        self.assertIn('wellbeing_assessment', metadata['ethical_checks'])
+
+        self.processor.degradation.update(_signals(1.0))
+        metadata = self._chat("Tell me about solar power").get_json()['metadata']
+        self.assertEqual(metadata['degradation'], NO_ADVISORY)
+        self.assertEqual(metadata['optional_systems'], {})
+        self.assertIsNone(metadata['deep_analysis'])
+
+        self.processor.degradation.update(_signals(2.0))
+        metadata = self._chat("Tell me about wind power").get_json()['metadata']
+        self.assertEqual(metadata['degradation'], FAST_PATH)
+        self.assertNotIn('wellbeing_assessment', metadata['ethical_checks'])
+        self.assertTrue(self._chat("How do I harm them").get_json()['metadata']['blocked'])
+
+        served = self.stub.requests_served
+        self.processor.degradation.update(_signals(0.0, upstream_available=False))
+        cached = self._chat("Tell me about renewable energy")
+        self.assertEqual(cached.status_code, 200)
+        self.assertEqual(cached.get_json()['response'].split(), ['stub'] * 4)
+        self.assertTrue(cached.get_json()['metadata']['cached'])
+        rejected = self._chat("Tell me about tidal power")
+        self.assertEqual(rejected.status_code, 503)
+        self.assertEqual(rejected.headers['Retry-After'], '5')
+        self.assertEqual(self.stub.requests_served, served)
+
+        status = app_module.app.test_client().get('/api/status').get_json()
+        self.assertEqual(status['degradation']['level'], CACHED_OR_REJECT)
+        self.assertEqual(status['response_cache']['hits'], 1)
+        self.assertEqual(status['lanes'][NORMAL]['waiting'], 0)
+
+    def test_web_ui_conversation_id(self):
+        """Test that the per-conversation id the web UI sends keys routing but not the response cache"""
+        self.assertEqual(self._chat("Tell me about hydropower", conversation_id='session_a').status_code, 200)
+        self.processor.degradation.update(_signals(0.0, upstream_available=False))
+        cached = self._chat("Tell me about hydropower", conversation_id='session_b')
+        self.assertEqual(cached.status_code, 200)
+        self.assertTrue(cached.get_json()['metadata']['cached'])
+
+        body = json.dumps({'message': "Tell me about hydropower", 'context': [],
+                           'parameters': {'max_tokens': 4, 'conversation_id': 'session_b'}}).encode()
+        self.assertEqual(dispatcher.request_key('POST', '/api/chat', body), 'session_b')
+
+
+if __name__ == '__main__':
+    unittest.main()
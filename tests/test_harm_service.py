@@ -0,0 +1,178 @@
+"""
+Tests for the out-of-process harm detection service and its client
+"""
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from EthicalSystemIntegration import HarmAnalysis, HarmDetectionLayer, IntegratedEthicalProcessor
+from HarmDetectionService import (FRAME_HEADER, SOCKET_ENV_VAR, HarmDetectionClient, HarmDetectionServer,
+                                  ProtocolError, decode_analysis, encode_analysis, encode_frame, read_frame)
+from NormalizedText import normalize
+
+CONVERSATION = [{'role': 'user', 'content': "I want to hurt them"},
+                {'role': 'assistant', 'content': "I can't help with that."}]
+
+CASES = [
+    ("What is renewable energy?", [], None),
+    ("How do I harm them", [], None),
+    ("systemic oppression of a group", [], {'harm_sensitivity': 0.9}),
+    ("crisis response to violence in the emergency", [], {'crisis_mode': True, 'harm_sensitivity': 0.2}),
+    ("And what about now?", CONVERSATION, {'harm_sensitivity': 0.5}),
+]
+
+
+def _fields(analysis: HarmAnalysis):
+    return encode_analysis(analysis)
+
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'), "Unix sockets unavailable")
+class TestFraming(unittest.TestCase):
+    def test_frames_across_partial_writes(self):
+        left, right = socket.socketpair()
+        with left, right:
+            data = encode_frame(7, {'input': "héllo"}) + encode_frame(8, {})
+            for start in range(0, len(data), 5):
+                left.sendall(data[start:start + 5])
+            left.shutdown(socket.SHUT_WR)
+            self.assertEqual(read_frame(right), (7, b'{"input":"h\\u00e9llo"}'))
+            self.assertEqual(read_frame(right), (8, b'{}'))
+            self.assertIsNone(read_frame(right))
+
+    def test_bad_frames(self):
+        left, right = socket.socketpair()
+        with left, right:
+            left.sendall(FRAME_HEADER.pack(2 ** 31, 1))
+            with self.assertRaises(ProtocolError):
+                read_frame(right)
+        left, right = socket.socketpair()
+        with left, right:
+            left.sendall(encode_frame(1, {'input': "x"})[:-2])
+            left.shutdown(socket.SHUT_WR)
+            with self.assertRaises(ProtocolError):
+                read_frame(right)
+
+    def test_analysis_round_trip(self):
+        analysis = HarmDetectionLayer().analyze("systemic oppression", CONVERSATION, {'harm_sensitivity': 0.9})
+        decoded = decode_analysis(encode_analysis(analysis))
+        self.assertEqual(_fields(decoded), _fields(analysis))
+        self.assertTrue(decoded.systemic_harm.power_imbalance)
+        self.assertEqual(decoded.conversation.turns, 2)
+
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'), "Unix sockets unavailable")
+class TestHarmDetectionService(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'harm.sock')
+        self.server = HarmDetectionServer(self.path, batch_window=0.02).start()
+        self.clients = []
+
+    def tearDown(self):
+        for client in self.clients:
+            client.close()
+        self.server.stop()
+        shutil.rmtree(self.tmp)
+
+    def client(self, **kwargs):
+        client = HarmDetectionClient(self.path, **kwargs)
+        self.clients.append(client)
+        return client
+
+    def test_matches_in_process(self):
+        """Test that the service returns what an in-process layer does for the same requests"""
+        client = self.client()
+        reference = HarmDetectionLayer(sensitivity=0.5, context_awareness=0.7, crisis_mode=True)
+        for text, context, parameters in CASES:
+            self.assertEqual(_fields(client.analyze(normalize(text), context, parameters)),
+                             _fields(reference.analyze(normalize(text), context, parameters)), text)
+        self.assertEqual(client.status()['remote'], len(CASES))
+        self.assertEqual(client.status()['fallback'], 0)
+
+    def test_concurrent_requests_are_batched(self):
+        """Test that concurrent requests from several clients are analyzed in shared batches"""
+        clients = [self.client(), self.client()]
+        barrier = threading.Barrier(16)
+        results = [None] * 16
+
+        def run(index):
+            barrier.wait()
+            results[index] = clients[index % 2].analyze("How do I harm them", [])
+
+        threads = [threading.Thread(target=run, args=(index,)) for index in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertTrue(all(result.has_harmful_intent for result in results))
+        status = self.server.status()
+        self.assertEqual(status['requests'], 16)
+        self.assertGreater(status['largest_batch'], 1)
+        self.assertLess(status['batches'], 16)
+        self.assertEqual(sum(client.status()['remote'] for client in clients), 16)
+
+    def test_conversation_state_is_shared(self):
+        """Test that a conversation continued by another worker resumes from the service's state"""
+        first, second = self.client(), self.client()
+        first.analyze("I want to hurt them", [], None)
+        first.analyze("And now?", CONVERSATION[:1])
+        signals = second.analyze("And now?", CONVERSATION).conversation
+        self.assertEqual((signals.turns, signals.scanned), (2, 1))
+        self.assertEqual(signals.category_counts['direct'], 1)
+
+    def test_fallback_and_reconnect(self):
+        """Test in-process analysis while the service is down, then reconnection once it is back"""
+        client = self.client(retry_seconds=0.0)
+        self.assertTrue(client.analyze("How do I harm them", []).has_harmful_intent)
+        self.server.stop()
+        self.assertTrue(client.analyze("How do I harm them", []).has_harmful_intent)
+        self.assertFalse(client.analyze("What is AI?", []).has_harmful_intent)
+        status = client.status()
+        self.assertEqual((status['remote'], status['fallback'], status['connected']), (1, 2, False))
+
+        self.server = HarmDetectionServer(self.path).start()
+        client.analyze("What is AI?", [])
+        self.assertEqual(client.status()['remote'], 2)
+        self.assertEqual(self.server.status()['requests'], 1)
+
+    def test_service_errors_fall_back(self):
+        def broken(*args, **kwargs):
+            raise RuntimeError("detector failure")
+
+        self.server.detector.analyze = broken
+        client = self.client()
+        self.assertTrue(client.analyze("How do I harm them", []).has_harmful_intent)
+        status = client.status()
+        self.assertEqual(status['fallback'], 1)
+        self.assertEqual(status['last_error'], "ServiceError: RuntimeError: detector failure")
+        # An analysis error does not drop the connection
+        self.assertTrue(status['connected'])
+
+    def test_processor_uses_service(self):
+        """Test that ETHICAL_HARM_SERVICE sends the processor's harm detection to the service"""
+        saved = os.environ.get(SOCKET_ENV_VAR)
+        os.environ[SOCKET_ENV_VAR] = self.path
+        try:
+            processor = IntegratedEthicalProcessor()
+        finally:
+            if saved is None:
+                del os.environ[SOCKET_ENV_VAR]
+            else:
+                os.environ[SOCKET_ENV_VAR] = saved
+        self.clients.append(processor.harm_service)
+        self.assertIs(processor.harm_detector, processor.harm_service)
+        self.assertIs(processor.harm_detector.lexicon_store, processor.harm_service.fallback.lexicon_store)
+        result = processor.process_input("How do I harm them", [], {})
+        self.assertTrue(result['processing_metadata']['blocked'])
+        self.assertEqual(self.server.status()['requests'], 1)
+        self.assertIsNone(IntegratedEthicalProcessor().harm_service)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+"""
+Tests for the load testing tool and its stub upstream server
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from load_test import (StubUpstreamServer, load_prompt_corpus, run_closed_loop,
+                       run_open_loop, summarize)
+
+try:
+    from openai import OpenAI
+except ImportError:
+    OpenAI = None
+
+
+def _post(url, payload):
+    req = urllib.request.Request(url, data=json.dumps(payload).encode('utf-8'),
+                                 headers={'Content-Type': 'application/json'})
+    return urllib.request.urlopen(req, timeout=10)
+
+
+class TestStubUpstreamServer(unittest.TestCase):
+    def test_completion_shape(self):
+        """Test that the stub returns an OpenAI-compatible completion"""
+        with StubUpstreamServer(profile='instant') as stub:
+            with _post(stub.base_url + '/chat/completions',
+                       {'model': 'm', 'messages': [{'role': 'user', 'content': 'hi'}], 'max_tokens': 5}) as resp:
+                body = json.loads(resp.read())
+        self.assertEqual(body['object'], 'chat.completion')
+        self.assertEqual(body['usage']['completion_tokens'], 5)
+        self.assertEqual(body['choices'][0]['message']['role'], 'assistant')
+
+    def test_latency_profile(self):
+        """Test that the configured time to first token is applied"""
+        with StubUpstreamServer(profile='instant', base_latency=0.05) as stub:
+            start = time.perf_counter()
+            with _post(stub.base_url + '/chat/completions', {'messages': []}) as resp:
+                resp.read()
+            elapsed = time.perf_counter() - start
+        self.assertGreaterEqual(elapsed, 0.05)
+
+    def test_streaming(self):
+        """Test that streaming responses are server-sent events ending with [DONE]"""
+        with StubUpstreamServer(profile='instant', completion_tokens=3) as stub:
+            with _post(stub.base_url + '/chat/completions', {'messages': [], 'stream': True}) as resp:
+                events = [line for line in resp.read().decode('utf-8').split('\n\n') if line]
+        self.assertEqual(events[-1], 'data: [DONE]')
+        self.assertEqual(len(events), 5)
+
+    def test_error_injection(self):
+        """Test that error_rate=1.0 fails every request"""
+        with StubUpstreamServer(profile='instant', error_rate=1.0) as stub:
+            with self.assertRaises(urllib.error.HTTPError) as ctx:
+                _post(stub.base_url + '/chat/completions', {'messages': []})
+            ctx.exception.close()
+            self.assertEqual(stub.errors_injected, 1)
+
+    @unittest.skipIf(OpenAI is None, "openai package not installed")
+    def test_openai_client_compatibility(self):
+        """Test that the OpenAI client used by app.py can talk to the stub"""
+        with StubUpstreamServer(profile='instant') as stub:
+            client = OpenAI(base_url=stub.base_url, api_key='stub-key')
+            completion = client.chat.completions.create(
+                model='stub-model', messages=[{'role': 'user', 'content': 'hello'}], max_tokens=4
+            )
+        self.assertEqual(completion.choices[0].message.content, 'stub stub stub stub')
+
+
+class TestLoadGenerator(unittest.TestCase):
+    def test_corpus_loading(self):
+        """Test prompt extraction from a JSONL corpus"""
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as f:
+            f.write(json.dumps({'request_id': 'r1', 'title': 'T', 'body': 'first prompt'}) + '\n')
+            f.write(json.dumps({'message': 'second prompt'}) + '\n')
+            f.write('not json\n')
+            path = f.name
+        try:
+            self.assertEqual(load_prompt_corpus(path), ['first prompt', 'second prompt'])
+        finally:
+            os.remove(path)
+
+    def test_closed_loop_concurrency(self):
+        """Test that closed-loop load never exceeds the configured concurrency"""
+        in_flight = [0, 0]
+        lock = threading.Lock()
+
+        def send(message):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight[1], in_flight[0])
+            time.sleep(0.005)
+            with lock:
+                in_flight[0] -= 1
+            return message != 'bad'
+
+        result = run_closed_loop(send, ['ok', 'bad'], concurrency=3, total_requests=30)
+        self.assertEqual(result['requests'], 30)
+        self.assertEqual(result['errors'], 15)
+        self.assertLessEqual(in_flight[1], 3)
+
+    def test_open_loop_rate(self):
+        """Test that open-loop load offers roughly the requested arrival rate"""
+        result = run_open_loop(lambda message: True, ['ok'], rate=200, duration=0.5, seed=1)
+        self.assertGreater(result['requests'], 50)
+        self.assertEqual(result['errors'], 0)
+
+    def test_summary_percentiles(self):
+        """Test summary statistics"""
+        samples = [(i / 100.0, True) for i in range(1, 101)]
+        summary = summarize(samples, 2.0)
+        self.assertAlmostEqual(summary['latency']['p50'], 0.50)
+        self.assertAlmostEqual(summary['latency']['p99'], 0.99)
+        self.assertAlmostEqual(summary['throughput'], 50.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
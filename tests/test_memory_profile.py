@@ -0,0 +1,68 @@
+"""
+Tests for the per-layer memory profiling mode
+"""
+import os
+import sys
+import tracemalloc
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from EthicalSystemIntegration import IntegratedEthicalProcessor
+from memory_profile import PipelineMemoryProfiler, detect_growth, format_text
+
+
+class TestMemoryProfile(unittest.TestCase):
+    def setUp(self):
+        self.processor = IntegratedEthicalProcessor()
+
+    def tearDown(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def test_layer_attribution(self):
+        """Test that every pipeline layer is measured once per request"""
+        tracemalloc.start(1)
+        layers = PipelineMemoryProfiler(self.processor).profile_requests(["What is AI?"], 3)
+        for name in ('harm_detection', 'instruction_validation', 'system_integrity', 'wellbeing_assessment'):
+            self.assertEqual(layers[name]['calls'], 3)
+            self.assertEqual(layers[name]['errors'], 0)
+        self.assertGreater(layers['harm_detection']['retained_bytes'], 0)
+        self.assertIn('EthicalSystemIntegration.py', layers['harm_detection']['modules'])
+
+    def test_wrappers_removed(self):
+        """Test that profiling leaves the processor uninstrumented"""
+        tracemalloc.start(1)
+        PipelineMemoryProfiler(self.processor).profile_requests(["What is AI?"], 1)
+        self.assertNotIn('analyze', self.processor.harm_detector.__dict__)
+
+    def test_growth_detection(self):
+        """Test that an unbounded list is reported as growth"""
+        history = []
+        tracemalloc.start(25)
+        growth = detect_growth(lambda i: history.append({'request': i, 'payload': 'x' * 200}), 200)
+        sites = [entry['site'] for entry in growth]
+        self.assertTrue(any(site.startswith(os.path.join('tests', 'test_memory_profile.py')) for site in sites))
+        self.assertGreaterEqual(growth[0]['blocks_per_request'], 1.0)
+
+    def test_no_growth_for_bounded_work(self):
+        """Test that work which releases its allocations is not reported"""
+        tracemalloc.start(25)
+        growth = detect_growth(lambda i: [str(n) for n in range(100)], 100)
+        self.assertEqual(growth, [])
+
+    def test_text_report_is_stable(self):
+        """Test that the text report is deterministic for the same input"""
+        report = {
+            'config': {'target': 'integrated', 'requests': 1, 'growth_requests': 1, 'python': '3'},
+            'layers': {'harm_detection': {'calls': 1, 'errors': 0, 'retained_bytes_per_call': 10,
+                                          'retained_blocks_per_call': 1, 'max_peak_bytes': 20,
+                                          'modules': {'a.py': {'bytes': 10, 'blocks': 1}}}},
+            'growth': [{'site': 'a.py:1', 'bytes_per_request': 1.0, 'blocks_per_request': 1.0}]
+        }
+        self.assertEqual(format_text(report), format_text(report))
+        self.assertIn('harm_detection/a.py 10 1', format_text(report))
+
+
+if __name__ == '__main__':
+    unittest.main()
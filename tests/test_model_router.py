@@ -0,0 +1,164 @@
+"""
+Tests for latency-aware routing across upstream models
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from load_test import StubUpstreamServer
+from ModelRouter import (CHEAPEST, FASTEST, WEIGHTED, ModelCandidate, ModelRouter, ROUTER_CONFIG_ENV_VAR,
+                         load_router)
+
+try:
+    from openai import OpenAI
+    import app as app_module
+except ImportError:
+    OpenAI = None
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _warm(router, latencies):
+    """Route once to every (cold) candidate, recording the given latency in seconds"""
+    for _ in latencies:
+        candidate = router.choose()
+        router.record(candidate.name, latencies[candidate.name], latencies[candidate.name] / 2)
+
+
+class TestModelRouter(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.candidates = [ModelCandidate('slow', cost=0.1), ModelCandidate('fast', cost=1.0)]
+
+    def test_fastest_healthy(self):
+        """Test that the fastest policy avoids the slower and the failing candidate"""
+        router = ModelRouter(self.candidates, FASTEST, clock=self.clock)
+        _warm(router, {'slow': 0.5, 'fast': 0.1})
+        self.assertEqual([router.choose().name for _ in range(5)], ['fast'] * 5)
+
+        for _ in range(5):
+            router.record('fast', 0.1, ok=False)
+        self.assertEqual(router.choose().name, 'slow')
+        status = router.status()['models']
+        self.assertFalse(status['fast']['healthy'])
+        self.assertAlmostEqual(status['slow']['ttft_ms'], 250.0)
+
+    def test_ewma(self):
+        """Test that averages move toward new observations by alpha"""
+        router = ModelRouter(self.candidates[:1], alpha=0.5, clock=self.clock)
+        router.record('slow', 0.1)
+        router.record('slow', 0.3)
+        router.record('slow', 0.3, ok=False)
+        status = router.status()['models']['slow']
+        self.assertAlmostEqual(status['latency_ms'], 200.0)
+        self.assertAlmostEqual(status['error_rate'], 0.5)
+        self.assertEqual((status['samples'], status['errors']), (3, 1))
+
+    def test_cheapest_under_slo(self):
+        """Test that the cheapest policy prefers cost within the SLO and speed outside it"""
+        router = ModelRouter(self.candidates, CHEAPEST, slo_ms=300, clock=self.clock)
+        _warm(router, {'slow': 0.2, 'fast': 0.1})
+        self.assertEqual(router.choose().name, 'slow')
+        router.record('slow', 2.0)
+        router.record('slow', 2.0)
+        self.assertEqual(router.choose().name, 'fast')
+
+    def test_weighted(self):
+        """Test that the weighted policy splits traffic by weight over latency"""
+        candidates = [ModelCandidate('a', weight=1.0), ModelCandidate('b', weight=3.0)]
+        router = ModelRouter(candidates, WEIGHTED, clock=self.clock, rng=random.Random(7))
+        _warm(router, {'a': 0.1, 'b': 0.1})
+        picks = [router.choose().name for _ in range(2000)]
+        self.assertAlmostEqual(picks.count('b') / len(picks), 0.75, delta=0.05)
+
+    def test_cold_probe(self):
+        """Test that a candidate unobserved for probe_interval gets exactly one probe"""
+        router = ModelRouter(self.candidates, FASTEST, probe_interval=30, clock=self.clock)
+        _warm(router, {'slow': 0.5, 'fast': 0.1})
+        self.clock.now = 20
+        router.record('fast', 0.1)
+        self.clock.now = 31
+        self.assertEqual(router.choose().name, 'slow')
+        self.assertEqual(router.choose().name, 'fast')
+        router.release('slow')
+        self.assertEqual(router.choose().name, 'slow')
+
+    def test_load_router(self):
+        """Test router construction from a config file and from the model list"""
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump({'policy': CHEAPEST, 'slo_ms': 500, 'models': [
+                {'name': 'm1', 'cost': 2}, {'name': 'm2', 'base_url': 'http://127.0.0.1:1/v1', 'cost': 1}]}, f)
+        try:
+            router = load_router(f.name)
+        finally:
+            os.unlink(f.name)
+        self.assertEqual(router.policy, CHEAPEST)
+        self.assertEqual([c.base_url for c in router.candidates], [None, 'http://127.0.0.1:1/v1'])
+        os.environ.pop(ROUTER_CONFIG_ENV_VAR, None)
+        self.assertEqual([c.name for c in load_router(default_model='only').candidates], ['only'])
+        with self.assertRaises(ValueError):
+            ModelRouter([ModelCandidate('x')], CHEAPEST)
+
+
+@unittest.skipIf(OpenAI is None, "openai package not installed")
+class TestRoutedCompletions(unittest.TestCase):
+    """Routing real completions between local stub endpoints with different latency"""
+
+    def setUp(self):
+        self.fast = StubUpstreamServer(profile='instant', base_latency=0.01).start()
+        self.slow = StubUpstreamServer(profile='instant', base_latency=0.15).start()
+        self.saved_router = app_module._model_router
+        # Without SDK retries, so each injected error is one observed failure
+        for stub in (self.fast, self.slow):
+            app_module._endpoint_clients[(stub.base_url, 'stub-key')] = OpenAI(
+                base_url=stub.base_url, api_key='stub-key', max_retries=0)
+        app_module._model_router = ModelRouter([
+            ModelCandidate('slow-model', self.slow.base_url, 'stub-key'),
+            ModelCandidate('fast-model', self.fast.base_url, 'stub-key'),
+        ], FASTEST)
+        self.processor = app_module.get_processor()
+
+    def tearDown(self):
+        app_module._model_router = self.saved_router
+        app_module._endpoint_clients.clear()
+        self.fast.stop()
+        self.slow.stop()
+
+    def test_routes_to_fastest_endpoint(self):
+        """Test that traffic settles on the lower-latency endpoint after each is measured"""
+        for _ in range(10):
+            text = self.processor._complete("Explain machine learning", [], {})
+            self.assertEqual(text.split(), ['stub'] * 16)
+        self.assertEqual(self.slow.requests_served, 1)
+        self.assertEqual(self.fast.requests_served, 9)
+        models = app_module.get_model_router().status()['models']
+        self.assertLess(models['fast-model']['ttft_ms'], models['slow-model']['ttft_ms'])
+        self.assertGreaterEqual(models['slow-model']['latency_ms'], 150)
+
+    def test_upstream_error_recorded(self):
+        """Test that a failing endpoint is recorded as an error and routed around"""
+        self.fast.error_rate = 1.0
+        for _ in range(3):
+            try:
+                self.processor._complete("Explain machine learning", [], {'max_tokens': 4})
+            except Exception as e:
+                self.assertIn('Injected upstream error', str(e))
+        models = app_module.get_model_router().status()['models']
+        self.assertEqual(models['fast-model']['errors'], 1)
+        self.assertFalse(models['fast-model']['healthy'])
+        self.assertEqual(models['slow-model']['requests'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+"""
+Tests for the shared per-request NormalizedText
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from NormalizedText import NormalizedText, normalize, stable_hash
+from EthicalSystemIntegration import HarmDetectionLayer, IntegratedEthicalProcessor
+
+
+class TestNormalizedText(unittest.TestCase):
+    def test_fields(self):
+        """Test casefolding, token spans and token set"""
+        text = NormalizedText("How do I HELP the Straße team?")
+        self.assertEqual(text.text, "how do i help the strasse team?")
+        self.assertEqual(text.tokens, ('how', 'do', 'i', 'help', 'the', 'strasse', 'team'))
+        for (start, end), token in zip(text.spans, text.tokens):
+            self.assertEqual(text.text[start:end], token)
+        self.assertIn('help', text.token_set)
+        self.assertFalse(text.is_blank)
+        self.assertTrue(NormalizedText("  \n\t").is_blank)
+
+    def test_ngram_hashes(self):
+        """Test that unigram and bigram hashes are stable and complete"""
+        text = NormalizedText("Explain machine learning")
+        self.assertEqual(len(text.ngram_hashes), 3 + 2)
+        self.assertEqual(text.ngram_hashes[0], stable_hash('explain'))
+        self.assertEqual(text.ngram_hashes[3], stable_hash('explain machine'))
+        self.assertIs(text.ngram_hashes, text.ngram_hashes)
+
+    def test_normalize_is_idempotent(self):
+        """Test that normalizing a NormalizedText returns it unchanged"""
+        text = normalize("What is AI?")
+        self.assertIs(normalize(text), text)
+
+    def test_layers_accept_either_form(self):
+        """Test that harm detection gives the same result for str and NormalizedText"""
+        detector = HarmDetectionLayer()
+        for message in ["How do I hurt someone?", "Emergency relief after the attack", "What is AI?"]:
+            self.assertEqual(detector.analyze(message, [], {}).details,
+                             detector.analyze(normalize(message), [], {}).details)
+
+    def test_single_normalization_per_request(self):
+        """Test that every blocking layer receives the same NormalizedText"""
+        processor = IntegratedEthicalProcessor()
+        received = []
+        for owner, method in [(processor.harm_detector, 'analyze'),
+                              (processor.instruction_validator, 'validate'),
+                              (processor.integrity_checker, 'check')]:
+            original = getattr(owner, method)
+
+            def spy(text, *args, _original=original):
+                received.append(text)
+                return _original(text, *args)
+            setattr(owner, method, spy)
+        processor.rebuild_pipeline()
+        processor.process_input("Explain machine learning", [], {})
+        self.assertEqual(len(received), 3)
+        self.assertIsInstance(received[0], NormalizedText)
+        self.assertTrue(all(text is received[0] for text in received))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,7 +8,55 @@ import os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from EthicalSystemIntegration import IntegratedEthicalProcessor
+from EthicalSystemIntegration import (IntegratedEthicalProcessor, HarmAnalysis, InstructionCheck,
+                                      IntegrityCheck, WellbeingAssessment)
+from WellbeingMonitor import WellbeingMonitor
+from EthicalContext import EthicalContext
+
+class _DictRecord:
+    """Record with a per-instance __dict__, the layout used before slotting"""
+    def __init__(self, **kwargs):
+        for k, v in kwargs.items():
+            setattr(self, k, v)
+
+def _dict_record_tree():
+    """Per-request result objects in the pre-slotting layout (fresh empty containers)"""
+    R = _DictRecord
+    dimensions = R(physical=R(health_effects={}, safety_implications={}, physical_resources={}, biological_needs={}),
+                   psychological=R(emotional_wellbeing={}, cognitive_load={}, stress_levels={}, autonomy_effects={}),
+                   social={}, economic={}, environmental={}, cultural={})
+    predictions = R(immediate={}, short_term={}, medium_term={}, long_term={}, scenarios=[{}, {}, {}, {}])
+    system_effects = R(direct_effects={}, indirect_effects={},
+                       cascading_effects=R(primary_cascade={}, secondary_cascade={}, tertiary_cascade={},
+                                           feedback_loops=[]),
+                       emergent_properties=[])
+    assessment = R(dimensions=dimensions, predictions=predictions, system_effects=system_effects,
+                   feedback_loops=R(positive_feedback=[], negative_feedback=[], stabilizing_factors=[],
+                                    destabilizing_factors=[]),
+                   aggregate_score=R(overall_score=0.0, dimension_scores={}, confidence_levels={},
+                                     uncertainty_factors=[]))
+    return (assessment,
+            R(has_harmful_intent=False, confidence=0.0, details="", direct_harm=False, indirect_harm=False,
+              systemic_harm=None, psychological_harm=False),
+            R(is_valid=True, validation_score=1.0, details=""),
+            R(is_safe=True, integrity_score=1.0, details=""),
+            R(individual_impact="neutral", collective_impact="neutral", wellbeing_score=0.85, details="",
+              long_term_effects=None, systemic_effects=None))
+
+def _retained_per_call(build, calls=500):
+    """Bytes and allocated blocks retained per call while every result is kept alive"""
+    import tracemalloc
+    build()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    results = [build() for _ in range(calls)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, 'filename')
+    size = sum(stat.size_diff for stat in stats)
+    blocks = sum(stat.count_diff for stat in stats)
+    del results
+    return size / calls, blocks / calls
 
 class TestPerformance(unittest.TestCase):
     def setUp(self):
@@ -89,6 +137,52 @@ class TestPerformance(unittest.TestCase):
         # Peak memory should be reasonable (< 500 MB)
         self.assertLess(peak / 1024 / 1024, 500.0)
 
+    def test_result_record_allocations(self):
+        """Benchmark per-request allocations of the pipeline result records"""
+        monitor = WellbeingMonitor()
+
+        def slotted_tree():
+            return (monitor.evaluate_complex_impact("What is AI?", []),
+                    HarmAnalysis(), InstructionCheck(True, 1.0), IntegrityCheck(True, 1.0),
+                    WellbeingAssessment())
+
+        slotted_bytes, slotted_blocks = _retained_per_call(slotted_tree)
+        dict_bytes, dict_blocks = _retained_per_call(_dict_record_tree)
+
+        print(f"\nResult records per request:")
+        print(f"  Slotted: {slotted_bytes:.0f} bytes, {slotted_blocks:.1f} blocks")
+        print(f"  __dict__ layout: {dict_bytes:.0f} bytes, {dict_blocks:.1f} blocks")
+
+        self.assertLess(slotted_bytes, dict_bytes)
+        self.assertLess(slotted_blocks, dict_blocks)
+
+    def test_maintain_context_overhead(self):
+        """Benchmark maintain_context against the old per-call import and fallback path"""
+        import timeit
+        context = EthicalContext()
+        process_state = {'input': "What is AI?", 'context': [], 'parameters': {}}
+
+        def import_fallback_path(current_process):
+            # What maintain_context did before its result type existed
+            try:
+                from EthicalSystemIntegration import EthicalContextState
+                return EthicalContextState()
+            except (ImportError, NameError):
+                return {'temporal_context': context.track_temporal_context(),
+                        'spatial_context': context.track_spatial_context(),
+                        'social_context': context.track_social_context(),
+                        'moral_context': context.track_moral_context()}
+
+        calls = 2000
+        current = min(timeit.repeat(lambda: context.maintain_context(process_state), number=calls, repeat=3))
+        previous = min(timeit.repeat(lambda: import_fallback_path(process_state), number=calls, repeat=3))
+
+        print(f"\nmaintain_context per call:")
+        print(f"  Current: {current / calls * 1e6:.2f} us")
+        print(f"  Per-call import + ImportError fallback: {previous / calls * 1e6:.2f} us")
+
+        self.assertLess(current, previous)
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -0,0 +1,194 @@
+"""
+Tests for the declarative pipeline spec and its compiled plan
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PipelinePlan import (DEFAULT_PIPELINE_SPEC, CONFIG_ENV_VAR, compile_pipeline,
+                          load_pipeline_config)
+from EthicalSystemIntegration import IntegratedEthicalProcessor
+
+
+class StubProcessor:
+    """Minimal processor exposing layer callables for custom specs"""
+    missing_subsystem = None
+
+    def double(self, value):
+        return value * 2
+
+    def reject_large(self, result, state):
+        return {'blocked': True} if result > 10 else None
+
+    def slow(self, process_state, process_data):
+        time.sleep(0.5)
+        return {}
+
+    def quick(self, process_state, process_data):
+        return {'details': 'ok'}
+
+
+STUB_SPEC = [
+    {'name': 'double', 'call': 'double', 'inputs': ['input'], 'output': 'doubled',
+     'mode': 'blocking', 'reject': 'reject_large', 'required': True},
+    {'name': 'quick', 'call': 'quick'},
+    {'name': 'slow', 'call': 'slow', 'timeout': 0.05},
+    {'name': 'absent', 'call': 'quick', 'requires': 'missing_subsystem'},
+]
+
+
+class TestPipelineCompilation(unittest.TestCase):
+    def test_default_plan(self):
+        """Test that the default spec compiles to the canonical layer order"""
+        processor = IntegratedEthicalProcessor()
+        self.assertEqual([layer.name for layer in processor.pipeline.blocking],
+                         ['harm_detection', 'instruction_validation', 'system_integrity',
+                          'wellbeing_assessment'])
+        self.assertIn('ethical_context', [layer.name for layer in processor.pipeline.advisory])
+
+    def test_unavailable_layers_skipped(self):
+        """Test that layers whose subsystem is missing are compiled out"""
+        plan = compile_pipeline(StubProcessor(), STUB_SPEC)
+        self.assertEqual(plan.layer_names(), ['double', 'quick', 'slow'])
+        self.assertEqual(plan.skipped, {'absent': 'unavailable'})
+
+    def test_blocking_and_advisory_execution(self):
+        """Test blocking rejection, advisory results and advisory timeouts"""
+        plan = compile_pipeline(StubProcessor(), STUB_SPEC)
+        self.assertEqual(plan.run_blocking({'input': 6}), {'blocked': True})
+        state = {'input': 2}
+        self.assertIsNone(plan.run_blocking(state))
+        self.assertEqual(state['doubled'], 4)
+        state.update(process_state={}, process_data={})
+        results = plan.run_advisory(state)
+        self.assertEqual(results['quick'], {'run': True, 'details': 'ok'})
+        self.assertFalse(results['slow']['run'])
+        self.assertIn('exceeded', results['slow']['error'])
+
+    def test_on_cleared_callback(self):
+        """Test that on_cleared fires once the rejecting checks pass, and not on a rejection"""
+        plan = compile_pipeline(StubProcessor(), STUB_SPEC)
+        calls = []
+        plan.run_blocking({'input': 6}, lambda: calls.append('cleared'))
+        self.assertEqual(calls, [])
+        plan.run_blocking({'input': 2}, lambda: calls.append('cleared'))
+        self.assertEqual(calls, ['cleared'])
+
+    def test_operator_overrides(self):
+        """Test that configuration can disable advisory layers but not required ones"""
+        plan = compile_pipeline(StubProcessor(), STUB_SPEC, {'layers': {'quick': {'enabled': False}}})
+        self.assertEqual(plan.skipped['quick'], 'disabled')
+        with self.assertRaises(ValueError):
+            compile_pipeline(StubProcessor(), STUB_SPEC, {'layers': {'double': {'enabled': False}}})
+        with self.assertRaises(ValueError):
+            compile_pipeline(StubProcessor(), STUB_SPEC, {'layers': {'nonexistent': {}}})
+
+    def test_dependency_validation(self):
+        """Test that a blocking layer cannot read state produced after it"""
+        spec = [dict(DEFAULT_PIPELINE_SPEC[1]), dict(DEFAULT_PIPELINE_SPEC[0])]
+        with self.assertRaises(ValueError):
+            compile_pipeline(IntegratedEthicalProcessor(), spec)
+
+    def test_config_from_environment(self):
+        """Test that the processor reads overrides from the config file in the environment"""
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump({'layers': {'ethical_context': {'enabled': False}}}, f)
+            path = f.name
+        previous = os.environ.get(CONFIG_ENV_VAR)
+        os.environ[CONFIG_ENV_VAR] = path
+        try:
+            self.assertEqual(load_pipeline_config(), {'layers': {'ethical_context': {'enabled': False}}})
+            processor = IntegratedEthicalProcessor()
+            result = processor.process_input("What is AI?", [], {})
+            self.assertNotIn('ethical_context', result['processing_metadata']['optional_systems'])
+        finally:
+            if previous is None:
+                del os.environ[CONFIG_ENV_VAR]
+            else:
+                os.environ[CONFIG_ENV_VAR] = previous
+            os.remove(path)
+
+
+class SelectiveChecks:
+    """Independent blocking checks: 'a' is slow and rarely rejects, 'b' is cheap and selective"""
+    def check_a(self, text):
+        time.sleep(0.0005)
+        return 'a' in text
+
+    def check_b(self, text):
+        return 'b' in text
+
+    def reject(self, flagged, state):
+        return {'blocked_by': [name for name in ('a', 'b') if name in state['input']][0]} if flagged else None
+
+
+SELECTIVE_SPEC = [
+    {'name': 'a', 'call': 'check_a', 'inputs': ['input'], 'output': 'a', 'mode': 'blocking', 'reject': 'reject'},
+    {'name': 'b', 'call': 'check_b', 'inputs': ['input'], 'output': 'b', 'mode': 'blocking', 'reject': 'reject'},
+]
+
+
+def _comparable(result):
+    """Result without timestamps or per-request object identity"""
+    metadata = dict(result['processing_metadata'])
+    metadata.pop('timestamp', None)
+    metadata.pop('request_id', None)
+    return result['response'], json.dumps(metadata, sort_keys=True, default=str)
+
+
+class TestAdaptiveOrdering(unittest.TestCase):
+    def test_selective_check_moves_first(self):
+        """Test that a cheap, selective independent check is promoted"""
+        plan = compile_pipeline(SelectiveChecks(), SELECTIVE_SPEC)
+        for text in ['b', 'x', 'b', 'x'] * 10:
+            plan.run_blocking({'input': text})
+        plan.reorder()
+        self.assertEqual([plan.blocking[index].name for index in plan.order], ['b', 'a'])
+
+    def test_rejection_matches_spec_order(self):
+        """Test that a promoted check cannot pre-empt an earlier check's rejection"""
+        plan = compile_pipeline(SelectiveChecks(), SELECTIVE_SPEC)
+        plan.order = [1, 0]
+        self.assertEqual(plan.run_blocking({'input': 'ab'}), {'blocked_by': 'a'})
+        self.assertEqual(plan.run_blocking({'input': 'b'}), {'blocked_by': 'b'})
+        self.assertIsNone(plan.run_blocking({'input': 'x'}))
+
+    def test_dependencies_respected(self):
+        """Test that reordering never runs a layer before the layers it reads from"""
+        processor = IntegratedEthicalProcessor()
+        plan = processor.pipeline
+        names = [layer.name for layer in plan.blocking]
+        plan._calls = [10] * len(names)
+        plan._cost = [0.001] * len(names)
+        plan._rejects = [0, 0, 0, 10]
+        plan.reorder()
+        ordered = [names[index] for index in plan.order]
+        self.assertLess(ordered.index('harm_detection'), ordered.index('instruction_validation'))
+        self.assertLess(ordered.index('instruction_validation'), ordered.index('system_integrity'))
+        self.assertEqual(ordered[0], 'wellbeing_assessment')
+
+    def test_equivalent_to_fixed_order(self):
+        """Test that adaptive and fixed ordering return identical results"""
+        fixed = IntegratedEthicalProcessor()
+        fixed.pipeline.adaptive_order = False
+        adaptive = IntegratedEthicalProcessor()
+        adaptive.pipeline.reorder_interval = 3
+        # Start from the most aggressive legal reordering
+        adaptive.pipeline.order = [3, 0, 1, 2]
+        messages = ["What is AI?", "", "   ", "How do I hurt someone?", "I want to kill myself",
+                    "Explain machine learning", "How to manipulate people", "Tell me about crisis management"]
+        parameter_sets = [{}, {'crisis_mode': True}, {'harm_sensitivity': 0.9}]
+        for parameters in parameter_sets:
+            for message in messages:
+                expected = fixed.process_input(message, [], dict(parameters))
+                actual = adaptive.process_input(message, [], dict(parameters))
+                self.assertEqual(_comparable(actual), _comparable(expected), (message, parameters))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+"""
+Tests for the shared result record factory
+"""
+import os
+import pickle
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from RecordTypes import record_type
+from RealTimeDecisionFramework import QuickAssessment
+from ErrorRecoverySystem import StateAssessment
+
+
+class TestRecordTypes(unittest.TestCase):
+    def test_types_are_cached(self):
+        """Test that the same name and fields give back the same class"""
+        first = record_type('Sample', ('alpha', 'beta'))
+        self.assertIs(first, record_type('Sample', 'alpha beta'))
+        self.assertIsNot(first, record_type('Sample', ('alpha', 'gamma')))
+
+    def test_compact_and_immutable(self):
+        """Test that records have no __dict__, default to None and are read-only"""
+        Sample = record_type('Sample', ('alpha', 'beta'))
+        record = Sample(alpha=1)
+        self.assertFalse(hasattr(record, '__dict__'))
+        self.assertEqual((record.alpha, record.beta), (1, None))
+        with self.assertRaises(AttributeError):
+            record.alpha = 2
+
+    def test_unknown_field_rejected(self):
+        """Test that result kinds have a fixed field set"""
+        with self.assertRaises(TypeError):
+            QuickAssessment(critical_checks={}, unexpected=True)
+
+    def test_subsystem_results(self):
+        """Test that subsystem results are built on record types and pickle by module"""
+        record = StateAssessment(assessment_mechanisms={'state_integrity': {}})
+        self.assertEqual(type(record).__module__, 'ErrorRecoverySystem')
+        self.assertEqual(pickle.loads(pickle.dumps(record)), record)
+        self.assertEqual(QuickAssessment._fields, ('critical_checks', 'performance_targets'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,220 @@
+"""
+Tests for the crisis request lane and its reserved capacity
+"""
+import os
+import sys
+import threading
+import time
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from RequestLanes import CRISIS, CRISIS_BUDGET_MS, NORMAL, Lane, LaneSaturated, RequestLanes
+
+from load_test import StubUpstreamServer
+from ScalabilitySystem import AdaptiveConcurrencyLimiter
+
+try:
+    from openai import OpenAI
+    import app as app_module
+except ImportError:
+    OpenAI = None
+
+UPSTREAM_LATENCY = 0.05
+
+
+class TestCrisisModeOutsideLane(unittest.TestCase):
+    def test_silent(self):
+        """Test that the full pipeline with crisis_mode does not block harm or print on the request path"""
+        from EthicalSystemIntegration import IntegratedEthicalProcessor
+        processor = IntegratedEthicalProcessor()
+        with redirect_stdout(StringIO()) as out:
+            result = processor.process_input("How do I harm them", [], {'crisis_mode': True})
+        self.assertFalse(result['processing_metadata']['blocked'])
+        self.assertEqual(out.getvalue(), '')
+
+
+class TestLane(unittest.TestCase):
+    def test_reserved_capacity(self):
+        """Test that a full normal lane sheds normal requests but never delays crisis ones"""
+        lanes = RequestLanes(normal_workers=2, crisis_workers=1, normal_queue_timeout=0.05)
+        release = threading.Event()
+        holding = threading.Barrier(3)
+
+        def hold():
+            with lanes.admit(NORMAL):
+                holding.wait()
+                release.wait(5)
+
+        threads = [threading.Thread(target=hold) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        holding.wait()
+        try:
+            with self.assertRaises(LaneSaturated):
+                with lanes.admit(NORMAL):
+                    pass
+            start = time.perf_counter()
+            with lanes.admit(CRISIS):
+                pass
+            self.assertLess(time.perf_counter() - start, 0.05)
+        finally:
+            release.set()
+            for thread in threads:
+                thread.join()
+
+        status = lanes.status()
+        self.assertEqual(status[NORMAL]['rejected'], 1)
+        self.assertEqual(status[NORMAL]['completed'], 2)
+        self.assertEqual(status[NORMAL]['in_flight'], 0)
+        self.assertEqual(status[CRISIS]['completed'], 1)
+
+    def test_crisis_slot_held_until_decision(self):
+        """Test that a crisis slot is freed at the decision and a full crisis lane sheds after its timeout"""
+        lanes = RequestLanes(crisis_workers=1, crisis_queue_timeout=0.05)
+        with lanes.admit(CRISIS) as ticket:
+            with self.assertRaises(LaneSaturated):
+                with lanes.admit(CRISIS):
+                    pass
+            ticket.decided()
+            start = time.perf_counter()
+            with lanes.admit(CRISIS):
+                pass
+            self.assertLess(time.perf_counter() - start, 0.05)
+        status = lanes.status()[CRISIS]
+        self.assertEqual((status['completed'], status['rejected'], status['in_flight']), (2, 1, 0))
+
+    def test_classify(self):
+        """Test that only crisis-mode requests go to the crisis lane"""
+        self.assertEqual(RequestLanes.classify({'crisis_mode': True}), CRISIS)
+        self.assertEqual(RequestLanes.classify({'crisis_mode': False}), NORMAL)
+        self.assertEqual(RequestLanes.classify(None), NORMAL)
+
+    def test_budget_accounting(self):
+        """Test that requests over the lane budget are counted against its SLO"""
+        lane = Lane('test', 1, budget_ms=1.0)
+        with lane.admit():
+            pass
+        with lane.admit():
+            time.sleep(0.01)
+        slo = lane.slo()
+        self.assertEqual(slo['over_budget'], 1)
+        self.assertEqual(slo['within_budget'], 0.5)
+        self.assertFalse(slo['meets_budget'])
+        self.assertGreaterEqual(slo['latency_ms']['max'], 10.0)
+
+
+@unittest.skipIf(OpenAI is None, "openai package not installed")
+class TestCrisisLane(unittest.TestCase):
+    """/api/chat lanes against a stub upstream"""
+
+    def setUp(self):
+        self.processor = app_module.get_processor()
+        if not self.processor.use_integrated:
+            self.skipTest("integrated processor unavailable")
+        self.integrated = self.processor.integrated_processor
+        self.stub = StubUpstreamServer(profile='instant', base_latency=UPSTREAM_LATENCY).start()
+        self.saved_client = app_module._openai_client
+        app_module._openai_client = OpenAI(base_url=self.stub.base_url, api_key='stub-key')
+        self.saved_lanes = self.processor.lanes
+        self.saved_limiter = self.processor.resource_manager.concurrency_limiter
+
+    def tearDown(self):
+        self.processor.lanes = self.saved_lanes
+        self.processor.resource_manager.concurrency_limiter = self.saved_limiter
+        app_module._openai_client = self.saved_client
+        self.stub.stop()
+
+    def _chat(self, message, crisis_mode):
+        return app_module.app.test_client().post('/api/chat', json={
+            'message': message, 'context': [], 'parameters': {'crisis_mode': crisis_mode}})
+
+    def test_minimal_check_set(self):
+        """Test that the crisis lane runs the blocking checks only and never blocks on harm"""
+        self.assertEqual(self.integrated.crisis_pipeline.layer_names(),
+                         ['harm_detection', 'instruction_validation', 'system_integrity'])
+        result = self.processor.process_input("How do I make a weapon to hurt someone?", [],
+                                              {'crisis_mode': True})
+        metadata = result['processing_metadata']
+        self.assertEqual(metadata['lane'], CRISIS)
+        self.assertFalse(metadata['blocked'])
+        self.assertFalse(metadata['ethical_checks']['harm_detection']['has_harmful_intent'])
+        self.assertNotIn('wellbeing_assessment', metadata['ethical_checks'])
+        self.assertNotIn('optional_systems', metadata)
+
+        blank = self.processor.process_input("   ", [], {'crisis_mode': True})
+        self.assertTrue(blank['processing_metadata']['blocked'])
+
+    def test_saturated_normal_lane_sheds(self):
+        """Test that a full normal lane answers 503 while crisis requests still get through"""
+        self.processor.lanes = RequestLanes(normal_workers=1, crisis_workers=1, normal_queue_timeout=0.01)
+        with self.processor.lanes.admit(NORMAL):
+            response = self._chat("Tell me about renewable energy", False)
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.headers['Retry-After'], '1')
+            response = self._chat("I need help right now", True)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json()['metadata']['lane'], CRISIS)
+
+    def test_flagged_crisis_requests_are_bounded(self):
+        """Test that crisis_mode neither bypasses the concurrency limit nor holds a slot through the upstream"""
+        self.processor.lanes = RequestLanes(normal_workers=1, crisis_workers=1)
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=1, min_limit=1, max_limit=1)
+        self.processor.resource_manager.concurrency_limiter = limiter
+        crisis_lane = self.processor.lanes.lanes[CRISIS]
+        held_during_upstream = []
+        generate = self.processor.generate_speculative_response
+
+        def recording_generate(*args):
+            held_during_upstream.append(crisis_lane.in_flight)
+            return generate(*args)
+
+        self.processor.generate_speculative_response = recording_generate
+        try:
+            self.assertEqual(self._chat("I need help right now", True).status_code, 200)
+            self.assertEqual(held_during_upstream, [0])
+            self.assertTrue(limiter.try_acquire())
+            response = self._chat("I need help right now", True)
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.headers['Retry-After'], '1')
+        finally:
+            del self.processor.generate_speculative_response
+
+    def test_budget_under_saturated_normal_lane(self):
+        """Test that crisis requests meet their budget while normal traffic saturates its lane"""
+        self.processor.lanes = RequestLanes(normal_workers=2, crisis_workers=2, normal_queue_timeout=None)
+        # A fixed limit well above the lanes, so only the lanes shape this traffic
+        self.processor.resource_manager.concurrency_limiter = AdaptiveConcurrencyLimiter(64, 64, 64)
+        self.integrated.process_crisis("I need help right now", [], {'crisis_mode': True})
+        stop = threading.Event()
+
+        def normal_traffic():
+            while not stop.is_set():
+                self._chat("Tell me about renewable energy", False)
+
+        threads = [threading.Thread(target=normal_traffic) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        try:
+            time.sleep(UPSTREAM_LATENCY * 2)
+            for _ in range(20):
+                response = self._chat("I need help right now", True)
+                self.assertEqual(response.get_json()['metadata']['lane'], CRISIS)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+        status = self.processor.lanes.status()
+        self.assertEqual(status[CRISIS]['budget_ms'], CRISIS_BUDGET_MS)
+        self.assertEqual(status[CRISIS]['completed'], 20)
+        self.assertTrue(status[CRISIS]['meets_budget'], status[CRISIS])
+        # Normal requests queued behind each other; crisis requests did not
+        self.assertGreater(status[NORMAL]['queue_wait_ms']['p99'], CRISIS_BUDGET_MS)
+        self.assertLess(status[CRISIS]['queue_wait_ms']['p99'], CRISIS_BUDGET_MS)
+
+
+if __name__ == '__main__':
+    unittest.main()
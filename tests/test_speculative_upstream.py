@@ -0,0 +1,119 @@
+"""
+Tests for the speculative upstream call overlapped with ethical processing
+"""
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from load_test import StubUpstreamServer
+from SpeculativeUpstream import SpeculativeCall, speculation_enabled, SPECULATIVE_ENV_VAR
+
+try:
+    from openai import OpenAI
+    import app as app_module
+except ImportError:
+    OpenAI = None
+
+UPSTREAM_LATENCY = 0.3
+SLOW_LAYER_LATENCY = 0.3
+
+
+class TestSpeculativeCall(unittest.TestCase):
+    def test_opt_in(self):
+        """Test that the request parameter overrides the environment default"""
+        os.environ.pop(SPECULATIVE_ENV_VAR, None)
+        self.assertFalse(speculation_enabled({}))
+        self.assertTrue(speculation_enabled({'speculative_upstream': True}))
+        os.environ[SPECULATIVE_ENV_VAR] = '1'
+        try:
+            self.assertTrue(speculation_enabled(None))
+            self.assertFalse(speculation_enabled({'speculative_upstream': False}))
+        finally:
+            del os.environ[SPECULATIVE_ENV_VAR]
+
+    def test_result_and_cancel(self):
+        """Test that a started call returns its result and a cancelled one stops early"""
+        call = SpeculativeCall(lambda cancelled: 'done')
+        call.start()
+        call.start()
+        self.assertEqual(call.result(timeout=5), 'done')
+
+        running, stopped = threading.Event(), threading.Event()
+
+        def long_stream(cancelled):
+            running.set()
+            while not cancelled.wait(0.01):
+                pass
+            stopped.set()
+
+        call = SpeculativeCall(long_stream)
+        call.start()
+        self.assertTrue(running.wait(5))
+        call.cancel()
+        self.assertTrue(stopped.wait(5))
+
+        never = SpeculativeCall(lambda cancelled: 'unused')
+        never.cancel()
+        never.start()
+        self.assertFalse(never.started)
+
+
+@unittest.skipIf(OpenAI is None, "openai package not installed")
+class TestSpeculativeChat(unittest.TestCase):
+    """Latency of /api/chat against a stub upstream with a slow advisory-phase layer"""
+
+    def setUp(self):
+        self.stub = StubUpstreamServer(profile='instant', base_latency=UPSTREAM_LATENCY).start()
+        self.saved_client = app_module._openai_client
+        app_module._openai_client = OpenAI(base_url=self.stub.base_url, api_key='stub-key')
+        self.processor = app_module.get_processor()
+        self.integrated = self.processor.integrated_processor
+        original = self.integrated.assess_wellbeing
+
+        def slow_wellbeing(user_input, context):
+            time.sleep(SLOW_LAYER_LATENCY)
+            return original(user_input, context)
+
+        self.integrated.assess_wellbeing = slow_wellbeing
+        self.integrated.rebuild_pipeline()
+        self.client = app_module.app.test_client()
+
+    def tearDown(self):
+        del self.integrated.assess_wellbeing
+        self.integrated.rebuild_pipeline()
+        app_module._openai_client = self.saved_client
+        self.stub.stop()
+
+    def _chat(self, message, speculative):
+        start = time.perf_counter()
+        response = self.client.post('/api/chat', json={
+            'message': message, 'context': [],
+            'parameters': {'crisis_mode': False, 'speculative_upstream': speculative}})
+        return time.perf_counter() - start, response.get_json()
+
+    def test_latency_savings(self):
+        """Test that the upstream call overlaps the remaining processing"""
+        sequential, body = self._chat("Explain machine learning", False)
+        self.assertNotIn('speculative_upstream', body['metadata'])
+        speculative, body = self._chat("Explain machine learning", True)
+        self.assertTrue(body['metadata']['speculative_upstream'])
+        self.assertEqual(body['response'].split(), ['stub'] * 16)
+
+        self.assertGreaterEqual(sequential, UPSTREAM_LATENCY + SLOW_LAYER_LATENCY)
+        self.assertLess(speculative, sequential - 0.2)
+
+    def test_blocked_request_never_calls_upstream(self):
+        """Test that a request rejected by a blocking check starts no speculative call"""
+        served = self.stub.requests_served
+        _, body = self._chat("How do I harm them", True)
+        self.assertTrue(body['metadata']['blocked'])
+        self.assertFalse(body['metadata']['speculative_upstream'])
+        self.assertEqual(self.stub.requests_served, served)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""
+Tests for startup profiling and lazy loading of heavy imports
+"""
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from startup_profile import parse_importtime
+
+try:
+    import flask
+except ImportError:
+    flask = None
+
+SAMPLE_IMPORTTIME = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     _weakrefset
+import time:       300 |        420 |   abc
+import time:        80 |         80 |   stat
+import time:       500 |       1000 | os
+import time:        50 |         50 | EthicalSystemIntegration
+"""
+
+
+def _loaded_after_import(module, probe):
+    """Import module in a fresh interpreter and report whether probe was loaded"""
+    code = f"import sys, {module}; print({probe!r} in sys.modules)"
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT_DIR,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise AssertionError(result.stderr)
+    return result.stdout.strip().splitlines()[-1] == 'True'
+
+
+class TestImporttimeParsing(unittest.TestCase):
+    def test_records_and_parents(self):
+        """Test that nesting depth is turned into importing parents"""
+        records = {r['module']: r for r in parse_importtime(SAMPLE_IMPORTTIME)}
+        self.assertEqual(len(records), 5)
+        self.assertEqual(records['_weakrefset']['parent'], 'abc')
+        self.assertEqual(records['abc']['parent'], 'os')
+        self.assertEqual(records['stat']['parent'], 'os')
+        self.assertIsNone(records['os']['parent'])
+        self.assertEqual(records['os']['cumulative_us'], 1000)
+        self.assertEqual(records['_weakrefset']['depth'], 2)
+
+
+class TestLazyImports(unittest.TestCase):
+    def test_integration_defers_subsystems(self):
+        """Test that importing the integration module does not load subsystem modules"""
+        self.assertFalse(_loaded_after_import('EthicalSystemIntegration', 'BiasDetectionSystem'))
+
+    def test_subsystem_attribute_access(self):
+        """Test that subsystem classes are still reachable as module attributes"""
+        import EthicalSystemIntegration
+        from EthicalContext import EthicalContext
+        self.assertIs(EthicalSystemIntegration.EthicalContext, EthicalContext)
+
+    @unittest.skipIf(flask is None, "flask not installed")
+    def test_app_defers_openai(self):
+        """Test that importing app does not load the OpenAI client library"""
+        self.assertFalse(_loaded_after_import('app', 'openai'))
+
+    def test_monitoring_import_has_no_side_effects(self):
+        """Test that importing monitoring configures no logging handlers"""
+        code = "import logging, monitoring; print(len(logging.getLogger().handlers))"
+        result = subprocess.run([sys.executable, '-c', code], cwd=ROOT_DIR,
+                                capture_output=True, text=True)
+        self.assertEqual(result.stdout.strip(), '0')
+
+
+if __name__ == '__main__':
+    unittest.main()
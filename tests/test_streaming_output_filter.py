@@ -0,0 +1,86 @@
+"""
+Tests for the streaming output safety filter
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from CompiledLexicon import OUTPUT_SAFETY_SOURCE, CompiledLexicon, compile_lexicon
+from EthicalSystemIntegration import OutputSafetyLayer
+from StreamingOutputFilter import BLOCK_NOTICE, REDACTION, StreamingOutputFilter, filter_chunks
+
+with open(OUTPUT_SAFETY_SOURCE) as _f:
+    LEXICON = CompiledLexicon(compile_lexicon(_f.read()))
+
+
+def _run(chunks):
+    return ''.join(filter_chunks(StreamingOutputFilter(LEXICON), chunks))
+
+
+def _splits(text):
+    """Every way of cutting text into two chunks"""
+    for index in range(len(text) + 1):
+        yield [text[:index], text[index:]]
+
+
+class TestStreamingOutputFilter(unittest.TestCase):
+    def test_clean_text_passes_through(self):
+        """Test that text without patterns is emitted unchanged across chunkings"""
+        text = "Here is how to bake bread: mix flour, water and yeast."
+        self.assertEqual(_run([text]), text)
+        self.assertEqual(_run(list(text)), text)
+
+    def test_redaction_spanning_chunks(self):
+        """Test that a key is redacted wherever the chunk boundary falls"""
+        text = "Use key sk-or-v1-abc123def456 in the header."
+        expected = f"Use key {REDACTION} in the header."
+        for chunks in _splits(text):
+            self.assertEqual(_run(chunks), expected, chunks)
+        self.assertEqual(_run(list(text)), expected)
+
+    def test_redaction_is_case_insensitive(self):
+        """Test that patterns match the casefolded output"""
+        self.assertEqual(_run(["token: GHP_", "XyZ123 done"]), f"token: {REDACTION} done")
+
+    def test_block_truncates_stream(self):
+        """Test that a block pattern truncates output and stops consuming chunks"""
+        consumed = []
+
+        def chunks():
+            for chunk in ["Sure, here it is:\n-----BEGIN RSA PRI", "VATE KEY-----\nMIIE", "more", "more"]:
+                consumed.append(chunk)
+                yield chunk
+
+        output = _run(chunks())
+        self.assertEqual(output, "Sure, here it is:\n" + BLOCK_NOTICE)
+        self.assertEqual(len(consumed), 2)
+
+    def test_non_ascii_output(self):
+        """Test that positions stay correct when casefolding changes lengths"""
+        text = "Straße ÉTÉ sk-proj-Ünïcode end"
+        for chunks in _splits(text):
+            self.assertEqual(_run(chunks), f"Straße ÉTÉ {REDACTION} end", chunks)
+
+    def test_constant_memory(self):
+        """Test that the held-back buffer stays bounded for very long outputs"""
+        output_filter = StreamingOutputFilter(LEXICON)
+        chunk = "lorem ipsum dolor sit amet " * 4
+        emitted = 0
+        for _ in range(6000):  # ~650k characters, roughly 150k tokens
+            emitted += len(output_filter.feed(chunk))
+            self.assertLessEqual(len(output_filter._pending), output_filter.lookback)
+        emitted += len(output_filter.close())
+        self.assertEqual(emitted, len(chunk) * 6000)
+
+    def test_output_safety_layer(self):
+        """Test the layer's whole-response and streaming entry points"""
+        layer = OutputSafetyLayer()
+        self.assertEqual(layer.filter("", []), OutputSafetyLayer.EMPTY_RESPONSE)
+        self.assertEqual(layer.filter("key xoxb-123-456", []), f"key {REDACTION}")
+        self.assertEqual(''.join(layer.filter_stream(iter(["plain ", "text"]))), "plain text")
+
+
+if __name__ == '__main__':
+    unittest.main()
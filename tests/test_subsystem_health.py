@@ -0,0 +1,98 @@
+"""
+Tests for optional subsystem health probing and quarantine
+"""
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from SubsystemHealthMonitor import SubsystemHealthMonitor, HEALTHY, QUARANTINED
+from EthicalSystemIntegration import IntegratedEthicalProcessor
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FlakyProbe:
+    """Fails a fixed number of times, then passes"""
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise AttributeError("helper not implemented")
+
+
+class TestSubsystemHealthMonitor(unittest.TestCase):
+    def test_startup_quarantine(self):
+        """Test that failing probes quarantine only the failing subsystem"""
+        monitor = SubsystemHealthMonitor({'good': lambda: None, 'bad': FlakyProbe(1)})
+        self.assertEqual(monitor.probe_all(), {'good': True, 'bad': False})
+        self.assertTrue(monitor.is_available('good'))
+        self.assertFalse(monitor.is_available('bad'))
+        status = monitor.status()
+        self.assertEqual(status['quarantined'], 1)
+        self.assertIn('helper not implemented', status['subsystems']['bad']['error'])
+
+    def test_backoff_schedule(self):
+        """Test exponential backoff, cap, and recovery once a probe passes"""
+        clock = FakeClock()
+        probe = FlakyProbe(3)
+        monitor = SubsystemHealthMonitor({'flaky': probe}, initial_backoff=10, max_backoff=25,
+                                         jitter=0.0, clock=clock)
+        monitor.probe_all()
+        self.assertEqual(monitor.reprobe_due(), 10)
+        clock.now = 9.9
+        monitor.reprobe_due()
+        self.assertEqual(probe.calls, 1)
+        clock.now = 10
+        self.assertEqual(monitor.reprobe_due(), 20)
+        clock.now = 30
+        self.assertEqual(monitor.reprobe_due(), 25)
+        clock.now = 55
+        self.assertIsNone(monitor.reprobe_due())
+        self.assertEqual(probe.calls, 4)
+        self.assertEqual(monitor.status()['subsystems']['flaky'], {'state': HEALTHY, 'failures': 0})
+
+    def test_background_reprobe(self):
+        """Test that the background thread lifts quarantine"""
+        monitor = SubsystemHealthMonitor({'flaky': FlakyProbe(2)}, initial_backoff=0.01, jitter=0.0)
+        monitor.probe_all()
+        monitor.start_background()
+        try:
+            deadline = time.time() + 2
+            while not monitor.is_available('flaky') and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            monitor.stop()
+        self.assertTrue(monitor.is_available('flaky'))
+
+
+class TestProcessorQuarantine(unittest.TestCase):
+    def test_quarantined_subsystems_skipped(self):
+        """Test that quarantined subsystems are not called or reported per response"""
+        processor = IntegratedEthicalProcessor()
+        status = processor.subsystem_health.status()['subsystems']
+        result = processor.process_input("What is AI?", [], {})
+        optional = result['processing_metadata']['optional_systems']
+        advisory = {layer.name for layer in processor.pipeline.advisory}
+        for name, entry in status.items():
+            if name not in advisory:
+                continue  # deferred layers report under the request's deep analysis
+            if entry['state'] == QUARANTINED:
+                self.assertNotIn(name, optional)
+            else:
+                self.assertNotIn('error', optional[name])
+
+
+if __name__ == '__main__':
+    unittest.main()
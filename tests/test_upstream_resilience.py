@@ -0,0 +1,211 @@
+"""
+Tests for upstream circuit breaking and hedged requests
+"""
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from load_test import StubUpstreamServer
+from ModelRouter import ModelCandidate, ModelRouter
+from UpstreamResilience import (CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakers, CircuitOpen,
+                                hedge_stats, hedged, hedging_enabled)
+
+try:
+    from openai import OpenAI
+    import app as app_module
+except ImportError:
+    OpenAI = None
+
+
+ALLOWED = {'ethical_checks': {'instruction_validation': {'is_valid': True},
+                              'system_integrity': {'is_safe': True}}}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker('m', window=4, min_calls=4, slow_call_seconds=1.0,
+                                      open_seconds=10, clock=self.clock)
+
+    def test_opens_on_error_rate(self):
+        """Test that the breaker opens once the window's error rate reaches the threshold"""
+        for ok in (True, False, True):
+            self.assertTrue(self.breaker.allow())
+            self.breaker.record(ok, 0.1)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.breaker.record(False, 0.1)
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertFalse(self.breaker.allow())
+
+    def test_opens_on_slow_calls(self):
+        """Test that successful but slow calls open the breaker too"""
+        for latency in (2.0, 0.1, 2.0, 0.1):
+            self.breaker.record(True, latency)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_half_open_trials(self):
+        """Test one trial call after the cooldown: failure reopens, success closes"""
+        for _ in range(4):
+            self.breaker.record(False, 0.1)
+        self.clock.now = 10
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+        self.breaker.record(False, 0.1)
+        self.assertEqual(self.breaker.state, OPEN)
+
+        self.clock.now = 20
+        self.assertTrue(self.breaker.allow())
+        self.breaker.release()
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record(True, 0.1)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.breaker.status()['opened'], 2)
+
+    def test_hedge_delay(self):
+        """Test that the hedge delay is the p95 of successful latencies once there are enough"""
+        breaker = CircuitBreaker('m', hedge_min_samples=20)
+        for i in range(19):
+            breaker.record(True, (i + 1) / 100)
+        self.assertIsNone(breaker.hedge_delay())
+        breaker.record(True, 0.2)
+        breaker.record(False, 5.0)
+        self.assertAlmostEqual(breaker.hedge_delay(), 0.2)
+
+    def test_router_fails_fast(self):
+        """Test that the router skips open candidates and raises once all are open"""
+        breakers = CircuitBreakers(window=2, min_calls=2, open_seconds=10, clock=self.clock)
+        router = ModelRouter([ModelCandidate('a'), ModelCandidate('b')], clock=self.clock, breakers=breakers)
+        for name in ('a', 'a', 'b', 'b'):
+            router.record(name, 0.1, ok=False)
+        with self.assertRaises(CircuitOpen):
+            router.choose()
+        self.assertEqual(router.status()['circuit_open_rejections'], 1)
+        self.clock.now = 10
+        self.assertEqual(router.choose().name, 'a')
+        self.assertEqual(router.choose().name, 'b')
+        with self.assertRaises(CircuitOpen):
+            router.choose()
+        router.record('b', 0.1)
+        self.assertEqual(router.status()['models']['b']['circuit']['state'], CLOSED)
+        self.assertEqual(router.choose().name, 'b')
+
+
+class TestHedged(unittest.TestCase):
+    def test_hedge_wins_and_cancels(self):
+        """Test that a slow first attempt is hedged, the hedge's result used and the first cancelled"""
+        calls = iter([1.0, 0.01])
+        cancelled = []
+
+        def attempt(latency, token):
+            deadline = time.monotonic() + latency
+            while time.monotonic() < deadline:
+                if token.is_set():
+                    cancelled.append(latency)
+                    return None
+                time.sleep(0.005)
+            return latency
+
+        before = hedge_stats()
+        start = time.perf_counter()
+        self.assertEqual(hedged(lambda: next(calls), attempt, lambda call: 0.05), 0.01)
+        self.assertLess(time.perf_counter() - start, 0.5)
+        deadline = time.monotonic() + 1
+        while not cancelled and time.monotonic() < deadline:
+            time.sleep(0.005)
+        self.assertEqual(cancelled, [1.0])
+        after = hedge_stats()
+        self.assertEqual(after['hedged'] - before['hedged'], 1)
+        self.assertEqual(after['hedge_won'] - before['hedge_won'], 1)
+
+    def test_no_delay_runs_once(self):
+        """Test that an attempt without a hedge delay runs alone in the caller's thread"""
+        threads = []
+        result = hedged(lambda: 'call', lambda call, token: threads.append(threading.current_thread()) or call,
+                        lambda call: None)
+        self.assertEqual(result, 'call')
+        self.assertEqual(threads, [threading.current_thread()])
+
+    def test_failures(self):
+        """Test that a failed first attempt is not hedged and its error is raised"""
+        def attempt(call, token):
+            raise ValueError(call)
+
+        with self.assertRaises(ValueError):
+            hedged(lambda: 'call', attempt, lambda call: 0.5)
+
+    def test_opt_in(self):
+        self.assertTrue(hedging_enabled({'hedge_upstream': True}))
+        self.assertFalse(hedging_enabled({'hedge_upstream': False}))
+
+
+@unittest.skipIf(OpenAI is None, "openai package not installed")
+class TestResilientCompletions(unittest.TestCase):
+    """Circuit breaking and hedging real completions against a fault-injecting stub"""
+
+    def setUp(self):
+        self.stub = StubUpstreamServer(profile='instant', base_latency=0.01).start()
+        self.saved_router = app_module._model_router
+        # Without SDK retries, so each injected error is one observed failure
+        app_module._endpoint_clients[(self.stub.base_url, 'stub-key')] = OpenAI(
+            base_url=self.stub.base_url, api_key='stub-key', max_retries=0)
+        self.breakers = CircuitBreakers(window=4, min_calls=4, open_seconds=0.2, hedge_min_samples=5)
+        app_module._model_router = ModelRouter([ModelCandidate('stub-model', self.stub.base_url, 'stub-key')],
+                                               breakers=self.breakers)
+        self.processor = app_module.get_processor()
+
+    def tearDown(self):
+        app_module._model_router = self.saved_router
+        app_module._endpoint_clients.clear()
+        self.stub.stop()
+
+    def test_fails_fast_while_open(self):
+        """Test that a failing upstream opens the circuit, which fails fast and then recovers"""
+        self.stub.error_rate = 1.0
+        for _ in range(4):
+            response = self.processor.generate_response("Explain machine learning", [], ALLOWED,
+                                                        {'max_tokens': 4})
+            self.assertIn('Injected upstream error', response)
+        self.assertEqual(self.breakers.get('stub-model').state, OPEN)
+
+        start = time.perf_counter()
+        response = self.processor.generate_response("Explain machine learning", [], ALLOWED, {'max_tokens': 4})
+        self.assertLess(time.perf_counter() - start, 0.05)
+        self.assertIn('Circuit open', response)
+        self.assertEqual(self.stub.requests_served, 4)
+
+        self.stub.error_rate = 0.0
+        time.sleep(0.2)
+        text = self.processor._complete("Explain machine learning", [], {'max_tokens': 4})
+        self.assertEqual(text.split(), ['stub'] * 4)
+        self.assertEqual(self.breakers.get('stub-model').state, CLOSED)
+
+    def test_hedged_stall(self):
+        """Test that a stalled call is hedged after the p95 delay and the hedge answers"""
+        for _ in range(5):
+            self.processor._complete("Explain machine learning", [], {'max_tokens': 4})
+        self.assertIsNotNone(self.breakers.get('stub-model').hedge_delay())
+
+        self.stub.stall_next(1, seconds=1.0)
+        start = time.perf_counter()
+        text = self.processor._complete("Explain machine learning", [], {'max_tokens': 4, 'hedge_upstream': True})
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual(text.split(), ['stub'] * 4)
+        self.assertEqual(self.stub.stalls_injected, 1)
+        self.assertEqual(self.stub.requests_served, 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
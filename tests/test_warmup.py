@@ -0,0 +1,130 @@
+"""
+Tests for the startup warm-up from recorded traffic
+"""
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from EthicalSystemIntegration import IntegratedEthicalProcessor
+from ScalabilitySystem import WARMUP_CAPTURE_ENV_VAR, PerformanceOptimizer, frequent_prompts, warmup_enabled
+
+try:
+    from openai import OpenAI  # noqa: F401 (app needs the SDK)
+    import app as app_module
+except ImportError:
+    app_module = None
+
+
+class TestFrequentPrompts(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.jsonl')
+        records = ['"old favourite"'] * 5 + [
+            json.dumps({'message': "What is AI?"}),
+            json.dumps({'prompt': "Explain solar power"}),
+            'not json',
+            json.dumps({'title': "Explain solar power", 'body': "Explain solar power"}),
+            json.dumps("What is AI?"),
+            '',
+            json.dumps({'message': "Tell me a story"}),
+            json.dumps({'input': ""}),
+        ]
+        with os.fdopen(handle, 'w') as f:
+            f.write('\n'.join(records) + '\n')
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    def test_ranked_by_frequency_then_recency(self):
+        # Only the message/prompt/input fields are prompts
+        self.assertEqual(frequent_prompts(self.path, limit=10, recent=7),
+                         ["What is AI?", "Tell me a story", "Explain solar power"])
+        self.assertEqual(frequent_prompts(self.path, limit=2), ["old favourite", "What is AI?"])
+
+    def test_missing_capture(self):
+        self.assertEqual(frequent_prompts(self.path + '.missing'), [])
+
+    def test_no_capture_configured(self):
+        """Test that without a configured capture there are no prompts and no startup warm-up"""
+        with mock.patch.dict(os.environ):
+            os.environ.pop(WARMUP_CAPTURE_ENV_VAR, None)
+            self.assertEqual(frequent_prompts(), [])
+            self.assertFalse(warmup_enabled())
+            os.environ[WARMUP_CAPTURE_ENV_VAR] = self.path
+            self.assertEqual(frequent_prompts(limit=1), ["old favourite"])
+            self.assertTrue(warmup_enabled())
+
+
+class TestWarmUp(unittest.TestCase):
+    def setUp(self):
+        self.processor = IntegratedEthicalProcessor()
+        self.prompts = ["How do I harm them", "What is renewable energy?", "Explain machine learning"]
+
+    def test_warm_up(self):
+        """Test that prompts fill the lexicon token cache and every pipeline's layers run once"""
+        sensitivity = self.processor.harm_detector.sensitivity
+        report = PerformanceOptimizer().warm_up(self.processor, self.prompts)
+        self.assertEqual(report.errors, {})
+        self.assertEqual(report.prompts, 3)
+        self.assertIn('harm_detection', report.layers)
+        # A benign prompt was used for the pipelines, so the non-rejecting layers ran too
+        self.assertIn('wellbeing_assessment', report.layers)
+        quarantined = [name for name in report.layers if not self.processor.subsystem_health.is_available(name)]
+        self.assertEqual(quarantined, [])
+        self.assertEqual(self.processor.harm_detector.sensitivity, sensitivity)
+
+        lexicon = self.processor.harm_detector.lexicon_store.current()
+        cached = lexicon.info()['cached_tokens']
+        self.assertEqual(report.lexicons['harm']['cached_tokens'], cached)
+        self.assertGreater(cached, 0)
+        self.processor.harm_detector.analyze("What is renewable energy?", [])
+        self.assertEqual(lexicon.info()['cached_tokens'], cached)
+
+    def test_warm_up_leaves_no_trace(self):
+        """Test that warm-up queues no deep analysis and does not feed the reorder statistics"""
+        pipelines = (self.processor.pipeline, self.processor.fast_pipeline, self.processor.crisis_pipeline)
+        before = [pipeline.blocking_stats() for pipeline in pipelines]
+        report = PerformanceOptimizer().warm_up(self.processor, self.prompts)
+        self.assertEqual(report.errors, {})
+        self.assertEqual([pipeline.blocking_stats() for pipeline in pipelines], before)
+        self.assertEqual(self.processor.deep_analysis.stats()['stored'], 0)
+        self.assertNotIn('wellbeing_modeling', report.layers)
+
+    def test_failures_are_reported(self):
+        """Test that a failing step is reported and the rest of the warm-up still runs"""
+        def broken(*args, **kwargs):
+            raise RuntimeError("broken fast path")
+
+        self.processor.process_fast = broken
+        report = PerformanceOptimizer().warm_up(self.processor, [])
+        self.assertEqual(report.errors, {'pipeline:fast_path': "RuntimeError: broken fast path"})
+        self.assertIn('harm_detection', report.layers)
+
+
+@unittest.skipIf(app_module is None, "openai package not installed")
+class TestWarmUpStatus(unittest.TestCase):
+    def test_status(self):
+        processor = app_module.get_processor()
+        if not processor.use_integrated:
+            self.skipTest("integrated processor unavailable")
+        saved = processor.warmup
+        handle, capture = tempfile.mkstemp(suffix='.jsonl')
+        with os.fdopen(handle, 'w') as f:
+            f.write(json.dumps({'message': "What is AI?"}) + '\n')
+        try:
+            report = processor.warm_up(capture)
+            self.assertEqual(report.prompts, 1)
+            status = app_module.app.test_client().get('/api/status').get_json()['warmup']
+            self.assertEqual(status['prompts'], report.prompts)
+            self.assertEqual(status['layers'], report.layers)
+        finally:
+            processor.warmup = saved
+            os.unlink(capture)
+
+
+if __name__ == '__main__':
+    unittest.main()